@@ -0,0 +1,112 @@
+"""Скорость потокового импорта и экспорта каталога (core.catalog_io).
+
+Заполняет исходную БД сгенерированными квестами (часть с историей
+версий), выгружает каталог в NDJSON и CSV и загружает каждый файл в
+пустую БД. Печатает записи в секунду для каждого шага; цель импорта -
+200 000 записей/с. Отдельно замеряются разбор файла (только Python) и
+запись тех же строк в голую таблицу с тем же UNIQUE (только SQLite):
+вместе они показывают, чего импорт не может быть быстрее на этой машине.
+
+Запуск из каталога src:  python -m benchmarks.catalog_io --quests 300000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.catalog_io import _read_csv, _read_ndjson, export_catalog, import_catalog
+from core.database import Database
+from core.quest_generator import QuestGenerator
+
+TARGET_PER_S = 200_000
+READERS = {"ndjson": _read_ndjson, "csv": _read_csv}
+
+
+def fill(path, quests, versions_every):
+    db = Database(path)
+    with db.bulk_load():
+        db.create_quests(QuestGenerator(5).generate(quests))
+        # каждый versions_every-й квест с двумя старыми версиями
+        db.conn.execute(
+            """
+            INSERT INTO quest_versions (quest_id, title, difficulty, reward, description, created_at)
+            SELECT id, title, difficulty, reward - v.n, description, created_at
+            FROM quests, (SELECT 1 AS n UNION ALL SELECT 2) v WHERE id % ? = 0
+            """,
+            (versions_every,),
+        )
+        db.conn.commit()
+    return db
+
+
+def parse_only(path, fmt, chunk_size):
+    start = time.perf_counter()
+    with open(path, "r", encoding="utf-8", newline="") as fh:
+        for _ in READERS[fmt](fh, 0, chunk_size):
+            pass
+    return time.perf_counter() - start
+
+
+def sqlite_only(path, fmt, workdir, chunk_size):
+    """Время одной записи разобранных квестов в таблицу без индексов и триггеров квестов"""
+    conn = sqlite3.connect(os.path.join(workdir, f"bare_{fmt}.db"))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE quests (id INTEGER PRIMARY KEY, title TEXT UNIQUE NOT NULL, difficulty TEXT, "
+                 "reward INTEGER, description TEXT, deadline TEXT, created_at TIMESTAMP)")
+    seconds = 0.0
+    with open(path, "r", encoding="utf-8", newline="") as fh:
+        for batch in READERS[fmt](fh, 0, chunk_size):
+            rows = [values for is_version, values in batch if not is_version]
+            start = time.perf_counter()
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO quests VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            seconds += time.perf_counter() - start
+    conn.close()
+    return seconds
+
+
+def report(label, records, seconds, target=None):
+    rate = records / seconds
+    mark = "" if target is None else ("  ✅" if rate >= target else "  ❌")
+    print(f"{label:28} {seconds:7.2f} с  {rate:10.0f} записей/с{mark}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quests", type=int, default=300_000)
+    parser.add_argument("--versions-every", type=int, default=10, help="у каждого N-го квеста есть история")
+    parser.add_argument("--chunk-size", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="qm_catalog_") as workdir:
+        source = fill(os.path.join(workdir, "source.db"), args.quests, args.versions_every)
+        print(f"📦 Каталог: {args.quests} квестов, история у каждого {args.versions_every}-го")
+        print("=" * 70)
+        for fmt in ("ndjson", "csv"):
+            path = os.path.join(workdir, f"catalog.{fmt}")
+            start = time.perf_counter()
+            records = export_catalog(source, path, versions=True)
+            report(f"экспорт {fmt}", records, time.perf_counter() - start)
+            size = os.path.getsize(path)
+            print(f"{'':28} {size / 2 ** 20:7.1f} МиБ, {size / records:.0f} байт на запись")
+            report(f"разбор {fmt}", records, parse_only(path, fmt, args.chunk_size))
+            report("запись в голую таблицу", args.quests, sqlite_only(path, fmt, workdir, args.chunk_size))
+
+            target = Database(os.path.join(workdir, f"target_{fmt}.db"))
+            start = time.perf_counter()
+            result = import_catalog(target, path, chunk_size=args.chunk_size)
+            report(f"импорт {fmt}", result.records, time.perf_counter() - start, TARGET_PER_S)
+            assert (result.quests, result.versions) == (
+                args.quests, 2 * (args.quests // args.versions_every)), result
+            target.close()
+            print("-" * 70)
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Цена статистики каталога, которую поддерживают триггеры.
+
+Вставляет одни и те же сгенерированные квесты в три временные БД:
+с триггерами статистики, без них (триггеры удалены) и через bulk_load,
+где триггеры отключены, а статистика пересчитывается один раз в конце.
+Затем сравнивает get_catalog_stats с теми же итогами, посчитанными
+полным проходом по quests, и время автосохранения с триггерами.
+
+Запуск из каталога src:  python -m benchmarks.catalog_stats --quests 200000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.quest_generator import QuestGenerator
+
+FULL_SCAN = """
+    SELECT difficulty, COUNT(*), SUM(reward), SUM(deadline < date('now')) FROM quests GROUP BY difficulty
+"""
+
+
+def fill(path, quests, mode):
+    db = Database(path)
+    if mode == "no_triggers":
+        for op in ("insert", "update", "delete"):
+            db.conn.execute(f"DROP TRIGGER quests_stats_{op}")
+    start = time.perf_counter()
+    if mode == "bulk_load":
+        with db.bulk_load():
+            db.create_quests(quests)
+    else:
+        db.create_quests(quests)
+    return db, time.perf_counter() - start
+
+
+def best_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quests", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--autosaves", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    quests = list(QuestGenerator(1).generate(args.quests))
+    with tempfile.TemporaryDirectory(prefix="qm_stats_") as workdir:
+        times = {}
+        for mode in ("no_triggers", "triggers", "bulk_load"):
+            filled, times[mode] = fill(os.path.join(workdir, f"{mode}.db"), quests, mode)
+            if mode == "triggers":
+                db = filled
+            else:
+                filled.close()
+
+        base = times["no_triggers"]
+        print(f"📊 Вставка {args.quests} квестов через create_quests")
+        print("=" * 70)
+        labels = {"no_triggers": "без статистики", "triggers": "с триггерами статистики",
+                  "bulk_load": "bulk_load + пересчёт в конце"}
+        for mode, seconds in times.items():
+            print(f"{labels[mode]:32} {seconds:7.2f} с  {args.quests / seconds:9.0f} квестов/с  "
+                  f"{(seconds / base - 1) * 100:+6.1f}%")
+
+        assert db.verify_catalog_stats() == []
+        stats_ms = best_ms(db.get_catalog_stats, args.repeat)
+        scan_ms = best_ms(lambda: db.conn.execute(FULL_SCAN).fetchall(), args.repeat)
+        print()
+        print(f"get_catalog_stats:      {stats_ms:8.3f} мс")
+        print(f"полный проход quests:   {scan_ms:8.3f} мс  (в {scan_ms / stats_ms:.0f} раз дольше)")
+        print(f"rebuild_catalog_stats:  {best_ms(db.rebuild_catalog_stats, 1):8.1f} мс")
+
+        quest = db.get_quest(1)
+        cases = {
+            "автосохранение (текст)": lambda i: (quest["title"], quest["difficulty"], quest["reward"], f"Текст {i}"),
+            "автосохранение (награда)": lambda i: (quest["title"], quest["difficulty"], i, quest["description"]),
+        }
+        print()
+        for label, fields in cases.items():
+            start = time.perf_counter()
+            for i in range(args.autosaves):
+                title, difficulty, reward, description = fields(i)
+                db.update_quest(1, title, difficulty, reward, description, quest["deadline"])
+            ms = (time.perf_counter() - start) * 1000 / args.autosaves
+            print(f"{label:26} {ms:6.3f} мс")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Скриптовый бенчмарк рисования кистью в MapEditor.
+
+Сравнивает старую схему (один QGraphicsLineItem на каждое движение мыши)
+со штрихами (одна ломаная на штрих с упрощением RDP, все штрихи рисует
+один слой StrokeLayer): число элементов сцены и время перерисовки.
+
+Запуск из каталога src:  QT_QPA_PLATFORM=offscreen python -m benchmarks.map_drawing
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt, QPointF
+from PyQt6.QtGui import QImage, QPainter, QPen
+
+from gui.map_editor import MapEditor
+from core.gamification import GamificationEngine
+
+
+def scripted_strokes(count: int, points_per_stroke: int, seed: int = 42):
+    """Детерминированные «рукописные» штрихи: плавное блуждание по сцене"""
+    rng = random.Random(seed)
+    strokes = []
+    for _ in range(count):
+        x, y = rng.uniform(50, 750), rng.uniform(50, 550)
+        angle = rng.uniform(0, 2 * math.pi)
+        points = []
+        for _ in range(points_per_stroke):
+            angle += rng.gauss(0, 0.15)
+            x = min(max(x + 2.0 * math.cos(angle), 0), 800)
+            y = min(max(y + 2.0 * math.sin(angle), 0), 600)
+            points.append(QPointF(x, y))
+        strokes.append(points)
+    return strokes
+
+
+def draw_legacy(editor: MapEditor, strokes):
+    """Старое поведение: addLine на каждое событие движения мыши"""
+    pen = QPen(MapEditor.PATH_COLOR, MapEditor.PATH_WIDTH, Qt.PenStyle.SolidLine)
+    for points in strokes:
+        last = points[0]
+        for pos in points[1:]:
+            editor.scene.addLine(last.x(), last.y(), pos.x(), pos.y(), pen)
+            last = pos
+
+
+def draw_strokes(editor: MapEditor, strokes):
+    """Новое поведение: штрих = одна упрощенная ломаная"""
+    for points in strokes:
+        editor.begin_stroke(points[0])
+        for pos in points[1:]:
+            editor.extend_stroke(pos)
+        editor.finish_stroke()
+
+
+def measure(editor: MapEditor, draw, strokes, repaints: int):
+    start = time.perf_counter()
+    draw(editor, strokes)
+    draw_time = time.perf_counter() - start
+
+    image = QImage(800, 600, QImage.Format.Format_ARGB32)
+    start = time.perf_counter()
+    for _ in range(repaints):
+        image.fill(Qt.GlobalColor.white)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        editor.scene.render(painter)
+        painter.end()
+    repaint_time = (time.perf_counter() - start) / repaints
+
+    return len(editor.scene.items()), draw_time, repaint_time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--strokes", type=int, default=200)
+    parser.add_argument("--points", type=int, default=300)
+    parser.add_argument("--repaints", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    # ссылка держит QApplication живым: без неё PyQt сразу удаляет созданный объект
+    app = QApplication.instance() or QApplication(sys.argv)
+    strokes = scripted_strokes(args.strokes, args.points)
+
+    print(f"🖌️  {args.strokes} штрихов × {args.points} точек")
+    print("=" * 50)
+    results = {}
+    for name, draw in (("addLine", draw_legacy), ("штрихи", draw_strokes)):
+        editor = MapEditor(GamificationEngine())
+        app.processEvents()  # отложенные события создания редактора - не в замер
+        items, draw_time, repaint_time = measure(editor, draw, strokes, args.repaints)
+        results[name] = (items, repaint_time)
+        print(f"{name:>8}: элементов {items:>7}, рисование {draw_time:.3f} с, "
+              f"перерисовка {repaint_time * 1000:.1f} мс")
+
+    (old_items, old_repaint), (new_items, new_repaint) = results.values()
+    print("=" * 50)
+    print(f"Элементов меньше в {old_items / max(new_items, 1):.0f}×, "
+          f"перерисовка быстрее в {old_repaint / max(new_repaint, 1e-9):.1f}×")
+    return results
+
+
+if __name__ == "__main__":
+    main()
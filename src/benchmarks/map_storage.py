@@ -0,0 +1,92 @@
+"""Бенчмарк хранения карт квестов: кодирование, БД и загрузка в MapEditor.
+
+Цель: карта из 10k штрихов загружается (чтение из БД + декодирование +
+наполнение редактора) быстрее 100 мс.
+
+Запуск из каталога src:  QT_QPA_PLATFORM=offscreen python -m benchmarks.map_storage
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.map_format import MapData, encode_map, decode_map
+
+
+def make_map(strokes: int, points: int, markers: int, seed: int = 3) -> MapData:
+    rng = random.Random(seed)
+    data = MapData()
+    for _ in range(strokes):
+        x, y = rng.uniform(0, 800), rng.uniform(0, 600)
+        data.add_stroke([(x + 2 * j, y + rng.uniform(-3, 3)) for j in range(points)])
+    types = ["Город", "Логово", "Таверна", "Лес", "Подземелье"]
+    for i in range(markers):
+        data.markers.append((rng.uniform(0, 800), rng.uniform(0, 600), types[i % len(types)]))
+    data.labels.append((100.0, 100.0, "Драконьи горы"))
+    return data
+
+
+def best_and_median(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples), statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--strokes", type=int, default=10_000)
+    parser.add_argument("--points", type=int, default=20)
+    parser.add_argument("--markers", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-gui", action="store_true", help="без загрузки в MapEditor")
+    args = parser.parse_args(argv)
+
+    data = make_map(args.strokes, args.points, args.markers)
+    db = Database(":memory:")
+    quest_id = db.create_quest("Карта", "Легкий", 100, "описание", "2025-12-31 23:59:59")
+
+    blob = encode_map(data)
+    db.save_quest_map(quest_id, blob)
+    raw_size = args.strokes * args.points * 2 * 8
+
+    print(f"🗺️  {args.strokes} штрихов × {args.points} точек, {args.markers} маркеров")
+    print("=" * 60)
+    print(f"Размер: {len(blob) / 1024:.0f} КБ (точки как double: {raw_size / 1024:.0f} КБ)")
+
+    best, median = best_and_median(lambda: encode_map(data), args.repeat)
+    print(f"encode_map          best {best:7.1f} мс   median {median:7.1f} мс")
+    best, median = best_and_median(lambda: decode_map(db.get_quest_map(quest_id)), args.repeat)
+    print(f"БД + decode_map     best {best:7.1f} мс   median {median:7.1f} мс")
+
+    if not args.no_gui:
+        from PyQt6.QtWidgets import QApplication
+        from gui.map_editor import MapEditor
+        from core.gamification import GamificationEngine
+
+        # ссылка держит QApplication живым: без неё PyQt сразу удаляет созданный объект
+        app = QApplication.instance() or QApplication(sys.argv)
+        editor = MapEditor(GamificationEngine())
+        app.processEvents()  # отложенные события создания редактора - не в замер
+
+        def load():
+            editor.show_map_blob(db.get_quest_map(quest_id))
+
+        best, median = best_and_median(load, args.repeat)
+        verdict = "✅" if median < 100 else "❌"
+        print(f"Загрузка в редактор best {best:7.1f} мс   median {median:7.1f} мс  {verdict} цель < 100 мс")
+
+    print("=" * 60)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Статистика SQL-запросов под нагрузкой.
+
+Наполняет временную БД сгенерированными квестами и прогоняет типичный
+трафик приложения: автосохранение мастера квестов (update_quest на каждое
+изменение поля), открытие квестов по id, обновление списка
+(get_all_quests) и начисление опыта. Запросы собирает QueryTracer; в
+конце печатается сводка по нормализованному SQL и медленные запросы с
+планами выполнения.
+
+Запуск из каталога src:  python -m benchmarks.query_trace --quests 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.gamification import GamificationEngine
+from core.quest_generator import QuestGenerator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quests", type=int, default=50_000)
+    parser.add_argument("--autosaves", type=int, default=2000)
+    parser.add_argument("--opens", type=int, default=2000)
+    parser.add_argument("--refreshes", type=int, default=5, help="сколько раз обновить полный список")
+    parser.add_argument("--threshold", type=float, default=20.0, help="порог медленного запроса, мс")
+    parser.add_argument("--sort", default="total_ms", choices=["total_ms", "p95_ms", "count", "rows", "steps"])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="qm_trace_") as workdir:
+        db = Database(os.path.join(workdir, "trace.db"))
+        db.create_quests(QuestGenerator(1).generate(args.quests))
+        engine = GamificationEngine(db, profile="trace")
+        tracer = db.trace_queries(args.threshold)
+        rng = random.Random(2)
+
+        quest = db.get_quest(1)
+        for i in range(args.autosaves):
+            db.update_quest(1, quest["title"], quest["difficulty"], i, quest["description"], quest["deadline"])
+        for _ in range(args.opens):
+            db.get_quest(rng.randint(1, args.quests))
+        for _ in range(args.refreshes):
+            db.get_all_quests()
+            engine.add_xp("create_quest")
+
+        print(f"🔎 {args.quests} квестов: {args.autosaves} автосохранений, {args.opens} открытий, "
+              f"{args.refreshes} обновлений списка")
+        print("=" * 100)
+        print(tracer.format_report(args.sort, width=60))
+        print("=" * 100)
+        print(f"🐢 Медленнее {args.threshold:g} мс: {len(tracer.slow)}")
+        shown = set()
+        for slow in tracer.slow:
+            if slow.sql in shown:
+                continue
+            shown.add(slow.sql)
+            print(f"\n{slow.ms:.1f} мс, {slow.rows} строк: {slow.sql}")
+            print(slow.plan or "(плана нет)")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Бенчмарк процедурного генератора квестов.
+
+Цель: не меньше 100k квестов/с генерации на одном ядре; отдельно меряется
+потоковая пакетная вставка в SQLite.
+
+Запуск из каталога src:  python -m benchmarks.quest_generator
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.quest_generator import QuestGenerator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", default=":memory:", help="файл БД для вставки")
+    args = parser.parse_args(argv)
+
+    print(f"📜 {args.count} квестов, seed {args.seed}")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    deque(QuestGenerator(args.seed).generate(args.count), maxlen=0)
+    elapsed = time.perf_counter() - start
+    rate = args.count / elapsed
+    verdict = "✅" if rate >= 100_000 else "❌"
+    print(f"Генерация           {elapsed:6.2f} с   {rate:9.0f} квестов/с  {verdict} цель >= 100k/с")
+
+    db = Database(args.db)
+    start = time.perf_counter()
+    inserted = db.create_quests(QuestGenerator(args.seed).generate(args.count))
+    elapsed = time.perf_counter() - start
+    print(f"Генерация + вставка {elapsed:6.2f} с   {inserted / elapsed:9.0f} квестов/с  ({inserted} добавлено)")
+    db.close()
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
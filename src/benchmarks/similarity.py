@@ -0,0 +1,144 @@
+"""Похожие описания квестов: MinHash/LSH-индекс против полного перебора.
+
+На временной БД с N сгенерированными квестами меряет:
+  * построение индекса (refresh) и сколько места он занял в файле БД;
+  * цену индекса для записи: create_quest/update_quest с подписчиком,
+    переиндексирующим квест сразу после коммита;
+  * find_similar для подброшенных почти-копий (несколько правок в описании
+    существующего квеста): задержка и полнота - нашёлся ли оригинал;
+  * один запрос полным перебором сигнатур - столько стоил бы каждый из n
+    запросов без LSH (O(n²) на весь каталог).
+
+Запуск из каталога src:  python -m benchmarks.similarity --quests 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from core.database import Database
+from core.quest_generator import QuestGenerator
+from core.similarity import NUM_PERM, SimilarityIndex, jaccard, signatures
+
+
+def near_copy(description: str, rng: random.Random, edits: int) -> str:
+    """Описание с несколькими правками: замена, вставка или удаление слова"""
+    words = description.split()
+    for _ in range(edits):
+        i = rng.randrange(len(words))
+        kind = rng.choice(("replace", "insert", "delete"))
+        if kind == "replace":
+            words[i] = rng.choice(["древний", "тёмный", "забытый", "ночной"])
+        elif kind == "insert":
+            words.insert(i, rng.choice(["очень", "снова", "вдруг"]))
+        elif len(words) > 10:
+            del words[i]
+    return " ".join(words)
+
+
+def file_size(db: Database) -> int:
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(db.db_path)
+
+
+def ms_stats(samples):
+    samples = sorted(samples)
+    return f"median {statistics.median(samples):6.2f} мс   p99 {samples[int(len(samples) * 0.99)]:6.2f} мс"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MinHash/LSH-индекс похожих описаний")
+    parser.add_argument("--quests", type=int, default=200_000)
+    parser.add_argument("--copies", type=int, default=300, help="подброшенных почти-копий")
+    parser.add_argument("--edits", type=int, default=2, help="правок слов в копии")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+    rng = random.Random(9)
+
+    print(f"🔍 Похожие описания: {args.quests} квестов, {args.copies} почти-копий")
+    print("=" * 70)
+    with tempfile.TemporaryDirectory() as workdir:
+        db = Database(os.path.join(workdir, "adventures.db"))
+        start = time.perf_counter()
+        with db.bulk_load():
+            db.create_quests(QuestGenerator(4).generate(args.quests))
+        base_size = file_size(db)
+        print(f"Квесты загружены        {time.perf_counter() - start:7.1f} с, файл {base_size / 2 ** 20:.0f} МиБ")
+
+        index = SimilarityIndex(db)
+        start = time.perf_counter()
+        indexed = index.refresh()
+        build_s = time.perf_counter() - start
+        index_size = file_size(db) - base_size
+        print(f"Индекс построен         {build_s:7.1f} с ({build_s / indexed * 1e6:.0f} мкс на квест), "
+              f"+{index_size / 2 ** 20:.0f} МиБ ({index_size / indexed:.0f} байт на квест)")
+        print("-" * 70)
+
+        # запись: сначала без подписчика, потом с переиндексацией после коммита
+        originals = rng.sample(range(1, args.quests + 1), args.copies)
+        quests = {quest_id: db.get_quest(quest_id) for quest_id in originals}
+        copies = [near_copy(quests[quest_id]["description"], rng, args.edits) for quest_id in originals]
+        half = args.copies // 2
+        timings = {False: [], True: []}
+        copy_ids = []
+        for i, (quest_id, description) in enumerate(zip(originals, copies)):
+            if i == half:
+                unsubscribe = db.subscribe(index.apply_changes)
+            quest = quests[quest_id]
+            start = time.perf_counter()
+            copy_ids.append(db.create_quest(f"{quest['title']} (копия {i})", quest["difficulty"], quest["reward"],
+                                            description, quest["deadline"]))
+            timings[i >= half].append((time.perf_counter() - start) * 1000)
+        index.refresh()  # копии, созданные до подписки
+        print(f"create_quest без индекса {ms_stats(timings[False])}")
+        print(f"create_quest с индексом  {ms_stats(timings[True])}")
+        updates = []
+        for copy_id, description in zip(copy_ids[:half], copies):
+            start = time.perf_counter()
+            db.update_quest(copy_id, f"Правка {copy_id}", "Легкий", 10, description + " Конец.", "2030-01-01 12:00:00")
+            updates.append((time.perf_counter() - start) * 1000)
+        print(f"update_quest с индексом  {ms_stats(updates)}")
+        unsubscribe()
+        print("-" * 70)
+
+        found, latencies, sizes, similarities = 0, [], [], []
+        for quest_id, copy_id, description in zip(originals, copy_ids, copies):
+            similarities.append(jaccard(quests[quest_id]["description"], db.get_quest(copy_id)["description"]))
+            start = time.perf_counter()
+            matches = index.find_similar(copy_id, args.threshold)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found += any(match.quest_id == quest_id for match in matches)
+            sizes.append(len(matches))
+        print(f"find_similar(копия)     {ms_stats(latencies)}")
+        print(f"Оригинал найден         {found}/{args.copies} (сходство копий: от {min(similarities):.2f}, "
+              f"медиана {statistics.median(similarities):.2f}); находок на запрос: медиана {statistics.median(sizes):.0f}")
+        random_latencies = []
+        for quest_id in rng.sample(range(1, args.quests + 1), args.copies):
+            start = time.perf_counter()
+            index.find_similar(quest_id, args.threshold)
+            random_latencies.append((time.perf_counter() - start) * 1000)
+        print(f"find_similar(случайный) {ms_stats(random_latencies)}")
+
+        # без LSH: сигнатура запроса против всех сигнатур
+        start = time.perf_counter()
+        blobs = [row[0] for row in db.conn.execute("SELECT signature FROM quest_minhash")]
+        stored = np.frombuffer(b"".join(blobs), dtype=np.uint16).reshape(len(blobs), NUM_PERM)
+        query = signatures([copies[0]])[0]
+        int(((stored == query).mean(axis=1) >= args.threshold).sum())
+        scan_s = time.perf_counter() - start
+        print(f"Полный перебор          {scan_s * 1000:7.0f} мс на запрос, "
+              f"весь каталог ≈ {scan_s * len(blobs) / 3600:.0f} ч")
+        db.close()
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Бенчмарк пространственного индекса редактора карт на 50k объектов.
+
+1. GridIndex против линейного перебора: поиск в точке, ближайший маркер,
+   выборка по региону.
+2. Ластик MapEditor: старая схема (scene.items + list.remove) против
+   id-хранилища с индексом.
+
+Запуск из каталога src:  QT_QPA_PLATFORM=offscreen python -m benchmarks.spatial_index
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.spatial_index import GridIndex
+
+
+def timed(func, repeat: int) -> float:
+    """Среднее время одного вызова в микросекундах"""
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench_index(count: int, queries: int, size: float, seed: int = 1):
+    rng = random.Random(seed)
+    centres = [(rng.uniform(0, size), rng.uniform(0, size)) for _ in range(count)]
+    probes = [(rng.uniform(0, size), rng.uniform(0, size)) for _ in range(queries)]
+
+    index = GridIndex(cell_size=64)
+    start = time.perf_counter()
+    for obj_id, (x, y) in enumerate(centres):
+        index.insert(obj_id, (x - 15, y - 15, x + 15, y + 15))
+    build = time.perf_counter() - start
+
+    def linear_point(i):
+        px, py = probes[i]
+        return [j for j, (x, y) in enumerate(centres) if abs(x - px) <= 15 and abs(y - py) <= 15]
+
+    def linear_nearest(i):
+        px, py = probes[i]
+        return min(range(count), key=lambda j: math.hypot(centres[j][0] - px, centres[j][1] - py))
+
+    rows = [
+        ("поиск в точке", lambda i: index.query_point(*probes[i]), linear_point),
+        ("ближайший", lambda i: index.nearest(*probes[i]), linear_nearest),
+        ("регион 256×256", lambda i: index.query_rect((probes[i][0], probes[i][1],
+                                                        probes[i][0] + 256, probes[i][1] + 256)), None),
+    ]
+
+    print(f"📍 GridIndex: {count} объектов, построение {build:.3f} с")
+    for name, fast, slow in rows:
+        fast_us = timed(fast, queries)
+        line = f"  {name:<16} {fast_us:9.1f} мкс"
+        if slow is not None:
+            slow_us = timed(slow, max(queries // 50, 5))
+            line += f"   перебор {slow_us:10.1f} мкс  (×{slow_us / fast_us:.0f})"
+        print(line)
+
+
+def bench_editor_erase(count: int, erases: int, size: float, seed: int = 2):
+    from PyQt6.QtWidgets import QApplication, QGraphicsEllipseItem
+    from PyQt6.QtCore import QPointF, QRectF
+    from gui.map_editor import MapEditor
+    from core.gamification import GamificationEngine
+
+    # ссылка держит QApplication живым: без неё PyQt сразу удаляет созданный объект
+    app = QApplication.instance() or QApplication(sys.argv)
+    rng = random.Random(seed)
+    points = [QPointF(rng.uniform(0, size), rng.uniform(0, size)) for _ in range(count)]
+
+    # Старая схема: список маркеров, удаление через list.remove
+    editor = MapEditor(GamificationEngine())
+    editor.scene.setSceneRect(0, 0, size, size)
+    legacy_markers = []
+    for pos in points:
+        item = QGraphicsEllipseItem(pos.x() - 15, pos.y() - 15, 30, 30)
+        editor.scene.addItem(item)
+        legacy_markers.append(item)
+    app.processEvents()  # отложенные обновления сцены - не в замер
+
+    start = time.perf_counter()
+    for pos in points[:erases]:
+        items = editor.scene.items(QRectF(pos.x() - 5, pos.y() - 5, 10, 10))
+        if items:
+            item = items[0]
+            editor.scene.removeItem(item)
+            if item in legacy_markers:
+                legacy_markers.remove(item)
+    legacy = (time.perf_counter() - start) / erases * 1e6
+
+    # Новая схема: id-хранилище + GridIndex
+    editor = MapEditor(GamificationEngine())
+    editor.scene.setSceneRect(0, 0, size, size)
+    for pos in points:
+        editor.add_marker(pos)
+    app.processEvents()
+
+    start = time.perf_counter()
+    for pos in points[:erases]:
+        editor.erase_at_point(pos)
+    indexed = (time.perf_counter() - start) / erases * 1e6
+
+    print(f"🧹 Ластик MapEditor: {count} маркеров, {erases} стираний")
+    print(f"  scene.items + list.remove {legacy:9.1f} мкс")
+    print(f"  GridIndex + dict          {indexed:9.1f} мкс  (×{legacy / indexed:.1f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objects", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--size", type=float, default=16_000.0, help="сторона карты в пикселях")
+    parser.add_argument("--no-gui", action="store_true", help="только GridIndex, без PyQt6")
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    bench_index(args.objects, args.queries, args.size)
+    if not args.no_gui:
+        print("=" * 60)
+        bench_editor_erase(args.objects, args.queries, args.size)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
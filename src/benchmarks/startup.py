@@ -0,0 +1,117 @@
+"""Бенчмарк запуска: время до интерактивности главного окна.
+
+Каждый замер - отдельный процесс (холодные импорты, как у пользователя)
+на временной БД со сгенерированными квестами. От момента запуска
+процесса отмечаются:
+  * окно       - первая отрисовка главного окна;
+  * интерактив - после отрисовки цикл событий свободен (сработал таймер 0,
+                 поставленный сразу после неё) и окно принимает ввод;
+  * список     - список квестов загружен.
+Цель - медиана «интерактива» меньше --target-ms.
+
+Запуск из каталога src:  QT_QPA_PLATFORM=offscreen python -m benchmarks.startup
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+MARKS = ("window", "interactive", "list")
+NAMES = {"window": "Окно отрисовано", "interactive": "Интерактивно", "list": "Список загружен"}
+
+
+def child():
+    """Запуск приложения в этом процессе; отметки времени (time.time) - в stdout"""
+    import asyncio
+    from PyQt6.QtCore import QEvent, QObject, QTimer
+    from PyQt6.QtWidgets import QApplication
+    from qasync import QEventLoop
+
+    marks = {}
+    app = QApplication(sys.argv[:1])
+    loop = QEventLoop(app)
+    asyncio.set_event_loop(loop)
+
+    from gui.main_window import MainWindow
+
+    def finish_if_done():
+        if all(name in marks for name in MARKS):
+            print(json.dumps(marks), flush=True)
+            window.close()
+
+    def mark(name):
+        marks.setdefault(name, time.time())
+        finish_if_done()
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint and "window" not in marks:
+                marks["window"] = time.time()
+                QTimer.singleShot(0, lambda: mark("interactive"))
+            return False
+
+    watcher = FirstPaint()
+    app.installEventFilter(watcher)
+    window = MainWindow()
+    window.quests_loaded.connect(lambda count: mark("list"))
+    window.show()
+    with loop:
+        loop.run_forever()
+
+
+def run_once(workdir: str) -> dict:
+    """Один холодный запуск; время каждой отметки от старта процесса, мс"""
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    start = time.time()
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], cwd=workdir, env=env,
+                            capture_output=True, text=True, timeout=120).stdout
+    marks = json.loads(output.strip().splitlines()[-1])
+    return {name: (marks[name] - start) * 1000 for name in MARKS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время запуска главного окна")
+    parser.add_argument("--quests", type=int, default=5000, help="квестов в БД")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=500.0, help="цель для времени до интерактивности")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return 0
+
+    from core.database import Database
+    from core.quest_generator import QuestGenerator
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # приложение открывает adventures.db в текущем каталоге
+        db = Database(os.path.join(workdir, "adventures.db"))
+        with db.bulk_load():
+            db.create_quests(QuestGenerator(1).generate(args.quests))
+        db.close()
+
+        print(f"🚀 Запуск главного окна: {args.quests} квестов, {args.repeat} запусков")
+        print("=" * 60)
+        run_once(workdir)  # прогрев дискового кэша
+        runs = [run_once(workdir) for _ in range(args.repeat)]
+
+    for name in MARKS:
+        values = [run[name] for run in runs]
+        print(f"{NAMES[name]:<18} best {min(values):7.0f} мс   median {statistics.median(values):7.0f} мс")
+    median = statistics.median(run["interactive"] for run in runs)
+    verdict = "✅" if median < args.target_ms else "❌"
+    print("=" * 60)
+    print(f"{verdict} интерактивно через {median:.0f} мс (цель < {args.target_ms:.0f} мс)")
+    return 0 if median < args.target_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
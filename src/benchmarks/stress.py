@@ -0,0 +1,306 @@
+"""Нагрузочный прогон на каталоге масштаба гильдии: 1M+ квестов.
+
+Наполняет БД сгенерированными квестами (по умолчанию 1 000 000) и
+несколькими версиями каждого, затем меряет то, что делает приложение с
+большим каталогом:
+
+  * заполнение: генерация + вставка, добавление версий;
+  * загрузка списка: сводки (get_quest_summaries) против полных квестов
+    (get_all_quests), время и прирост RSS на удерживаемый результат;
+  * постраничный вывод (LIMIT/OFFSET в начале, середине и конце списка);
+  * поиск по подстроке в названии и описании, фильтр по сложности;
+  * задержки get_quest / update_quest (p50/p95/p99) и чтение версий;
+  * размер файла БД, пиковый RSS, скорость экспорта (HTML, DOCX, PDF).
+
+Для поиска, фильтров, страниц и версий у Database пока нет API, поэтому
+меряются те SQL-запросы, которые выполнил бы интерфейс.
+
+Отчет пишется в benchmarks/results/stress-<дата>.json; с --compare
+печатается сравнение с отчетом прошлого релиза.
+
+Запуск из каталога src:
+    python -m benchmarks.stress                          # 1M квестов, 3 версии
+    python -m benchmarks.stress --quests 100000 --label 1.2
+    python -m benchmarks.stress --compare benchmarks/results/stress-1.1.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.metrics import Histogram
+from core.quest_generator import QuestGenerator, PLACES, FOES
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "results")
+PAGE_SIZE = 50
+# поиск подстрокой (общий с benchmarks/suite.py): шаблон и лимит
+SEARCH_TITLE = "SELECT id, title FROM quests WHERE title LIKE ? LIMIT ?"
+SEARCH_DESCRIPTION = "SELECT id, title FROM quests WHERE description LIKE ? LIMIT ?"
+SEARCH_MISSING = "%единорог%"
+
+
+def search_frequent() -> str:
+    """Шаблон частого слова в названиях (много совпадений, ранний выход)"""
+    return f"%{FOES[0].split()[-1]}%"
+
+
+def search_description() -> str:
+    """Шаблон места из описаний"""
+    return f"%{PLACES[-1]}%"
+
+
+def rss_mb() -> Optional[float]:
+    """Текущий RSS процесса, МБ (None, если /proc недоступен)"""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает КБ, macOS - байты
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def file_size_mb(path: str) -> float:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p)) / 2 ** 20
+
+
+def latency(func: Callable[[], Any], calls: int) -> Dict[str, float]:
+    """Распределение времени одного вызова, мс"""
+    hist = Histogram()
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        hist.observe((time.perf_counter() - start) * 1000)
+    summary = hist.summary()
+    return {key: summary[key] for key in ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")}
+
+
+def once(func: Callable[[], Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    result = func()
+    out = {"ms": (time.perf_counter() - start) * 1000}
+    if isinstance(result, list):
+        out["rows"] = len(result)
+    return out
+
+
+def fill(db: Database, quests: int, versions: int, seed: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    inserted = db.create_quests(QuestGenerator(seed).generate(quests), chunk_size=50_000)
+    quests_s = time.perf_counter() - start
+
+    # версии как после правок в мастере: меняется награда
+    start = time.perf_counter()
+    with db.conn:
+        for version in range(versions):
+            db.conn.execute(
+                """
+                INSERT INTO quest_versions (quest_id, title, difficulty, reward, description)
+                SELECT id, title, difficulty, reward + ?, description FROM quests
+                """,
+                (10 * (version + 1),),
+            )
+    versions_s = time.perf_counter() - start
+    return {
+        "quests": inserted,
+        "quests_s": quests_s,
+        "quests_per_s": inserted / quests_s,
+        "versions": inserted * versions,
+        "versions_s": versions_s,
+    }
+
+
+def run_queries(db: Database, quests: int, calls: int, full_list: bool) -> Dict[str, Any]:
+    conn = db.conn
+    rng = random.Random(11)
+    results: Dict[str, Any] = {}
+
+    def query(sql: str, params=()) -> Callable[[], list]:
+        return lambda: conn.execute(sql, params).fetchall()
+
+    if full_list:
+        # сначала легкий вариант: освобожденная память не всегда возвращается ОС
+        for name, loader in (("list.get_quest_summaries", db.get_quest_summaries),
+                             ("list.get_all_quests", db.get_all_quests)):
+            before = rss_mb()
+            start = time.perf_counter()
+            rows = loader()
+            results[name] = {"ms": (time.perf_counter() - start) * 1000, "rows": len(rows),
+                             "rss_delta_mb": rss_mb() - before if before is not None else None}
+            del rows
+
+    page = "SELECT id, title, difficulty, reward FROM quests ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?"
+    for name, offset in (("first", 0), ("middle", quests // 2), ("last", max(0, quests - PAGE_SIZE))):
+        results[f"page.{name}"] = latency(query(page, (PAGE_SIZE, offset)), 5)
+    results["page.count"] = once(query("SELECT COUNT(*) FROM quests"))
+
+    # поиск: частое слово (много совпадений, ранний выход) и редкое (полный скан)
+    results["search.title_frequent"] = latency(query(SEARCH_TITLE, (search_frequent(), PAGE_SIZE)), 5)
+    results["search.title_missing"] = latency(query(SEARCH_TITLE, (SEARCH_MISSING, PAGE_SIZE)), 3)
+    results["search.description"] = latency(query(SEARCH_DESCRIPTION, (search_description(), PAGE_SIZE)), 3)
+
+    results["filter.difficulty_top_reward"] = latency(
+        query("SELECT id, title, reward FROM quests WHERE difficulty = ? ORDER BY reward DESC LIMIT ?",
+              ("Эпический", PAGE_SIZE)), 3)
+    results["filter.count_by_difficulty"] = latency(
+        query("SELECT difficulty, COUNT(*) FROM quests GROUP BY difficulty"), 3)
+
+    results["quest.get"] = latency(lambda: db.get_quest(rng.randint(1, quests)), calls)
+
+    def update():
+        quest = db.get_quest(rng.randint(1, quests))
+        db.update_quest(quest["id"], quest["title"], quest["difficulty"], quest["reward"] + 1,
+                        quest["description"], quest["deadline"])
+    results["quest.update"] = latency(update, max(1, calls // 10))
+
+    results["versions.latest_of_quest"] = latency(
+        lambda: conn.execute("SELECT * FROM quest_versions WHERE quest_id = ? ORDER BY id DESC LIMIT 5",
+                             (rng.randint(1, quests),)).fetchall(), 5)
+    return results
+
+
+def run_exports(db: Database, quests: int, count: int, workdir: str) -> Dict[str, Any]:
+    from core import template_engine as te
+
+    results: Dict[str, Any] = {}
+    if count <= 0:
+        return results
+    if te.Environment is None or te.qrcode is None:
+        return {"export": {"skipped": "нет Jinja2 или qrcode"}}
+    engine = te.TemplateEngine(os.path.join(SRC, "templates"))
+    rng = random.Random(12)
+    sample = [db.get_quest(rng.randint(1, quests)) for _ in range(count)]
+
+    def throughput(export: Callable[[Dict[str, Any], int], Any], n: int) -> Dict[str, float]:
+        start = time.perf_counter()
+        for i, quest in enumerate(sample[:n]):
+            export(quest, i)
+        elapsed = time.perf_counter() - start
+        return {"quests": n, "s": elapsed, "quests_per_s": n / elapsed}
+
+    results["export.html"] = throughput(lambda q, i: engine.render_template("guild_contract.html", q), count)
+    if te.Document is not None:
+        results["export.docx"] = throughput(
+            lambda q, i: engine.export_to_docx(q, os.path.join(workdir, f"q{i}.docx")), count)
+    else:
+        results["export.docx"] = {"skipped": "python-docx недоступен"}
+    if te.HTML is not None:
+        results["export.pdf"] = throughput(
+            lambda q, i: engine.export_to_pdf("guild_contract.html", q, os.path.join(workdir, f"q{i}.pdf")),
+            max(1, count // 10))
+    else:
+        results["export.pdf"] = {"skipped": "WeasyPrint недоступен"}
+    return results
+
+
+def compare(report: Dict[str, Any], previous: Dict[str, Any]) -> None:
+    """Печать изменений ключевых чисел относительно прошлого отчета"""
+    print(f"\n📊 Сравнение с {previous.get('label') or previous.get('created_at')}")
+    old_results = previous.get("results", {})
+    for name, stats in report["results"].items():
+        old = old_results.get(name)
+        if not isinstance(stats, dict) or not isinstance(old, dict):
+            continue
+        for key in ("p95_ms", "ms", "quests_per_s", "s"):
+            if key in stats and key in old and old[key]:
+                print(f"  {name:32} {key:13} {old[key]:12.3f} → {stats[key]:12.3f} (×{stats[key] / old[key]:.2f})")
+                break
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    for name, stats in results.items():
+        if not isinstance(stats, dict):
+            print(f"{name:34} {stats if stats is not None else '-'}")
+        elif "skipped" in stats:
+            print(f"{name:34} пропущен: {stats['skipped']}")
+        elif "p95_ms" in stats:
+            print(f"{name:34} p50 {stats['p50_ms']:9.3f} мс   p95 {stats['p95_ms']:9.3f} мс   "
+                  f"max {stats['max_ms']:9.3f} мс")
+        elif "quests_per_s" in stats:
+            print(f"{name:34} {stats['quests_per_s']:9.1f} квестов/с")
+        else:
+            rows = f"   {stats['rows']} строк" if "rows" in stats else ""
+            memory = f"   +{stats['rss_delta_mb']:.0f} МБ RSS" if stats.get("rss_delta_mb") is not None else ""
+            print(f"{name:34} {stats['ms']:9.1f} мс{rows}{memory}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quests", type=int, default=1_000_000)
+    parser.add_argument("--versions", type=int, default=3, help="версий на квест")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--calls", type=int, default=2000, help="вызовов get_quest для задержек")
+    parser.add_argument("--exports", type=int, default=50, help="квестов для замера экспорта")
+    parser.add_argument("--db", help="путь к БД (по умолчанию временный файл, удаляется)")
+    parser.add_argument("--no-full-list", action="store_true", help="не загружать весь список")
+    parser.add_argument("--label", default="", help="метка отчета, например версия релиза")
+    parser.add_argument("--output", help="JSON-отчет (по умолчанию results/stress-<метка или дата>.json)")
+    parser.add_argument("--compare", help="отчет прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="qm_stress_") as workdir:
+        db_path = args.db or os.path.join(workdir, "stress.db")
+        print(f"🏋️ Нагрузочный прогон: {args.quests} квестов × {args.versions} версий → {db_path}")
+        print("=" * 90)
+
+        db = Database(db_path)
+        results: Dict[str, Any] = {"fill": fill(db, args.quests, args.versions, args.seed)}
+        quests = results["fill"]["quests"] or args.quests
+        print(f"Заполнение: {results['fill']['quests_per_s']:.0f} квестов/с, "
+              f"версии за {results['fill']['versions_s']:.1f} с")
+
+        results.update(run_queries(db, quests, args.calls, not args.no_full_list))
+        results.update(run_exports(db, quests, args.exports, workdir))
+        db.close()
+
+        results["db.file_mb"] = file_size_mb(db_path)
+        results["process.peak_rss_mb"] = peak_rss_mb()
+        print_results({k: v for k, v in results.items() if k != "fill"})
+
+    print("=" * 90)
+    stamp = datetime.now()
+    report = {
+        "label": args.label,
+        "created_at": stamp.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "quests": args.quests,
+        "versions": args.versions,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"stress-{args.label or stamp.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2)
+    print(f"📄 Отчет: {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            compare(report, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""Набор бенчмарков горячих путей с отслеживанием регрессий.
+
+Каждый случай готовится на своей временной БД (настоящая adventures.db не
+трогается), прогревается и затем меряется `repeat` раз по `number`
+вызовов. В JSON пишутся min / median / mean / p95 / stdev на один вызов в
+миллисекундах. Если есть сохраненный baseline, медианы сравниваются с ним;
+замедление больше допуска - регрессия, и запуск завершается с кодом 1.
+
+Запуск из каталога src:
+    python -m benchmarks.suite                      # все случаи, сравнение с baseline
+    python -m benchmarks.suite -k db. --repeat 10   # только случаи БД
+    python -m benchmarks.suite --save-baseline      # записать текущие результаты как baseline
+
+Случаи без нужных зависимостей (WeasyPrint, python-docx, Jinja2, qrcode)
+помечаются как пропущенные.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.quest_generator import QuestGenerator
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.dirname(HERE)
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(HERE, "results", "latest.json")
+
+
+class Skip(Exception):
+    """Случай нельзя выполнить в этом окружении"""
+
+
+class Case:
+    def __init__(self, name: str, setup: Callable, number: int, repeat: int, warmup: int):
+        self.name = name
+        self.setup = setup
+        self.number = number
+        self.repeat = repeat
+        self.warmup = warmup
+
+
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str, number: int = 1, repeat: int = 7, warmup: int = 1):
+    """Регистрация случая: setup(ctx) возвращает функцию, время вызова которой меряется"""
+    def register(setup):
+        CASES[name] = Case(name, setup, number, repeat, warmup)
+        return setup
+    return register
+
+
+class Context:
+    """Временный каталог и свежие БД для одного случая"""
+
+    def __init__(self, workdir: str):
+        self.workdir = workdir
+        self._databases: List[Database] = []
+
+    def database(self, quests: int = 0, seed: int = 1) -> Database:
+        db = Database(os.path.join(self.workdir, f"bench_{len(self._databases)}.db"))
+        self._databases.append(db)
+        if quests:
+            db.create_quests(QuestGenerator(seed).generate(quests))
+        return db
+
+    def close(self):
+        for db in self._databases:
+            db.close()
+
+
+def sample_quest(db: Optional[Database] = None) -> Dict[str, Any]:
+    if db is not None:
+        return db.get_all_quests()[0]
+    quest = QuestGenerator(7).generate(1).__next__()._asdict()
+    quest["id"] = 1
+    return quest
+
+
+# --- База данных ---------------------------------------------------------
+
+@case("db.create_quest", number=200)
+def bench_create_quest(ctx):
+    db = ctx.database()
+    stream = QuestGenerator(2).generate()
+    return lambda: db.create_quest(*next(stream))
+
+
+@case("db.create_quests_10k", repeat=5)
+def bench_create_quests(ctx):
+    db = ctx.database()
+    stream = QuestGenerator(3).generate()  # названия уникальны в пределах потока
+    return lambda: db.create_quests(next(stream) for _ in range(10_000))
+
+
+@case("db.get_all_quests_10k", repeat=5)
+def bench_get_all_quests(ctx):
+    db = ctx.database(quests=10_000)
+    return db.get_all_quests
+
+
+@case("db.get_quest_summaries_10k", repeat=5)
+def bench_get_quest_summaries(ctx):
+    db = ctx.database(quests=10_000)
+    return db.get_quest_summaries
+
+
+@case("db.get_quest", number=1000)
+def bench_get_quest(ctx):
+    db = ctx.database(quests=10_000)
+    rng = random.Random(4)
+    return lambda: db.get_quest(rng.randint(1, 10_000))
+
+
+@case("db.update_quest_autosave", number=200)
+def bench_update_quest(ctx):
+    # автосохранение мастера квестов: update_quest на каждое изменение поля
+    db = ctx.database(quests=1000)
+    quest = db.get_quest(500)
+    counter = iter(range(10 ** 9))
+    return lambda: db.update_quest(500, quest["title"], quest["difficulty"], next(counter) % 10_000,
+                                   quest["description"], quest["deadline"])
+
+
+def search(ctx, sql: str, pattern: str) -> Callable:
+    """Поиск LIKE из benchmarks/stress.py на 10k квестов"""
+    from benchmarks.stress import PAGE_SIZE
+    db = ctx.database(quests=10_000)
+    return lambda: db.conn.execute(sql, (pattern, PAGE_SIZE)).fetchall()
+
+
+@case("db.search_title_frequent", number=50)
+def bench_search_title_frequent(ctx):
+    # много совпадений: LIMIT срабатывает рано
+    from benchmarks.stress import SEARCH_TITLE, search_frequent
+    return search(ctx, SEARCH_TITLE, search_frequent())
+
+
+@case("db.search_title_missing", number=20)
+def bench_search_title_missing(ctx):
+    # совпадений нет: полный просмотр названий
+    from benchmarks.stress import SEARCH_TITLE, SEARCH_MISSING
+    return search(ctx, SEARCH_TITLE, SEARCH_MISSING)
+
+
+@case("db.search_description", number=10)
+def bench_search_description(ctx):
+    from benchmarks.stress import SEARCH_DESCRIPTION, search_description
+    return search(ctx, SEARCH_DESCRIPTION, search_description())
+
+
+# --- Импорт и экспорт каталога -------------------------------------------
+
+def catalog_file(ctx, fmt: str) -> str:
+    """Каталог из 10k квестов в файле формата fmt"""
+    from core.catalog_io import export_catalog
+
+    path = os.path.join(ctx.workdir, f"catalog.{fmt}")
+    export_catalog(ctx.database(quests=10_000), path)
+    return path
+
+
+@case("catalog.export_ndjson_10k", repeat=5)
+def bench_catalog_export(ctx):
+    from core.catalog_io import export_catalog
+
+    db = ctx.database(quests=10_000)
+    path = os.path.join(ctx.workdir, "export.ndjson")
+    return lambda: export_catalog(db, path)
+
+
+@case("catalog.import_ndjson_10k", repeat=5)
+def bench_catalog_import_ndjson(ctx):
+    from core.catalog_io import import_catalog
+
+    path = catalog_file(ctx, "ndjson")
+    return lambda: import_catalog(ctx.database(), path)  # каждый раз в пустую БД
+
+
+@case("catalog.import_csv_10k", repeat=5)
+def bench_catalog_import_csv(ctx):
+    from core.catalog_io import import_catalog
+
+    path = catalog_file(ctx, "csv")
+    return lambda: import_catalog(ctx.database(), path)
+
+
+# --- Шаблоны и экспорт ---------------------------------------------------
+
+def template_engine():
+    from core import template_engine as te
+    if te.Environment is None or te.qrcode is None:
+        raise Skip("нет Jinja2 или qrcode")
+    return te, te.TemplateEngine(os.path.join(SRC, "templates"))
+
+
+@case("template.render", number=20)
+def bench_render(ctx):
+    _, engine = template_engine()
+    quest = sample_quest()
+    return lambda: engine.render_template("guild_contract.html", quest)
+
+
+@case("template.qr_code", number=20)
+def bench_qr(ctx):
+    _, engine = template_engine()
+    return lambda: engine._generate_qr_code(42)
+
+
+@case("export.pdf", repeat=3)
+def bench_pdf(ctx):
+    te, engine = template_engine()
+    if te.HTML is None:
+        raise Skip("WeasyPrint недоступен")
+    quest = sample_quest()
+    path = os.path.join(ctx.workdir, "quest.pdf")
+    return lambda: engine.export_to_pdf("guild_contract.html", quest, path)
+
+
+@case("export.docx", repeat=5)
+def bench_docx(ctx):
+    te, engine = template_engine()
+    if te.Document is None:
+        raise Skip("python-docx недоступен")
+    quest = sample_quest()
+    path = os.path.join(ctx.workdir, "quest.docx")
+    return lambda: engine.export_to_docx(quest, path)
+
+
+# --- Геймификация ------------------------------------------------------------
+
+@case("gamification.add_xp", number=200)
+def bench_add_xp(ctx):
+    from core.gamification import GamificationEngine
+    engine = GamificationEngine(ctx.database(), profile="bench")
+    return lambda: engine.add_xp("create_quest")
+
+
+@case("gamification.update_stats", number=200)
+def bench_update_stats(ctx):
+    from core.gamification import GamificationEngine
+    engine = GamificationEngine(ctx.database(), profile="bench")
+    return lambda: engine.update_stats("quests_created")
+
+
+# --- Карты ---------------------------------------------------------------
+
+@case("map.encode_10k_strokes", repeat=5)
+def bench_map_encode(ctx):
+    from benchmarks.map_storage import make_map
+    from core.map_format import encode_map
+    data = make_map(10_000, 20, 200)
+    return lambda: encode_map(data)
+
+
+@case("map.decode_10k_strokes", repeat=5)
+def bench_map_decode(ctx):
+    from benchmarks.map_storage import make_map
+    from core.map_format import encode_map, decode_map
+    blob = encode_map(make_map(10_000, 20, 200))
+    return lambda: decode_map(blob)
+
+
+@case("map.grid_query_point", number=1000)
+def bench_grid_query(ctx):
+    from core.spatial_index import GridIndex
+    rng = random.Random(5)
+    index = GridIndex()
+    for i in range(50_000):
+        x, y = rng.uniform(0, 5000), rng.uniform(0, 5000)
+        index.insert(i, (x - 10, y - 10, x + 10, y + 10))
+    return lambda: index.query_point(rng.uniform(0, 5000), rng.uniform(0, 5000), 5)
+
+
+@case("map.simplify_1k_points", number=20)
+def bench_simplify(ctx):
+    from core.geometry import simplify_polyline
+    rng = random.Random(6)
+    points = [(i * 0.5, rng.uniform(-2, 2)) for i in range(1000)]
+    return lambda: simplify_polyline(points, 1.0)
+
+
+@case("quests.generate_10k", repeat=5)
+def bench_generate(ctx):
+    generator = QuestGenerator(8)
+    stream = generator.generate()
+    return lambda: [next(stream) for _ in range(10_000)]
+
+
+# --- Запуск и сравнение --------------------------------------------------
+
+def measure(func: Callable, number: int, repeat: int, warmup: int) -> Dict[str, float]:
+    """Статистика времени одного вызова, мс"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    ordered = sorted(samples)
+    return {
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def run_case(bench: Case, repeat: Optional[int] = None) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="qm_bench_") as workdir:
+        ctx = Context(workdir)
+        try:
+            func = bench.setup(ctx)
+            return measure(func, bench.number, repeat or bench.repeat, bench.warmup)
+        except Skip as e:
+            return {"skipped": str(e)}
+        finally:
+            ctx.close()
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float = 0.25, min_delta_ms: float = 0.01) -> List[Tuple[str, float, float]]:
+    """Регрессии (имя, медиана baseline, медиана сейчас) сверх допуска
+
+    Медиана должна вырасти больше чем в (1 + tolerance) раз и больше чем на
+    min_delta_ms, чтобы шум микросекундных случаев не валил запуск.
+    """
+    regressions = []
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if not old or "median" not in old or "median" not in stats:
+            continue
+        if stats["median"] > old["median"] * (1 + tolerance) and stats["median"] - old["median"] > min_delta_ms:
+            regressions.append((name, old["median"], stats["median"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="только случаи, содержащие подстроку")
+    parser.add_argument("--repeat", type=int, help="переопределить число повторов")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON с результатами")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое замедление медианы (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    selected = [c for name, c in CASES.items() if args.filter in name]
+    results: Dict[str, Dict[str, Any]] = {}
+
+    print(f"⏱️  Бенчмарки: {len(selected)} случаев")
+    print("=" * 72)
+    for bench in selected:
+        stats = results[bench.name] = run_case(bench, args.repeat)
+        if "skipped" in stats:
+            print(f"{bench.name:28} пропущен: {stats['skipped']}")
+        else:
+            print(f"{bench.name:28} median {stats['median']:9.3f} мс   p95 {stats['p95']:9.3f} мс"
+                  f"   ±{stats['stdev']:.3f}")
+    print("=" * 72)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, ensure_ascii=False, indent=2)
+    print(f"📄 Результаты: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+        print(f"📌 Baseline сохранен: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Baseline не найден, сравнение пропущено (--save-baseline чтобы создать)")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as fh:
+        baseline = json.load(fh)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for name, old, new in regressions:
+        print(f"❌ {name}: {old:.3f} → {new:.3f} мс (×{new / old:.2f})")
+    if regressions:
+        return 1
+    print(f"✅ Регрессий нет (допуск {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
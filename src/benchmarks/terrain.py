@@ -0,0 +1,53 @@
+"""Бенчмарк процедурной местности.
+
+Цель: карта 4096×4096 (шум, отмывка рельефа, реки, маркеры) за ~1 с на
+одном ядре.
+
+Запуск из каталога src:  python -m benchmarks.terrain
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.terrain import generate_terrain, value_noise, shade
+
+
+def best_and_median(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return min(samples), statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    size = args.size
+    print(f"🏔️  Местность {size}×{size}, seed {args.seed}")
+    print("=" * 60)
+
+    heights = value_noise(size, size, args.seed)
+    best, median = best_and_median(lambda: value_noise(size, size, args.seed), args.repeat)
+    print(f"value_noise         best {best:7.1f} мс   median {median:7.1f} мс")
+    best, median = best_and_median(lambda: shade(heights), args.repeat)
+    print(f"shade               best {best:7.1f} мс   median {median:7.1f} мс")
+
+    best, median = best_and_median(lambda: generate_terrain(size, size, args.seed), args.repeat)
+    verdict = "✅" if median < 1000 else "❌"
+    print(f"generate_terrain    best {best:7.1f} мс   median {median:7.1f} мс  {verdict} цель ~1 с")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Индекс названий квестов: скорость подсказок и память.
+
+Строит TitleIndex по N сгенерированным названиям и меряет:
+  * построение и память индекса (tracemalloc: удержано и пик при постройке)
+    в сравнении с обычным отсортированным списком строк;
+  * complete() по префиксам из 1-8 символов и find() по точным названиям -
+    цель < 1 мс на запрос;
+  * те же запросы после тысяч правок (непустая дельта) и слияние дельты.
+
+Запуск из каталога src:  python -m benchmarks.title_index --titles 1000000
+"""
+
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.quest_generator import QuestGenerator
+from core.title_index import TitleIndex
+
+
+def lookups(index, titles, rng, count):
+    """(complete, find) - времена запросов в мкс"""
+    complete, find = [], []
+    for _ in range(count):
+        title = rng.choice(titles)
+        prefix = title[:rng.randint(1, 8)]
+        start = time.perf_counter()
+        index.complete(prefix)
+        complete.append((time.perf_counter() - start) * 1e6)
+        start = time.perf_counter()
+        index.find(title)
+        find.append((time.perf_counter() - start) * 1e6)
+    return complete, find
+
+
+def report(name, times, target_us):
+    p99 = statistics.quantiles(times, n=100)[-1]
+    verdict = "✅" if p99 < target_us else "❌"
+    print(f"{name:<22} median {statistics.median(times):6.1f} мкс   p99 {p99:6.1f} мкс   "
+          f"max {max(times):7.1f} мкс  {verdict}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Скорость и память индекса названий")
+    parser.add_argument("--titles", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--edits", type=int, default=5000, help="правок в дельте перед вторым замером")
+    args = parser.parse_args()
+
+    print(f"🔤 Индекс названий: {args.titles} квестов")
+    print("=" * 70)
+    titles = [quest[0] for quest in QuestGenerator(11).generate(args.titles)]
+    pairs = list(enumerate(titles, 1))
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = TitleIndex(pairs, compact_after=2 * args.edits + 1)
+    build_s = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    plain = sorted(titles, key=str.casefold)
+    plain_bytes = sys.getsizeof(plain) + sum(sys.getsizeof(title) for title in plain)
+    text_bytes = sum(len(title.encode()) for title in titles)
+    del plain
+    print(f"Построение              {build_s:6.2f} с")
+    print(f"Память индекса          {retained / 2 ** 20:6.1f} МиБ ({retained / args.titles:.0f} байт на название, "
+          f"из них текст {text_bytes / args.titles:.0f}); пик при постройке {peak / 2 ** 20:.0f} МиБ")
+    print(f"Список строк для сравнения {plain_bytes / 2 ** 20:6.1f} МиБ")
+    print("-" * 70)
+
+    rng = random.Random(5)
+    target_us = 1000
+    complete, find = lookups(index, titles, rng, args.queries)
+    report("complete()", complete, target_us)
+    report("find()", find, target_us)
+
+    # правки: переименования и удаления уходят в дельту
+    start = time.perf_counter()
+    for i in range(args.edits):
+        quest_id = rng.randint(1, args.titles)
+        if i % 5 == 0:
+            index.update({quest_id: None})
+        else:
+            index.update({quest_id: f"{titles[quest_id - 1]} (правка {i})"})
+    update_us = (time.perf_counter() - start) / args.edits * 1e6
+    print("-" * 70)
+    print(f"update() одного квеста  {update_us:6.1f} мкс; в дельте {len(index._delta)}, скрыто {len(index._stale)}")
+    complete, find = lookups(index, titles, rng, args.queries)
+    report("complete() с дельтой", complete, target_us)
+    report("find() с дельтой", find, target_us)
+    # так сливает GUI: сборка в потоке БД, в GUI-потоке только снимок и подмена
+    start = time.perf_counter()
+    build = index.start_compaction()
+    frozen = time.perf_counter() - start
+    start = time.perf_counter()
+    blob = build()
+    merged = time.perf_counter() - start
+    start = time.perf_counter()
+    index.finish_compaction(blob)
+    swapped = time.perf_counter() - start
+    print(f"Слияние дельты          {merged:6.2f} с в фоне, "
+          f"{(frozen + swapped) * 1000:.1f} мс в GUI-потоке")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
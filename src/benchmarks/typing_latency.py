@@ -0,0 +1,117 @@
+"""Задержка набора в описании квеста (QuestWizard).
+
+В редактор загружается квест с описанием из N слов, затем печатается
+текст по одной клавише (события нажатия и отпускания) - в конец
+описания и в его середину. Замер одного нажатия: обработка клавиши всеми синхронными
+обработчиками (счетчик слов, валидация, автосохранение) и
+processEvents. Задержка должна оставаться ровной при росте описания.
+
+Описание разбито на абзацы: Qt перекладывает при вводе весь абзац, так
+что набор в одном абзаце на тысячи слов медленен сам по себе.
+
+Запуск из каталога src:  QT_QPA_PLATFORM=offscreen python -m benchmarks.typing_latency
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PyQt6.QtCore import QEvent, Qt
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QKeyEvent, QTextCursor
+from qasync import QEventLoop
+
+from core.async_database import AsyncDatabase
+from core.gamification import GamificationEngine
+from core.quest_generator import QuestGenerator
+from gui.quest_wizard import QuestWizard
+
+TYPED = "и снова в путь "
+
+
+def description(words: int) -> str:
+    """Описание из words слов: абзацы из описаний сгенерированных квестов"""
+    paragraphs, total = [], 0
+    for quest in QuestGenerator(7).generate(words // 50 + 1):
+        paragraph = quest[3].split()[:words - total]
+        paragraphs.append(" ".join(paragraph))
+        total += len(paragraph)
+        if total >= words:
+            break
+    return "\n".join(paragraphs)
+
+
+def press(app, widget, char: str):
+    """Нажатие клавиши с символом (QTest умеет только ASCII)"""
+    for kind in (QEvent.Type.KeyPress, QEvent.Type.KeyRelease):
+        app.sendEvent(widget, QKeyEvent(kind, Qt.Key.Key_unknown, Qt.KeyboardModifier.NoModifier, char))
+
+
+def type_keys(app, wizard: QuestWizard, position: str, keys: int):
+    """Мс на одно нажатие"""
+    edit = wizard.description_edit
+    cursor = edit.textCursor()
+    if position == "end":
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+    else:
+        cursor.setPosition(len(edit.toPlainText()) // 2)
+    edit.setTextCursor(cursor)
+
+    times = []
+    for i in range(keys):
+        start = time.perf_counter()
+        press(app, edit, TYPED[i % len(TYPED)])
+        app.processEvents()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка набора в описании квеста")
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--keys", type=int, default=150, help="нажатий на каждый замер")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    loop = QEventLoop(app)
+    asyncio.set_event_loop(loop)
+
+    print(f"⌨️  Набор в описании: {args.keys} нажатий в конец и в середину")
+    print("=" * 60)
+    medians = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AsyncDatabase(os.path.join(tmp, "typing.db"))
+        wizard = QuestWizard(db, GamificationEngine())
+        wizard.show()
+        for words in args.words:
+            text = description(words)
+            quest_id = loop.run_until_complete(
+                db.create_quest(f"Квест на {words} слов", "Легкий", 100, text, "2030-01-01 12:00:00"))
+            loop.run_until_complete(wizard.load_quest(quest_id))
+
+            for position in ("end", "middle"):
+                times = type_keys(app, wizard, position, args.keys)
+                median = statistics.median(times)
+                p95 = statistics.quantiles(times, n=20)[-1]
+                medians[(words, position)] = median
+                print(f"{words:>6} слов, {position:<6}  median {median:6.2f} мс   p95 {p95:6.2f} мс")
+            # дождаться отложенных сохранений, чтобы они не попали в следующий замер
+            loop.run_until_complete(asyncio.sleep(1.0))
+        wizard.close()
+        db.close()
+
+    smallest, largest = min(args.words), max(args.words)
+    ratio = medians[(largest, "middle")] / medians[(smallest, "middle")]
+    print("=" * 60)
+    verdict = "✅" if ratio < 2 else "❌"
+    print(f"{verdict} {largest} слов / {smallest} слов: x{ratio:.1f} (ровно, если < x2)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Awaitable facade over `Database` for the asyncio (qasync) GUI.
+
+`AsyncDatabase` opens its own `Database` on a dedicated worker thread and
+runs every call there, one at a time and in the order they were made
+(the constructor does not wait for the open, the first call queues
+behind it):
+
+	quest = await adb.get_quest(quest_id)
+	adb.update_quest(...)            # fire and forget, still applied in order
+
+Each method submits its call right away and returns an asyncio future,
+so a call made just before `close()` is still carried out even if
+nobody awaits it. `run(func, ...)` runs `func(db, ...)` on the worker for
+several queries in one hop.
+
+Change feed callbacks (`subscribe`) are called on the worker thread;
+GUI code should hand them to a Qt signal, which queues them to the GUI
+thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, List
+
+from core.database import Database, QuestChange
+
+log = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+	def __init__(self, db_path: str = "adventures.db"):
+		self.db_path = db_path
+		self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quest-db")
+		# opened on the worker, so the connection lives where it is used
+		self._opened: "Future[Database]" = self._executor.submit(Database, db_path)
+		self._closed = False
+
+	@staticmethod
+	def _loop() -> asyncio.AbstractEventLoop:
+		try:
+			return asyncio.get_running_loop()
+		except RuntimeError:
+			return asyncio.get_event_loop()  # the qasync loop, set before any window exists
+
+	def _submit(self, func: Callable, *args) -> Future:
+		if self._closed:
+			raise RuntimeError("AsyncDatabase is closed")
+		return self._executor.submit(self._call, func, *args)
+
+	def _call(self, func: Callable, *args) -> Any:
+		# on the worker the open has already run; a failed open fails every call
+		return func(self._opened.result(), *args)
+
+	def run(self, func: Callable[..., Any], *args) -> "asyncio.Future[Any]":
+		"""Run `func(db, *args)` on the database thread."""
+		future = asyncio.wrap_future(self._submit(func, *args), loop=self._loop())
+		future.add_done_callback(_log_failure)
+		return future
+
+	def __getattr__(self, name: str) -> Callable[..., "asyncio.Future[Any]"]:
+		"""`adb.method(...)` runs `Database.method(...)` on the database thread."""
+		if name.startswith("_") or not callable(getattr(Database, name, None)):
+			raise AttributeError(name)
+		method = getattr(Database, name)
+		return partial(self.run, method)
+
+	def subscribe(self, callback: Callable[[List[QuestChange]], None]) -> Callable[[], None]:
+		"""Change feed of this connection's writes (and of other writers on poll_changes)."""
+		unsubscribe = self._submit(Database.subscribe, callback).result()
+
+		def unsubscribe_later() -> None:
+			if not self._closed:
+				self._executor.submit(unsubscribe)
+		return unsubscribe_later
+
+	def close(self) -> None:
+		"""Finish the calls already made, then close the connection."""
+		if self._closed:
+			return
+		self._submit(Database.close)
+		self._closed = True
+		self._executor.shutdown(wait=True)
+
+	@property
+	def closed(self) -> bool:
+		return self._closed
+
+
+def _log_failure(future: "asyncio.Future[Any]") -> None:
+	# calls nobody awaits (autosaves) would otherwise fail silently
+	if not future.cancelled() and future.exception() is not None:
+		log.error("database call failed", exc_info=future.exception())
+
+
+__all__ = ["AsyncDatabase"]
@@ -0,0 +1,250 @@
+"""Online backups of the quest database.
+
+Backups are taken with sqlite3's online backup API from a connection of
+their own, a few pages per step with a short sleep in between, so the
+app keeps working while the copy is made. The database runs in WAL mode
+(see `Database`), where a backup read never blocks a writer: autosaves
+commit as usual while a step is running.
+
+The copy keeps one read transaction open on its source connection, so
+every step reads the same WAL snapshot and commits made meanwhile do not
+restart it. Without WAL (or if SQLite restarts the copy anyway) the
+remaining copy is done in a single step after `max_restarts` restarts.
+The backup file is written with synchronous=OFF and fsynced every
+`FLUSH_PAGES` pages: one large fsync at the end would queue the app's own
+commit fsyncs behind it.
+
+Every backup is written to a temporary file, checked (`verify_backup`)
+and only then renamed into place as `<name>-YYYYmmdd-HHMMSS-ffffff.db`; the
+newest `keep` backups are kept. `BackupManager.start()` runs this on a
+background thread every `interval_s` seconds.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional
+
+from core.metrics import timed
+
+
+class BackupResult(NamedTuple):
+	path: Optional[str]  # None when the backup failed
+	pages: int
+	seconds: float
+	restarts: int
+	error: Optional[str] = None
+
+	@property
+	def ok(self) -> bool:
+		return self.error is None
+
+
+# pages copied between fsyncs of the backup file
+FLUSH_PAGES = 1024
+
+
+class _Restarted(Exception):
+	pass
+
+
+def _pause(seconds: float) -> Callable[[], int]:
+	def handler() -> int:
+		time.sleep(seconds)
+		return 0
+	return handler
+
+
+def verify_backup(path: str, full: bool = False, sleep: float = 0.0) -> Optional[str]:
+	"""Open `path` read-only and check it; returns None if fine, else the problem.
+
+	`full` runs integrity_check (also cross-checks every index entry) instead
+	of the faster quick_check; `sleep` pauses every 10k VM steps of the check.
+	"""
+	try:
+		conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+	except sqlite3.Error as e:
+		return f"cannot open: {e}"
+	if sleep:
+		conn.set_progress_handler(_pause(sleep), 10_000)
+	try:
+		check = "integrity_check" if full else "quick_check"
+		problems = [row[0] for row in conn.execute(f"PRAGMA {check}")]
+		if problems != ["ok"]:
+			return "; ".join(problems[:5])
+		conn.execute("SELECT COUNT(*) FROM quests").fetchone()
+		return None
+	except sqlite3.Error as e:
+		return str(e)
+	finally:
+		conn.close()
+
+
+@timed("backup.copy")
+def copy_database(source_path: str, target_path: str, pages: int = 64, sleep: float = 0.002,
+				  max_restarts: int = 3) -> BackupResult:
+	"""Copy a live database file to `target_path` (overwritten) with the backup API."""
+	start = time.perf_counter()
+	restarts = 0
+	total = 0
+	source = sqlite3.connect(source_path, check_same_thread=False)
+	target = sqlite3.connect(target_path)
+	# one big fsync of the whole copy stalls the app's own commits behind it on
+	# the disk queue: flush the target a few MB at a time as the copy goes
+	target.execute("PRAGMA synchronous=OFF")
+	target.execute(f"PRAGMA cache_size={FLUSH_PAGES // 2}")
+	flush_fd = None
+	try:
+		remaining_seen = None
+		flushed = 0
+
+		def progress(status, remaining, count):
+			nonlocal remaining_seen, restarts, total, flush_fd, flushed
+			total = count
+			if count - remaining - flushed >= FLUSH_PAGES:
+				flush_fd = flush_fd or os.open(target_path, os.O_RDONLY)
+				os.fsync(flush_fd)
+				flushed = count - remaining
+			# the remaining page count only goes up when SQLite restarted the copy
+			if remaining_seen is not None and remaining > remaining_seen:
+				restarts += 1
+				if restarts > max_restarts:
+					raise _Restarted
+			remaining_seen = remaining
+			# sqlite3 only sleeps on SQLITE_BUSY; pause between steps ourselves
+			# so the copy never hogs the CPU (or the disk) the app is using
+			if remaining and sleep:
+				time.sleep(sleep)
+
+		# pin one WAL snapshot for the whole copy: commits by other connections
+		# then go to the log and do not restart the page-step copy
+		source.execute("BEGIN")
+		source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+		try:
+			source.backup(target, pages=pages, progress=progress)
+		except _Restarted:
+			source.backup(target, pages=-1)
+		# a self-contained file: no -wal/-shm needed to open the backup
+		target.execute("PRAGMA journal_mode=DELETE")
+		if not total:
+			total = target.execute("PRAGMA page_count").fetchone()[0]
+	finally:
+		if flush_fd is not None:
+			os.close(flush_fd)
+		target.close()
+		source.close()
+	return BackupResult(target_path, total, time.perf_counter() - start, restarts)
+
+
+def _fsync(path: str) -> None:
+	fd = os.open(path, os.O_RDONLY)
+	try:
+		os.fsync(fd)
+	finally:
+		os.close(fd)
+
+
+class BackupManager:
+	"""Scheduled, rotated, verified backups of one database file."""
+
+	def __init__(self, db_path: str, backup_dir: Optional[str] = None, keep: int = 7,
+				 interval_s: float = 6 * 3600, pages: int = 64, sleep: float = 0.002,
+				 on_result: Optional[Callable[[BackupResult], None]] = None):
+		self.db_path = db_path
+		self.backup_dir = backup_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), "backups")
+		self.keep = keep
+		self.interval_s = interval_s
+		self.pages = pages
+		self.sleep = sleep
+		self.on_result = on_result
+		self.last_result: Optional[BackupResult] = None
+		self._lock = threading.Lock()
+		self._wake = threading.Event()
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+
+	@property
+	def _stem(self) -> str:
+		return os.path.splitext(os.path.basename(self.db_path))[0]
+
+	def list_backups(self) -> List[str]:
+		"""Backup files, newest first."""
+		if not os.path.isdir(self.backup_dir):
+			return []
+		prefix = self._stem + "-"
+		names = [n for n in os.listdir(self.backup_dir) if n.startswith(prefix) and n.endswith(".db")]
+		return [os.path.join(self.backup_dir, n) for n in sorted(names, reverse=True)]
+
+	def backup_now(self) -> BackupResult:
+		"""Take, verify and rotate one backup in the calling thread."""
+		with self._lock:
+			os.makedirs(self.backup_dir, exist_ok=True)
+			stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+			path = os.path.join(self.backup_dir, f"{self._stem}-{stamp}.db")
+			part = path + ".part"
+			try:
+				result = copy_database(self.db_path, part, self.pages, self.sleep)
+				problem = verify_backup(part, sleep=self.sleep)
+				if problem is not None:
+					raise sqlite3.DatabaseError(f"verification failed: {problem}")
+				_fsync(part)
+				os.replace(part, path)
+				result = result._replace(path=path)
+				self._rotate()
+			except (sqlite3.Error, OSError) as e:
+				if os.path.exists(part):
+					os.remove(part)
+				result = BackupResult(None, 0, 0.0, 0, str(e))
+			self.last_result = result
+		if self.on_result is not None:
+			self.on_result(result)
+		return result
+
+	def _rotate(self) -> None:
+		for old in self.list_backups()[self.keep:]:
+			os.remove(old)
+
+	def due(self) -> bool:
+		"""True if the newest backup is older than the interval (or missing)."""
+		backups = self.list_backups()
+		return not backups or time.time() - os.path.getmtime(backups[0]) >= self.interval_s
+
+	# --- background schedule -------------------------------------------------
+
+	def start(self) -> None:
+		"""Back up on a background thread now if due, then every interval."""
+		if self._thread is not None:
+			return
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, name="quest-backup", daemon=True)
+		self._thread.start()
+
+	def trigger(self) -> None:
+		"""Ask the background thread for a backup right away."""
+		self._wake.set()
+
+	def stop(self, timeout: Optional[float] = 10.0) -> None:
+		thread, self._thread = self._thread, None
+		if thread is not None:
+			self._stop.set()
+			self._wake.set()
+			thread.join(timeout)
+
+	def _run(self) -> None:
+		if self.due():
+			self.backup_now()
+		while not self._stop.is_set():
+			woken = self._wake.wait(self.interval_s)
+			self._wake.clear()
+			if self._stop.is_set():
+				return
+			if woken or self.due():
+				self.backup_now()
+
+
+__all__ = ["BackupManager", "BackupResult", "copy_database", "verify_backup"]
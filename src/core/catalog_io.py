@@ -0,0 +1,404 @@
+"""Streaming NDJSON / CSV import and export of the quest catalog.
+
+Both formats carry the same flat records, one per line (NDJSON) or row
+(CSV), with the columns in FIELDS:
+
+	kind     "quest" (the default when missing) or "version"
+	id       quest id (quests only); ids are kept on import
+	quest_id owning quest (versions only)
+	title, difficulty, reward, description, deadline, created_at
+
+With version history, each quest is followed by its versions, oldest
+first. Export walks quests and versions in id order side by side, and
+import reads one chunk of records at a time, so both run in constant
+memory whatever the catalog size.
+
+Import writes chunks of records in one transaction each, inside
+`Database.bulk_load` (list index, change-log and statistics triggers
+rebuilt once at the end). A quest whose id or title is already taken is
+skipped; a version is only added to a quest with the same id and title,
+and an identical version is never added twice. The number of records committed
+is checkpointed in the same transaction as the chunk, so an interrupted
+import resumes exactly where it stopped.
+
+Command line, from the src directory:
+	python -m core.catalog_io export catalog.ndjson --versions
+	python -m core.catalog_io import catalog.ndjson --db adventures.db
+	python -m core.catalog_io stats --verify   (or --rebuild)
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import count, islice
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from core.database import Database
+
+FIELDS = ("kind", "id", "quest_id", "title", "difficulty", "reward", "description", "deadline", "created_at")
+FORMATS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "ndjson", ".csv": "csv"}
+
+_QUEST_COLUMNS = "id, title, difficulty, reward, description, deadline, created_at"
+_VERSION_COLUMNS = "quest_id, title, difficulty, reward, description, created_at"
+
+
+class ImportResult(NamedTuple):
+	records: int  # records read from the file, including those skipped by a resume
+	quests: int  # quests inserted
+	versions: int  # versions inserted
+	resumed_from: int  # records already imported by an earlier, interrupted run
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+	if fmt:
+		if fmt not in ("ndjson", "csv"):
+			raise ValueError(f"unknown format: {fmt}")
+		return fmt
+	ext = os.path.splitext(path)[1].lower()
+	if ext not in FORMATS:
+		raise ValueError(f"cannot tell the format of {path}; pass fmt='ndjson' or 'csv'")
+	return FORMATS[ext]
+
+
+# --- export ------------------------------------------------------------------
+
+def _rows(db: Database, sql: str, chunk_size: int) -> Iterator[tuple]:
+	cur = db.conn.cursor()
+	cur.row_factory = None
+	cur.execute(sql)
+	while True:
+		rows = cur.fetchmany(chunk_size)
+		if not rows:
+			return
+		yield from rows
+
+
+def _iter_rows(db: Database, versions: bool, chunk_size: int) -> Iterator[tuple]:
+	"""Records as tuples in FIELDS order: quests by id, each followed by its versions."""
+	quests = _rows(db, f"SELECT {_QUEST_COLUMNS} FROM quests ORDER BY id", chunk_size)
+	history = _rows(db, f"SELECT {_VERSION_COLUMNS} FROM quest_versions ORDER BY quest_id, id", chunk_size)
+	version = next(history, None) if versions else None
+
+	for quest_id, title, difficulty, reward, description, deadline, created_at in quests:
+		yield "quest", quest_id, None, title, difficulty, reward, description, deadline, created_at
+		# versions of deleted quests (ids below this one) are left out
+		while version is not None and version[0] <= quest_id:
+			if version[0] == quest_id:
+				v_quest, v_title, v_difficulty, v_reward, v_description, v_created = version
+				yield "version", None, v_quest, v_title, v_difficulty, v_reward, v_description, None, v_created
+			version = next(history, None)
+
+
+def iter_records(db: Database, versions: bool = False, chunk_size: int = 10_000) -> Iterator[Dict[str, Any]]:
+	"""Catalog records in export order, without the fields their kind does not use."""
+	for row in _iter_rows(db, versions, chunk_size):
+		record = dict(zip(FIELDS, row))
+		if row[0] == "quest":
+			del record["quest_id"]
+		else:
+			del record["id"], record["deadline"]
+		yield record
+
+
+def export_catalog(db: Database, path: str, fmt: Optional[str] = None, versions: bool = False,
+				   chunk_size: int = 10_000) -> int:
+	"""Write the catalog to `path`; returns the number of records written."""
+	fmt = detect_format(path, fmt)
+	written = 0
+	tmp_path = path + ".part"
+	# written next to the target and renamed, so a crash never leaves half a file
+	with open(tmp_path, "w", encoding="utf-8", newline="") as fh:
+		if fmt == "ndjson":
+			dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+			write = fh.write
+			for record in iter_records(db, versions, chunk_size):
+				write(dumps(record))
+				write("\n")
+				written += 1
+		else:
+			writer = csv.writer(fh)
+			writer.writerow(FIELDS)
+			counter = count(1)
+			writer.writerows(row for row, _ in zip(_iter_rows(db, versions, chunk_size), counter))
+			written = next(counter) - 1
+	os.replace(tmp_path, path)
+	return written
+
+
+# --- import ------------------------------------------------------------------
+
+# a parsed record: (is_version, values in _QUEST_COLUMNS or _VERSION_COLUMNS order)
+Record = Optional[Tuple[bool, tuple]]
+
+_QUEST_KEYS = tuple(_QUEST_COLUMNS.split(", "))
+_VERSION_KEYS = tuple(_VERSION_COLUMNS.split(", "))
+
+
+def _loads_lines(lines: List[str]) -> List[Any]:
+	"""The JSON value of each line, parsed with one json.loads call for all."""
+	try:
+		values = json.loads(f"[{','.join(lines)}]")
+		if len(values) == len(lines):
+			return values
+	except ValueError:
+		pass
+	# a bad line, or one holding two values: parse line by line to report it
+	return [json.loads(line) for line in lines]
+
+
+def _read_ndjson(fh, skip: int, chunk_size: int) -> Iterator[List[Record]]:
+	lines = islice(fh, skip, None)
+	quest_values, version_values = itemgetter(*_QUEST_KEYS), itemgetter(*_VERSION_KEYS)
+	while True:
+		chunk = list(islice(lines, chunk_size))
+		if not chunk:
+			return
+		filled = [line for line in chunk if not line.isspace()]
+		objects = _loads_lines(filled)
+		if len(filled) == len(chunk):
+			try:
+				# the common case: no blank lines, every field written out
+				yield [(True, version_values(obj)) if obj.get("kind") == "version" else (False, quest_values(obj))
+					   for obj in objects]
+				continue
+			except KeyError:
+				pass
+		objects = iter(objects)
+		records: List[Record] = []
+		for line in chunk:
+			if line.isspace():
+				records.append(None)  # blank lines still count, so checkpoints stay line numbers
+				continue
+			obj = next(objects)
+			is_version = obj.get("kind") == "version"
+			# fields may be left out, they read as None
+			records.append((is_version, tuple(map(obj.get, _VERSION_KEYS if is_version else _QUEST_KEYS))))
+		yield records
+
+
+def _read_csv(fh, skip: int, chunk_size: int) -> Iterator[List[Record]]:
+	reader = csv.reader(fh)
+	header = next(reader, None)
+	if header is None:
+		return
+	# missing columns read the None appended to every row
+	position = {name: i for i, name in enumerate(header)}
+	kind_at = position.get("kind", -1)
+	quest_values = itemgetter(*(position.get(name, -1) for name in _QUEST_KEYS))
+	version_values = itemgetter(*(position.get(name, -1) for name in _VERSION_KEYS))
+	rows = islice(reader, skip, None)
+	while True:
+		records: List[Record] = []
+		append = records.append
+		for row in islice(rows, chunk_size):
+			if not row:
+				append(None)
+				continue
+			row.append(None)
+			is_version = row[kind_at] == "version"
+			values = version_values(row) if is_version else quest_values(row)
+			if "" in values:
+				# SQLite column affinity turns numeric text into integers; only blanks need care
+				values = tuple(value or None for value in values)
+			append((is_version, values))
+		if not records:
+			return
+		yield records
+
+
+def _file_signature(path: str) -> str:
+	stat = os.stat(path)
+	return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _checkpoint(db: Database, source: str) -> Optional[Tuple[str, int]]:
+	db.conn.execute(
+		"""
+		CREATE TABLE IF NOT EXISTS catalog_imports (
+			source TEXT PRIMARY KEY,
+			signature TEXT NOT NULL,
+			records INTEGER NOT NULL,
+			updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+		)
+		"""
+	)
+	row = db.conn.execute("SELECT signature, records FROM catalog_imports WHERE source = ?", (source,)).fetchone()
+	return None if row is None else (row[0], row[1])
+
+
+def _write_chunk(db: Database, quest_rows: List[tuple], version_rows: List[tuple],
+				 source: str, signature: str, records: int) -> Tuple[int, int]:
+	"""Insert one chunk and its checkpoint in one transaction; returns (quests, versions) added."""
+	quests = versions = 0
+	with db.conn:
+		cur = db.conn.cursor()
+		if quest_rows:
+			cur.executemany(
+				f"""
+				INSERT OR IGNORE INTO quests ({_QUEST_COLUMNS})
+				VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+				""",
+				quest_rows,
+			)
+			quests = cur.rowcount
+		if version_rows:
+			cur.executemany(
+				f"""
+				INSERT INTO quest_versions ({_VERSION_COLUMNS})
+				SELECT ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP)
+				WHERE EXISTS (SELECT 1 FROM quests WHERE id = ? AND (? IS NULL OR title = ?))
+				AND NOT EXISTS (
+					SELECT 1 FROM quest_versions WHERE quest_id = ? AND title IS ? AND difficulty IS ?
+					AND reward IS ? AND description IS ? AND created_at IS ?
+				)
+				""",
+				version_rows,
+			)
+			versions = cur.rowcount
+		cur.execute(
+			"INSERT OR REPLACE INTO catalog_imports (source, signature, records) VALUES (?, ?, ?)",
+			(source, signature, records),
+		)
+	return quests, versions
+
+
+def import_catalog(db: Database, path: str, fmt: Optional[str] = None, chunk_size: int = 20_000,
+				   resume: bool = True, progress: Optional[Callable[[int], None]] = None) -> ImportResult:
+	"""Load records from `path` into `db` (see the module docstring).
+
+	With `resume` (the default) an earlier interrupted import of the same,
+	unchanged file continues after its last committed chunk; a changed file
+	raises ValueError. `progress(records)` is called after every chunk.
+
+	Parsing the next chunk overlaps with writing the previous one on a
+	worker thread (sqlite3 releases the GIL while it steps statements), so
+	at most two chunks are held in memory.
+	"""
+	fmt = detect_format(path, fmt)
+	source = os.path.abspath(path)
+	signature = _file_signature(path)
+	checkpoint = _checkpoint(db, source)
+	skip = 0
+	if checkpoint is not None and resume:
+		if checkpoint[0] != signature:
+			raise ValueError(f"{path} changed since the interrupted import; pass resume=False to start over")
+		skip = checkpoint[1]
+
+	quests_done = versions_done = 0
+	records = skip
+
+	def collect(future: Future) -> None:
+		nonlocal quests_done, versions_done
+		quests, versions = future.result()
+		quests_done += quests
+		versions_done += versions
+		if progress is not None:
+			progress(future.records)
+
+	with open(path, "r", encoding="utf-8", newline="") as fh, db.bulk_load(), \
+			ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-import") as writer:
+		read = _read_ndjson if fmt == "ndjson" else _read_csv
+		parent: Tuple[Any, Any] = (None, None)
+		pending: Optional[Future] = None
+		for batch in read(fh, skip, chunk_size):
+			quest_rows: List[tuple] = []
+			version_rows: List[tuple] = []
+			for record in batch:
+				if record is None:
+					continue
+				is_version, values = record
+				if is_version:
+					# the owning quest's title, when the version follows it in the file
+					title = parent[1] if parent[0] == values[0] else None
+					version_rows.append(values + (values[0], title, title) + values)
+				else:
+					parent = values[:2]
+					quest_rows.append(values)
+			records += len(batch)
+
+			if pending is not None:
+				collect(pending)
+			pending = writer.submit(_write_chunk, db, quest_rows, version_rows, source, signature, records)
+			pending.records = records
+		if pending is not None:
+			collect(pending)
+
+	with db.conn:
+		db.conn.execute("DELETE FROM catalog_imports WHERE source = ?", (source,))
+	return ImportResult(records, quests_done, versions_done, skip)
+
+
+# --- command line ------------------------------------------------------------
+
+def _stats(db: Database, verify: bool, rebuild: bool) -> int:
+	if rebuild:
+		start = time.perf_counter()
+		db.rebuild_catalog_stats()
+		print(f"statistics rebuilt in {time.perf_counter() - start:.2f} s")
+	stats = db.get_catalog_stats()
+	print(f"quests: {stats.quests}, total reward: {stats.total_reward}, overdue: {stats.overdue}")
+	for difficulty, quests in sorted(stats.by_difficulty.items(), key=lambda item: -item[1]):
+		print(f"  {difficulty or '-'}: {quests} quests, reward {stats.reward_by_difficulty[difficulty]}")
+	if verify:
+		problems = db.verify_catalog_stats()
+		for problem in problems:
+			print(f"mismatch: {problem}")
+		print("statistics match a full recount" if not problems else f"{len(problems)} mismatches")
+		return 1 if problems else 0
+	return 0
+
+
+def main(argv=None) -> int:
+	parser = argparse.ArgumentParser(description="Import or export the quest catalog as NDJSON or CSV, "
+									 "or show its statistics")
+	parser.add_argument("command", choices=["import", "export", "stats"])
+	parser.add_argument("path", nargs="?", help="catalog file (.ndjson/.jsonl or .csv)")
+	parser.add_argument("--db", default="adventures.db")
+	parser.add_argument("--format", choices=["ndjson", "csv"], help="override the format given by the extension")
+	parser.add_argument("--versions", action="store_true", help="export version history too")
+	parser.add_argument("--chunk-size", type=int, default=20_000, help="records per import transaction")
+	parser.add_argument("--restart", action="store_true", help="ignore an interrupted import and start over")
+	parser.add_argument("--verify", action="store_true", help="stats: recount and compare with the stored statistics")
+	parser.add_argument("--rebuild", action="store_true", help="stats: recompute the statistics from scratch")
+	args = parser.parse_args(argv)
+	if args.command != "stats" and not args.path:
+		parser.error(f"{args.command} needs a catalog file")
+
+	db = Database(args.db)
+	start = time.perf_counter()
+	try:
+		if args.command == "stats":
+			return _stats(db, args.verify, args.rebuild)
+		if args.command == "export":
+			count = export_catalog(db, args.path, args.format, args.versions)
+			elapsed = time.perf_counter() - start
+			print(f"exported {count} records to {args.path} in {elapsed:.1f} s ({count / max(elapsed, 1e-9):.0f}/s)")
+		else:
+			def report(records):
+				print(f"\r{records} records", end="", file=sys.stderr, flush=True)
+
+			result = import_catalog(db, args.path, args.format, args.chunk_size, not args.restart, report)
+			elapsed = time.perf_counter() - start
+			print(file=sys.stderr)
+			if result.resumed_from:
+				print(f"resumed after {result.resumed_from} records")
+			done = result.records - result.resumed_from
+			print(f"imported {result.quests} quests and {result.versions} versions from {done} records "
+				  f"in {elapsed:.1f} s ({done / max(elapsed, 1e-9):.0f} records/s)")
+	finally:
+		db.close()
+	return 0
+
+
+__all__ = ["FIELDS", "ImportResult", "export_catalog", "import_catalog", "iter_records", "detect_format"]
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,7 +1,55 @@
 from __future__ import annotations
 
+import logging
 import sqlite3
-from typing import Optional, List, Dict, Any
+import sys
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import date
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Sequence, Callable, NamedTuple, Tuple
+
+from core.deadlines import DeadlineEvent, normalize_deadline
+from core.metrics import timed
+from core.query_tracer import QueryTracer, threshold_from_env
+
+log = logging.getLogger(__name__)
+
+# change log rows kept for readers in other processes; older ones are pruned
+CHANGE_LOG_KEEP = 10_000
+
+# limits the wizard enforces on quests (generated quests meet them too)
+MAX_TITLE_LENGTH = 50
+MIN_DESCRIPTION_WORDS = 50
+
+# page cache of a connection inside bulk_load()
+BULK_CACHE_KIB = 64 * 1024
+
+
+class QuestChange(NamedTuple):
+	"""One row of the quest change feed."""
+	seq: int
+	quest_id: int
+	op: str  # "insert", "update", "delete", or "reset" after a bulk load: re-read everything
+
+
+class QuestSummary(NamedTuple):
+	"""The columns list views show; the description is loaded on open."""
+	id: int
+	title: str
+	difficulty: str
+	reward: int
+
+
+class CatalogStats(NamedTuple):
+	"""Catalog totals; difficulty None stands for quests without one."""
+	quests: int
+	total_reward: int
+	by_difficulty: Dict[Optional[str], int]
+	reward_by_difficulty: Dict[Optional[str], int]
+	overdue: int
 
 
 class Database:
@@ -13,7 +61,27 @@ class Database:
 		self.db_path = db_path
 		self.conn = sqlite3.connect(db_path, check_same_thread=False)
 		self.conn.row_factory = sqlite3.Row
+		# only takes effect on a new file: lets the retention job (core.retention)
+		# hand pages freed from the version history back to the file system
+		self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+		if db_path != ":memory:":
+			# readers (other windows, the online backup) never block a writer,
+			# and a commit appends to the log instead of rewriting pages in place
+			self.conn.execute("PRAGMA journal_mode=WAL")
+		# sorted score arrays used for O(log n) rank lookups, keyed by "xp"
+		# or a stat name; dropped when another connection changes a score
+		self._rank_cache: Dict[str, array] = {}
+		self._rank_cache_version: Optional[int] = None
+		self.tracer: Optional[QueryTracer] = None
+		# change feed subscribers and the last change log seq they have seen
+		self._subscribers: List[Callable[[List[QuestChange]], None]] = []
+		self._change_seq = 0
+		self._change_lock = threading.Lock()
 		self._create_tables()
+		self._prune_changes()
+		threshold = threshold_from_env()
+		if threshold is not None:
+			self.trace_queries(threshold)
 
 	def _create_tables(self) -> None:
 		cur = self.conn.cursor()
@@ -26,10 +94,22 @@ class Database:
 				reward INTEGER,
 				description TEXT,
 				deadline TEXT,
-				created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+				created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+				deadline_ts INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', deadline) AS INTEGER)) VIRTUAL
 			)
 			"""
 		)
+		# databases from before deadline_ts: add the column, then fix up the
+		# deadlines SQLite cannot read; the index below fills it in
+		columns = [row[1] for row in cur.execute("PRAGMA table_xinfo(quests)")]
+		if "deadline_ts" not in columns:
+			cur.execute(
+				"""
+				ALTER TABLE quests ADD COLUMN
+				deadline_ts INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', deadline) AS INTEGER)) VIRTUAL
+				"""
+			)
+			self._normalize_deadlines(cur)
 
 		cur.execute(
 			"""
@@ -46,10 +126,166 @@ class Database:
 			"""
 		)
 
+		cur.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS profiles (
+				id INTEGER PRIMARY KEY AUTOINCREMENT,
+				name TEXT UNIQUE NOT NULL,
+				total_xp INTEGER NOT NULL DEFAULT 0,
+				created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+			)
+			"""
+		)
+
+		cur.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS profile_stats (
+				profile_id INTEGER NOT NULL,
+				stat TEXT NOT NULL,
+				value INTEGER NOT NULL DEFAULT 0,
+				PRIMARY KEY (profile_id, stat),
+				FOREIGN KEY (profile_id) REFERENCES profiles(id) ON DELETE CASCADE
+			) WITHOUT ROWID
+			"""
+		)
+
+		cur.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS profile_achievements (
+				profile_id INTEGER NOT NULL,
+				achievement_id TEXT NOT NULL,
+				unlocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+				PRIMARY KEY (profile_id, achievement_id),
+				FOREIGN KEY (profile_id) REFERENCES profiles(id) ON DELETE CASCADE
+			) WITHOUT ROWID
+			"""
+		)
+
+		# bumped by triggers on every score change, from any connection: the
+		# rank cache is dropped when it moves, not on unrelated commits
+		cur.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS profile_rank_version (
+				id INTEGER PRIMARY KEY CHECK (id = 0),
+				version INTEGER NOT NULL
+			)
+			"""
+		)
+		cur.execute("INSERT OR IGNORE INTO profile_rank_version VALUES (0, 0)")
+		for table, column in (("profiles", "total_xp"), ("profile_stats", "value")):
+			for event in ("INSERT", f"UPDATE OF {column}", "DELETE"):
+				cur.execute(
+					f"""
+					CREATE TRIGGER IF NOT EXISTS {table}_rank_{event.split()[0].lower()} AFTER {event} ON {table}
+					BEGIN
+						UPDATE profile_rank_version SET version = version + 1;
+					END
+					"""
+				)
+
+		cur.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS quest_maps (
+				quest_id INTEGER PRIMARY KEY,
+				data BLOB NOT NULL,
+				updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+				FOREIGN KEY (quest_id) REFERENCES quests(id) ON DELETE CASCADE
+			)
+			"""
+		)
+
+		# change log written by triggers, so writes from any connection or
+		# process show up in the feed (see subscribe / changes_since); a plain
+		# rowid is enough since pruning always keeps the newest entries
+		cur.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS quest_changes (
+				seq INTEGER PRIMARY KEY,
+				quest_id INTEGER NOT NULL,
+				op TEXT NOT NULL
+			)
+			"""
+		)
+		for op, event, row in (("insert", "INSERT", "NEW"), ("update", "UPDATE", "NEW"), ("delete", "DELETE", "OLD")):
+			cur.execute(
+				f"""
+				CREATE TRIGGER IF NOT EXISTS quests_log_{op} AFTER {event} ON quests
+				BEGIN
+					INSERT INTO quest_changes (quest_id, op) VALUES ({row}.id, '{op}');
+				END
+				"""
+			)
+
+		# catalog statistics kept by triggers, so get_catalog_stats reads a
+		# handful of rows instead of scanning quests; a missing trigger (new
+		# database, or a bulk load that died midway) means they are stale
+		stats_missing = self._stats_triggers_missing()
+		cur.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS quest_stats (
+				difficulty TEXT PRIMARY KEY,
+				quests INTEGER NOT NULL,
+				reward INTEGER NOT NULL
+			) WITHOUT ROWID
+			"""
+		)
+		cur.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS quest_deadline_days (
+				day TEXT PRIMARY KEY,
+				quests INTEGER NOT NULL
+			) WITHOUT ROWID
+			"""
+		)
+		add = """
+			INSERT INTO quest_stats VALUES (IFNULL(NEW.difficulty, ''), 1, IFNULL(NEW.reward, 0))
+			ON CONFLICT (difficulty) DO UPDATE SET quests = quests + 1, reward = reward + excluded.reward;
+			INSERT INTO quest_deadline_days VALUES (IFNULL(substr(NEW.deadline, 1, 10), ''), 1)
+			ON CONFLICT (day) DO UPDATE SET quests = quests + 1;
+		"""
+		remove = """
+			UPDATE quest_stats SET quests = quests - 1, reward = reward - IFNULL(OLD.reward, 0)
+			WHERE difficulty = IFNULL(OLD.difficulty, '');
+			UPDATE quest_deadline_days SET quests = quests - 1
+			WHERE day = IFNULL(substr(OLD.deadline, 1, 10), '');
+		"""
+		cur.execute(f"CREATE TRIGGER IF NOT EXISTS quests_stats_insert AFTER INSERT ON quests BEGIN {add} END")
+		cur.execute(f"CREATE TRIGGER IF NOT EXISTS quests_stats_delete AFTER DELETE ON quests BEGIN {remove} END")
+		# autosaves mostly change the title or description: those skip the trigger
+		cur.execute(
+			f"""
+			CREATE TRIGGER IF NOT EXISTS quests_stats_update AFTER UPDATE OF difficulty, reward, deadline ON quests
+			WHEN OLD.difficulty IS NOT NEW.difficulty OR OLD.reward IS NOT NEW.reward
+				OR OLD.deadline IS NOT NEW.deadline
+			BEGIN {remove} {add} END
+			"""
+		)
+
+		# covering index for list views: summaries are read in display order
+		# straight from the index, never touching the descriptions in the table
+		cur.execute(
+			"CREATE INDEX IF NOT EXISTS idx_quests_summary ON quests (created_at DESC, id DESC, title, difficulty, reward)"
+		)
+		if stats_missing:
+			# after the index: the totals by difficulty are counted from it, not the table
+			self._rebuild_catalog_stats(cur)
+
+		# upcoming deadlines in order, for the expiry scheduler
+		cur.execute("CREATE INDEX IF NOT EXISTS idx_quests_deadline ON quests (deadline_ts) WHERE deadline_ts IS NOT NULL")
+
+		# version history of one quest, newest last
+		cur.execute("CREATE INDEX IF NOT EXISTS idx_quest_versions_quest ON quest_versions (quest_id, id)")
+
+		# leaderboard indexes: top-K reads walk these instead of sorting
+		cur.execute("CREATE INDEX IF NOT EXISTS idx_profiles_xp ON profiles (total_xp DESC, id)")
+		cur.execute("CREATE INDEX IF NOT EXISTS idx_profile_stats_rank ON profile_stats (stat, value DESC, profile_id)")
+
 		self.conn.commit()
 
+	@timed("db.create_quest")
 	def create_quest(self, title: str, difficulty: str, reward: int, description: str, deadline: str) -> Optional[int]:
 		"""Insert a new quest and return its ID or None on failure."""
+		deadline = normalize_deadline(deadline)
 		try:
 			cur = self.conn.cursor()
 			cur.execute(
@@ -60,13 +296,44 @@ class Database:
 				(title, difficulty, reward, description, deadline),
 			)
 			self.conn.commit()
-			return cur.lastrowid
 		except sqlite3.IntegrityError:
 			# e.g., duplicate title
 			return None
+		self._publish_changes()
+		return cur.lastrowid
 
+	@timed("db.create_quests")
+	def create_quests(self, quests: Iterable[Sequence[Any]], chunk_size: int = 10_000) -> int:
+		"""Bulk-insert (title, difficulty, reward, description, deadline) rows.
+
+		Rows are written with executemany in one transaction per chunk, so any
+		iterable (including an endless generator cut with islice) streams in
+		with bounded memory. Rows with a title that already exists are skipped.
+		Returns the number of quests inserted.
+		"""
+		cur = self.conn.cursor()
+		inserted = 0
+		rows = iter(quests)
+		while True:
+			chunk = list(islice(rows, chunk_size))
+			if not chunk:
+				self._prune_changes()
+				self._publish_changes()
+				return inserted
+			with self.conn:
+				cur.executemany(
+					"""
+					INSERT OR IGNORE INTO quests (title, difficulty, reward, description, deadline)
+					VALUES (?, ?, ?, ?, ?)
+					""",
+					chunk,
+				)
+				inserted += cur.rowcount
+
+	@timed("db.update_quest")
 	def update_quest(self, quest_id: int, title: str, difficulty: str, reward: int, description: str, deadline: str) -> bool:
 		"""Update quest and store a version snapshot. Returns True if updated."""
+		deadline = normalize_deadline(deadline)
 		cur = self.conn.cursor()
 		cur.execute(
 			"""
@@ -90,8 +357,10 @@ class Database:
 		)
 
 		self.conn.commit()
+		self._publish_changes()
 		return True
 
+	@timed("db.get_quest")
 	def get_quest(self, quest_id: int) -> Optional[Dict[str, Any]]:
 		cur = self.conn.cursor()
 		cur.execute("SELECT * FROM quests WHERE id = ?", (quest_id,))
@@ -100,18 +369,505 @@ class Database:
 			return None
 		return dict(row)
 
+	@timed("db.get_all_quests")
 	def get_all_quests(self) -> List[Dict[str, Any]]:
 		cur = self.conn.cursor()
 		cur.execute("SELECT * FROM quests ORDER BY created_at DESC")
 		rows = cur.fetchall()
 		return [dict(r) for r in rows]
 
+	@timed("db.get_quest_summaries")
+	def get_quest_summaries(self, limit: Optional[int] = None, offset: int = 0) -> List[QuestSummary]:
+		"""Quest summaries, newest first, for lists that do not need descriptions."""
+		cur = self.conn.cursor()
+		cur.row_factory = None  # plain tuples; QuestSummary._make is then a bare tuple copy
+		cur.execute(
+			"""
+			SELECT id, title, difficulty, reward FROM quests
+			ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?
+			""",
+			(-1 if limit is None else limit, offset),
+		)
+		return list(map(QuestSummary._make, cur.fetchall()))
+
+	@timed("db.get_quest_summary")
+	def get_quest_summary(self, quest_id: int) -> Optional[QuestSummary]:
+		cur = self.conn.cursor()
+		cur.row_factory = None
+		cur.execute("SELECT id, title, difficulty, reward FROM quests WHERE id = ?", (quest_id,))
+		row = cur.fetchone()
+		return None if row is None else QuestSummary._make(row)
+
+	@timed("db.delete_quest")
 	def delete_quest(self, quest_id: int) -> bool:
 		cur = self.conn.cursor()
 		cur.execute("DELETE FROM quests WHERE id = ?", (quest_id,))
+		deleted = cur.rowcount > 0
+		# foreign keys are not enforced on this connection, so cascade by hand
+		cur.execute("DELETE FROM quest_maps WHERE quest_id = ?", (quest_id,))
+		self.conn.commit()
+		self._publish_changes()
+		return deleted
+
+	@contextmanager
+	def bulk_load(self) -> Iterator[None]:
+		"""Load many quests without per-row index, change-log and stats upkeep.
+
+		The list and deadline indexes and the change-log and statistics
+		triggers are dropped for the duration and rebuilt on exit (statistics
+		recomputed once, unreadable deadlines normalized), followed by a
+		single "reset" change for subscribers. If the process dies midway, the next open rebuilds them.
+
+		The page cache is raised to BULK_CACHE_KIB meanwhile: inserts into the
+		title index land at random pages, which thrash the default 2 MB.
+		"""
+		cache_size = self.conn.execute("PRAGMA cache_size").fetchone()[0]
+		self.conn.execute(f"PRAGMA cache_size={-BULK_CACHE_KIB}")
+		with self.conn:
+			self.conn.execute("DROP INDEX IF EXISTS idx_quests_summary")
+			self.conn.execute("DROP INDEX IF EXISTS idx_quests_deadline")
+			for op in ("insert", "update", "delete"):
+				self.conn.execute(f"DROP TRIGGER IF EXISTS quests_log_{op}")
+				self.conn.execute(f"DROP TRIGGER IF EXISTS quests_stats_{op}")
+		try:
+			yield
+		finally:
+			try:
+				with self.conn:
+					self._normalize_deadlines(self.conn.cursor())
+				self._create_tables()
+			finally:
+				self.conn.execute(f"PRAGMA cache_size={cache_size}")
+			with self.conn:
+				self.conn.execute("INSERT INTO quest_changes (quest_id, op) VALUES (0, 'reset')")
+			self._publish_changes()
+
+	# --- deadlines -------------------------------------------------------------
+
+	@staticmethod
+	def _normalize_deadlines(cur: sqlite3.Cursor) -> int:
+		"""Rewrite deadlines SQLite cannot parse (e.g. "15.06.2030 12:00") in DEADLINE_FORMAT."""
+		rows = cur.execute(
+			"SELECT id, deadline FROM quests WHERE deadline_ts IS NULL AND deadline IS NOT NULL AND deadline <> ''"
+		).fetchall()
+		fixed = []
+		for quest_id, deadline in rows:
+			normalized = normalize_deadline(deadline)
+			if normalized != deadline:
+				fixed.append((normalized, quest_id))
+		cur.executemany("UPDATE quests SET deadline = ? WHERE id = ?", fixed)
+		return len(fixed)
+
+	def next_deadlines(self, after_ts: int, after_id: int = sys.maxsize, limit: int = 64) -> List[Tuple[int, int]]:
+		"""(deadline_ts, quest id) of the next `limit` deadlines after (after_ts, after_id)."""
+		cur = self.conn.cursor()
+		cur.row_factory = None
+		cur.execute(
+			"""
+			SELECT deadline_ts, id FROM quests
+			WHERE deadline_ts >= ? AND (deadline_ts > ? OR id > ?)
+			ORDER BY deadline_ts, id LIMIT ?
+			""",
+			(after_ts, after_ts, after_id, limit),
+		)
+		return cur.fetchall()
+
+	def get_deadline_ts(self, quest_ids: Iterable[int]) -> List[Tuple[int, Optional[int]]]:
+		"""(quest id, deadline_ts) of the given quests that exist."""
+		return self._select_by_ids("SELECT id, deadline_ts FROM quests WHERE id IN ({})", quest_ids)
+
+	def get_deadline_events(self, quest_ids: Iterable[int]) -> List[DeadlineEvent]:
+		rows = self._select_by_ids("SELECT id, title, deadline, deadline_ts FROM quests WHERE id IN ({})", quest_ids)
+		return list(map(DeadlineEvent._make, rows))
+
+	def get_quest_titles(self, quest_ids: Iterable[int]) -> List[Tuple[int, str]]:
+		"""(quest id, title) of the given quests that exist."""
+		return self._select_by_ids("SELECT id, title FROM quests WHERE id IN ({})", quest_ids)
+
+	def iter_quest_titles(self) -> Iterator[Tuple[int, str]]:
+		"""(quest id, title) of every quest, streamed from the cursor."""
+		cur = self.conn.cursor()
+		cur.row_factory = None
+		return iter(cur.execute("SELECT id, title FROM quests"))
+
+	def _select_by_ids(self, sql: str, ids: Iterable[int], chunk_size: int = 500) -> List[tuple]:
+		cur = self.conn.cursor()
+		cur.row_factory = None
+		rows = []
+		ids = iter(ids)
+		while True:
+			chunk = list(islice(ids, chunk_size))
+			if not chunk:
+				return rows
+			rows.extend(cur.execute(sql.format(", ".join("?" * len(chunk))), chunk))
+
+	# --- catalog statistics ----------------------------------------------------
+
+	def _stats_triggers_missing(self) -> bool:
+		count = self.conn.execute(
+			"""
+			SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'
+			AND name IN ('quests_stats_insert', 'quests_stats_update', 'quests_stats_delete')
+			"""
+		).fetchone()[0]
+		return count < 3
+
+	@staticmethod
+	def _rebuild_catalog_stats(cur: sqlite3.Cursor) -> None:
+		cur.execute("DELETE FROM quest_stats")
+		cur.execute(
+			"""
+			INSERT INTO quest_stats
+			SELECT IFNULL(difficulty, ''), COUNT(*), IFNULL(SUM(reward), 0) FROM quests GROUP BY 1
+			"""
+		)
+		cur.execute("DELETE FROM quest_deadline_days")
+		cur.execute(
+			"""
+			INSERT INTO quest_deadline_days
+			SELECT IFNULL(substr(deadline, 1, 10), ''), COUNT(*) FROM quests GROUP BY 1
+			"""
+		)
+
+	@timed("db.get_catalog_stats")
+	def get_catalog_stats(self, today: Optional[str] = None) -> CatalogStats:
+		"""Catalog totals from the trigger-maintained statistics tables.
+
+		Cost depends on the number of difficulties and deadline days, not on
+		the number of quests. `overdue` counts quests whose deadline day is
+		before `today` ("YYYY-MM-DD", default the local date).
+		"""
+		if today is None:
+			today = date.today().isoformat()
+		cur = self.conn.cursor()
+		cur.row_factory = None
+		by_difficulty: Dict[Optional[str], int] = {}
+		reward_by_difficulty: Dict[Optional[str], int] = {}
+		for difficulty, quests, reward in cur.execute(
+				"SELECT difficulty, quests, reward FROM quest_stats WHERE quests > 0"):
+			by_difficulty[difficulty or None] = quests
+			reward_by_difficulty[difficulty or None] = reward
+		overdue = cur.execute(
+			"SELECT IFNULL(SUM(quests), 0) FROM quest_deadline_days WHERE day <> '' AND day < ?", (today,)
+		).fetchone()[0]
+		return CatalogStats(sum(by_difficulty.values()), sum(reward_by_difficulty.values()),
+							by_difficulty, reward_by_difficulty, overdue)
+
+	def rebuild_catalog_stats(self) -> None:
+		"""Recompute the statistics tables from the quests table."""
+		with self.conn:
+			self._rebuild_catalog_stats(self.conn.cursor())
+
+	def verify_catalog_stats(self) -> List[str]:
+		"""Compare the statistics tables with a full recount; [] if they agree."""
+		problems = []
+		checks = (
+			("quest_stats", "difficulty", "quests, reward",
+			 "SELECT IFNULL(difficulty, ''), COUNT(*), IFNULL(SUM(reward), 0) FROM quests GROUP BY 1"),
+			("quest_deadline_days", "day", "quests",
+			 "SELECT IFNULL(substr(deadline, 1, 10), ''), COUNT(*) FROM quests GROUP BY 1"),
+		)
+		cur = self.conn.cursor()
+		cur.row_factory = None
+		for table, key, columns, recount in checks:
+			stored = {row[0]: row[1:] for row in cur.execute(f"SELECT {key}, {columns} FROM {table} WHERE quests <> 0")}
+			actual = {row[0]: row[1:] for row in cur.execute(recount)}
+			for name in sorted(stored.keys() | actual.keys()):
+				if stored.get(name) != actual.get(name):
+					problems.append(f"{table}[{name!r}]: stored {stored.get(name)}, actual {actual.get(name)}")
+		return problems
+
+	# --- change feed ---------------------------------------------------------
+
+	def subscribe(self, callback: Callable[[List[QuestChange]], None]) -> Callable[[], None]:
+		"""Call `callback(changes)` after every write that touched quests.
+
+		Changes made through this Database are delivered right after their
+		commit, in the writing thread; changes from other connections or
+		processes are picked up by `poll_changes`. Returns an unsubscribe
+		function.
+		"""
+		with self._change_lock:
+			if not self._subscribers:
+				self._change_seq = self.last_change_seq()
+			self._subscribers.append(callback)
+
+		def unsubscribe() -> None:
+			with self._change_lock:
+				if callback in self._subscribers:
+					self._subscribers.remove(callback)
+		return unsubscribe
+
+	def poll_changes(self) -> int:
+		"""Deliver changes committed elsewhere; returns how many were delivered."""
+		return self._publish_changes()
+
+	def last_change_seq(self) -> int:
+		row = self.conn.execute("SELECT MAX(seq) FROM quest_changes").fetchone()
+		return row[0] or 0
+
+	def changes_since(self, seq: int, limit: Optional[int] = None) -> List[QuestChange]:
+		"""Change log entries after `seq`, oldest first.
+
+		A reader whose `seq` is older than the oldest kept entry (see
+		CHANGE_LOG_KEEP) has missed changes and should reload everything.
+		"""
+		cur = self.conn.execute(
+			"SELECT seq, quest_id, op FROM quest_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+			(seq, -1 if limit is None else limit),
+		)
+		return [QuestChange(*row) for row in cur.fetchall()]
+
+	def _publish_changes(self) -> int:
+		if not self._subscribers:
+			return 0
+		with self._change_lock:
+			changes = self.changes_since(self._change_seq)
+			if not changes:
+				return 0
+			self._change_seq = changes[-1].seq
+			subscribers = list(self._subscribers)
+		for callback in subscribers:
+			try:
+				callback(changes)
+			except Exception:
+				# the write is already committed; a broken listener must not undo that
+				log.exception("quest change subscriber failed")
+		return len(changes)
+
+	def _prune_changes(self) -> None:
+		with self.conn:
+			self.conn.execute(
+				"DELETE FROM quest_changes WHERE seq <= (SELECT MAX(seq) FROM quest_changes) - ?",
+				(CHANGE_LOG_KEEP,),
+			)
+
+	@timed("db.save_quest_map")
+	def save_quest_map(self, quest_id: int, data: bytes) -> None:
+		"""Store the encoded map (see core.map_format) for a quest."""
+		cur = self.conn.cursor()
+		cur.execute(
+			"""
+			INSERT INTO quest_maps (quest_id, data) VALUES (?, ?)
+			ON CONFLICT (quest_id) DO UPDATE SET data = excluded.data, updated_at = CURRENT_TIMESTAMP
+			""",
+			(quest_id, data),
+		)
+		self.conn.commit()
+
+	@timed("db.get_quest_map")
+	def get_quest_map(self, quest_id: int) -> Optional[bytes]:
+		cur = self.conn.cursor()
+		cur.execute("SELECT data FROM quest_maps WHERE quest_id = ?", (quest_id,))
+		row = cur.fetchone()
+		return None if row is None else row[0]
+
+	# --- profiles & leaderboard -------------------------------------------
+
+	@timed("db.get_or_create_profile")
+	def get_or_create_profile(self, name: str) -> int:
+		"""Return the ID of the profile called `name`, creating it if needed."""
+		cur = self.conn.cursor()
+		# insert first: another connection creating the same profile between
+		# a lookup and the insert would make the insert fail
+		cur.execute("INSERT OR IGNORE INTO profiles (name) VALUES (?)", (name,))
+		created = cur.rowcount > 0
+		self.conn.commit()
+		if created:
+			self._rank_cache_add("xp", 0)
+		cur.execute("SELECT id FROM profiles WHERE name = ?", (name,))
+		return cur.fetchone()["id"]
+
+	@timed("db.get_profile")
+	def get_profile(self, profile_id: int) -> Optional[Dict[str, Any]]:
+		"""Return profile fields plus `stats` and `achievements`, or None."""
+		cur = self.conn.cursor()
+		cur.execute("SELECT * FROM profiles WHERE id = ?", (profile_id,))
+		row = cur.fetchone()
+		if row is None:
+			return None
+
+		profile = dict(row)
+		cur.execute("SELECT stat, value FROM profile_stats WHERE profile_id = ?", (profile_id,))
+		profile["stats"] = {r["stat"]: r["value"] for r in cur.fetchall()}
+		cur.execute("SELECT achievement_id FROM profile_achievements WHERE profile_id = ?", (profile_id,))
+		profile["achievements"] = [r["achievement_id"] for r in cur.fetchall()]
+		return profile
+
+	@timed("db.add_profile_xp")
+	def add_profile_xp(self, profile_id: int, xp: int) -> Optional[int]:
+		"""Add `xp` to a profile and return the new total (None if missing)."""
+		old_xp = self._get_profile_score(profile_id, "xp")
+		if old_xp is None:
+			return None
+
+		cur = self.conn.cursor()
+		cur.execute("UPDATE profiles SET total_xp = total_xp + ? WHERE id = ?", (xp, profile_id))
+		self.conn.commit()
+		self._rank_cache_move("xp", old_xp, old_xp + xp)
+		return old_xp + xp
+
+	@timed("db.increment_profile_stat")
+	def increment_profile_stat(self, profile_id: int, stat: str, amount: int = 1) -> int:
+		"""Increment a per-profile stat counter and return its new value."""
+		old_value = self._get_profile_score(profile_id, stat)
+
+		cur = self.conn.cursor()
+		cur.execute(
+			"""
+			INSERT INTO profile_stats (profile_id, stat, value) VALUES (?, ?, ?)
+			ON CONFLICT (profile_id, stat) DO UPDATE SET value = value + excluded.value
+			""",
+			(profile_id, stat, amount),
+		)
+		self.conn.commit()
+
+		if old_value is None:
+			self._rank_cache_add(stat, amount)
+			return amount
+		self._rank_cache_move(stat, old_value, old_value + amount)
+		return old_value + amount
+
+	@timed("db.unlock_profile_achievement")
+	def unlock_profile_achievement(self, profile_id: int, achievement_id: str) -> bool:
+		"""Record an unlocked achievement. Returns False if it was already unlocked."""
+		cur = self.conn.cursor()
+		cur.execute(
+			"INSERT OR IGNORE INTO profile_achievements (profile_id, achievement_id) VALUES (?, ?)",
+			(profile_id, achievement_id),
+		)
 		self.conn.commit()
 		return cur.rowcount > 0
 
+	@timed("db.get_leaderboard")
+	def get_leaderboard(self, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+		"""Top profiles by XP, highest first (served by idx_profiles_xp)."""
+		cur = self.conn.cursor()
+		cur.execute(
+			"""
+			SELECT id, name, total_xp FROM profiles
+			ORDER BY total_xp DESC, id
+			LIMIT ? OFFSET ?
+			""",
+			(limit, offset),
+		)
+		return [dict(r) for r in cur.fetchall()]
+
+	@timed("db.get_stat_leaderboard")
+	def get_stat_leaderboard(self, stat: str, limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+		"""Top profiles by a single stat (served by idx_profile_stats_rank)."""
+		cur = self.conn.cursor()
+		cur.execute(
+			"""
+			SELECT p.id, p.name, s.value
+			FROM profile_stats AS s JOIN profiles AS p ON p.id = s.profile_id
+			WHERE s.stat = ?
+			ORDER BY s.value DESC, s.profile_id
+			LIMIT ? OFFSET ?
+			""",
+			(stat, limit, offset),
+		)
+		return [dict(r) for r in cur.fetchall()]
+
+	@timed("db.get_profile_rank")
+	def get_profile_rank(self, profile_id: int) -> Optional[int]:
+		"""1-based XP rank of a profile (ties share a rank), or None if missing."""
+		xp = self._get_profile_score(profile_id, "xp")
+		if xp is None:
+			return None
+		return self._rank_of("xp", xp)
+
+	@timed("db.get_profile_stat_rank")
+	def get_profile_stat_rank(self, profile_id: int, stat: str) -> Optional[int]:
+		"""1-based rank of a profile for `stat`, or None if the profile is missing."""
+		if self._get_profile_score(profile_id, "xp") is None:
+			return None
+		value = self._get_profile_score(profile_id, stat) or 0
+		return self._rank_of(stat, value)
+
+	def get_profile_count(self) -> int:
+		self._check_rank_cache()
+		return len(self._rank_scores("xp"))
+
+	def _get_profile_score(self, profile_id: int, key: str) -> Optional[int]:
+		cur = self.conn.cursor()
+		if key == "xp":
+			cur.execute("SELECT total_xp FROM profiles WHERE id = ?", (profile_id,))
+		else:
+			cur.execute("SELECT value FROM profile_stats WHERE profile_id = ? AND stat = ?", (profile_id, key))
+		row = cur.fetchone()
+		return None if row is None else row[0]
+
+	def _rank_of(self, key: str, score: int) -> int:
+		self._check_rank_cache()
+		scores = self._rank_scores(key)
+		return len(scores) - bisect_right(scores, score) + 1
+
+	def _rank_version(self) -> int:
+		return self.conn.execute("SELECT version FROM profile_rank_version").fetchone()[0]
+
+	def _check_rank_cache(self) -> None:
+		"""Drop cached score arrays if a score changed since they were read."""
+		version = self._rank_version()
+		if version != self._rank_cache_version:
+			self._rank_cache.clear()
+			self._rank_cache_version = version
+
+	def _rank_cache_written(self) -> bool:
+		"""After one score change of ours: whether the cache missed only that one.
+
+		Otherwise (another connection changed a score too) it is dropped.
+		"""
+		version = self._rank_version()
+		current = self._rank_cache_version is not None and version == self._rank_cache_version + 1
+		if not current:
+			self._rank_cache.clear()
+		self._rank_cache_version = version
+		return current
+
+	def _rank_scores(self, key: str) -> array:
+		scores = self._rank_cache.get(key)
+		if scores is None:
+			cur = self.conn.cursor()
+			if key == "xp":
+				cur.execute("SELECT total_xp FROM profiles ORDER BY total_xp")
+			else:
+				cur.execute("SELECT value FROM profile_stats WHERE stat = ? ORDER BY value", (key,))
+			scores = array("q", (r[0] for r in cur.fetchall()))
+			self._rank_cache[key] = scores
+		return scores
+
+	def _rank_cache_add(self, key: str, score: int) -> None:
+		scores = self._rank_cache.get(key) if self._rank_cache_written() else None
+		if scores is not None:
+			insort(scores, score)
+
+	def _rank_cache_move(self, key: str, old_score: int, new_score: int) -> None:
+		scores = self._rank_cache.get(key) if self._rank_cache_written() else None
+		if scores is None:
+			return
+		pos = bisect_left(scores, old_score)
+		if pos < len(scores) and scores[pos] == old_score:
+			del scores[pos]
+		insort(scores, new_score)
+
+	def trace_queries(self, threshold_ms: float = 50.0, progress_steps: int = 1000) -> QueryTracer:
+		"""Start aggregating statement statistics and logging slow queries.
+
+		Returns the active tracer (the existing one if already tracing).
+		"""
+		if self.tracer is None:
+			self.tracer = QueryTracer(threshold_ms, progress_steps)
+			self.conn = self.tracer.attach(self.conn)
+		return self.tracer
+
+	def stop_tracing(self) -> Optional[QueryTracer]:
+		"""Detach the tracer and return it with the statistics collected so far."""
+		tracer, self.tracer = self.tracer, None
+		if tracer is not None:
+			self.conn = tracer.detach()
+		return tracer
+
 	def close(self) -> None:
 		try:
 			self.conn.commit()
@@ -123,4 +879,5 @@ class Database:
 			pass
 
 
-__all__ = ["Database"]
+__all__ = ["Database", "CatalogStats", "QuestChange", "QuestSummary", "CHANGE_LOG_KEEP", "MAX_TITLE_LENGTH",
+		   "MIN_DESCRIPTION_WORDS"]
@@ -0,0 +1,209 @@
+"""Quest deadlines: parsing and an expiry scheduler.
+
+Deadlines are kept in `quests.deadline` as "YYYY-MM-DD HH:MM:SS" text in
+local time; `normalize_deadline` turns the other formats people type or
+import into that one. The database derives `deadline_ts` from it, the
+same wall-clock time as seconds since 1970-01-01 00:00 (the local time
+read as if it were UTC, so no time zone is baked into the file), and
+indexes it.
+
+`DeadlineScheduler` keeps only the next `k` upcoming deadlines in a heap,
+read from that index, and refills from where it stopped when the heap
+runs dry; quest changes from the database change feed are merged in, so
+the table is never polled. `due()` pops the deadlines that have passed,
+`next_due()` says when to look again.
+
+Command line, from the src directory:
+	python -m core.deadlines --db adventures.db          # next deadlines
+	python -m core.deadlines --db adventures.db --watch  # print them as they expire
+"""
+
+from __future__ import annotations
+
+import argparse
+import calendar
+import heapq
+import sys
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+	from core.database import Database, QuestChange
+
+DEADLINE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# accepted on input; the first one is what gets stored
+_FORMATS = (DEADLINE_FORMAT, "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d",
+			"%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d.%m.%Y", "%Y/%m/%d %H:%M:%S", "%Y/%m/%d %H:%M", "%Y/%m/%d")
+
+
+def parse_deadline(text: Optional[str]) -> Optional[datetime]:
+	"""The deadline as a naive local datetime, None if it is not a date."""
+	if not text:
+		return None
+	text = text.strip()
+	for fmt in _FORMATS:
+		try:
+			return datetime.strptime(text, fmt)
+		except ValueError:
+			pass
+	try:
+		parsed = datetime.fromisoformat(text)
+	except ValueError:
+		return None
+	return parsed.replace(tzinfo=None)
+
+
+def normalize_deadline(text: Optional[str]) -> Optional[str]:
+	"""`text` in DEADLINE_FORMAT if it parses, otherwise unchanged."""
+	parsed = parse_deadline(text)
+	return text if parsed is None else parsed.strftime(DEADLINE_FORMAT)
+
+
+def wall_clock_ts(moment: Optional[datetime] = None) -> int:
+	"""A local datetime (default now) on the `deadline_ts` scale."""
+	return calendar.timegm((moment or datetime.now()).timetuple())
+
+
+class DeadlineEvent(NamedTuple):
+	quest_id: int
+	title: str
+	deadline: str
+	deadline_ts: int
+
+
+class DeadlineScheduler:
+	"""The next `k` deadlines after `start_ts` (default now), in order."""
+
+	def __init__(self, db: "Database", k: int = 64, start_ts: Optional[int] = None):
+		self.db = db
+		self.k = k
+		# deadlines up to this one have been handed out by due()
+		self._fired: Tuple[int, int] = (wall_clock_ts() if start_ts is None else start_ts, sys.maxsize)
+		self._heap: List[Tuple[int, int]] = []
+		# quest id -> its deadline_ts in the heap; heap entries that disagree are stale
+		self._scheduled: Dict[int, int] = {}
+		# everything up to (deadline_ts, id) is loaded; None: nothing left in the table
+		self._horizon: Optional[Tuple[int, int]] = None
+		self._refill()
+
+	def _refill(self) -> None:
+		"""Load the next k deadlines past the horizon (or past the fired ones)."""
+		ts, quest_id = self._horizon or self._fired
+		rows = self.db.next_deadlines(ts, quest_id, self.k)
+		for ts, quest_id in rows:
+			self._schedule(quest_id, ts)
+		self._horizon = rows[-1] if len(rows) == self.k else None
+
+	def _schedule(self, quest_id: int, ts: int) -> None:
+		self._scheduled[quest_id] = ts
+		heapq.heappush(self._heap, (ts, quest_id))
+
+	def _in_window(self, key: Tuple[int, int]) -> bool:
+		return key > self._fired and (self._horizon is None or key <= self._horizon)
+
+	def _prune(self) -> None:
+		"""Drop stale entries from the top of the heap, refill when it runs dry."""
+		heap = self._heap
+		while True:
+			while heap and self._scheduled.get(heap[0][1]) != heap[0][0]:
+				heapq.heappop(heap)
+			if heap or self._horizon is None:
+				return
+			self._refill()
+
+	def __len__(self) -> int:
+		return len(self._scheduled)
+
+	def next_due(self) -> Optional[int]:
+		"""deadline_ts of the next deadline, None if there are no more."""
+		self._prune()
+		return self._heap[0][0] if self._heap else None
+
+	def due(self, now_ts: Optional[int] = None) -> List[DeadlineEvent]:
+		"""Pop the deadlines reached by `now_ts` (default now), oldest first."""
+		if now_ts is None:
+			now_ts = wall_clock_ts()
+		fired = []
+		while True:
+			self._prune()
+			if not self._heap or self._heap[0][0] > now_ts:
+				break
+			ts, quest_id = heapq.heappop(self._heap)
+			del self._scheduled[quest_id]
+			self._fired = (ts, quest_id)
+			fired.append(quest_id)
+		if not fired:
+			return []
+		events = {event.quest_id: event for event in self.db.get_deadline_events(fired)}
+		return [events[quest_id] for quest_id in fired if quest_id in events]
+
+	def apply_changes(self, changes: List["QuestChange"]) -> None:
+		"""Merge a change feed batch; subscribe this to `Database.subscribe`."""
+		touched = {change.quest_id for change in changes}
+		# a bulk load or a big batch: one indexed read beats merging it in
+		if len(touched) > 4 * self.k or any(change.op == "reset" for change in changes):
+			self._heap.clear()
+			self._scheduled.clear()
+			self._horizon = None
+			self._refill()
+			return
+		current = dict(self.db.get_deadline_ts(touched))
+		for quest_id in touched:
+			ts = current.get(quest_id)
+			if ts is None or not self._in_window((ts, quest_id)):
+				self._scheduled.pop(quest_id, None)
+			elif self._scheduled.get(quest_id) != ts:
+				self._schedule(quest_id, ts)
+		# inserts inside the window can grow the heap past k: keep the nearest k
+		if len(self._scheduled) > 2 * self.k:
+			keep = heapq.nsmallest(self.k, ((ts, quest_id) for quest_id, ts in self._scheduled.items()))
+			self._scheduled = {quest_id: ts for ts, quest_id in keep}
+			self._heap = keep
+			self._horizon = keep[-1]
+
+
+def _format_event(event: DeadlineEvent) -> str:
+	return f"#{event.quest_id} {event.title} — {event.deadline}"
+
+
+def main(argv=None) -> int:
+	from core.database import Database
+
+	parser = argparse.ArgumentParser(description="Show upcoming quest deadlines or watch them expire")
+	parser.add_argument("--db", default="adventures.db")
+	parser.add_argument("--limit", type=int, default=10, help="deadlines to list")
+	parser.add_argument("--watch", action="store_true", help="keep running and print deadlines as they pass")
+	parser.add_argument("--poll", type=float, default=5.0, help="seconds between checks for other writers")
+	args = parser.parse_args(argv)
+
+	db = Database(args.db)
+	try:
+		now = wall_clock_ts()
+		upcoming = [quest_id for _, quest_id in db.next_deadlines(now, sys.maxsize, args.limit)]
+		for event in db.get_deadline_events(upcoming):
+			print(_format_event(event))
+		if not args.watch:
+			return 0
+		scheduler = DeadlineScheduler(db, start_ts=now)
+		db.subscribe(scheduler.apply_changes)
+		while True:
+			for event in scheduler.due():
+				print(f"⏰ {_format_event(event)}", flush=True)
+			next_ts = scheduler.next_due()
+			wait = args.poll if next_ts is None else min(args.poll, max(next_ts - wall_clock_ts(), 0))
+			time.sleep(wait)
+			db.poll_changes()
+	except KeyboardInterrupt:
+		return 0
+	finally:
+		db.close()
+
+
+__all__ = ["DEADLINE_FORMAT", "DeadlineEvent", "DeadlineScheduler", "normalize_deadline", "parse_deadline",
+		   "wall_clock_ts"]
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -1,10 +1,23 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
+
+from core.level_curves import LevelCurve, DEFAULT_LEVEL_CURVE
+from core.metrics import METRICS, timed
 
 
 class GamificationEngine:
-	def __init__(self):
+	def __init__(self, db=None, profile: Optional[str] = None, level_curve: Optional[LevelCurve] = None):
+		"""Create the engine.
+
+		Without `db`/`profile` the state lives in memory only. With both, XP,
+		stats and achievements are loaded from and written to that profile.
+		`level_curve` defaults to the linear 100 XP per level curve.
+		"""
+		self.db = db
+		self.profile_id: Optional[int] = None
+		self.level_curve: LevelCurve = level_curve or DEFAULT_LEVEL_CURVE
+
 		# total XP collected
 		self.total_xp: int = 0
 
@@ -35,6 +48,25 @@ class GamificationEngine:
 			"win_boss": 50,
 		}
 
+		if db is not None and profile is not None:
+			self.load_profile(db, profile)
+
+	def load_profile(self, db, name: str) -> None:
+		"""Switch to the profile called `name` in `db` (created if missing).
+
+		Lets an engine start in memory and attach later, e.g. on the thread
+		that owns the connection; the profile's state replaces the counters.
+		"""
+		self.db = db
+		self.profile_id = db.get_or_create_profile(name)
+		data = db.get_profile(self.profile_id)
+		self.total_xp = data["total_xp"]
+		self.stats.update(data["stats"])
+		unlocked = set(data["achievements"])
+		for ach in self._achievements:
+			ach["unlocked"] = ach["id"] in unlocked
+
+	@timed("gamification.add_xp")
 	def add_xp(self, action: str = "") -> Tuple[int, bool]:
 		"""Add XP for an action and return (xp_gained, leveled_up).
 
@@ -42,7 +74,7 @@ class GamificationEngine:
 		"""
 		xp = self._xp_by_action.get(action, 1)
 		prev_level = self.get_current_level()
-		self.total_xp += xp
+		self._gain_xp(xp)
 		new_level = self.get_current_level()
 		leveled_up = new_level > prev_level
 
@@ -51,26 +83,34 @@ class GamificationEngine:
 
 		return xp, leveled_up
 
+	def reward(self, action: str, stat_name: str) -> Tuple[int, bool]:
+		"""`add_xp(action)` then `update_stats(stat_name)`; returns what add_xp does."""
+		result = self.add_xp(action)
+		self.update_stats(stat_name)
+		return result
+
+	@timed("gamification.update_stats")
 	def update_stats(self, stat_name: str) -> None:
 		"""Increment a named stat and evaluate achievements."""
 		self.stats[stat_name] = self.stats.get(stat_name, 0) + 1
+		if self.profile_id is not None:
+			self.db.increment_profile_stat(self.profile_id, stat_name)
 		self._check_achievements()
 
+	def set_level_curve(self, curve: LevelCurve) -> None:
+		"""Swap the level curve (e.g. at a season change). Thresholds are prebuilt."""
+		self.level_curve = curve
+
 	def get_current_level(self) -> int:
-		"""Compute level from total_xp. Level 1 starts at 0 XP. Every 100 XP = +1 level."""
-		return 1 + (self.total_xp // 100)
+		"""Compute level from total_xp using the active level curve. Level 1 starts at 0 XP."""
+		return self.level_curve.level_for(self.total_xp)
 
 	def get_progress_to_next_level(self) -> Tuple[int, int, int]:
 		"""Return (xp_into_current_level, xp_required_for_next_level, percent).
 
 		percent is an integer 0-100 used for display.
 		"""
-		xp_per_level = 100
-		current_level = self.get_current_level()
-		xp_into = self.total_xp - (current_level - 1) * xp_per_level
-		required = xp_per_level
-		percent = int((xp_into / required) * 100) if required > 0 else 0
-		return xp_into, required, percent
+		return self.level_curve.progress(self.total_xp)
 
 	def get_unlocked_achievements(self) -> List[Dict[str, Any]]:
 		return [a for a in self._achievements if a.get("unlocked")]
@@ -98,13 +138,38 @@ class GamificationEngine:
 
 	def _unlock(self, ach: Dict[str, Any]) -> None:
 		ach["unlocked"] = True
+		METRICS.inc("gamification.achievements_unlocked")
+		if self.profile_id is not None:
+			self.db.unlock_profile_achievement(self.profile_id, ach["id"])
 		xp = ach.get("xp", 0)
 		if xp:
-			self.total_xp += xp
+			self._gain_xp(xp)
+
+	def _gain_xp(self, xp: int) -> None:
+		self.total_xp += xp
+		METRICS.inc("gamification.xp_gained", xp)
+		if self.profile_id is not None:
+			self.db.add_profile_xp(self.profile_id, xp)
 
 	def get_stats(self) -> Dict[str, int]:
 		return dict(self.stats)
 
+	def get_rank(self) -> Optional[int]:
+		"""XP rank of the active profile among all profiles, or None in memory mode."""
+		if self.profile_id is None:
+			return None
+		return self.db.get_profile_rank(self.profile_id)
+
+	def get_stat_rank(self, stat_name: str) -> Optional[int]:
+		if self.profile_id is None:
+			return None
+		return self.db.get_profile_stat_rank(self.profile_id, stat_name)
+
+	def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
+		if self.db is None:
+			return []
+		return self.db.get_leaderboard(limit)
+
 
 __all__ = ["GamificationEngine"]
 
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import math
+from typing import List, Sequence, Tuple
+
+Point = Tuple[float, float]
+
+
+def simplify_polyline(points: Sequence[Point], tolerance: float) -> List[Point]:
+	"""Ramer–Douglas–Peucker simplification.
+
+	Keeps the first and last point and every point that deviates more than
+	`tolerance` from the simplified line. Iterative (explicit stack), so long
+	strokes cannot hit the recursion limit.
+	"""
+	n = len(points)
+	if n < 3 or tolerance <= 0:
+		return list(points)
+
+	keep = [False] * n
+	keep[0] = keep[-1] = True
+	tol_sq = tolerance * tolerance
+	stack = [(0, n - 1)]
+
+	while stack:
+		first, last = stack.pop()
+		x1, y1 = points[first]
+		x2, y2 = points[last]
+		dx, dy = x2 - x1, y2 - y1
+		seg_len_sq = dx * dx + dy * dy
+
+		max_dist_sq = -1.0
+		index = first
+		for i in range(first + 1, last):
+			px, py = points[i]
+			if seg_len_sq == 0:
+				dist_sq = (px - x1) ** 2 + (py - y1) ** 2
+			else:
+				# squared perpendicular distance to the chord
+				cross = dx * (py - y1) - dy * (px - x1)
+				dist_sq = cross * cross / seg_len_sq
+			if dist_sq > max_dist_sq:
+				max_dist_sq = dist_sq
+				index = i
+
+		if max_dist_sq > tol_sq:
+			keep[index] = True
+			stack.append((first, index))
+			stack.append((index, last))
+
+	return [p for p, k in zip(points, keep) if k]
+
+
+def distance_to_polyline(points: Sequence[Point], x: float, y: float) -> float:
+	"""Shortest distance from (x, y) to the polyline through `points`."""
+	if not points:
+		return math.inf
+	if len(points) == 1:
+		return math.hypot(points[0][0] - x, points[0][1] - y)
+
+	best_sq = math.inf
+	for (x1, y1), (x2, y2) in zip(points, points[1:]):
+		dx, dy = x2 - x1, y2 - y1
+		seg_len_sq = dx * dx + dy * dy
+		t = 0.0 if seg_len_sq == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / seg_len_sq))
+		ex, ey = x1 + t * dx - x, y1 + t * dy - y
+		dist_sq = ex * ex + ey * ey
+		if dist_sq < best_sq:
+			best_sq = dist_sq
+	return math.sqrt(best_sq)
+
+
+__all__ = ["Point", "simplify_polyline", "distance_to_polyline"]
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import List, Sequence, Tuple
+
+
+class LevelCurve:
+	"""Maps total XP to a level using a precomputed threshold table.
+
+	`thresholds[i]` is the cumulative XP needed to reach level i + 1, so
+	thresholds[0] is always 0 (level 1). Past the end of the table every
+	further level costs `tail_cost`, which keeps lookups O(1) for XP values
+	far beyond anything worth precomputing. Curves are immutable, so swapping
+	one in at runtime is a plain reference assignment.
+	"""
+
+	def __init__(self, thresholds: Sequence[int], tail_cost: int, name: str = ""):
+		if not thresholds or thresholds[0] != 0:
+			raise ValueError("thresholds must start at 0")
+		if any(b <= a for a, b in zip(thresholds, thresholds[1:])):
+			raise ValueError("thresholds must be strictly increasing")
+		if tail_cost <= 0:
+			raise ValueError("tail_cost must be positive")
+
+		self.thresholds: List[int] = list(thresholds)
+		self.tail_cost = tail_cost
+		self.name = name
+
+	@classmethod
+	def linear(cls, xp_per_level: int = 100) -> "LevelCurve":
+		"""Every level costs the same amount of XP (the classic 100 XP/level)."""
+		return cls([0], xp_per_level, name=f"linear-{xp_per_level}")
+
+	@classmethod
+	def exponential(cls, base: int = 100, growth: float = 1.15, max_level: int = 200) -> "LevelCurve":
+		"""Level n -> n + 1 costs base * growth ** (n - 1), flat after `max_level`."""
+		thresholds = [0]
+		cost = base
+		for level in range(1, max_level):
+			cost = max(1, int(base * growth ** (level - 1)))
+			thresholds.append(thresholds[-1] + cost)
+		return cls(thresholds, cost, name=f"exp-{base}-{growth}")
+
+	@classmethod
+	def from_thresholds(cls, thresholds: Sequence[int], tail_cost: int = 0, name: str = "table") -> "LevelCurve":
+		"""Table-driven curve, e.g. a season designed by hand.
+
+		If `tail_cost` is not given, levels past the table repeat the cost of
+		the last table step.
+		"""
+		if not tail_cost:
+			tail_cost = thresholds[-1] - thresholds[-2] if len(thresholds) > 1 else 100
+		return cls(thresholds, tail_cost, name=name)
+
+	def level_for(self, xp: int) -> int:
+		"""Return the 1-based level for `xp` total XP."""
+		last = self.thresholds[-1]
+		if xp >= last:
+			return len(self.thresholds) + (xp - last) // self.tail_cost
+		return bisect_right(self.thresholds, max(xp, 0))
+
+	def level_start(self, level: int) -> int:
+		"""Cumulative XP at which `level` begins."""
+		if level <= len(self.thresholds):
+			return self.thresholds[max(level, 1) - 1]
+		return self.thresholds[-1] + (level - len(self.thresholds)) * self.tail_cost
+
+	def progress(self, xp: int) -> Tuple[int, int, int]:
+		"""Return (xp_into_current_level, xp_required_for_next_level, percent)."""
+		level = self.level_for(xp)
+		start = self.level_start(level)
+		required = self.level_start(level + 1) - start
+		xp_into = xp - start
+		return xp_into, required, xp_into * 100 // required
+
+
+DEFAULT_LEVEL_CURVE = LevelCurve.linear(100)
+
+
+__all__ = ["LevelCurve", "DEFAULT_LEVEL_CURVE"]
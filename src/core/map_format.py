@@ -0,0 +1,158 @@
+"""Compact binary format for editable quest maps.
+
+Layout (little-endian)::
+
+	header   "QMAP" | u8 version | u32 width | u32 height      (not compressed)
+	payload  zlib(
+	    u16 len + utf-8     background reference ("" = none)
+	    u32 n_strokes | u32[n] point counts | f32[2 * sum] xy coords
+	    u8 n_types + (u8 len + utf-8)*   marker type table
+	    u32 n_markers | f32[2n] xy | u8[n] type index
+	    u32 n_labels | f32[2n] xy | u32[n] byte lengths | utf-8 blob
+	)
+
+Point data is stored as flat float32 arrays, so decoding a stroke is a
+single `array.frombytes` plus a slice rather than per-point unpacking.
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+import zlib
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+MAGIC = b"QMAP"
+VERSION = 1
+_HEADER = struct.Struct("<4sBII")
+
+
+class MapData:
+	"""Editable content of a map: everything except the rendered pixels."""
+
+	def __init__(self, width: int = 800, height: int = 600, background: Optional[str] = None):
+		self.width = width
+		self.height = height
+		self.background = background
+		# each stroke is a flat array('f') of x0, y0, x1, y1, ...
+		self.strokes: List[array] = []
+		self.markers: List[Tuple[float, float, str]] = []
+		self.labels: List[Tuple[float, float, str]] = []
+
+	def add_stroke(self, points: Sequence[Tuple[float, float]]) -> None:
+		flat = array("f")
+		for x, y in points:
+			flat.append(x)
+			flat.append(y)
+		self.strokes.append(flat)
+
+	def __eq__(self, other) -> bool:
+		if not isinstance(other, MapData):
+			return NotImplemented
+		return (self.width, self.height, self.background, self.strokes, self.markers, self.labels) == \
+			(other.width, other.height, other.background, other.strokes, other.markers, other.labels)
+
+
+def _le(values: array) -> bytes:
+	if sys.byteorder == "big":
+		values = array(values.typecode, values)
+		values.byteswap()
+	return values.tobytes()
+
+
+def _read_array(typecode: str, buf: memoryview, offset: int, count: int) -> Tuple[array, int]:
+	values = array(typecode)
+	end = offset + count * values.itemsize
+	values.frombytes(buf[offset:end])
+	if sys.byteorder == "big":
+		values.byteswap()
+	return values, end
+
+
+def encode_map(data: MapData, level: int = 1) -> bytes:
+	parts: List[bytes] = []
+
+	background = (data.background or "").encode("utf-8")
+	parts.append(struct.pack("<H", len(background)))
+	parts.append(background)
+
+	counts = array("I", (len(s) // 2 for s in data.strokes))
+	coords = array("f")
+	for stroke in data.strokes:
+		coords.extend(stroke)
+	parts.append(struct.pack("<I", len(counts)))
+	parts.append(_le(counts))
+	parts.append(_le(coords))
+
+	types = sorted({m[2] for m in data.markers})
+	type_index = {name: i for i, name in enumerate(types)}
+	parts.append(struct.pack("<B", len(types)))
+	for name in types:
+		raw = name.encode("utf-8")
+		parts.append(struct.pack("<B", len(raw)))
+		parts.append(raw)
+	parts.append(struct.pack("<I", len(data.markers)))
+	parts.append(_le(array("f", (v for x, y, _ in data.markers for v in (x, y)))))
+	parts.append(bytes(type_index[m[2]] for m in data.markers))
+
+	texts = [t.encode("utf-8") for _, _, t in data.labels]
+	parts.append(struct.pack("<I", len(data.labels)))
+	parts.append(_le(array("f", (v for x, y, _ in data.labels for v in (x, y)))))
+	parts.append(_le(array("I", (len(t) for t in texts))))
+	parts.append(b"".join(texts))
+
+	header = _HEADER.pack(MAGIC, VERSION, data.width, data.height)
+	return header + zlib.compress(b"".join(parts), level)
+
+
+def decode_map(blob: bytes) -> MapData:
+	magic, version, width, height = _HEADER.unpack_from(blob)
+	if magic != MAGIC:
+		raise ValueError("not a quest map blob")
+	if version != VERSION:
+		raise ValueError(f"unsupported map format version {version}")
+
+	buf = memoryview(zlib.decompress(memoryview(blob)[_HEADER.size:]))
+	pos = 0
+
+	(bg_len,) = struct.unpack_from("<H", buf, pos)
+	pos += 2
+	background = bytes(buf[pos:pos + bg_len]).decode("utf-8") or None
+	pos += bg_len
+	data = MapData(width, height, background)
+
+	(n_strokes,) = struct.unpack_from("<I", buf, pos)
+	counts, pos = _read_array("I", buf, pos + 4, n_strokes)
+	coords, pos = _read_array("f", buf, pos, 2 * sum(counts))
+	offset = 0
+	for count in counts:
+		data.strokes.append(coords[offset:offset + 2 * count])
+		offset += 2 * count
+
+	n_types = buf[pos]
+	pos += 1
+	types = []
+	for _ in range(n_types):
+		length = buf[pos]
+		types.append(bytes(buf[pos + 1:pos + 1 + length]).decode("utf-8"))
+		pos += 1 + length
+
+	(n_markers,) = struct.unpack_from("<I", buf, pos)
+	xy, pos = _read_array("f", buf, pos + 4, 2 * n_markers)
+	kinds = buf[pos:pos + n_markers]
+	pos += n_markers
+	data.markers = [(xy[2 * i], xy[2 * i + 1], types[kinds[i]]) for i in range(n_markers)]
+
+	(n_labels,) = struct.unpack_from("<I", buf, pos)
+	xy, pos = _read_array("f", buf, pos + 4, 2 * n_labels)
+	lengths, pos = _read_array("I", buf, pos, n_labels)
+	for i, length in enumerate(lengths):
+		text = bytes(buf[pos:pos + length]).decode("utf-8")
+		pos += length
+		data.labels.append((xy[2 * i], xy[2 * i + 1], text))
+
+	return data
+
+
+__all__ = ["MapData", "encode_map", "decode_map"]
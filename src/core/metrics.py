@@ -0,0 +1,210 @@
+"""Lightweight in-process metrics: counters, latency histograms, cProfile.
+
+Hot operations are wrapped with `@timed("area.operation")`. While the
+registry is disabled (the default) the wrapper costs one attribute check
+and a call; when enabled it records the latency into a fixed-bucket
+histogram, so memory stays constant however many calls are observed.
+Optional profiling captures a cProfile of every outermost timed call and
+accumulates it per metric.
+
+The process-wide registry is `METRICS`; set QM_METRICS=1 in the
+environment to enable it at startup (QM_METRICS=profile also profiles).
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import json
+import math
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional
+
+# histogram bucket upper bounds in ms: 1 µs .. ~100 s, 4 buckets per doubling
+BUCKET_BOUNDS: List[float] = [0.001 * 2 ** (i / 4) for i in range(4 * 27 + 1)]
+
+
+class Counter:
+	__slots__ = ("value",)
+
+	def __init__(self):
+		self.value = 0
+
+	def inc(self, amount: int = 1) -> None:
+		self.value += amount
+
+
+class Histogram:
+	"""Latency distribution in ms over logarithmic buckets.
+
+	Quantiles are estimated from the bucket bounds (within ~19%, the
+	bucket width); count, sum, min and max are exact.
+	"""
+
+	__slots__ = ("buckets", "count", "total", "min", "max")
+
+	def __init__(self):
+		self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+		self.count = 0
+		self.total = 0.0
+		self.min = math.inf
+		self.max = 0.0
+
+	def observe(self, ms: float) -> None:
+		self.buckets[bisect_left(BUCKET_BOUNDS, ms)] += 1
+		self.count += 1
+		self.total += ms
+		if ms < self.min:
+			self.min = ms
+		if ms > self.max:
+			self.max = ms
+
+	def quantile(self, q: float) -> float:
+		if not self.count:
+			return 0.0
+		rank = q * self.count
+		seen = 0
+		for i, n in enumerate(self.buckets):
+			seen += n
+			if seen >= rank and n:
+				bound = BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+				return min(max(bound, self.min), self.max)
+		return self.max
+
+	@property
+	def mean(self) -> float:
+		return self.total / self.count if self.count else 0.0
+
+	def summary(self) -> Dict[str, float]:
+		return {
+			"count": self.count,
+			"total_ms": self.total,
+			"mean_ms": self.mean,
+			"min_ms": self.min if self.count else 0.0,
+			"max_ms": self.max,
+			"p50_ms": self.quantile(0.5),
+			"p95_ms": self.quantile(0.95),
+			"p99_ms": self.quantile(0.99),
+		}
+
+
+class MetricsRegistry:
+	def __init__(self, enabled: bool = False, profiling: bool = False):
+		self.enabled = enabled
+		self.profiling = profiling
+		self.counters: Dict[str, Counter] = {}
+		self.histograms: Dict[str, Histogram] = {}
+		self.profiles: Dict[str, cProfile.Profile] = {}
+		self._lock = threading.Lock()
+		# only the outermost timed call is profiled: cProfile cannot nest
+		self._profiling_active = threading.local()
+
+	def counter(self, name: str) -> Counter:
+		counter = self.counters.get(name)
+		if counter is None:
+			with self._lock:
+				counter = self.counters.setdefault(name, Counter())
+		return counter
+
+	def histogram(self, name: str) -> Histogram:
+		histogram = self.histograms.get(name)
+		if histogram is None:
+			with self._lock:
+				histogram = self.histograms.setdefault(name, Histogram())
+		return histogram
+
+	def inc(self, name: str, amount: int = 1) -> None:
+		if self.enabled:
+			self.counter(name).inc(amount)
+
+	def observe(self, name: str, ms: float) -> None:
+		if self.enabled:
+			self.histogram(name).observe(ms)
+
+	def reset(self) -> None:
+		with self._lock:
+			self.counters.clear()
+			self.histograms.clear()
+			self.profiles.clear()
+
+	def call(self, name: str, func: Callable, *args, **kwargs):
+		"""Run `func` and record it under `name` (the slow path of `timed`)."""
+		profile = None
+		if self.profiling and not getattr(self._profiling_active, "on", False):
+			profile = self.profiles.get(name)
+			if profile is None:
+				with self._lock:
+					profile = self.profiles.setdefault(name, cProfile.Profile())
+			try:
+				profile.enable()
+			except ValueError:
+				profile = None  # another profiler is active (e.g. in another thread)
+			else:
+				self._profiling_active.on = True
+
+		start = time.perf_counter()
+		try:
+			return func(*args, **kwargs)
+		except BaseException:
+			self.counter(name + ".errors").inc()
+			raise
+		finally:
+			elapsed = (time.perf_counter() - start) * 1000
+			if profile is not None:
+				profile.disable()
+				self._profiling_active.on = False
+			self.histogram(name).observe(elapsed)
+
+	def profile_text(self, name: str, limit: int = 25, sort: str = "cumulative") -> str:
+		profile = self.profiles.get(name)
+		if profile is None:
+			return ""
+		out = io.StringIO()
+		pstats.Stats(profile, stream=out).sort_stats(sort).print_stats(limit)
+		return out.getvalue()
+
+	def snapshot(self) -> Dict[str, Any]:
+		return {
+			"enabled": self.enabled,
+			"profiling": self.profiling,
+			"counters": {name: c.value for name, c in sorted(self.counters.items())},
+			"histograms": {name: h.summary() for name, h in sorted(self.histograms.items())},
+			"profiled": sorted(self.profiles),
+		}
+
+	def dump_json(self, path: Optional[str] = None) -> str:
+		"""Snapshot as JSON; also written to `path` when given."""
+		text = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+		if path is not None:
+			with open(path, "w", encoding="utf-8") as fh:
+				fh.write(text)
+		return text
+
+
+def _from_env() -> MetricsRegistry:
+	mode = os.environ.get("QM_METRICS", "").strip().lower()
+	return MetricsRegistry(enabled=mode not in ("", "0", "off", "false"), profiling=mode == "profile")
+
+
+METRICS = _from_env()
+
+
+def timed(name: str, registry: Optional[MetricsRegistry] = None):
+	"""Record calls of the decorated function as latency metric `name`."""
+	def decorate(func):
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			reg = registry or METRICS
+			if not reg.enabled:
+				return func(*args, **kwargs)
+			return reg.call(name, func, *args, **kwargs)
+		return wrapper
+	return decorate
+
+
+__all__ = ["Counter", "Histogram", "MetricsRegistry", "METRICS", "timed", "BUCKET_BOUNDS"]
@@ -0,0 +1,104 @@
+"""Streaming PNG writer.
+
+Rows are compressed and written to disk as they arrive, so an image of any
+size can be produced from horizontal bands without ever holding the whole
+bitmap in memory. Only 8-bit RGB/RGBA without interlacing is supported —
+that is all map export needs.
+"""
+
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import BinaryIO, Optional
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# IDAT chunks are flushed once this much compressed data has accumulated
+IDAT_CHUNK_SIZE = 256 * 1024
+INCH_PER_METER = 39.3700787
+
+
+class PngWriter:
+	def __init__(self, path: str, width: int, height: int, alpha: bool = True,
+				 dpi: Optional[float] = None, level: int = 6):
+		if width <= 0 or height <= 0:
+			raise ValueError("image size must be positive")
+		self.width = width
+		self.height = height
+		self.channels = 4 if alpha else 3
+		self.rows_written = 0
+		self._compressor = zlib.compressobj(level)
+		self._pending = bytearray()
+		self._file: Optional[BinaryIO] = open(path, "wb")
+
+		self._file.write(PNG_SIGNATURE)
+		color_type = 6 if alpha else 2
+		self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+		if dpi:
+			ppm = round(dpi * INCH_PER_METER)
+			self._chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+
+	@property
+	def stride(self) -> int:
+		return self.width * self.channels
+
+	def write_rows(self, data, stride: Optional[int] = None) -> None:
+		"""Append whole rows of packed 8-bit pixels.
+
+		`stride` is the byte distance between rows in `data` (QImage pads
+		scanlines to 4 bytes); it defaults to the exact row size.
+		"""
+		row_size = self.stride
+		stride = stride or row_size
+		view = memoryview(data).cast("B")
+		count = len(view) // stride
+		if self.rows_written + count > self.height:
+			raise ValueError("more rows than the image height")
+
+		filtered = bytearray()
+		for i in range(count):
+			filtered.append(0)  # filter type None
+			filtered += view[i * stride:i * stride + row_size]
+		self.rows_written += count
+
+		self._pending += self._compressor.compress(filtered)
+		if len(self._pending) >= IDAT_CHUNK_SIZE:
+			self._chunk(b"IDAT", bytes(self._pending))
+			self._pending.clear()
+
+	def close(self) -> None:
+		if self._file is None:
+			return
+		try:
+			if self.rows_written != self.height:
+				raise ValueError(f"expected {self.height} rows, got {self.rows_written}")
+			self._pending += self._compressor.flush()
+			self._chunk(b"IDAT", bytes(self._pending))
+			self._chunk(b"IEND", b"")
+		finally:
+			self._file.close()
+			self._file = None
+
+	def abort(self) -> None:
+		"""Close the file without finishing the image."""
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+
+	def _chunk(self, kind: bytes, payload: bytes) -> None:
+		self._file.write(struct.pack(">I", len(payload)))
+		self._file.write(kind)
+		self._file.write(payload)
+		self._file.write(struct.pack(">I", zlib.crc32(payload, zlib.crc32(kind))))
+
+	def __enter__(self) -> "PngWriter":
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		if exc_type is None:
+			self.close()
+		else:
+			self.abort()
+
+
+__all__ = ["PngWriter"]
@@ -0,0 +1,368 @@
+"""Opt-in statement tracing for the SQLite layer.
+
+`QueryTracer.attach(conn)` returns a stand-in for the connection that times
+every statement issued through it, from `execute` to the last row fetched,
+and aggregates the executions by normalized SQL (literals become `?`, so
+`WHERE id = 5` and `WHERE id = 7` are one entry) into a count, latency
+histogram and rows returned. sqlite3's hooks fill in what the wrapper
+cannot see: the progress handler counts virtual machine steps per
+statement, in units of `progress_steps` (a cost that does not depend on
+machine load), and the trace callback counts statements run on the
+wrapper's behalf, such as the implicit BEGIN before a write; their time is
+part of the statement that caused them.
+
+Executions slower than `threshold_ms` are logged at WARNING level together
+with their EXPLAIN QUERY PLAN and kept in `QueryTracer.slow`.
+
+`Database.trace_queries()` starts tracing; setting QM_TRACE_SQL=<ms> in the
+environment does it for every `Database` with that threshold.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+from core.metrics import Histogram
+
+log = logging.getLogger(__name__)
+
+_STRING = re.compile(r"[xX]?'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+	"""Statement text with literals replaced by `?` and whitespace collapsed."""
+	sql = _COMMENT.sub(" ", sql)
+	sql = _STRING.sub("?", sql)
+	sql = _NUMBER.sub("?", sql)
+	sql = _IN_LIST.sub("IN (?)", sql)
+	return _SPACE.sub(" ", sql).strip().rstrip(";").rstrip()
+
+
+class StatementStats:
+	__slots__ = ("sql", "count", "rows", "steps", "errors", "latency")
+
+	def __init__(self, sql: str):
+		self.sql = sql
+		self.count = 0
+		self.rows = 0
+		self.steps = 0
+		self.errors = 0
+		self.latency = Histogram()
+
+	def summary(self) -> Dict[str, Any]:
+		return {
+			"sql": self.sql,
+			"count": self.count,
+			"total_ms": self.latency.total,
+			"mean_ms": self.latency.mean,
+			"p95_ms": self.latency.quantile(0.95),
+			"max_ms": self.latency.max,
+			"rows": self.rows,
+			"steps": self.steps,
+			"errors": self.errors,
+		}
+
+
+class SlowQuery(NamedTuple):
+	sql: str
+	params: Any
+	ms: float
+	rows: int
+	plan: str
+
+
+class QueryTracer:
+	def __init__(self, threshold_ms: float = 50.0, progress_steps: int = 1000, max_slow: int = 100):
+		self.threshold_ms = threshold_ms
+		self.progress_steps = progress_steps
+		self.stats: Dict[str, StatementStats] = {}
+		self.slow: Deque[SlowQuery] = deque(maxlen=max_slow)
+		self._conn: Optional[sqlite3.Connection] = None
+		self._lock = threading.Lock()
+		# per thread: normalized SQL of the statement being run through the wrapper
+		self._local = threading.local()
+
+	# --- attaching ---------------------------------------------------------
+
+	def attach(self, conn: sqlite3.Connection) -> "TracedConnection":
+		if self._conn is not None:
+			raise RuntimeError("tracer is already attached to a connection")
+		self._conn = conn
+		conn.set_trace_callback(self._on_trace)
+		conn.set_progress_handler(self._on_progress, self.progress_steps)
+		return TracedConnection(conn, self)
+
+	def detach(self) -> Optional[sqlite3.Connection]:
+		"""Remove the hooks; returns the plain connection."""
+		conn, self._conn = self._conn, None
+		if conn is not None:
+			conn.set_trace_callback(None)
+			conn.set_progress_handler(None, 0)
+		return conn
+
+	# --- hooks ---------------------------------------------------------------
+
+	def _on_trace(self, sql: str) -> None:
+		local = self._local
+		if getattr(local, "explaining", False):
+			return
+		key = normalize_sql(sql)
+		if key == getattr(local, "current", None):
+			return  # the wrapper already counts it (triggers report their parent too)
+		with self._lock:
+			self._entry(key).count += 1
+
+	def _on_progress(self) -> int:
+		key = getattr(self._local, "current", None)
+		if key is not None:
+			entry = self.stats.get(key)
+			if entry is not None:
+				entry.steps += self.progress_steps
+		return 0  # never interrupt
+
+	# --- recording -----------------------------------------------------------
+
+	def _entry(self, key: str) -> StatementStats:
+		entry = self.stats.get(key)
+		if entry is None:
+			entry = self.stats[key] = StatementStats(key)
+		return entry
+
+	def _begin(self, key: str) -> None:
+		with self._lock:
+			self._entry(key)
+
+	def _record(self, key: str, sql: str, params: Any, ms: float, rows: int, error: bool) -> None:
+		with self._lock:
+			entry = self._entry(key)
+			entry.count += 1
+			entry.rows += rows
+			entry.errors += error
+			entry.latency.observe(ms)
+		if ms >= self.threshold_ms and not error:
+			plan = self.explain(sql, params)
+			self.slow.append(SlowQuery(key, params, ms, rows, plan))
+			log.warning("slow query %.1f ms, %d rows: %s\n%s", ms, rows, key, plan or "(no plan)")
+
+	def _timed(self, key: str, func: Callable, *args):
+		"""Run `func` as one execution of `key` (commits and rollbacks)."""
+		local = self._local
+		outer, local.current = getattr(local, "current", None), key
+		self._begin(key)
+		start = time.perf_counter()
+		error = True
+		try:
+			result = func(*args)
+			error = False
+			return result
+		finally:
+			local.current = outer
+			self._record(key, key, None, (time.perf_counter() - start) * 1000, 0, error)
+
+	def explain(self, sql: str, params: Any = None) -> str:
+		"""EXPLAIN QUERY PLAN as an indented tree, '' if SQLite has none."""
+		if self._conn is None:
+			return ""
+		local = self._local
+		outer, local.current = getattr(local, "current", None), None
+		local.explaining = True
+		try:
+			rows = self._conn.execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+		except sqlite3.Error:
+			return ""
+		finally:
+			local.explaining = False
+			local.current = outer
+		depth = {0: -1}
+		lines = []
+		for node, parent, _, detail in rows:
+			depth[node] = depth.get(parent, -1) + 1
+			lines.append("  " * depth[node] + detail)
+		return "\n".join(lines)
+
+	# --- reporting -----------------------------------------------------------
+
+	def report(self, sort: str = "total_ms", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+		with self._lock:
+			rows = [entry.summary() for entry in self.stats.values()]
+		rows.sort(key=lambda row: row[sort], reverse=True)
+		return rows[:limit] if limit else rows
+
+	def format_report(self, sort: str = "total_ms", limit: int = 20, width: int = 70) -> str:
+		lines = [f"{'count':>8} {'total ms':>10} {'p95 ms':>8} {'rows':>9} {'steps':>10}  sql"]
+		for row in self.report(sort, limit):
+			sql = row["sql"] if len(row["sql"]) <= width else row["sql"][:width - 3] + "..."
+			lines.append(f"{row['count']:8} {row['total_ms']:10.2f} {row['p95_ms']:8.3f} "
+						 f"{row['rows']:9} {row['steps']:10}  {sql}")
+		return "\n".join(lines)
+
+	def reset(self) -> None:
+		with self._lock:
+			self.stats.clear()
+			self.slow.clear()
+
+
+class TracedCursor:
+	"""Cursor wrapper: one execution lasts from `execute` until the rows run
+	out, the cursor is reused or closed, or it is garbage collected."""
+
+	def __init__(self, cursor: sqlite3.Cursor, tracer: QueryTracer):
+		self._cursor = cursor
+		self._tracer = tracer
+		self._key: Optional[str] = None
+
+	def _start(self, sql: str, params: Any) -> str:
+		self._finish()
+		key = self._key = normalize_sql(sql)
+		self._sql, self._params = sql, params
+		self._ms = 0.0
+		self._rows = 0
+		self._error = False
+		self._tracer._begin(key)
+		return key
+
+	def _run(self, func: Callable, *args):
+		local = self._tracer._local
+		outer, local.current = getattr(local, "current", None), self._key
+		start = time.perf_counter()
+		try:
+			return func(*args)
+		except sqlite3.Error:
+			self._error = True
+			raise
+		finally:
+			self._ms += (time.perf_counter() - start) * 1000
+			local.current = outer
+
+	def _finish(self) -> None:
+		key, self._key = self._key, None
+		if key is not None:
+			self._tracer._record(key, self._sql, self._params, self._ms, self._rows, self._error)
+
+	def execute(self, sql: str, params: Any = ()) -> "TracedCursor":
+		self._start(sql, params)
+		try:
+			self._run(self._cursor.execute, sql, params)
+		except sqlite3.Error:
+			self._finish()
+			raise
+		return self
+
+	def executemany(self, sql: str, seq_of_params) -> "TracedCursor":
+		self._start(sql, None)
+		try:
+			self._run(self._cursor.executemany, sql, seq_of_params)
+		finally:
+			self._finish()
+		return self
+
+	def fetchone(self):
+		row = self._run(self._cursor.fetchone)
+		if row is None:
+			self._finish()
+		else:
+			self._rows += 1
+		return row
+
+	def fetchmany(self, size: int = 1) -> list:
+		rows = self._run(self._cursor.fetchmany, size)
+		self._rows += len(rows)
+		if len(rows) < size:
+			self._finish()
+		return rows
+
+	def fetchall(self) -> list:
+		rows = self._run(self._cursor.fetchall)
+		self._rows += len(rows)
+		self._finish()
+		return rows
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		row = self.fetchone()
+		if row is None:
+			raise StopIteration
+		return row
+
+	def close(self) -> None:
+		self._finish()
+		self._cursor.close()
+
+	def __del__(self):
+		if self._key is not None:
+			self._finish()
+
+	def __getattr__(self, name: str):
+		return getattr(self._cursor, name)
+
+	def __setattr__(self, name: str, value) -> None:
+		if name.startswith("_"):
+			object.__setattr__(self, name, value)
+		else:
+			setattr(self._cursor, name, value)  # e.g. row_factory
+
+
+class TracedConnection:
+	"""Connection wrapper handing out `TracedCursor`s; everything else is
+	passed through to the real connection."""
+
+	def __init__(self, conn: sqlite3.Connection, tracer: QueryTracer):
+		object.__setattr__(self, "_conn", conn)
+		object.__setattr__(self, "_tracer", tracer)
+
+	def cursor(self) -> TracedCursor:
+		return TracedCursor(self._conn.cursor(), self._tracer)
+
+	def execute(self, sql: str, params: Any = ()) -> TracedCursor:
+		return self.cursor().execute(sql, params)
+
+	def executemany(self, sql: str, seq_of_params) -> TracedCursor:
+		return self.cursor().executemany(sql, seq_of_params)
+
+	def commit(self) -> None:
+		self._tracer._timed("COMMIT", self._conn.commit)
+
+	def rollback(self) -> None:
+		self._tracer._timed("ROLLBACK", self._conn.rollback)
+
+	def __enter__(self) -> "TracedConnection":
+		self._conn.__enter__()
+		return self
+
+	def __exit__(self, exc_type, exc, tb):
+		key = "COMMIT" if exc_type is None else "ROLLBACK"
+		return self._tracer._timed(key, self._conn.__exit__, exc_type, exc, tb)
+
+	def __getattr__(self, name: str):
+		return getattr(self._conn, name)
+
+	def __setattr__(self, name: str, value) -> None:
+		setattr(self._conn, name, value)
+
+
+def threshold_from_env() -> Optional[float]:
+	"""Slow-query threshold from QM_TRACE_SQL, None when tracing is off."""
+	value = os.environ.get("QM_TRACE_SQL", "").strip()
+	if not value:
+		return None
+	try:
+		return float(value)
+	except ValueError:
+		return 50.0
+
+
+__all__ = ["QueryTracer", "StatementStats", "SlowQuery", "TracedConnection", "TracedCursor",
+		   "normalize_sql", "threshold_from_env"]
@@ -0,0 +1,263 @@
+"""Seeded procedural quest generator.
+
+Quests are assembled from weighted phrase tables. Each quest draws one
+place, foe and artifact; its title pattern and five description
+sentences (at least ten words each) all refer to that same draw. Place
+and foe phrases are written in the genitive case, so they combine freely.
+Difficulty is weighted, and reward range and deadline window depend on
+the difficulty.
+
+Everything that can be rendered ahead of time is: every title and
+sentence is pre-formatted for every filler value when the generator is
+created, and deadlines come from a table of ready strings. Producing a
+quest is then a handful of index picks and one `str.join`, which keeps
+generation well above 100k quests/s on one core.
+
+The same seed and start date always give the same stream of quests.
+"""
+
+from __future__ import annotations
+
+import random
+from bisect import bisect
+from datetime import date, datetime, timedelta
+from itertools import accumulate, islice
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from core.database import MAX_TITLE_LENGTH
+
+# (difficulty, weight, (min reward, max reward), (min days, max days))
+DIFFICULTIES = [
+	("Легкий", 40, (10, 200), (1, 7)),
+	("Средний", 35, (150, 800), (3, 14)),
+	("Сложный", 18, (600, 3000), (7, 30)),
+	("Эпический", 7, (2500, 10000), (14, 90)),
+]
+
+# places and foes in the genitive case
+PLACES = [
+	"Туманной долины", "Черного леса", "Старой мельницы", "Забытого тракта",
+	"Серебряного озера", "Северной заставы", "Медных холмов", "Гнилых болот",
+	"Королевского тракта", "Пограничной крепости", "Соляных копей", "Пепельных гор",
+	"Лунной рощи", "Разрушенного монастыря", "Торгового порта", "Ледяного перевала",
+	"Каменного моста", "Заброшенной шахты", "Шепчущих пещер", "Янтарного берега",
+	"Вересковой пустоши", "Драконьего ущелья", "Тихой деревни", "Древнего кургана",
+	"Багровой степи", "Сумеречной чащи", "Старого маяка", "Гномьего рудника",
+	"Речной переправы", "Ведьминого холма", "Дальнего хутора", "Подземного города",
+]
+FOES = [
+	"огненного дракона", "некроманта-отступника", "стаи оборотней", "банды разбойников",
+	"болотной ведьмы", "гоблинского вождя", "каменного тролля", "культа безликих",
+	"призрачного рыцаря", "короля-лича", "гигантского паука", "теневого ассасина",
+	"пиратского капитана", "орды нежити", "безумного алхимика", "ледяного великана",
+	"пустынного василиска", "клана кровавых орков", "падшего паладина", "морского змея",
+]
+ARTIFACTS = [
+	"Рог Рассвета", "Сердце Горы", "Корону Забытых Королей", "Клинок Зари",
+	"Око Бури", "Посох Семи Ветров", "Зеркало Истины", "Печать Древних",
+	"Кубок Вечной Жизни", "Амулет Звездного Света", "Книгу Теней", "Ключ Пяти Замков",
+]
+
+# (weight, pattern); {place} / {foe} / {artifact}
+TITLE_PATTERNS = [
+	(6, "Логово {foe}"),
+	(5, "Тайна {place}"),
+	(4, "Проклятие {place}"),
+	(4, "Охота на {artifact} у {foe}"),
+	(3, "Последний бой {foe}"),
+	(3, "Стражи {place}"),
+	(3, "Пропавший караван {place}"),
+	(2, "Тень над воротами {place}"),
+	(2, "Месть {foe}"),
+	(2, "Сокровища {place}"),
+	(1, "Песнь {place}"),
+	(1, "Безмолвие {place}"),
+]
+
+# description slots in order; every sentence has at least ten words
+OPENINGS = [
+	(4, "Жители {place} давно не спят спокойно и каждую ночь запирают ставни на все засовы."),
+	(3, "Гонец из {place} прибыл в гильдию израненным и успел передать лишь короткую записку."),
+	(3, "Старейшины {place} собрали последние сбережения, чтобы нанять отважных и опытных искателей приключений."),
+	(2, "В окрестностях {place} снова пропадают путники, и торговцы отказываются ходить по этим дорогам."),
+	(2, "Летописцы гильдии давно следят за {place}, но такого тревожного затишья не помнят даже старики."),
+]
+THREATS = [
+	(4, "Следы ведут к логову {foe}, о котором в тавернах рассказывают только шепотом и с оглядкой."),
+	(3, "Разведчики видели слуг {foe}, и теперь каждая неделя промедления стоит кому-то жизни."),
+	(3, "За нападениями стоят приспешники {foe}, собирающие силы для удара по соседним землям и крепостям."),
+	(2, "Все указывает на возвращение {foe}, которого считали побежденным еще во времена прошлой войны."),
+]
+TASKS = [
+	(4, "Отряду предстоит найти и вернуть {artifact}, без которого защитные чары скоро окончательно ослабнут."),
+	(3, "Нужно добыть {artifact} раньше врага, ведь в чужих руках реликвия обернется страшным оружием."),
+	(3, "Герои должны доставить {artifact} в святилище гильдии, пока сила реликвии не пробудила древнее зло."),
+	(2, "Главная цель похода состоит в том, чтобы отыскать {artifact} и узнать, кто похитил реликвию."),
+]
+OBSTACLES = [
+	(4, "Дорога займет несколько дней, а проводники берутся вести отряд только до границы обжитых земель."),
+	(3, "Путь преграждают ловушки и обвалы, поэтому стоит запастись веревками, факелами и целебными зельями."),
+	(3, "Местные знахари предупреждают о ядовитых туманах, от которых не спасают ни броня, ни амулеты."),
+	(2, "Говорят, что у врага есть шпион среди горожан, так что доверять можно не каждому встречному."),
+]
+# {reward} is filled in per quest
+CLOSINGS = [
+	(4, "Гильдия обещает {reward} золотых за успешное выполнение задания и почетное место в летописи героев."),
+	(3, "Награда составит {reward} золотых, а городской совет добавит к ней пожизненное право на бесплатный ночлег."),
+	(2, "За голову врага и возвращение реликвии казна выплатит {reward} золотых в день триумфального возвращения."),
+]
+
+# description slot -> which phrase table fills its placeholder
+DESCRIPTION_SLOTS = [
+	(OPENINGS, "place"),
+	(THREATS, "foe"),
+	(TASKS, "artifact"),
+	(OBSTACLES, None),
+]
+
+
+class GeneratedQuest(NamedTuple):
+	"""A quest in `Database.create_quest` argument order."""
+	title: str
+	difficulty: str
+	reward: int
+	description: str
+	deadline: str
+
+
+def _cumulative(weighted: Sequence[Tuple[int, object]]) -> Tuple[List[int], List[object]]:
+	weights, values = zip(*weighted)
+	return list(accumulate(weights)), list(values)
+
+
+def _expand(weighted: Sequence[Tuple[int, object]]) -> List[object]:
+	"""Repeat each value by its weight: a uniform pick is then a weighted one."""
+	return [value for weight, value in weighted for _ in range(weight)]
+
+
+def _word_count(template: str) -> int:
+	# placeholders stand for at least one word each
+	return len(template.split())
+
+
+def _fit(title: str, room: int) -> str:
+	"""`title` cut at a word boundary to at most `room` characters, the cut marked with an ellipsis."""
+	if len(title) <= room:
+		return title
+	cut = title.rfind(" ", 0, room)
+	return title[:cut if cut > 0 else room - 1].rstrip(" ,-") + "…"
+
+
+def min_description_words() -> int:
+	"""Fewest words any generated description can have."""
+	slots = [table for table, _ in DESCRIPTION_SLOTS] + [CLOSINGS]
+	return sum(min(_word_count(t) for _, t in table) for table in slots)
+
+
+class QuestGenerator:
+	def __init__(self, seed: int = 0, start: Optional[datetime] = None):
+		"""`start` is the creation moment deadlines count from (default: today 00:00)."""
+		self.seed = seed
+		self.start = start or datetime.combine(date.today(), datetime.min.time())
+		self._rng = random.Random(seed)
+		self._seen = {}
+
+		fillers = {"place": PLACES, "foe": FOES, "artifact": ARTIFACTS}
+
+		# titles: each pattern rendered over the fillers it uses, with index
+		# strides so the quest's (place, foe, artifact) draw maps to its entry
+		self._title_cum, patterns = _cumulative(TITLE_PATTERNS)
+		self._titles = []
+		for pattern in patterns:
+			rendered = [pattern]
+			strides = {}
+			for key, values in fillers.items():
+				if "{" + key + "}" in pattern:
+					for known in strides:
+						strides[known] *= len(values)
+					strides[key] = 1
+					rendered = [r.replace("{" + key + "}", v) for r in rendered for v in values]
+			rendered = [_fit(r, MAX_TITLE_LENGTH) for r in rendered]
+			self._titles.append((rendered, strides.get("place", 0), strides.get("foe", 0),
+								 strides.get("artifact", 0)))
+
+		# description sentences pre-rendered for every filler value; the
+		# template list is expanded by weight, so its pick is a uniform index
+		self._slots = []
+		for table, key in DESCRIPTION_SLOTS:
+			values = fillers[key] if key else [""]
+			self._slots.append(_expand(
+				(weight, [t.replace("{" + key + "}", v) for v in values] if key else [t])
+				for weight, t in table))
+		self._closings = _expand(CLOSINGS)
+		self._difficulties = _expand(
+			[(weight, (name, low, (high - low) // 10 + 1, first, last - first + 1))
+			 for name, weight, (low, high), (first, last) in DIFFICULTIES])
+
+		longest = max(days[1] for _, _, _, days in DIFFICULTIES)
+		self._deadlines = [
+			(self.start + timedelta(days=day, hours=hour)).strftime("%Y-%m-%d %H:%M:%S")
+			for day in range(longest + 1) for hour in range(24)
+		]
+
+	def generate(self, count: Optional[int] = None) -> Iterator[GeneratedQuest]:
+		"""Yield `count` quests (endless if None); titles are unique in the stream and fit MAX_TITLE_LENGTH."""
+		rng = self._rng.random
+		title_cum, titles = self._title_cum, self._titles
+		title_total = title_cum[-1]
+		s1, s2, s3, s4 = self._slots
+		n1, n2, n3, n4 = len(s1), len(s2), len(s3), len(s4)
+		closings, n_closings = self._closings, len(self._closings)
+		difficulties, n_difficulties = self._difficulties, len(self._difficulties)
+		deadlines = self._deadlines
+		seen = self._seen
+		n_places, n_foes, n_artifacts = len(PLACES), len(FOES), len(ARTIFACTS)
+		make = GeneratedQuest
+
+		produced = 0
+		while count is None or produced < count:
+			produced += 1
+			place = int(rng() * n_places)
+			foe = int(rng() * n_foes)
+			artifact = int(rng() * n_artifacts)
+
+			table, by_place, by_foe, by_artifact = titles[bisect(title_cum, rng() * title_total)]
+			title = table[place * by_place + foe * by_foe + artifact * by_artifact]
+			repeats = seen.get(title, 0)
+			if repeats:
+				# the number counts towards the length limit; a shortened title
+				# may meet another one, so numbered titles are remembered too
+				numbered = title
+				while numbered in seen:
+					repeats += 1
+					suffix = f" #{repeats}"
+					numbered = _fit(title, MAX_TITLE_LENGTH - len(suffix)) + suffix
+				seen[title] = repeats
+				seen[numbered] = 1
+				title = numbered
+			else:
+				seen[title] = 1
+
+			name, low, steps, first_day, days = difficulties[int(rng() * n_difficulties)]
+			reward = low + 10 * int(rng() * steps)
+			# deadlines fall in working hours, 9:00-20:00
+			deadline = deadlines[(first_day + int(rng() * days)) * 24 + 9 + int(rng() * 12)]
+
+			description = " ".join((
+				s1[int(rng() * n1)][place], s2[int(rng() * n2)][foe],
+				s3[int(rng() * n3)][artifact], s4[int(rng() * n4)][0],
+				closings[int(rng() * n_closings)].replace("{reward}", str(reward)),
+			))
+			yield make(title, name, reward, description, deadline)
+
+	def batches(self, count: int, size: int = 10_000) -> Iterator[List[GeneratedQuest]]:
+		"""`generate(count)` cut into lists of `size` quests."""
+		stream = self.generate(count)
+		while True:
+			batch = list(islice(stream, size))
+			if not batch:
+				return
+			yield batch
+
+
+__all__ = ["QuestGenerator", "GeneratedQuest", "min_description_words"]
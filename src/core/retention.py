@@ -0,0 +1,281 @@
+"""Retention of quest version history and space reclamation.
+
+Every `update_quest` (each autosave of the quest wizard) adds a row to
+`quest_versions`. A `RetentionPolicy` says which of them to keep, per
+quest: the newest `keep_last` always; all versions younger than
+`keep_all_s`; the newest one of each hour up to `hourly_s` old; the newest
+one of each day up to `daily_s` old (forever if None); nothing older.
+Versions of quests that no longer exist are dropped too.
+
+`RetentionJob` applies a policy from a connection of its own, a batch of
+quests at a time, deleting at most `delete_rows` versions per short
+transaction with a pause in between, so the app's writes wait for one
+slice at most. The freed pages are then returned to the file
+system with `PRAGMA incremental_vacuum`, also a few pages at a time.
+That needs auto_vacuum=INCREMENTAL, which new databases get (see
+`Database`); an older file must be converted once with
+`enable_incremental_vacuum()`, a full VACUUM that locks it for as long as
+it takes. Without it, freed pages are still reused by new rows but the
+file does not shrink.
+
+Command line, from the src directory:
+	python -m core.retention --db adventures.db --dry-run
+	python -m core.retention --db adventures.db --keep-last 20 --daily-days 365
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, NamedTuple, Optional
+
+from core.metrics import timed
+
+log = logging.getLogger(__name__)
+
+DAY = 24 * 3600
+
+
+class RetentionPolicy(NamedTuple):
+	keep_last: int = 50
+	keep_all_s: float = 7 * DAY
+	hourly_s: float = 30 * DAY
+	daily_s: Optional[float] = None
+
+
+class RetentionResult(NamedTuple):
+	deleted: int
+	pages_freed: int
+	batches: int
+	seconds: float
+
+
+# the newest version of each hour/day, per quest, stands for that hour/day;
+# created_at is "YYYY-MM-DD HH:MM:SS" in UTC, so its prefixes are the buckets
+_DOOMED = """
+	SELECT id FROM (
+		SELECT v.id, v.created_at,
+			ROW_NUMBER() OVER (PARTITION BY v.quest_id ORDER BY v.id DESC) AS newest,
+			ROW_NUMBER() OVER (PARTITION BY v.quest_id, substr(v.created_at, 1, 13) ORDER BY v.id DESC) AS in_hour,
+			ROW_NUMBER() OVER (PARTITION BY v.quest_id, substr(v.created_at, 1, 10) ORDER BY v.id DESC) AS in_day,
+			q.id IS NULL AS orphan
+		FROM quest_versions v LEFT JOIN quests q ON q.id = v.quest_id
+		WHERE v.quest_id BETWEEN :first AND :last
+	)
+	WHERE orphan OR (
+		newest > :keep_last AND created_at < :keep_all AND (
+			(created_at >= :hourly AND in_hour > 1)
+			OR (created_at < :hourly AND (created_at < :daily OR in_day > 1))
+		)
+	)
+"""
+
+
+def _cutoff(now: datetime, age_s: Optional[float]) -> str:
+	if age_s is None:
+		return ""  # sorts before every timestamp: nothing is too old
+	return (now - timedelta(seconds=age_s)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class RetentionJob:
+	"""Applies a retention policy to one database file in small batches."""
+
+	def __init__(self, db_path: str, policy: RetentionPolicy = RetentionPolicy(), batch_quests: int = 200,
+				 delete_rows: int = 1000, vacuum_pages: int = 256, pause: float = 0.02,
+				 on_result: Optional[Callable[[RetentionResult], None]] = None):
+		self.db_path = db_path
+		self.policy = policy
+		self.batch_quests = batch_quests
+		self.delete_rows = delete_rows
+		self.vacuum_pages = vacuum_pages
+		self.pause = pause
+		self.on_result = on_result
+		self.last_result: Optional[RetentionResult] = None
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+
+	def _connect(self) -> sqlite3.Connection:
+		# autocommit: every batch is its own explicit transaction
+		conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+		conn.execute("PRAGMA journal_mode=WAL")
+		return conn
+
+	def _params(self, now: Optional[datetime]) -> dict:
+		"""Query parameters; `now` is UTC, like created_at."""
+		now = now or datetime.now(timezone.utc)
+		policy = self.policy
+		return {
+			"keep_last": policy.keep_last,
+			"keep_all": _cutoff(now, policy.keep_all_s),
+			"hourly": _cutoff(now, policy.hourly_s),
+			"daily": _cutoff(now, policy.daily_s),
+		}
+
+	def _batches(self, conn: sqlite3.Connection):
+		"""(first, last) quest_id ranges of at most batch_quests quests with versions."""
+		last = -1
+		while not self._stop.is_set():
+			ids = [row[0] for row in conn.execute(
+				"SELECT DISTINCT quest_id FROM quest_versions WHERE quest_id > ? ORDER BY quest_id LIMIT ?",
+				(last, self.batch_quests))]
+			if not ids:
+				return
+			last = ids[-1]
+			yield ids[0], last
+
+	def count(self, now: Optional[datetime] = None) -> int:
+		"""How many versions the policy would delete now."""
+		conn = self._connect()
+		try:
+			params = self._params(now)
+			total = 0
+			for first, last in self._batches(conn):
+				total += conn.execute(f"SELECT COUNT(*) FROM ({_DOOMED})",
+									  dict(params, first=first, last=last)).fetchone()[0]
+			return total
+		finally:
+			conn.close()
+
+	@timed("retention.run")
+	def run_once(self, now: Optional[datetime] = None) -> RetentionResult:
+		"""Prune every quest's history, then give free pages back to the file system."""
+		start = time.perf_counter()
+		conn = self._connect()
+		deleted = batches = 0
+		try:
+			params = self._params(now)
+			for first, last in self._batches(conn):
+				# pick the versions outside the write lock; the choice stays valid
+				# because later writes can only make more versions redundant
+				doomed = [row[0] for row in conn.execute(_DOOMED, dict(params, first=first, last=last))]
+				# one quest can have thousands of versions: slice the ids so a
+				# statement stays under SQLite's variable limit and a lock is short
+				for i in range(0, len(doomed), self.delete_rows):
+					if self._stop.is_set():
+						break
+					chunk = doomed[i:i + self.delete_rows]
+					conn.execute("BEGIN IMMEDIATE")
+					try:
+						conn.execute(f"DELETE FROM quest_versions WHERE id IN ({', '.join('?' * len(chunk))})",
+									 chunk)
+						conn.execute("COMMIT")
+					except BaseException:
+						conn.execute("ROLLBACK")
+						raise
+					deleted += len(chunk)
+					time.sleep(self.pause)
+				batches += 1
+			pages_freed = self._vacuum(conn)
+		finally:
+			conn.close()
+		result = RetentionResult(deleted, pages_freed, batches, time.perf_counter() - start)
+		self.last_result = result
+		if self.on_result is not None:
+			self.on_result(result)
+		return result
+
+	def _vacuum(self, conn: sqlite3.Connection) -> int:
+		if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:  # 2 = INCREMENTAL
+			return 0
+		freed = 0
+		while not self._stop.is_set():
+			free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+			if not free:
+				break
+			step = min(free, self.vacuum_pages)
+			# execute() would step the pragma once, which frees a single page;
+			# executescript() runs it to completion
+			conn.executescript(f"PRAGMA incremental_vacuum({step})")
+			freed += step
+			time.sleep(self.pause)
+		# the file only shrinks once the log is copied back; never wait for readers
+		conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+		return freed
+
+	def enable_incremental_vacuum(self) -> bool:
+		"""Convert the file to auto_vacuum=INCREMENTAL with one full VACUUM.
+
+		Locks the database for the whole rebuild; returns False if it was
+		already incremental.
+		"""
+		conn = self._connect()
+		try:
+			if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+				return False
+			conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+			conn.execute("VACUUM")
+			return True
+		finally:
+			conn.close()
+
+	# --- background schedule -------------------------------------------------
+
+	def start(self, interval_s: float = DAY, first_delay_s: float = 60.0) -> None:
+		"""Run on a background thread after `first_delay_s`, then every interval."""
+		if self._thread is not None:
+			return
+		self._stop.clear()
+
+		def run():
+			delay = first_delay_s
+			while not self._stop.wait(delay):
+				try:
+					self.run_once()
+				except (sqlite3.Error, OSError):
+					# a locked or broken file must not end the schedule; try next time
+					log.exception("version retention failed")
+				delay = interval_s
+
+		self._thread = threading.Thread(target=run, name="quest-retention", daemon=True)
+		self._thread.start()
+
+	def stop(self, timeout: Optional[float] = 10.0) -> None:
+		"""Stop the schedule; a run in progress ends after its current batch."""
+		thread, self._thread = self._thread, None
+		self._stop.set()
+		if thread is not None:
+			thread.join(timeout)
+
+
+def main(argv=None) -> int:
+	defaults = RetentionPolicy()
+	parser = argparse.ArgumentParser(description="Prune quest version history and reclaim the space")
+	parser.add_argument("--db", default="adventures.db")
+	parser.add_argument("--keep-last", type=int, default=defaults.keep_last, help="versions always kept per quest")
+	parser.add_argument("--keep-all-days", type=float, default=defaults.keep_all_s / DAY,
+						help="every version younger than this is kept")
+	parser.add_argument("--hourly-days", type=float, default=defaults.hourly_s / DAY,
+						help="one version per hour is kept up to this age")
+	parser.add_argument("--daily-days", type=float, default=None,
+						help="one version per day is kept up to this age (default: forever)")
+	parser.add_argument("--dry-run", action="store_true", help="only count what would be deleted")
+	parser.add_argument("--enable-incremental-vacuum", action="store_true",
+						help="convert an old database once (full VACUUM, locks it while running)")
+	args = parser.parse_args(argv)
+
+	policy = RetentionPolicy(args.keep_last, args.keep_all_days * DAY, args.hourly_days * DAY,
+							 None if args.daily_days is None else args.daily_days * DAY)
+	job = RetentionJob(args.db, policy)
+	if args.dry_run:
+		print(f"{job.count()} versions would be deleted")
+		return 0
+	if args.enable_incremental_vacuum:
+		start = time.perf_counter()
+		if job.enable_incremental_vacuum():
+			print(f"converted to incremental vacuum in {time.perf_counter() - start:.1f} s")
+	result = job.run_once()
+	print(f"deleted {result.deleted} versions in {result.batches} batches, "
+		  f"freed {result.pages_freed} pages in {result.seconds:.1f} s")
+	return 0
+
+
+__all__ = ["RetentionJob", "RetentionPolicy", "RetentionResult"]
+
+
+if __name__ == "__main__":
+	sys.exit(main())
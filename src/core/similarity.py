@@ -0,0 +1,502 @@
+"""Near-duplicate quest descriptions: MinHash signatures and LSH buckets.
+
+A description is reduced to its set of shingles, every run of
+`SHINGLE_WORDS` consecutive words, lowercased. The Jaccard similarity of
+two such sets (shared shingles over all shingles) is estimated from
+MinHash signatures: the minimum shingle hash under each of `NUM_PERM`
+random hash functions, of which the low 16 bits are kept (b-bit MinHash:
+half the storage, a negligible bias); the share of positions where two
+signatures agree estimates the similarity, within about ±0.04.
+
+Comparing a quest against all others would still be O(n). The signature
+is therefore cut into `BANDS` bands of `ROWS` values, and each band is
+hashed to a bucket; quests that share a bucket in any band are the
+candidates, and only their signatures are compared. With 16 bands of 8
+rows a pair with similarity 0.8 shares a bucket 95% of the time, at 0.85
+99%, at 0.5 only 6%: thresholds below ~0.8 miss pairs, in exchange for
+few candidates even though generated descriptions, built from shared
+sentence templates, are often 0.4-0.6 similar. `find_similar` reports
+the estimate; with `exact=True` the candidates near the threshold are
+re-scored from their descriptions instead.
+
+Everything lives in the quests database:
+- quest_minhash: the signature of each indexed quest, `NUM_PERM` uint16;
+- quest_lsh: (bucket, quest id), a bucket being the band number and 27
+  bits of the band hash, so one index lookup per band finds candidates;
+- quest_minhash_dirty: quests whose description changed or that were
+  deleted, filled by triggers, so writes from any connection count.
+
+New quests need no trigger (bulk loads stay fast): they are the quests
+without a signature. Ids are AUTOINCREMENT, so usually only those above
+the highest indexed id are checked; a catalog import keeps the ids from
+its file, so after its "reset" change the whole table is. `refresh()`
+re-indexes dirty quests and indexes new ones, a chunk per transaction;
+subscribed to the change feed through `apply_changes`, it runs right after
+every write that touched quests. NumPy is required.
+
+Command line, from the src directory:
+	python -m core.similarity --db adventures.db 42 --threshold 0.8
+	python -m core.similarity --db adventures.db --refresh
+"""
+
+from __future__ import annotations
+
+try:
+	import numpy as np
+except Exception:
+	np = None
+
+import argparse
+import re
+import sys
+import time
+import zlib
+from functools import lru_cache
+from itertools import chain
+from typing import TYPE_CHECKING, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+if TYPE_CHECKING:
+	from core.database import Database, QuestChange
+
+SHINGLE_WORDS = 3
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# a signature of all `_EMPTY` values marks a description without words
+_EMPTY = 0xFFFF
+_BUCKET_BITS = 27
+# exact=True re-scores the candidates estimated at least this close to the
+# threshold (about three standard deviations of the estimate)
+_ESTIMATE_MARGIN = 0.08
+_SEED = 20240917
+
+_WORD = re.compile(r"\w+")
+
+
+class SimilarQuest(NamedTuple):
+	quest_id: int
+	similarity: float  # Jaccard similarity of the description shingles, estimated unless exact=True
+
+
+def _require_numpy():
+	if np is None:
+		raise RuntimeError("NumPy is required for description similarity")
+
+
+def shingles(text: Optional[str], size: int = SHINGLE_WORDS) -> Set[str]:
+	"""Runs of `size` consecutive words; a shorter text is one shingle."""
+	words = _WORD.findall((text or "").lower())
+	if len(words) <= size:
+		return {" ".join(words)} if words else set()
+	return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Optional[str], b: Optional[str]) -> float:
+	"""Exact shingle similarity of two texts, what signatures estimate."""
+	return _jaccard(shingles(a), shingles(b))
+
+
+def _jaccard(first: Set[str], second: Set[str]) -> float:
+	if not first or not second:
+		return 0.0
+	return len(first & second) / len(first | second)
+
+
+@lru_cache(maxsize=None)
+def _parameters():
+	"""Odd multipliers and offsets of the hash functions, fixed by _SEED.
+
+	Returns (shingle, a, b, mix): word hashes are combined into a shingle
+	hash with `shingle`; hash function i is (a[i] * x + b[i]) >> 32, modulo
+	2**64 (multiply-shift, no division); `mix` combines a band's values.
+	"""
+	rng = np.random.default_rng(_SEED)
+
+	def odd(count):
+		return rng.integers(1, 1 << 63, count, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+	return odd(SHINGLE_WORDS), odd(NUM_PERM)[:, None], odd(NUM_PERM)[:, None], odd(ROWS)
+
+
+class _WordHashes(dict):
+	"""crc32 of each word seen, so a repeated word costs one dict lookup."""
+
+	def __missing__(self, word: str) -> int:
+		if len(self) >= 500_000:
+			self.clear()
+		value = self[word] = zlib.crc32(word.encode())
+		return value
+
+
+_word_hash = _WordHashes().__getitem__
+
+
+def _word_hashes(text: Optional[str]) -> List[int]:
+	hashes = list(map(_word_hash, _WORD.findall((text or "").lower())))
+	if 0 < len(hashes) < SHINGLE_WORDS:
+		hashes += [0] * (SHINGLE_WORDS - len(hashes))  # a short text is one shingle
+	return hashes
+
+
+def _starts(counts: "np.ndarray") -> "np.ndarray":
+	return np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+
+def signatures(texts: Sequence[Optional[str]]) -> "np.ndarray":
+	"""MinHash signatures of the texts, one uint16 row of NUM_PERM values each."""
+	_require_numpy()
+	shingle, a, b, _ = _parameters()
+	hashed = [_word_hashes(text) for text in texts]
+	words = np.fromiter(map(len, hashed), dtype=np.int64, count=len(hashed))
+	result = np.full((len(texts), NUM_PERM), _EMPTY, dtype=np.uint16)
+	counts = np.maximum(words - (SHINGLE_WORDS - 1), 0)
+	filled = counts > 0
+	if not filled.any():
+		return result
+	# shingle hashes of all texts at once: every window of consecutive word
+	# hashes, keeping the windows that start and end inside one text
+	flat = np.fromiter(chain.from_iterable(hashed), dtype=np.uint64, count=int(words.sum()))
+	windows = len(flat) - (SHINGLE_WORDS - 1)
+	combined = sum(flat[i:i + windows] * shingle[i] for i in range(SHINGLE_WORDS))
+	offsets = np.arange(int(counts.sum())) - np.repeat(_starts(counts), counts)
+	x = combined[np.repeat(_starts(words), counts) + offsets]
+	# (hash function, shingle), then the minimum over each text's run of columns
+	values = a * x
+	values += b
+	values >>= np.uint64(32)
+	minimums = np.minimum.reduceat(values, _starts(counts[filled]), axis=1)
+	result[filled] = (minimums & np.uint64(0xFFFF)).T
+	return result
+
+
+def band_buckets(signature_rows: "np.ndarray") -> "np.ndarray":
+	"""LSH bucket of each band of each signature, (n, BANDS) int64."""
+	mix = _parameters()[3]
+	bands = signature_rows.reshape(len(signature_rows), BANDS, ROWS).astype(np.uint64)
+	# multiply-add over the band, then keep the best mixed (top) bits
+	mixed = (bands * mix).sum(axis=2, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+	band = np.arange(BANDS, dtype=np.uint64) << np.uint64(_BUCKET_BITS)
+	return (band | (mixed >> np.uint64(64 - _BUCKET_BITS))).astype(np.int64)
+
+
+def _is_empty(signature: "np.ndarray") -> bool:
+	return bool((signature == _EMPTY).all())
+
+
+class SimilarityIndex:
+	"""MinHash/LSH index of quest descriptions, stored in the quests database."""
+
+	def __init__(self, db: "Database", changes_refresh_limit: int = 500, bulk_after: int = 20_000):
+		_require_numpy()
+		self.db = db
+		# most quests one change feed batch re-indexes; the rest of a backlog
+		# (first start, bulk load) is left to refresh()
+		self.changes_refresh_limit = changes_refresh_limit
+		# this many new quests are indexed by refresh() in bulk (see there)
+		self.bulk_after = bulk_after
+		# new quests are normally those above the highest indexed id; an import
+		# keeps the ids from its file, so after a reset (and on open, as one may
+		# have happened meanwhile) the whole table is checked for them once
+		self._sweep = True
+		self._create_tables()
+
+	def _create_tables(self) -> None:
+		conn = self.db.conn
+		cur = conn.cursor()
+		cur.execute("CREATE TABLE IF NOT EXISTS quest_minhash (quest_id INTEGER PRIMARY KEY, signature BLOB NOT NULL)")
+		cur.execute(
+			"""
+			CREATE TABLE IF NOT EXISTS quest_lsh (
+				bucket INTEGER NOT NULL,
+				quest_id INTEGER NOT NULL,
+				PRIMARY KEY (bucket, quest_id)
+			) WITHOUT ROWID
+			"""
+		)
+		cur.execute("CREATE TABLE IF NOT EXISTS quest_minhash_dirty (quest_id INTEGER PRIMARY KEY)")
+		# autosaves that leave the description alone skip the trigger
+		cur.execute(
+			"""
+			CREATE TRIGGER IF NOT EXISTS quests_minhash_update AFTER UPDATE OF description ON quests
+			WHEN OLD.description IS NOT NEW.description
+			BEGIN
+				INSERT OR IGNORE INTO quest_minhash_dirty VALUES (NEW.id);
+			END
+			"""
+		)
+		cur.execute(
+			"""
+			CREATE TRIGGER IF NOT EXISTS quests_minhash_delete AFTER DELETE ON quests
+			BEGIN
+				INSERT OR IGNORE INTO quest_minhash_dirty VALUES (OLD.id);
+			END
+			"""
+		)
+		# signatures from other parameters cannot be compared: start over
+		row = cur.execute("SELECT length(signature) FROM quest_minhash LIMIT 1").fetchone()
+		if row is not None and row[0] != NUM_PERM * 2:
+			cur.execute("DELETE FROM quest_minhash")
+			cur.execute("DELETE FROM quest_lsh")
+			cur.execute("DELETE FROM quest_minhash_dirty")
+		conn.commit()
+
+	# --- upkeep ----------------------------------------------------------------
+
+	def refresh(self, limit: Optional[int] = None, chunk_size: int = 1000) -> int:
+		"""Re-index changed quests and index new ones; returns how many were processed.
+
+		`limit` bounds the work of one call (to the chunk it falls in), so a
+		caller can work through a large backlog in steps. Without a limit, a
+		backlog of at least `bulk_after` new quests (the first build, a bulk
+		load) is staged in temporary tables and merged in one transaction,
+		buckets in index order, so each index page is written once instead of
+		once per chunk; other writers wait for that merge.
+		"""
+		done = 0
+		if limit is None:
+			# checks the whole table: nothing is missed even if no reset was seen
+			self._sweep = True
+			cur = self.db.conn.cursor()
+			cur.row_factory = None
+			new = self._new_ids(cur)
+			if len(new) >= self.bulk_after:
+				done += self._bulk_add(new, chunk_size)
+		while limit is None or done < limit:
+			processed = self._refresh_chunk(chunk_size if limit is None else min(chunk_size, limit - done))
+			if not processed:
+				break
+			done += processed
+		return done
+
+	def _refresh_chunk(self, size: int) -> int:
+		conn = self.db.conn
+		# reading the descriptions and clearing their dirty marks in one write
+		# transaction: an update from another connection cannot slip in between
+		conn.execute("BEGIN IMMEDIATE")
+		try:
+			cur = conn.cursor()
+			cur.row_factory = None
+			dirty = [row[0] for row in cur.execute("SELECT quest_id FROM quest_minhash_dirty LIMIT ?", (size,))]
+			if dirty:
+				# quests without a signature are not indexed yet: they come in as new ones
+				rows = self._descriptions(cur, self._remove(cur, dirty))
+				cur.execute(f"DELETE FROM quest_minhash_dirty WHERE quest_id IN ({', '.join('?' * len(dirty))})",
+							dirty)
+				processed = len(dirty)
+			else:
+				rows = self._descriptions(cur, self._new_ids(cur, size))
+				processed = len(rows)
+				if not rows:
+					self._sweep = False
+			if rows:
+				self._add(cur, rows)
+			conn.commit()
+		except BaseException:
+			conn.rollback()
+			raise
+		return processed
+
+	def _new_ids(self, cur, limit: int = -1) -> List[int]:
+		"""Ids of quests without a signature, in id order (see `_sweep`)."""
+		sql = "SELECT id FROM quests AS q WHERE NOT EXISTS (SELECT 1 FROM quest_minhash AS m WHERE m.quest_id = q.id)"
+		if self._sweep:
+			# without an id range this walks the smaller title index, not the table
+			return sorted(row[0] for row in cur.execute(f"{sql} LIMIT ?", (limit,)))
+		high = cur.execute("SELECT IFNULL(MAX(quest_id), 0) FROM quest_minhash").fetchone()[0]
+		return [row[0] for row in cur.execute(f"{sql} AND id > ? ORDER BY id LIMIT ?", (high, limit))]
+
+	@staticmethod
+	def _descriptions(cur, quest_ids: List[int]) -> List[Tuple[int, Optional[str]]]:
+		if not quest_ids:
+			return []
+		return cur.execute(
+			f"SELECT id, description FROM quests WHERE id IN ({', '.join('?' * len(quest_ids))}) ORDER BY id",
+			quest_ids,
+		).fetchall()
+
+	def _bulk_add(self, new: List[int], chunk_size: int) -> int:
+		conn = self.db.conn
+		cur = conn.cursor()
+		cur.row_factory = None
+		cur.execute("CREATE TEMP TABLE quest_minhash_staging (quest_id INTEGER PRIMARY KEY, signature BLOB NOT NULL)")
+		cur.execute("CREATE TEMP TABLE quest_lsh_staging (bucket INTEGER NOT NULL, quest_id INTEGER NOT NULL)")
+		done = 0
+		try:
+			for start in range(0, len(new), chunk_size):
+				rows = self._descriptions(cur, new[start:start + chunk_size])
+				self._add(cur, rows, "quest_minhash_staging", "quest_lsh_staging")
+				conn.commit()
+				done += len(rows)
+			# buckets before signatures: if this dies midway, the quests are
+			# still new and get indexed again (over the buckets already there)
+			conn.execute("BEGIN IMMEDIATE")
+			cur.execute("INSERT OR IGNORE INTO quest_lsh SELECT * FROM quest_lsh_staging ORDER BY bucket, quest_id")
+			cur.execute("INSERT OR REPLACE INTO quest_minhash SELECT * FROM quest_minhash_staging")
+			conn.commit()
+		except BaseException:
+			conn.rollback()
+			raise
+		finally:
+			cur.execute("DROP TABLE temp.quest_minhash_staging")
+			cur.execute("DROP TABLE temp.quest_lsh_staging")
+		return done
+
+	@staticmethod
+	def _remove(cur, quest_ids: List[int]) -> List[int]:
+		"""Drop the signatures and buckets of these quests; returns the ids that had one."""
+		marks = ", ".join("?" * len(quest_ids))
+		rows = cur.execute(f"SELECT quest_id, signature FROM quest_minhash WHERE quest_id IN ({marks})",
+						   quest_ids).fetchall()
+		if not rows:
+			return []
+		stored = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.uint16).reshape(len(rows), NUM_PERM)
+		cur.executemany(
+			"DELETE FROM quest_lsh WHERE bucket = ? AND quest_id = ?",
+			((bucket, quest_id) for (quest_id, _), buckets in zip(rows, band_buckets(stored).tolist())
+			 for bucket in buckets),
+		)
+		cur.execute(f"DELETE FROM quest_minhash WHERE quest_id IN ({marks})", quest_ids)
+		return [row[0] for row in rows]
+
+	@staticmethod
+	def _add(cur, rows: List[Tuple[int, Optional[str]]], minhash_table: str = "quest_minhash",
+			 lsh_table: str = "quest_lsh") -> None:
+		computed = signatures([description for _, description in rows])
+		cur.executemany(f"INSERT OR REPLACE INTO {minhash_table} VALUES (?, ?)",
+						((quest_id, signature.tobytes()) for (quest_id, _), signature in zip(rows, computed)))
+		# descriptions without words get a signature (so they count as indexed)
+		# but no buckets; rows go in bucket order, walking the index once
+		cur.executemany(f"INSERT OR IGNORE INTO {lsh_table} VALUES (?, ?)", sorted(
+			(bucket, quest_id) for (quest_id, _), signature, buckets in zip(rows, computed, band_buckets(computed).tolist())
+			if not _is_empty(signature) for bucket in buckets
+		))
+
+	def apply_changes(self, changes: List["QuestChange"]) -> None:
+		"""Change feed subscriber: index what the writes changed."""
+		if any(change.op == "reset" for change in changes):
+			self._sweep = True
+		self.refresh(limit=self.changes_refresh_limit)
+
+	def pending(self) -> int:
+		"""Quests still to be (re-)indexed."""
+		return self.db.conn.execute(
+			"""
+			SELECT (SELECT COUNT(*) FROM quests AS q
+					WHERE NOT EXISTS (SELECT 1 FROM quest_minhash AS m WHERE m.quest_id = q.id))
+				 + (SELECT COUNT(*) FROM quest_minhash_dirty)
+			"""
+		).fetchone()[0]
+
+	def rebuild(self) -> int:
+		"""Drop every signature and index all quests again."""
+		with self.db.conn:
+			for table in ("quest_minhash", "quest_lsh", "quest_minhash_dirty"):
+				self.db.conn.execute(f"DELETE FROM {table}")
+		return self.refresh()
+
+	# --- lookups ---------------------------------------------------------------
+
+	def find_similar(self, quest_id: int, threshold: float = 0.8, limit: Optional[int] = None,
+					 exact: bool = False) -> List[SimilarQuest]:
+		"""Quests whose description is at least `threshold` similar to this quest's, most similar first.
+
+		The quest's current description is used, so it may be changed or
+		not indexed yet; the other quests are found as of the last refresh().
+		"""
+		row = self.db.conn.execute("SELECT description FROM quests WHERE id = ?", (quest_id,)).fetchone()
+		if row is None:
+			return []
+		return self.find_similar_text(row[0], threshold, limit, exact, exclude=quest_id)
+
+	def find_similar_text(self, text: Optional[str], threshold: float = 0.8, limit: Optional[int] = None,
+						  exact: bool = False, exclude: Optional[int] = None) -> List[SimilarQuest]:
+		"""Quests whose description is similar to `text` (e.g. a draft not saved yet)."""
+		signature = signatures([text])[0]
+		if _is_empty(signature):
+			return []
+		cur = self.db.conn.cursor()
+		cur.row_factory = None
+		rows = cur.execute(
+			f"""
+			SELECT quest_id, signature FROM quest_minhash
+			WHERE quest_id IN (SELECT quest_id FROM quest_lsh WHERE bucket IN ({", ".join("?" * BANDS)}))
+			""",
+			band_buckets(signature[None, :])[0].tolist(),
+		).fetchall()
+		rows = [row for row in rows if row[0] != exclude]
+		if not rows:
+			return []
+		stored = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.uint16).reshape(len(rows), NUM_PERM)
+		estimates = (stored == signature).mean(axis=1).tolist()
+		if not exact:
+			found = [SimilarQuest(row[0], round(estimate, 3))
+					 for row, estimate in zip(rows, estimates) if estimate >= threshold]
+		else:
+			query = shingles(text)
+			close = [row[0] for row, estimate in zip(rows, estimates) if estimate >= threshold - _ESTIMATE_MARGIN]
+			found = []
+			for first in range(0, len(close), 500):
+				chunk = close[first:first + 500]
+				cur.execute(f"SELECT id, description FROM quests WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+				for quest_id, description in cur.fetchall():
+					similarity = _jaccard(query, shingles(description))
+					if similarity >= threshold:
+						found.append(SimilarQuest(quest_id, round(similarity, 3)))
+		found.sort(key=lambda match: (-match.similarity, match.quest_id))
+		return found if limit is None else found[:limit]
+
+	def iter_similar_pairs(self, threshold: float = 0.8, exact: bool = False) -> Iterator[Tuple[int, int, float]]:
+		"""(lower id, higher id, similarity) of every indexed pair at or above `threshold`.
+
+		One bucket lookup per quest instead of comparing all pairs.
+		"""
+		cur = self.db.conn.cursor()
+		cur.row_factory = None
+		for quest_id, description in cur.execute("SELECT id, description FROM quests ORDER BY id"):
+			for match in self.find_similar_text(description, threshold, exact=exact, exclude=quest_id):
+				if match.quest_id > quest_id:
+					yield quest_id, match.quest_id, match.similarity
+
+
+def main(argv=None) -> int:
+	from core.database import Database
+
+	parser = argparse.ArgumentParser(description="Find quests with near-duplicate descriptions")
+	parser.add_argument("quest_id", nargs="?", type=int, help="quest to compare (default: list every similar pair)")
+	parser.add_argument("--db", default="adventures.db")
+	parser.add_argument("--threshold", type=float, default=0.8)
+	parser.add_argument("--limit", type=int, default=20)
+	parser.add_argument("--exact", action="store_true", help="report exact similarities instead of estimates")
+	parser.add_argument("--refresh", action="store_true", help="only bring the index up to date")
+	args = parser.parse_args(argv)
+
+	db = Database(args.db)
+	try:
+		index = SimilarityIndex(db)
+		start = time.perf_counter()
+		indexed = index.refresh()
+		if indexed:
+			print(f"indexed {indexed} quests in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+		if args.refresh:
+			return 0
+		if args.quest_id is not None:
+			matches = index.find_similar(args.quest_id, args.threshold, args.limit, args.exact)
+			titles = dict(db.get_quest_titles(match.quest_id for match in matches))
+			for match in matches:
+				print(f"{match.similarity:.2f}  #{match.quest_id} {titles.get(match.quest_id, '')}")
+		else:
+			for shown, (first, second, similarity) in enumerate(index.iter_similar_pairs(args.threshold, args.exact)):
+				if shown == args.limit:
+					break
+				print(f"{similarity:.2f}  #{first} ~ #{second}")
+	finally:
+		db.close()
+	return 0
+
+
+__all__ = ["BANDS", "NUM_PERM", "ROWS", "SHINGLE_WORDS", "SimilarQuest", "SimilarityIndex", "band_buckets",
+		   "jaccard", "shingles", "signatures"]
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import math
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+Rect = Tuple[float, float, float, float]  # x1, y1, x2, y2
+Cell = Tuple[int, int]
+
+
+class GridIndex:
+	"""Uniform-grid spatial hash of object IDs by bounding box.
+
+	Each object is registered in every cell its bounding box overlaps, so
+	insert/remove cost is proportional to the object's size in cells and
+	rectangle queries only touch the cells they cover. With objects spread
+	over the map that is O(1) expected per lookup, independent of the total
+	number of objects.
+	"""
+
+	def __init__(self, cell_size: float = 64.0):
+		if cell_size <= 0:
+			raise ValueError("cell_size must be positive")
+		self.cell_size = float(cell_size)
+		self._cells: Dict[Cell, Set[int]] = {}
+		self._bounds: Dict[int, Rect] = {}
+		# occupied cell range; only ever grows, which keeps it a safe bound
+		self._extent: Optional[Tuple[int, int, int, int]] = None
+
+	def __len__(self) -> int:
+		return len(self._bounds)
+
+	def __contains__(self, obj_id: int) -> bool:
+		return obj_id in self._bounds
+
+	def bounds(self, obj_id: int) -> Optional[Rect]:
+		return self._bounds.get(obj_id)
+
+	def insert(self, obj_id: int, bounds: Rect) -> None:
+		"""Register `obj_id` with bounding box (x1, y1, x2, y2); replaces any old entry."""
+		if obj_id in self._bounds:
+			self.remove(obj_id)
+		x1, y1, x2, y2 = bounds
+		if x1 > x2:
+			x1, x2 = x2, x1
+		if y1 > y2:
+			y1, y2 = y2, y1
+		self._bounds[obj_id] = (x1, y1, x2, y2)
+
+		# hot path when loading big maps: cell loop inlined on purpose
+		size = self.cell_size
+		cx1, cy1 = math.floor(x1 / size), math.floor(y1 / size)
+		cx2, cy2 = math.floor(x2 / size), math.floor(y2 / size)
+		extent = self._extent
+		if extent is None:
+			self._extent = (cx1, cy1, cx2, cy2)
+		elif cx1 < extent[0] or cy1 < extent[1] or cx2 > extent[2] or cy2 > extent[3]:
+			self._extent = (min(extent[0], cx1), min(extent[1], cy1),
+							max(extent[2], cx2), max(extent[3], cy2))
+
+		cells = self._cells
+		for cx in range(cx1, cx2 + 1):
+			for cy in range(cy1, cy2 + 1):
+				bucket = cells.get((cx, cy))
+				if bucket is None:
+					cells[(cx, cy)] = {obj_id}
+				else:
+					bucket.add(obj_id)
+
+	def remove(self, obj_id: int) -> bool:
+		bounds = self._bounds.pop(obj_id, None)
+		if bounds is None:
+			return False
+		for cell in self._cells_for(bounds):
+			bucket = self._cells.get(cell)
+			if bucket is not None:
+				bucket.discard(obj_id)
+				if not bucket:
+					del self._cells[cell]
+		return True
+
+	def clear(self) -> None:
+		self._cells.clear()
+		self._bounds.clear()
+		self._extent = None
+
+	def query_rect(self, bounds: Rect) -> List[int]:
+		"""IDs whose bounding boxes intersect `bounds`."""
+		qx1, qy1, qx2, qy2 = bounds
+		found: Set[int] = set()
+		for cell in self._cells_for(bounds):
+			bucket = self._cells.get(cell)
+			if bucket:
+				found.update(bucket)
+
+		result = []
+		for obj_id in found:
+			x1, y1, x2, y2 = self._bounds[obj_id]
+			if x1 <= qx2 and qx1 <= x2 and y1 <= qy2 and qy1 <= y2:
+				result.append(obj_id)
+		return result
+
+	def query_point(self, x: float, y: float, radius: float = 0.0) -> List[int]:
+		return self.query_rect((x - radius, y - radius, x + radius, y + radius))
+
+	def nearest(self, x: float, y: float, max_distance: float = math.inf,
+				predicate: Optional[Callable[[int], bool]] = None) -> Optional[int]:
+		"""ID whose bounding-box centre is closest to (x, y), or None.
+
+		Searches rings of cells outwards from the query cell and stops as soon
+		as no unvisited ring can hold anything closer than the best hit.
+		"""
+		if not self._bounds:
+			return None
+
+		cx, cy = self._cell_of(x, y)
+		max_ring = self._max_ring(cx, cy)
+		best_id: Optional[int] = None
+		best_dist = max_distance
+		seen: Set[int] = set()
+
+		for ring in range(max_ring + 1):
+			# anything in ring r is at least (r - 1) cells away from (x, y)
+			if best_id is not None and best_dist <= (ring - 1) * self.cell_size:
+				break
+			if (ring - 1) * self.cell_size > max_distance:
+				break
+			for cell in self._ring(cx, cy, ring):
+				bucket = self._cells.get(cell)
+				if not bucket:
+					continue
+				for obj_id in bucket:
+					if obj_id in seen:
+						continue
+					seen.add(obj_id)
+					if predicate is not None and not predicate(obj_id):
+						continue
+					x1, y1, x2, y2 = self._bounds[obj_id]
+					dist = math.hypot((x1 + x2) / 2 - x, (y1 + y2) / 2 - y)
+					if dist <= best_dist:
+						best_id, best_dist = obj_id, dist
+
+		return best_id
+
+	def _cell_of(self, x: float, y: float) -> Cell:
+		return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+	def _cells_for(self, bounds: Rect) -> Iterator[Cell]:
+		x1, y1, x2, y2 = bounds
+		cx1, cy1 = self._cell_of(x1, y1)
+		cx2, cy2 = self._cell_of(x2, y2)
+		for cx in range(cx1, cx2 + 1):
+			for cy in range(cy1, cy2 + 1):
+				yield cx, cy
+
+	def _max_ring(self, cx: int, cy: int) -> int:
+		"""Ring radius that covers every occupied cell as seen from (cx, cy)."""
+		ex1, ey1, ex2, ey2 = self._extent
+		return max(abs(cx - ex1), abs(cx - ex2), abs(cy - ey1), abs(cy - ey2))
+
+	@staticmethod
+	def _ring(cx: int, cy: int, ring: int) -> Iterator[Cell]:
+		if ring == 0:
+			yield cx, cy
+			return
+		for dx in range(-ring, ring + 1):
+			yield cx + dx, cy - ring
+			yield cx + dx, cy + ring
+		for dy in range(-ring + 1, ring):
+			yield cx - ring, cy + dy
+			yield cx + ring, cy + dy
+
+
+__all__ = ["GridIndex", "Rect"]
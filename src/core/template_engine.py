@@ -6,48 +6,63 @@ unit testing (for example `tests/test_boss_fight.py`) possible without
 installing all optional dependencies, we import the heavy modules lazily
 and fall back to placeholders if they're missing. BatchExporter only uses
 the Database API and does not require those heavy imports.
-"""
 
-try:
-    from jinja2 import Environment, FileSystemLoader
-except Exception:
-    Environment = None
-    FileSystemLoader = None
-
-try:
-    from weasyprint import HTML
-except Exception:
-    HTML = None
-
-try:
-    from docx import Document
-    from docx.shared import Pt, Inches
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-except Exception:
-    Document = None
-    Pt = None
-    Inches = None
-    WD_ALIGN_PARAGRAPH = None
-
-try:
-    import qrcode
-except Exception:
-    qrcode = None
+The imports happen on first use, not when this module is imported
+(WeasyPrint alone takes a few hundred milliseconds, which would otherwise
+be paid on every application start): `template_engine.HTML` and the other
+names in `_OPTIONAL` are resolved by the module `__getattr__` and are
+None when the library is missing.
+"""
 
 from io import BytesIO
 from datetime import datetime
 from typing import Dict, Any, Optional
+import importlib
 import os
 
+from core.metrics import timed
+from core.quest_generator import QuestGenerator
+
+# имя в модуле -> (модуль, атрибут); None - сам модуль
+_OPTIONAL = {
+    "Environment": ("jinja2", "Environment"),
+    "FileSystemLoader": ("jinja2", "FileSystemLoader"),
+    "HTML": ("weasyprint", "HTML"),
+    "Document": ("docx", "Document"),
+    "Pt": ("docx.shared", "Pt"),
+    "Inches": ("docx.shared", "Inches"),
+    "WD_ALIGN_PARAGRAPH": ("docx.enum.text", "WD_ALIGN_PARAGRAPH"),
+    "qrcode": ("qrcode", None),
+}
+
+
+def _optional(name: str):
+    """Ленивый импорт необязательной зависимости (None, если её нет)"""
+    module_name, attr = _OPTIONAL[name]
+    try:
+        module = importlib.import_module(module_name)
+        value = module if attr is None else getattr(module, attr)
+    except Exception:
+        value = None
+    globals()[name] = value
+    return value
+
+
+def __getattr__(name: str):
+    if name not in _OPTIONAL:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _optional(name)
+
 
 class TemplateEngine:
     """Движок шаблонизации документов"""
 
     def __init__(self, templates_dir: str = "templates"):
         """Инициализация Jinja2"""
-        self.env = Environment(loader=FileSystemLoader(templates_dir))
+        self.env = _optional("Environment")(loader=_optional("FileSystemLoader")(templates_dir))
         self.templates_dir = templates_dir
 
+    @timed("template.render")
     def render_template(self, template_name: str, quest_data: Dict[str, Any]) -> str:
         """Рендер HTML шаблона"""
         template = self.env.get_template(template_name)
@@ -61,11 +76,12 @@ class TemplateEngine:
 
         return template.render(**context)
 
+    @timed("template.qr_code")
     def _generate_qr_code(self, quest_id: int) -> str:
         """Генерация QR-кода с URL квеста"""
         url = f"https://quest-master.local/quest/{quest_id}"
 
-        qr = qrcode.QRCode(version=1, box_size=10, border=2)
+        qr = _optional("qrcode").QRCode(version=1, box_size=10, border=2)
         qr.add_data(url)
         qr.make(fit=True)
 
@@ -81,6 +97,7 @@ class TemplateEngine:
 
         return f"data:image/png;base64,{img_str}"
 
+    @timed("template.export_pdf")
     def export_to_pdf(self, template_name: str, quest_data: Dict[str, Any],
                       output_path: Optional[str] = None) -> str:
         """Экспорт в PDF через WeasyPrint"""
@@ -92,13 +109,15 @@ class TemplateEngine:
             quest_id = quest_data.get('id', 'unknown')
             output_path = f"parchments/quest_{quest_id}_{timestamp}.pdf"
 
-        HTML(string=html_content).write_pdf(output_path)
+        _optional("HTML")(string=html_content).write_pdf(output_path)
         return output_path
 
+    @timed("template.export_docx")
     def export_to_docx(self, quest_data: Dict[str, Any],
                        output_path: Optional[str] = None) -> str:
         """Экспорт в DOCX через python-docx"""
-        doc = Document()
+        doc = _optional("Document")()
+        WD_ALIGN_PARAGRAPH = _optional("WD_ALIGN_PARAGRAPH")
 
         # Заголовок
         title = doc.add_heading(f"Квест: {quest_data.get('title', 'Без названия')}", 0)
@@ -120,7 +139,7 @@ class TemplateEngine:
         seal.alignment = WD_ALIGN_PARAGRAPH.CENTER
         seal_run = seal.add_run("🏰 ПЕЧАТЬ ГИЛЬДИИ ПРИКЛЮЧЕНЦЕВ 🏰")
         seal_run.bold = True
-        seal_run.font.size = Pt(16)
+        seal_run.font.size = _optional("Pt")(16)
 
         # Дата создания
         date_para = doc.add_paragraph(f"\nДата создания: {datetime.now().strftime('%d.%m.%Y %H:%M')}")
@@ -148,15 +167,14 @@ class BatchExporter:
         import time
 
         start_time = time.time()
-
-        for i in range(100):
-            title = f"Тестовый квест #{i+1}"
-            difficulty = ["Легкий", "Средний", "Сложный", "Эпический"][i % 4]
-            reward = (i + 1) * 100
-            description = f"Описание тестового квеста номер {i+1}. " * 10  # 50+ слов
-            deadline = "2025-12-31 23:59:59"
-
-            db.create_quest(title, difficulty, reward, description, deadline)
-
+        BatchExporter.generate_quests(db, 100)
         elapsed = time.time() - start_time
-        return elapsed
\ No newline at end of file
+        return elapsed
+
+    @staticmethod
+    def generate_quests(db, count: int, seed: int = 0) -> int:
+        """
+        Процедурная генерация квестов потоком в БД (пачками по транзакции)
+        Returns: число добавленных квестов (совпавшие названия пропускаются)
+        """
+        return db.create_quests(QuestGenerator(seed).generate(count))
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""Seeded procedural terrain for map backgrounds.
+
+Heights are multi-octave value noise: each octave is a small random lattice
+upsampled with separable smoothstep interpolation, so the whole map is
+built from a handful of whole-array NumPy operations instead of per-pixel
+Python. The heightmap is hill-shaded and coloured through a
+parchment palette lookup table, rivers follow steepest descent on a coarse
+grid, and marker sites are picked by per-type terrain rules.
+
+The same seed always gives the same map. NumPy is required here; Pillow
+is only needed by `save_terrain`.
+"""
+
+from __future__ import annotations
+
+try:
+	import numpy as np
+except Exception:
+	np = None
+
+try:
+	from PIL import Image
+except Exception:
+	Image = None
+
+from array import array
+from typing import List, Tuple
+
+SEA_LEVEL = 0.38
+# (height, (r, g, b)) stops of the parchment palette
+PALETTE = [
+	(0.00, (118, 146, 160)),
+	(SEA_LEVEL - 0.001, (170, 190, 184)),
+	(SEA_LEVEL, (214, 198, 150)),
+	(0.50, (236, 222, 180)),
+	(0.65, (204, 196, 140)),
+	(0.78, (178, 150, 106)),
+	(0.90, (140, 110, 80)),
+	(1.00, (232, 226, 214)),
+]
+RIVER_COLOR = (92, 128, 150, 255)
+# coarse grid step for rivers and site search, in pixels
+COARSE_STEP = 16
+
+
+class Terrain:
+	def __init__(self, width: int, height: int, seed: int):
+		self.width = width
+		self.height = height
+		self.seed = seed
+		self.heights = None  # float32 (height, width), 0..1
+		self.image = None  # uint8 RGBX (height, width, 4)
+		# flat x0, y0, x1, y1, ... polylines, same layout as map strokes
+		self.rivers: List[array] = []
+		self.sites: List[Tuple[float, float, str]] = []
+
+
+def _require_numpy():
+	if np is None:
+		raise RuntimeError("NumPy is required for terrain generation")
+
+
+def _lattice_axis(size: int, cells: int, smooth: bool = True):
+	"""Lattice indices and interpolation weights for one axis."""
+	pos = np.linspace(0, cells, size, endpoint=False, dtype=np.float32)
+	index = pos.astype(np.int32)
+	t = pos - np.floor(pos)
+	if smooth:
+		t = t * t * (3 - 2 * t)
+	return index, t
+
+
+def _upsample(grid, width: int, height: int, smooth: bool = True):
+	"""Separable interpolation of a (cy + 1, cx + 1) grid to (height, width)."""
+	ix, wx = _lattice_axis(width, grid.shape[1] - 1, smooth)
+	iy, wy = _lattice_axis(height, grid.shape[0] - 1, smooth)
+	# along x on the small grid first, then along y
+	rows = grid[:, ix] * (1 - wx) + grid[:, ix + 1] * wx
+	out = rows[iy] * (1 - wy)[:, None]
+	out += rows[iy + 1] * wy[:, None]
+	return out
+
+
+def value_noise(width: int, height: int, seed: int, octaves: int = 6,
+				base_cells: int = 4, persistence: float = 0.5):
+	"""Fractal value noise normalised to 0..1, float32 of shape (height, width).
+
+	Octaves are summed at a working resolution of about 8 px per cell of the
+	finest octave and then upsampled once, which costs the same as a single
+	full-size octave however large the map is.
+	"""
+	_require_numpy()
+	rng = np.random.default_rng(seed)
+	longest = max(width, height)
+	work = min(1.0, (base_cells << (octaves - 1)) * 8 / longest)
+	work_w, work_h = max(2, round(width * work)), max(2, round(height * work))
+
+	total = np.zeros((work_h, work_w), dtype=np.float32)
+	amplitude = 1.0
+	for octave in range(octaves):
+		cells = base_cells << octave
+		cells_x = max(1, round(cells * width / longest))
+		cells_y = max(1, round(cells * height / longest))
+		lattice = rng.random((cells_y + 1, cells_x + 1), dtype=np.float32)
+		layer = _upsample(lattice, work_w, work_h)
+		layer *= amplitude
+		total += layer
+		amplitude *= persistence
+
+	total -= total.min()
+	total /= max(float(total.max()), 1e-6)
+	if (work_w, work_h) == (width, height):
+		return total
+	# pad one row/column so the last pixels interpolate towards the edge value
+	total = np.pad(total, ((0, 1), (0, 1)), mode="edge")
+	return _upsample(total, width, height, smooth=False)
+
+
+LIGHT_LEVELS = 64
+MAX_LIGHT = 0.35
+
+
+def _shade_lut():
+	"""(256 heights * LIGHT_LEVELS) table of palette colour times light, packed RGBX."""
+	stops = np.array([h for h, _ in PALETTE], dtype=np.float32)
+	colors = np.array([c for _, c in PALETTE], dtype=np.float32)
+	levels = np.linspace(0, 1, 256, dtype=np.float32)
+	base = np.stack([np.interp(levels, stops, colors[:, ch]) for ch in range(3)], axis=1)
+	light = 1 + np.linspace(-MAX_LIGHT, MAX_LIGHT, LIGHT_LEVELS, dtype=np.float32)
+	lut = base[:, None, :] * light[None, :, None]
+	lut[levels < SEA_LEVEL] = base[levels < SEA_LEVEL, None, :]  # water is flat
+	packed = np.full((256 * LIGHT_LEVELS, 4), 255, dtype=np.uint8)
+	packed[:, :3] = np.clip(lut, 0, 255).reshape(-1, 3)
+	return packed.view(np.uint32).ravel()
+
+
+def shade(heights, relief: float = 6.0):
+	"""Hill-shaded parchment colouring of a heightmap, uint8 RGBX (h, w, 4).
+
+	Height and slope are quantised and looked up in one precomputed colour
+	table, so the per-pixel work is a single 32-bit gather.
+	"""
+	_require_numpy()
+	# light from the north-west: brighten slopes facing it, darken the rest
+	slope = np.zeros_like(heights)
+	np.subtract(heights[:-1, :-1], heights[1:, 1:], out=slope[1:, 1:])
+	slope *= relief * heights.shape[0] / 256 * (LIGHT_LEVELS - 1) / (2 * MAX_LIGHT)
+	slope += (LIGHT_LEVELS - 1) / 2
+	np.clip(slope, 0, LIGHT_LEVELS - 1, out=slope)
+
+	index = (heights * 255).astype(np.uint16)
+	index *= LIGHT_LEVELS
+	index += slope.astype(np.uint16)
+	return _shade_lut()[index].view(np.uint8).reshape(heights.shape + (4,))
+
+
+def _blur(grid, passes: int = 2):
+	"""Cheap 3x3 box blur, used to keep rivers off the fine noise."""
+	for _ in range(passes):
+		padded = np.pad(grid, 1, mode="edge")
+		grid = sum(padded[dy:dy + grid.shape[0], dx:dx + grid.shape[1]]
+				   for dy in range(3) for dx in range(3)) / 9
+	return grid
+
+
+def trace_rivers(heights, count: int, rng, step: int = COARSE_STEP) -> List[array]:
+	"""Steepest-descent rivers from high sources to the sea or a lake in a pit."""
+	coarse = _blur(heights[step // 2::step, step // 2::step])
+	rows, cols = coarse.shape
+	candidates = np.argwhere((coarse > 0.55) & (coarse < 0.8))
+	if not len(candidates):
+		return []
+	starts = candidates[rng.choice(len(candidates), size=min(4 * count, len(candidates)), replace=False)]
+
+	grid = coarse.tolist()  # plain floats: the walk below is scalar Python
+	rivers = []
+	taken = set()
+	for r, c in starts:
+		if len(rivers) == count:
+			break
+		r, c = int(r), int(c)
+		path = [(r, c)]
+		while grid[r][c] >= SEA_LEVEL and (r, c) not in taken:
+			taken.add((r, c))
+			best = (r, c)
+			for nr in range(max(r - 1, 0), min(r + 2, rows)):
+				for nc in range(max(c - 1, 0), min(c + 2, cols)):
+					if grid[nr][nc] < grid[best[0]][best[1]]:
+						best = (nr, nc)
+			if best == (r, c):
+				break  # a pit: the river ends in a lake
+			r, c = best
+			path.append(best)
+		if len(path) >= 8:
+			flat = array("f")
+			for pr, pc in path:
+				flat.append(pc * step + step / 2)
+				flat.append(pr * step + step / 2)
+			rivers.append(flat)
+	return rivers
+
+
+def _paint_polyline(image, flat: array, color, radius: int = 4):
+	"""Stamp a polyline into the image with a round brush."""
+	height, width = image.shape[:2]
+	xs = np.asarray(flat[0::2], dtype=np.float32)
+	ys = np.asarray(flat[1::2], dtype=np.float32)
+	# one sample per pixel along every segment, all segments at once
+	lengths = np.maximum(np.abs(np.diff(xs)), np.abs(np.diff(ys))).astype(np.int32) + 1
+	t = np.arange(lengths.sum(), dtype=np.float32) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+	t /= np.repeat(lengths, lengths)
+	seg = np.repeat(np.arange(len(lengths)), lengths)
+	px = (xs[seg] + (xs[seg + 1] - xs[seg]) * t).astype(np.int32)
+	py = (ys[seg] + (ys[seg + 1] - ys[seg]) * t).astype(np.int32)
+
+	for dy in range(-radius, radius + 1):
+		for dx in range(-radius, radius + 1):
+			if dx * dx + dy * dy <= radius * radius:
+				image[np.clip(py + dy, 0, height - 1), np.clip(px + dx, 0, width - 1)] = color
+
+
+# marker type -> score over the coarse heightmap (higher is better, <= 0 never)
+def _site_scores(coarse, wet):
+	land = coarse >= SEA_LEVEL + 0.02
+	return {
+		"Город": np.where(land & (coarse < 0.55), 1.0 + wet - np.abs(coarse - 0.45), 0),
+		"Таверна": np.where(land & (coarse < 0.6), 1.0 + 0.5 * wet - np.abs(coarse - 0.5), 0),
+		"Лес": np.where((coarse > 0.55) & (coarse < 0.72), 1.0 - np.abs(coarse - 0.63), 0),
+		"Логово": np.where(coarse > 0.78, coarse, 0),
+		"Подземелье": np.where((coarse > 0.68) & (coarse < 0.85), 1.0 - np.abs(coarse - 0.75), 0),
+	}
+
+
+def suggest_sites(heights, rivers: List[array], rng, per_type: int = 3,
+				  step: int = COARSE_STEP) -> List[Tuple[float, float, str]]:
+	"""Marker suggestions per type, kept apart from each other."""
+	coarse = heights[step // 2::step, step // 2::step]
+	wet = np.zeros_like(coarse)
+	for flat in rivers:
+		for x, y in zip(flat[0::2], flat[1::2]):
+			r, c = int(y // step), int(x // step)
+			wet[max(r - 2, 0):r + 3, max(c - 2, 0):c + 3] = 0.5
+
+	min_gap = max(coarse.shape) / 8
+	chosen: List[Tuple[int, int]] = []
+	sites = []
+	for marker_type, score in _site_scores(coarse, wet).items():
+		# a little seeded jitter so equal scores do not always pick the same corner
+		score = score + rng.random(score.shape, dtype=np.float32) * 0.05 * (score > 0)
+		order = np.argsort(score, axis=None)[::-1]
+		picked = 0
+		for flat_index in order:
+			if picked == per_type:
+				break
+			r, c = divmod(int(flat_index), coarse.shape[1])
+			if score[r, c] <= 0:
+				break
+			if any((r - pr) ** 2 + (c - pc) ** 2 < min_gap ** 2 for pr, pc in chosen):
+				continue
+			chosen.append((r, c))
+			sites.append((c * step + step / 2, r * step + step / 2, marker_type))
+			picked += 1
+	return sites
+
+
+def generate_terrain(width: int = 4096, height: int = 4096, seed: int = 0,
+					 rivers: int = 6, sites_per_type: int = 3) -> Terrain:
+	_require_numpy()
+	terrain = Terrain(width, height, seed)
+	rng = np.random.default_rng(seed)
+	terrain.heights = value_noise(width, height, int(rng.integers(2 ** 63)))
+	terrain.image = shade(terrain.heights)
+	terrain.rivers = trace_rivers(terrain.heights, rivers, rng)
+	for flat in terrain.rivers:
+		_paint_polyline(terrain.image, flat, RIVER_COLOR)
+	terrain.sites = suggest_sites(terrain.heights, terrain.rivers, rng, sites_per_type)
+	return terrain
+
+
+def save_terrain(terrain: Terrain, path: str) -> str:
+	if Image is None:
+		raise RuntimeError("Pillow is required to save terrain images")
+	Image.fromarray(np.ascontiguousarray(terrain.image[..., :3]), "RGB").save(path, compress_level=1)
+	return path
+
+
+__all__ = ["Terrain", "value_noise", "shade", "trace_rivers", "suggest_sites",
+		   "generate_terrain", "save_terrain"]
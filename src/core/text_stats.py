@@ -0,0 +1,92 @@
+"""Text statistics for quest descriptions.
+
+`WordCounter` keeps the word count of a text that is edited in place
+(a description being typed). Each edit is applied from its position,
+the removed length and the inserted text: only the words that touch the
+edited region are recounted, so a keystroke costs the same in a 50-word
+and a 20,000-word description. A word is a run of non-whitespace, as
+with `str.split()`. The counter keeps its own copy of the text, because
+an edit report does not say what was removed.
+
+`analyze_text` computes the slower statistics (readability, repeated
+phrases, forbidden words) over the whole text; the editor runs it on a
+worker thread once typing pauses.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Iterable, List, NamedTuple, Tuple
+
+# placeholders and filler that should not end up in a published quest
+FORBIDDEN_WORDS = frozenset({"lorem", "ipsum", "todo", "fixme", "xxx", "бла"})
+
+_WORD = re.compile(r"[^\W\d_]+(?:[-'’][^\W\d_]+)*")
+_SENTENCE_END = re.compile(r"[.!?…]+")
+_VOWELS = frozenset("аеёиоуыэюяaeiouy")
+
+
+class WordCounter:
+	"""Word count of a text kept up to date edit by edit."""
+
+	def __init__(self, text: str = ""):
+		self.reset(text)
+
+	def reset(self, text: str) -> None:
+		self.text = text
+		self.words = len(text.split())
+
+	def apply(self, position: int, removed: int, inserted: str) -> int:
+		"""Replace `removed` characters at `position` with `inserted`; returns the new count."""
+		old = self.text
+		if position < 0 or position + removed > len(old):
+			raise ValueError(f"edit {position}+{removed} is outside a text of {len(old)} characters")
+		# widen the region to whitespace (or the ends): words outside it are untouched
+		start = position
+		while start > 0 and not old[start - 1].isspace():
+			start -= 1
+		end = position + removed
+		while end < len(old) and not old[end].isspace():
+			end += 1
+		before = len(old[start:end].split())
+		after = len((old[start:position] + inserted + old[position + removed:end]).split())
+		self.text = old[:position] + inserted + old[position + removed:]
+		self.words += after - before
+		return self.words
+
+
+class TextReport(NamedTuple):
+	words: int
+	sentences: int
+	# Flesch reading ease with Oborneva's coefficients for Russian, clamped
+	# to 0..100: higher is easier
+	readability: float
+	# (phrase, times) for word trigrams seen at least `min_repeats` times, most frequent first
+	repeated: List[Tuple[str, int]]
+	forbidden: List[str]
+
+
+def count_syllables(word: str) -> int:
+	return max(1, sum(1 for ch in word if ch in _VOWELS))
+
+
+def analyze_text(text: str, forbidden: Iterable[str] = FORBIDDEN_WORDS, min_repeats: int = 3,
+				 top: int = 5) -> TextReport:
+	"""Whole-text statistics for the description editor."""
+	tokens = _WORD.findall(text.lower())
+	sentences = max(1, len([part for part in _SENTENCE_END.split(text) if part.strip()]))
+	if tokens:
+		syllables = sum(count_syllables(word) for word in tokens)
+		readability = 206.835 - 1.3 * len(tokens) / sentences - 60.1 * syllables / len(tokens)
+	else:
+		readability = 0.0
+
+	trigrams = Counter(zip(tokens, tokens[1:], tokens[2:]))
+	repeated = [(" ".join(gram), times) for gram, times in trigrams.most_common(top) if times >= min_repeats]
+	banned = {word.lower() for word in forbidden}
+	found = sorted(banned.intersection(tokens))
+	return TextReport(len(text.split()), sentences, round(min(max(readability, 0.0), 100.0), 1), repeated, found)
+
+
+__all__ = ["FORBIDDEN_WORDS", "TextReport", "WordCounter", "analyze_text", "count_syllables"]
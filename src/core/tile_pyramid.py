@@ -0,0 +1,188 @@
+"""Multi-resolution tile pyramids for large background maps.
+
+A source image is cut once into `tile_size` square tiles at level 0 (full
+resolution), then halved repeatedly until it fits into a single tile. Tiles
+are cached on disk under `<cache_dir>/<key>/<level>/<col>_<row>.png`, where
+the key depends on the source path, size and mtime, so rebuilding happens
+only when the source changes. Viewers decode just the tiles that intersect
+the visible rect at the level matching the current zoom.
+
+Pillow is only needed to build a pyramid, not to read an existing one.
+"""
+
+from __future__ import annotations
+
+try:
+	from PIL import Image
+except Exception:
+	Image = None
+
+import hashlib
+import json
+import math
+import os
+import warnings
+from typing import Callable, Iterator, List, Optional, Tuple
+
+TILE_SIZE = 256
+META_FILE = "pyramid.json"
+# largest source accepted, checked against the declared size before decoding.
+# Scanned campaign maps are far above Pillow's decompression-bomb guard, which
+# is process-wide (Image.MAX_IMAGE_PIXELS) and so left alone.
+MAX_SOURCE_PIXELS = 1 << 30
+
+
+def _open_source(path: str) -> "Image.Image":
+	"""Image.open + load, limited by MAX_SOURCE_PIXELS instead of Pillow's guard."""
+	try:
+		with warnings.catch_warnings():
+			# up to twice MAX_IMAGE_PIXELS Pillow only warns; our own limit decides
+			warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+			image = Image.open(path)
+	except Image.DecompressionBombError:
+		# beyond that Image.open refuses outright, and a 16k x 16k scan is beyond it
+		image = _open_unguarded(path)
+	width, height = image.size
+	if width * height > MAX_SOURCE_PIXELS:
+		image.close()
+		raise ValueError(f"{path}: {width}x{height} pixels, more than {MAX_SOURCE_PIXELS}")
+	image.load()
+	return image
+
+
+def _open_unguarded(path: str) -> "Image.Image":
+	"""Open `path` with its format's image class, as Image.open does, minus the size guard.
+
+	Pillow has no public way to do this for one call. It relies on
+	Image.OPEN mapping a format to (image class, accept) and on the class
+	taking a file name, as in the Pillow pinned in requirements.txt;
+	tests/test_tile_pyramid.py checks both and fails on another version.
+	"""
+	fmt = Image.registered_extensions().get(os.path.splitext(path)[1].lower())
+	if fmt is None:
+		raise Image.UnidentifiedImageError(f"cannot identify image file {path!r}")
+	factory, _ = Image.OPEN[fmt]
+	return factory(path)
+
+
+class TilePyramid:
+	def __init__(self, root: str):
+		with open(os.path.join(root, META_FILE), "r", encoding="utf-8") as fh:
+			meta = json.load(fh)
+		self.root = root
+		self.source = meta["source"]
+		self.width: int = meta["width"]
+		self.height: int = meta["height"]
+		self.tile_size: int = meta["tile_size"]
+		# (width, height) of every level, level 0 first
+		self.levels: List[Tuple[int, int]] = [tuple(size) for size in meta["levels"]]
+
+	@staticmethod
+	def cache_root(source_path: str, cache_dir: str = "tiles") -> str:
+		source_path = os.path.abspath(source_path)
+		stat = os.stat(source_path)
+		key = hashlib.sha1(f"{source_path}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8")).hexdigest()[:16]
+		return os.path.join(cache_dir, key)
+
+	@classmethod
+	def cached(cls, source_path: str, cache_dir: str = "tiles") -> Optional["TilePyramid"]:
+		"""Return the already built pyramid for `source_path`, or None."""
+		if not os.path.exists(source_path):
+			return None
+		root = cls.cache_root(source_path, cache_dir)
+		if not os.path.exists(os.path.join(root, META_FILE)):
+			return None
+		return cls(root)
+
+	@classmethod
+	def build(cls, source_path: str, cache_dir: str = "tiles", tile_size: int = TILE_SIZE,
+			  progress: Optional[Callable[[int, int], None]] = None) -> "TilePyramid":
+		"""Cut `source_path` into a tile pyramid (or reuse the cached one).
+
+		`progress(done_levels, total_levels)` is called after each level.
+		"""
+		existing = cls.cached(source_path, cache_dir)
+		if existing is not None:
+			return existing
+		if Image is None:
+			raise RuntimeError("Pillow is required to build tile pyramids")
+
+		root = cls.cache_root(source_path, cache_dir)
+		os.makedirs(root, exist_ok=True)
+
+		image = _open_source(source_path)
+		if image.mode not in ("RGB", "RGBA"):
+			image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+		width, height = image.size
+		total = max(1, math.ceil(math.log2(max(width, height) / tile_size)) + 1)
+		levels = []
+		for level in range(total):
+			levels.append(image.size)
+			level_dir = os.path.join(root, str(level))
+			os.makedirs(level_dir, exist_ok=True)
+			cols = math.ceil(image.width / tile_size)
+			rows = math.ceil(image.height / tile_size)
+			for row in range(rows):
+				for col in range(cols):
+					box = (col * tile_size, row * tile_size,
+						   min((col + 1) * tile_size, image.width), min((row + 1) * tile_size, image.height))
+					image.crop(box).save(os.path.join(level_dir, f"{col}_{row}.png"), compress_level=1)
+			if progress is not None:
+				progress(level + 1, total)
+			if level + 1 < total:
+				image = image.reduce(2)
+
+		meta = {
+			"source": os.path.abspath(source_path),
+			"width": width,
+			"height": height,
+			"tile_size": tile_size,
+			"levels": levels,
+		}
+		# meta is written last, so a half-built pyramid is never picked up
+		with open(os.path.join(root, META_FILE), "w", encoding="utf-8") as fh:
+			json.dump(meta, fh)
+		return cls(root)
+
+	@property
+	def max_level(self) -> int:
+		return len(self.levels) - 1
+
+	def level_for_scale(self, scale: float) -> int:
+		"""Pick the coarsest level that still has >= 1 source pixel per screen pixel.
+
+		`scale` is screen pixels per level-0 pixel (1.0 = 100% zoom).
+		"""
+		if scale <= 0:
+			return self.max_level
+		level = math.floor(math.log2(1.0 / scale)) if scale < 1.0 else 0
+		return max(0, min(level, self.max_level))
+
+	def tile_path(self, level: int, col: int, row: int) -> str:
+		return os.path.join(self.root, str(level), f"{col}_{row}.png")
+
+	def tiles_in_rect(self, level: int, x1: float, y1: float, x2: float, y2: float
+					  ) -> Iterator[Tuple[int, int, Tuple[float, float, float, float]]]:
+		"""Yield (col, row, rect) for tiles of `level` that intersect a level-0 rect.
+
+		`rect` is the tile's extent as (x, y, w, h) in level-0 coordinates.
+		"""
+		level_w, level_h = self.levels[level]
+		factor_x = self.width / level_w
+		factor_y = self.height / level_h
+		span_x = self.tile_size * factor_x
+		span_y = self.tile_size * factor_y
+		cols = math.ceil(level_w / self.tile_size)
+		rows = math.ceil(level_h / self.tile_size)
+
+		col1, col2 = max(0, math.floor(x1 / span_x)), min(cols - 1, math.floor(x2 / span_x))
+		row1, row2 = max(0, math.floor(y1 / span_y)), min(rows - 1, math.floor(y2 / span_y))
+		for row in range(row1, row2 + 1):
+			for col in range(col1, col2 + 1):
+				tile_w = min(self.tile_size, level_w - col * self.tile_size)
+				tile_h = min(self.tile_size, level_h - row * self.tile_size)
+				yield col, row, (col * span_x, row * span_y, tile_w * factor_x, tile_h * factor_y)
+
+
+__all__ = ["TilePyramid", "TILE_SIZE"]
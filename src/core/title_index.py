@@ -0,0 +1,267 @@
+"""In-memory prefix index of quest titles.
+
+Autocomplete in the quest wizard and the duplicate warning need a title
+lookup on every keystroke, across up to millions of quests, without a
+database round trip. `TitleIndex` keeps the titles sorted by their
+casefolded form:
+
+- the bulk lives in one UTF-8 blob with an `array` of offsets and one of
+  quest ids, about 12 bytes per title on top of the text itself, instead of
+  a Python string object per title. A lookup is a `bisect` over the
+  blob, decoding the ~20 titles it compares.
+- changes since the last build go to a small sorted list, and the blob
+  entries they replace are hidden by quest id. Once that list grows past
+  `compact_after`, both are merged into a new blob - in place, or on
+  another thread with `start_compaction()`, as the GUI does, since a merge
+  of a million titles takes seconds.
+
+Quest ids make updates cheap: the change feed says which quests changed,
+`update()` gets their current titles (None for deleted ones) and never
+needs the old title. Matching is case-insensitive for autocomplete;
+`find()` is exact, like the UNIQUE constraint on quests.title.
+
+Command line, from the src directory:
+	python -m core.title_index --db adventures.db "Тень"
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import sys
+from array import array
+from bisect import bisect_left, insort
+from itertools import accumulate
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+	from core.database import Database
+
+_Entry = Tuple[str, str, int]  # (casefolded title, title, quest id)
+
+
+class _Blob:
+	"""Titles in key order: one UTF-8 blob, its offsets and the quest ids.
+
+	Never changed once built, so a compaction can read one on the database
+	thread while the GUI thread keeps using it, and the index switches to
+	the next one with a single assignment.
+	"""
+
+	__slots__ = ("blob", "offsets", "ids")
+
+	def __init__(self, encoded: List[bytes], ids: array):
+		self.blob = b"".join(encoded)
+		if len(self.blob) >= 1 << 32:
+			raise ValueError("titles do not fit 32-bit offsets")
+		self.offsets = array("I", [0])
+		self.offsets.extend(accumulate(map(len, encoded)))
+		self.ids = ids
+
+	def title(self, i: int) -> str:
+		return self.blob[self.offsets[i]:self.offsets[i + 1]].decode()
+
+	def entries_from(self, key: str, stale: Set[int]) -> Iterator[_Entry]:
+		"""Entries not in `stale`, from the first one whose key is >= key."""
+		ids = self.ids
+		for i in range(bisect_left(_Keys(self), key), len(ids)):
+			if ids[i] in stale:
+				continue
+			title = self.title(i)
+			yield title.casefold(), title, ids[i]
+
+
+class _Keys:
+	"""A blob seen as a sequence of casefolded titles, for bisect."""
+
+	def __init__(self, blob: _Blob):
+		self._blob = blob
+
+	def __len__(self) -> int:
+		return len(self._blob.ids)
+
+	def __getitem__(self, i: int) -> str:
+		return self._blob.title(i).casefold()
+
+
+def _sorted_titles(pairs: Iterable[Tuple[int, str]]) -> Tuple[List[bytes], array]:
+	"""Encoded titles in key order and their ids.
+
+	The decoded titles are local here, so they are freed on return, before
+	the caller joins the encoded ones into the blob.
+	"""
+	ids = array("q")
+	titles: List[str] = []
+	for quest_id, title in pairs:
+		ids.append(quest_id)
+		titles.append(title)
+	order = sorted(range(len(titles)), key=lambda i: titles[i].casefold())
+	return [titles[i].encode() for i in order], array("q", (ids[i] for i in order))
+
+
+def _merged(blob: _Blob, delta: List[_Entry], stale: Set[int]) -> _Blob:
+	encoded = []
+	ids = array("q")
+	for _, title, quest_id in heapq.merge(blob.entries_from("", stale), delta):
+		encoded.append(title.encode())
+		ids.append(quest_id)
+	return _Blob(encoded, ids)
+
+
+class TitleIndex:
+	def __init__(self, pairs: Iterable[Tuple[int, str]] = (), compact_after: int = 10_000):
+		self.compact_after = compact_after
+		self._build(pairs)
+
+	@classmethod
+	def from_database(cls, db: "Database", **kwargs) -> "TitleIndex":
+		return cls(db.iter_quest_titles(), **kwargs)
+
+	def _build(self, pairs: Iterable[Tuple[int, str]]) -> None:
+		self._set_blob(_Blob(*_sorted_titles(pairs)))
+
+	def _set_blob(self, blob: _Blob) -> None:
+		self._data = blob
+		# blob entries replaced by `_delta` (or deleted), by quest id
+		self._stale: Set[int] = set()
+		self._delta: List[_Entry] = []
+		self._delta_by_id: Dict[int, _Entry] = {}
+		# quests updated while a compaction runs elsewhere, None when none does
+		self._touched: Optional[Set[int]] = None
+
+	def _delta_from(self, key: str) -> Iterator[_Entry]:
+		delta = self._delta
+		for i in range(bisect_left(delta, (key,)), len(delta)):
+			yield delta[i]
+
+	def _entries_from(self, key: str) -> Iterator[_Entry]:
+		return heapq.merge(self._data.entries_from(key, self._stale), self._delta_from(key))
+
+	# --- lookups ---------------------------------------------------------------
+
+	def complete(self, prefix: str, limit: int = 10) -> List[str]:
+		"""Up to `limit` titles starting with `prefix` (any case), in order."""
+		key = prefix.casefold()
+		found = []
+		for entry_key, title, _ in self._entries_from(key):
+			if not entry_key.startswith(key) or len(found) >= limit:
+				break
+			found.append(title)
+		return found
+
+	def find(self, title: str) -> Optional[int]:
+		"""Id of the quest with exactly this title, None if there is none."""
+		key = title.casefold()
+		for entry_key, entry_title, quest_id in self._entries_from(key):
+			if entry_key != key:
+				return None
+			if entry_title == title:
+				return quest_id
+		return None
+
+	def __contains__(self, title: str) -> bool:
+		return self.find(title) is not None
+
+	def __len__(self) -> int:
+		# one pass over the blob ids: its stale entries are replaced in the delta or deleted
+		ids = self._data.ids
+		return len(ids) - len(self._stale.intersection(ids)) + len(self._delta)
+
+	# --- changes ---------------------------------------------------------------
+
+	def update(self, titles: Dict[int, Optional[str]], compact: bool = True) -> None:
+		"""Apply current titles by quest id; None removes the quest.
+
+		With `compact=False` the caller merges the changes itself once
+		`needs_compaction()` says so, see `start_compaction()`.
+		"""
+		for quest_id, title in titles.items():
+			old = self._delta_by_id.pop(quest_id, None)
+			if old is not None:
+				del self._delta[bisect_left(self._delta, old)]
+			self._stale.add(quest_id)
+			if title is not None:
+				entry = (title.casefold(), title, quest_id)
+				insort(self._delta, entry)
+				self._delta_by_id[quest_id] = entry
+		if self._touched is not None:
+			self._touched.update(titles)
+		if compact and self.needs_compaction():
+			self.compact()
+
+	def apply_changes(self, changes, db: "Database") -> None:
+		"""Merge a change feed batch, reading the touched titles from `db`."""
+		if any(change.op == "reset" for change in changes):
+			self._build(db.iter_quest_titles())
+			return
+		touched = {change.quest_id for change in changes}
+		titles: Dict[int, Optional[str]] = dict.fromkeys(touched)
+		titles.update(db.get_quest_titles(touched))
+		self.update(titles)
+
+	def needs_compaction(self) -> bool:
+		"""True if the pending changes are due to be merged and no merge is running."""
+		return self._touched is None and len(self._delta) + len(self._stale) > self.compact_after
+
+	def start_compaction(self) -> Callable[[], _Blob]:
+		"""Freeze the pending changes for a merge on another thread.
+
+		Returns a function that builds the merged blob; it reads nothing the
+		index changes afterwards, so it may run on any thread while lookups
+		and updates go on. Pass its result to `finish_compaction()`.
+		"""
+		blob, delta, stale = self._data, list(self._delta), set(self._stale)
+		self._touched = set()
+		return lambda: _merged(blob, delta, stale)
+
+	def finish_compaction(self, blob: Optional[_Blob]) -> None:
+		"""Switch to the blob built by `start_compaction()`; None drops the attempt.
+
+		Updates made since the start stay pending on top of the new blob.
+		"""
+		touched, self._touched = self._touched, None
+		if blob is None or touched is None:
+			return
+		delta = sorted(self._delta_by_id[quest_id] for quest_id in touched if quest_id in self._delta_by_id)
+		self._data = blob
+		self._stale = touched
+		self._delta = delta
+		self._delta_by_id = {entry[2]: entry for entry in delta}
+
+	def compact(self) -> None:
+		"""Merge the pending changes into a new blob."""
+		self.finish_compaction(self.start_compaction()())
+
+	def memory_bytes(self) -> int:
+		"""Approximate memory held by the index."""
+		delta = sum(sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1]) for entry in self._delta)
+		data = self._data
+		return (sys.getsizeof(data.blob) + sys.getsizeof(data.offsets) + sys.getsizeof(data.ids)
+				+ sys.getsizeof(self._delta) + sys.getsizeof(self._delta_by_id) + delta + sys.getsizeof(self._stale))
+
+
+def main(argv=None) -> int:
+	from core.database import Database
+
+	parser = argparse.ArgumentParser(description="Autocomplete quest titles from the title index")
+	parser.add_argument("prefix")
+	parser.add_argument("--db", default="adventures.db")
+	parser.add_argument("--limit", type=int, default=10)
+	args = parser.parse_args(argv)
+
+	db = Database(args.db)
+	try:
+		index = TitleIndex.from_database(db)
+	finally:
+		db.close()
+	for title in index.complete(args.prefix, args.limit):
+		print(title)
+	print(f"{len(index)} titles, {index.memory_bytes() / 2 ** 20:.1f} MiB", file=sys.stderr)
+	return 0
+
+
+__all__ = ["TitleIndex"]
+
+
+if __name__ == "__main__":
+	sys.exit(main())
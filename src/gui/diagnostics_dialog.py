@@ -0,0 +1,124 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QCheckBox,
+                             QTableWidget, QTableWidgetItem, QPlainTextEdit, QFileDialog,
+                             QHeaderView, QSplitter, QLabel)
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont
+
+from core.metrics import METRICS, MetricsRegistry
+
+
+class DiagnosticsDialog(QDialog):
+    """Диагностика: метрики операций и профили cProfile"""
+
+    COLUMNS = ["Метрика", "Вызовов", "Среднее, мс", "p50, мс", "p95, мс", "p99, мс", "Макс, мс", "Всего, мс"]
+
+    def __init__(self, registry: MetricsRegistry = METRICS, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.setWindowTitle("🩺 Диагностика")
+        self.resize(900, 600)
+        self.init_ui()
+        self.refresh()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        switches = QHBoxLayout()
+        self.enabled_check = QCheckBox("Сбор метрик")
+        self.enabled_check.setChecked(self.registry.enabled)
+        self.enabled_check.toggled.connect(self.on_enabled_toggled)
+        switches.addWidget(self.enabled_check)
+
+        self.profiling_check = QCheckBox("Профилирование cProfile (медленнее)")
+        self.profiling_check.setChecked(self.registry.profiling)
+        self.profiling_check.toggled.connect(self.on_profiling_toggled)
+        switches.addWidget(self.profiling_check)
+        switches.addStretch()
+
+        self.counters_label = QLabel()
+        switches.addWidget(self.counters_label)
+        layout.addLayout(switches)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSortingEnabled(True)
+        self.table.itemSelectionChanged.connect(self.show_profile)
+        splitter.addWidget(self.table)
+
+        self.profile_view = QPlainTextEdit()
+        self.profile_view.setReadOnly(True)
+        self.profile_view.setFont(QFont("Monospace", 9))
+        self.profile_view.setPlaceholderText("Выберите метрику, чтобы увидеть её профиль cProfile")
+        splitter.addWidget(self.profile_view)
+        layout.addWidget(splitter)
+
+        buttons = QHBoxLayout()
+        refresh_btn = QPushButton("🔄 Обновить")
+        refresh_btn.clicked.connect(self.refresh)
+        buttons.addWidget(refresh_btn)
+
+        reset_btn = QPushButton("🧹 Сбросить")
+        reset_btn.clicked.connect(self.reset)
+        buttons.addWidget(reset_btn)
+
+        save_btn = QPushButton("💾 Сохранить JSON")
+        save_btn.clicked.connect(self.save_json)
+        buttons.addWidget(save_btn)
+
+        buttons.addStretch()
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+        self.setLayout(layout)
+
+    def on_enabled_toggled(self, checked: bool):
+        self.registry.enabled = checked
+
+    def on_profiling_toggled(self, checked: bool):
+        self.registry.profiling = checked
+
+    def refresh(self):
+        snapshot = self.registry.snapshot()
+
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(0)
+        for name, summary in snapshot["histograms"].items():
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(name))
+            values = [summary["count"], summary["mean_ms"], summary["p50_ms"], summary["p95_ms"],
+                      summary["p99_ms"], summary["max_ms"], summary["total_ms"]]
+            for column, value in enumerate(values, start=1):
+                item = QTableWidgetItem()
+                # числа, а не строки: сортировка по столбцу должна быть числовой
+                item.setData(Qt.ItemDataRole.DisplayRole, value if column == 1 else round(value, 3))
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+
+        counters = ", ".join(f"{name}: {value}" for name, value in snapshot["counters"].items())
+        self.counters_label.setText(counters)
+
+    def show_profile(self):
+        items = self.table.selectedItems()
+        if not items:
+            return
+        name = self.table.item(items[0].row(), 0).text()
+        text = self.registry.profile_text(name)
+        self.profile_view.setPlainText(text or "Профиль не собран: включите профилирование")
+
+    def reset(self):
+        self.registry.reset()
+        self.profile_view.clear()
+        self.refresh()
+
+    def save_json(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Сохранить метрики", "metrics.json",
+                                                   "JSON (*.json)")
+        if file_path:
+            self.registry.dump_json(file_path)
@@ -2,14 +2,18 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QProgressBar, QListWidget, QListWidgetItem, QGroupBox)
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
+from typing import Optional
+import asyncio
 
 
 class GamificationPanel(QWidget):
     """Панель геймификации"""
 
-    def __init__(self, gamification, parent=None):
+    def __init__(self, gamification, db=None, parent=None):
         super().__init__(parent)
         self.gamification = gamification
+        # AsyncDatabase, в потоке которой работает движок (None - вызовы напрямую)
+        self.db = db
         self.init_ui()
 
     def init_ui(self):
@@ -33,6 +37,11 @@ class GamificationPanel(QWidget):
         self.level_label.setFont(level_font)
         layout.addWidget(self.level_label)
 
+        # Место в рейтинге гильдии (только для профилей в БД)
+        self.rank_label = QLabel()
+        self.rank_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.rank_label)
+
         # Прогресс-бар XP
         self.xp_progress = QProgressBar()
         self.xp_progress.setTextVisible(True)
@@ -108,10 +117,19 @@ class GamificationPanel(QWidget):
         total_xp = self.gamification.total_xp
         self.level_label.setText(f"🎖️ {current_level} (XP: {total_xp})")
 
+        # Обновление рейтинга (место считается в потоке БД)
+        if self.gamification.profile_id is None:
+            self.show_rank(None, 0)
+        elif self.db is None:
+            self.show_rank(self.gamification.get_rank(), self.gamification.db.get_profile_count())
+        elif not self.db.closed:
+            asyncio.ensure_future(self._load_rank())
+
         # Обновление прогресс-бара
+        # Шкала в процентах: XP уровня может не влезть в int32 QProgressBar
         progress, required, percent = self.gamification.get_progress_to_next_level()
-        self.xp_progress.setMaximum(required)
-        self.xp_progress.setValue(progress)
+        self.xp_progress.setMaximum(100)
+        self.xp_progress.setValue(percent)
         self.xp_progress.setFormat(f"{progress} / {required} XP ({percent}%)")
 
         # Обновление статистики
@@ -147,6 +165,18 @@ class GamificationPanel(QWidget):
             item.setForeground(Qt.GlobalColor.gray)
             self.achievements_list.addItem(item)
 
+    async def _load_rank(self):
+        rank, total = await self.db.run(lambda db: (self.gamification.get_rank(), db.get_profile_count()))
+        self.show_rank(rank, total)
+
+    def show_rank(self, rank: Optional[int], total: int):
+        """Место профиля в рейтинге (None - профиля нет, строка скрыта)"""
+        if rank is None:
+            self.rank_label.hide()
+        else:
+            self.rank_label.setText(f"🏅 Место в рейтинге: #{rank} из {total}")
+            self.rank_label.show()
+
     def show_xp_gain(self, xp: int, leveled_up: bool = False):
         """Показать получение XP (можно добавить анимацию)"""
         self.update_display()
\ No newline at end of file
@@ -0,0 +1,31 @@
+from typing import Callable, Optional
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout
+
+
+class LazyTab(QWidget):
+    """Вкладка, содержимое которой создаётся при первом показе"""
+
+    def __init__(self, factory: Callable[[], QWidget], parent=None):
+        super().__init__(parent)
+        self._factory = factory
+        self._widget: Optional[QWidget] = None
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+    @property
+    def is_built(self) -> bool:
+        return self._widget is not None
+
+    def widget(self) -> QWidget:
+        """Содержимое вкладки (создаётся при первом обращении)"""
+        if self._widget is None:
+            self._widget = self._factory()
+            self.layout().addWidget(self._widget)
+        return self._widget
+
+    def showEvent(self, event):
+        self.widget()
+        super().showEvent(event)
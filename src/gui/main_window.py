@@ -1,31 +1,164 @@
+import getpass
+from typing import Dict, List, Optional
+
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QTabWidget, QPushButton, QFileDialog, QMessageBox,
                              QListWidget, QListWidgetItem, QSplitter, QLabel,
                              QComboBox, QGroupBox)
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QAction
-from core.database import Database
+from qasync import asyncSlot, asyncWrap
+from core.async_database import AsyncDatabase
+from core.backup import BackupManager, BackupResult
+from core.database import Database, QuestChange, QuestSummary
+from core.deadlines import DeadlineEvent, DeadlineScheduler, wall_clock_ts
 from core.gamification import GamificationEngine
+from core.retention import RetentionJob
 from core.template_engine import TemplateEngine
+from core.title_index import TitleIndex
 from gui.quest_wizard import QuestWizard
-from gui.map_editor import MapEditor
 from gui.gamification_panel import GamificationPanel
+from gui.diagnostics_dialog import DiagnosticsDialog
+from gui.lazy_tab import LazyTab
+
+
+DIFFICULTY_ICONS = {
+    "Легкий": "🟢",
+    "Средний": "🟡",
+    "Сложный": "🔴",
+    "Эпический": "🟣"
+}
+
+
+def open_similarity_index(db: Database):
+    """Индекс похожих описаний, подписанный на записи этой БД; None без numpy.
+
+    Вызывается в потоке БД: там же импортируется numpy и потом
+    переиндексируются квесты после каждой записи.
+    """
+    from core import similarity
+    if similarity.np is None:
+        return None
+    index = similarity.SimilarityIndex(db)
+    db.subscribe(index.apply_changes)
+    return index
 
 
 class MainWindow(QMainWindow):
     """Главное окно приложения"""
 
+    # Изменения квестов из ленты БД; сигнал переносит их в GUI-поток
+    quests_changed = pyqtSignal(list)
+    # Результат резервного копирования из фонового потока
+    backup_finished = pyqtSignal(object)
+    # Список квестов (пере)загружен, в нём столько строк
+    quests_loaded = pyqtSignal(int)
+
+    # Как часто забирать изменения, сделанные другими процессами, мс
+    CHANGE_POLL_MS = 2000
+    # Пачку больше этой проще перечитать целиком, чем применять по одному
+    FULL_RELOAD_CHANGES = 500
+    # Резервная копия БД раз в столько секунд, хранится столько последних копий
+    BACKUP_INTERVAL_S = 6 * 3600
+    BACKUP_KEEP = 7
+    # Чистка истории версий квестов (политика по умолчанию), раз в сутки
+    RETENTION_INTERVAL_S = 24 * 3600
+    # Дольше таймер дедлайнов не заводится: часы могли перевести
+    DEADLINE_CHECK_MAX_MS = 60 * 60 * 1000
+    # Описание, похожее на чужое хотя бы настолько, - почти копия
+    SIMILARITY_THRESHOLD = 0.8
+    # Старые квесты индексируются пачками, между ними проходят запросы окна
+    SIMILARITY_BATCH = 500
+
     def __init__(self):
         super().__init__()
 
         # Инициализация компонентов
-        self.db = Database()
+        # Квесты, карты, профиль и дедлайны читаются и пишутся через await
+        # в отдельном потоке БД - единственном соединении окна
+        self.adb = AsyncDatabase()
+        # Профиль приключенца = пользователь ОС, общий файл БД для всей гильдии.
+        # Загружается в потоке БД при запуске, все вызовы движка идут туда же
         self.gamification = GamificationEngine()
-        self.template_engine = TemplateEngine()
+        # Jinja2-окружение создаётся при первом экспорте
+        self._template_engine: Optional[TemplateEngine] = None
+
+        # id квеста -> его строка в списке
+        self.quest_items: Dict[int, QListWidgetItem] = {}
+        # Квест карты; сам редактор карт создаётся при первом открытии вкладки
+        self.map_quest_id: Optional[int] = None
 
         self.init_ui()
         self.setup_menu()
+
+        # Список обновляется по ленте изменений, а не перечитыванием всех квестов.
+        # Лента - соединения, через которое пишет GUI; колбэк зовётся в потоке БД,
+        # сигнал доставляет изменения в GUI-поток
+        self.quests_changed.connect(self.apply_quest_changes)
+        self._unsubscribe_changes = None
+        self.change_poll_timer = QTimer(self)
+        self.change_poll_timer.timeout.connect(self.adb.poll_changes)
+
+        # Ближайшие дедлайны держит планировщик; таймер заводится до следующего
+        # (создаётся и работает в потоке БД)
+        self.deadline_scheduler: Optional[DeadlineScheduler] = None
+        self.quests_changed.connect(self.on_deadlines_changed)
+        self.deadline_timer = QTimer(self)
+        self.deadline_timer.setSingleShot(True)
+        self.deadline_timer.timeout.connect(self.check_deadlines)
+
+        # Индекс названий для подсказок и проверки дубликатов в мастере.
+        # Строится в потоке БД; изменения, пришедшие за это время, копятся
+        # в _title_changes (None - индекс не строится) и применяются после
+        self.title_index: Optional[TitleIndex] = None
+        self._title_changes: Optional[List[QuestChange]] = None
+        self.quests_changed.connect(self.on_titles_changed)
+
+        # Индекс похожих описаний (core.similarity) работает в потоке БД
+        self.similarity = None
+
+        # Онлайн-копии БД в фоновом потоке: автосохранения мастера не ждут их
+        self.backup_finished.connect(self.on_backup_finished)
+        self.backup_manager: Optional[BackupManager] = None
+        # История версий прореживается в фоне небольшими пачками
+        self.retention_job: Optional[RetentionJob] = None
+
+        # Список квестов и фоновые службы запускаются после первой отрисовки
+        self._startup_scheduled = False
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._startup_scheduled:
+            self._startup_scheduled = True
+            # таймер 0 срабатывает после уже поставленной в очередь отрисовки
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Всё, без чего окно можно показать: список квестов и фоновые службы"""
+        if self.adb.closed:
+            return
+        # подписка раньше чтения списка: ни одно изменение не теряется
+        self._unsubscribe_changes = self.adb.subscribe(self.quests_changed.emit)
+        self.change_poll_timer.start(self.CHANGE_POLL_MS)
+        self.load_profile()
         self.load_quests_list()
+        self.load_title_index()
+        self.start_similarity_index()
+        self.start_deadline_scheduler()
+
+        if self.adb.db_path != ":memory:":
+            self.backup_manager = BackupManager(self.adb.db_path, keep=self.BACKUP_KEEP,
+                                                interval_s=self.BACKUP_INTERVAL_S,
+                                                on_result=self.backup_finished.emit)
+            self.backup_manager.start()
+            self.retention_job = RetentionJob(self.adb.db_path)
+            self.retention_job.start(self.RETENTION_INTERVAL_S)
+
+    @property
+    def template_engine(self) -> TemplateEngine:
+        if self._template_engine is None:
+            self._template_engine = TemplateEngine()
+        return self._template_engine
 
     def init_ui(self):
         """Инициализация интерфейса"""
@@ -63,21 +196,21 @@ class MainWindow(QMainWindow):
         self.tabs = QTabWidget()
 
         # Вкладка 1: Quest Wizard
-        self.quest_wizard = QuestWizard(self.db, self.gamification)
+        self.quest_wizard = QuestWizard(self.adb, self.gamification)
         self.quest_wizard.quest_created.connect(self.on_quest_created)
         self.quest_wizard.quest_updated.connect(self.on_quest_updated)
+        self.quest_wizard.form_cleared.connect(self.on_form_cleared)
         self.tabs.addTab(self.quest_wizard, "📝 Создание квеста")
 
-        # Вкладка 2: Map Editor
-        self.map_editor = MapEditor(self.gamification)
-        self.tabs.addTab(self.map_editor, "🗺️ Редактор карт")
+        # Вкладки 2 и 3 создаются при первом открытии
+        self.map_tab = LazyTab(self.create_map_editor)
+        self.tabs.addTab(self.map_tab, "🗺️ Редактор карт")
 
-        # Вкладка 3: Экспорт
-        export_tab = self.create_export_tab()
-        self.tabs.addTab(export_tab, "📄 Экспорт документов")
+        self.export_tab = LazyTab(self.create_export_tab)
+        self.tabs.addTab(self.export_tab, "📄 Экспорт документов")
 
         # Правая панель - геймификация
-        self.gamification_panel = GamificationPanel(self.gamification)
+        self.gamification_panel = GamificationPanel(self.gamification, self.adb)
         self.gamification_panel.setMaximumWidth(350)
 
         # Сборка layout
@@ -105,6 +238,10 @@ class MainWindow(QMainWindow):
         new_action.triggered.connect(lambda: self.tabs.setCurrentIndex(0))
         file_menu.addAction(new_action)
 
+        backup_action = QAction("&Резервная копия", self)
+        backup_action.triggered.connect(self.backup_now)
+        file_menu.addAction(backup_action)
+
         file_menu.addSeparator()
 
         exit_action = QAction("&Выход", self)
@@ -115,10 +252,30 @@ class MainWindow(QMainWindow):
         # Меню "Помощь"
         help_menu = menubar.addMenu("&Помощь")
 
+        diagnostics_action = QAction("&Диагностика", self)
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        help_menu.addAction(diagnostics_action)
+
         about_action = QAction("&О программе", self)
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
 
+    def create_map_editor(self) -> QWidget:
+        """Создание редактора карт"""
+        # numpy и сцена редактора нужны только здесь
+        from gui.map_editor import MapEditor
+
+        editor = MapEditor(self.gamification, self.adb)
+        if self.map_quest_id is not None:
+            editor.set_quest_id(self.map_quest_id)
+        return editor
+
+    def set_map_quest(self, quest_id: Optional[int], keep_current: bool = False):
+        """Привязка карты к квесту (и редактора, если он уже создан); None - отвязка"""
+        self.map_quest_id = quest_id
+        if self.map_tab.is_built:
+            self.map_tab.widget().set_quest_id(quest_id, keep_current)
+
     def create_export_tab(self) -> QWidget:
         """Создание вкладки экспорта"""
         export_widget = QWidget()
@@ -183,78 +340,232 @@ class MainWindow(QMainWindow):
         export_widget.setLayout(layout)
         return export_widget
 
-    def load_quests_list(self):
+    @staticmethod
+    def quest_item_text(quest: QuestSummary) -> str:
+        difficulty_icon = DIFFICULTY_ICONS.get(quest.difficulty, "⚪")
+        return f"{difficulty_icon} {quest.title} ({quest.reward} 💰)"
+
+    @asyncSlot()
+    async def load_quests_list(self):
         """Загрузка списка квестов"""
+        # Только id/название/сложность/награда; описание грузится при открытии квеста
+        quests = await self.adb.get_quest_summaries()
         self.quests_list.clear()
-        quests = self.db.get_all_quests()
+        self.quest_items.clear()
 
         for quest in quests:
-            difficulty_icon = {
-                "Легкий": "🟢",
-                "Средний": "🟡",
-                "Сложный": "🔴",
-                "Эпический": "🟣"
-            }.get(quest['difficulty'], "⚪")
-
-            item_text = f"{difficulty_icon} {quest['title']} ({quest['reward']} 💰)"
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.ItemDataRole.UserRole, quest['id'])
+            item = QListWidgetItem(self.quest_item_text(quest))
+            item.setData(Qt.ItemDataRole.UserRole, quest.id)
             self.quests_list.addItem(item)
+            self.quest_items[quest.id] = item
+        self.quests_loaded.emit(len(quests))
+
+    @asyncSlot(list)
+    async def apply_quest_changes(self, changes: List[QuestChange]):
+        """Применение изменений из ленты БД только к затронутым строкам"""
+        if len(changes) > self.FULL_RELOAD_CHANGES or any(c.op == "reset" for c in changes):
+            await self.load_quests_list()
+            return
+
+        # важно только последнее состояние квеста, промежуточные правки пропускаем
+        touched = list(dict.fromkeys(change.quest_id for change in changes))
+        # все строки одним заходом в поток БД
+        quests = await self.adb.run(lambda db: [db.get_quest_summary(quest_id) for quest_id in touched])
+        for quest_id, quest in zip(touched, quests):
+            item = self.quest_items.get(quest_id)
+            if quest is None:
+                if item is not None:
+                    self.quests_list.takeItem(self.quests_list.row(item))
+                    del self.quest_items[quest_id]
+            elif item is not None:
+                item.setText(self.quest_item_text(quest))
+            else:
+                # список отсортирован от новых к старым
+                item = QListWidgetItem(self.quest_item_text(quest))
+                item.setData(Qt.ItemDataRole.UserRole, quest_id)
+                self.quests_list.insertItem(0, item)
+                self.quest_items[quest_id] = item
+
+    @asyncSlot()
+    async def load_title_index(self):
+        """(Пере)построение индекса названий в потоке БД"""
+        self._title_changes = []
+        index = await self.adb.run(TitleIndex.from_database)
+        self.title_index = index
+        self.quest_wizard.set_title_index(index)
+        changes, self._title_changes = self._title_changes, None
+        if changes:
+            await self.update_title_index(changes)
+
+    @asyncSlot(list)
+    async def on_titles_changed(self, changes: List[QuestChange]):
+        """Изменения квестов в индекс названий"""
+        if self._title_changes is not None:
+            self._title_changes.extend(changes)
+        elif self.title_index is not None:
+            await self.update_title_index(changes)
+
+    async def update_title_index(self, changes: List[QuestChange]):
+        if any(change.op == "reset" for change in changes):
+            await self.load_title_index()
+            return
+        touched = {change.quest_id for change in changes}
+        # удалённых квестов в ответе нет - для них None
+        titles: Dict[int, Optional[str]] = dict.fromkeys(touched)
+        titles.update(await self.adb.get_quest_titles(touched))
+        index = self.title_index
+        index.update(titles, compact=False)
+        self.quest_wizard.check_title()
+        if index.needs_compaction():
+            # слияние миллиона названий - секунды: строим в потоке БД, подменяем здесь
+            build = index.start_compaction()
+            blob = None
+            try:
+                blob = await self.adb.run(lambda db: build())
+            finally:
+                index.finish_compaction(blob)
+
+    @asyncSlot()
+    async def start_similarity_index(self):
+        """Индекс похожих описаний: новые записи он подхватывает сам, старые квесты - пачками"""
+        self.similarity = index = await self.adb.run(open_similarity_index)
+        if index is None:
+            return
+        # первый запуск или импорт: догоняем, не занимая поток БД надолго
+        while not self.adb.closed and await self.adb.run(lambda db: index.refresh(limit=self.SIMILARITY_BATCH)):
+            pass
+
+    @asyncSlot(int)
+    async def report_similar_quests(self, quest_id: int):
+        """Предупреждение в строке состояния, если описание почти повторяет другие квесты"""
+        index = self.similarity
+        if index is None or self.adb.closed:
+            return
+        matches = await self.adb.run(lambda db: index.find_similar(quest_id, self.SIMILARITY_THRESHOLD, limit=3))
+        if not matches:
+            return
+        titles = dict(await self.adb.get_quest_titles([match.quest_id for match in matches]))
+        similar = ", ".join(f"«{titles.get(match.quest_id, match.quest_id)}» ({match.similarity:.0%})"
+                            for match in matches)
+        self.statusBar().showMessage(f"⚠️ Описание квеста #{quest_id} похоже на: {similar}", 10000)
+
+    @asyncSlot()
+    async def load_profile(self):
+        """Профиль приключенца читается в потоке БД, затем панель перерисовывается"""
+        await self.adb.run(self.gamification.load_profile, getpass.getuser())
+        self.gamification_panel.update_display()
+
+    @asyncSlot()
+    async def start_deadline_scheduler(self):
+        """Планировщик дедлайнов строится в потоке БД и заводит таймер"""
+        scheduler = await self.adb.run(DeadlineScheduler)
+        if self.adb.closed:
+            return
+        self.deadline_scheduler = scheduler
+        self.arm_deadline_timer(await self.adb.run(lambda db: scheduler.next_due()))
+
+    @asyncSlot(list)
+    async def on_deadlines_changed(self, changes: List[QuestChange]):
+        """Изменения квестов могли сдвинуть ближайший дедлайн"""
+        scheduler = self.deadline_scheduler
+        if scheduler is None or self.adb.closed:
+            return
+
+        def apply(db):
+            scheduler.apply_changes(changes)
+            return scheduler.next_due()
+        self.arm_deadline_timer(await self.adb.run(apply))
+
+    def arm_deadline_timer(self, next_ts: Optional[int]):
+        """Завести таймер до ближайшего дедлайна (next_ts - его время, None - дедлайнов нет)"""
+        if next_ts is None:
+            self.deadline_timer.stop()
+            return
+        delay_ms = max(next_ts - wall_clock_ts(), 0) * 1000
+        self.deadline_timer.start(min(delay_ms, self.DEADLINE_CHECK_MAX_MS))
+
+    @asyncSlot()
+    async def check_deadlines(self):
+        """Сообщить о наступивших дедлайнах"""
+        scheduler = self.deadline_scheduler
+        if scheduler is None or self.adb.closed:
+            return
+        events: List[DeadlineEvent]
+        events, next_ts = await self.adb.run(lambda db: (scheduler.due(), scheduler.next_due()))
+        if len(events) == 1:
+            self.statusBar().showMessage(f"⏰ Дедлайн квеста «{events[0].title}» наступил!")
+        elif events:
+            titles = ", ".join(f"«{event.title}»" for event in events[:3])
+            more = f" и ещё {len(events) - 3}" if len(events) > 3 else ""
+            self.statusBar().showMessage(f"⏰ Дедлайны наступили: {titles}{more}")
+        self.arm_deadline_timer(next_ts)
 
     def on_quest_selected(self, item: QListWidgetItem):
         """Обработка выбора квеста из списка"""
         quest_id = item.data(Qt.ItemDataRole.UserRole)
         self.quest_wizard.load_quest(quest_id)
-        self.map_editor.set_quest_id(quest_id)
+        self.set_map_quest(quest_id)
         self.tabs.setCurrentIndex(0)
 
     def on_quest_created(self, quest_id: int):
         """Обработка создания квеста"""
-        self.load_quests_list()
         self.gamification_panel.update_display()
-        self.map_editor.set_quest_id(quest_id)
+        # Карта, нарисованная до создания квеста, привязывается к нему
+        self.set_map_quest(quest_id, keep_current=True)
         self.statusBar().showMessage(f"✅ Квест #{quest_id} создан!", 3000)
+        self.report_similar_quests(quest_id)
+
+    def on_form_cleared(self):
+        """Мастер очищен: карта прежнего квеста сохраняется и убирается с холста"""
+        self.set_map_quest(None)
 
     def on_quest_updated(self, quest_id: int):
         """Обработка обновления квеста"""
-        self.load_quests_list()
         self.statusBar().showMessage(f"✅ Квест #{quest_id} обновлен!", 3000)
+        self.report_similar_quests(quest_id)
 
-    def delete_selected_quest(self):
+    @asyncSlot()
+    async def delete_selected_quest(self):
         """Удаление выбранного квеста"""
         current_item = self.quests_list.currentItem()
 
+        # Модальные окна - из цикла Qt: вложенный цикл внутри корутины
+        # не дал бы выполняться другим задачам asyncio
         if not current_item:
-            QMessageBox.warning(self, "Предупреждение", "Выберите квест для удаления")
+            await asyncWrap(QMessageBox.warning, self, "Предупреждение", "Выберите квест для удаления")
             return
 
         quest_id = current_item.data(Qt.ItemDataRole.UserRole)
-        quest = self.db.get_quest(quest_id)
+        quest = await self.adb.get_quest(quest_id)
+        if quest is None:
+            # уже удалён другим окном; строка уйдёт по ленте изменений
+            return
 
-        reply = QMessageBox.question(
+        reply = await asyncWrap(
+            QMessageBox.question,
             self, "Подтверждение",
             f"Удалить квест '{quest['title']}'?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            if self.db.delete_quest(quest_id):
-                self.load_quests_list()
+            if await self.adb.delete_quest(quest_id):
                 self.quest_wizard.clear_form()
-                QMessageBox.information(self, "Успех", "Квест удален")
+                await asyncWrap(QMessageBox.information, self, "Успех", "Квест удален")
             else:
-                QMessageBox.critical(self, "Ошибка", "Не удалось удалить квест")
+                await asyncWrap(QMessageBox.critical, self, "Ошибка", "Не удалось удалить квест")
 
-    def export_to_pdf(self):
+    @asyncSlot()
+    async def export_to_pdf(self):
         """Экспорт текущего квеста в PDF"""
         quest_id = self.quest_wizard.current_quest_id
 
         if not quest_id:
-            QMessageBox.warning(self, "Предупреждение",
-                              "Сначала создайте или выберите квест")
+            await asyncWrap(QMessageBox.warning, self, "Предупреждение",
+                            "Сначала создайте или выберите квест")
             return
 
-        quest = self.db.get_quest(quest_id)
+        quest = await self.adb.get_quest(quest_id)
         template_text = self.template_combo.currentText()
         template_name = template_text.split(" - ")[0]
 
@@ -262,44 +573,47 @@ class MainWindow(QMainWindow):
             output_path = self.template_engine.export_to_pdf(template_name, quest)
 
             # Геймификация
-            xp, leveled_up = self.gamification.add_xp("export_pdf")
-            self.gamification.update_stats("pdfs_exported")
+            xp, leveled_up = await self.adb.run(lambda db: self.gamification.reward("export_pdf", "pdfs_exported"))
             self.gamification_panel.update_display()
 
             msg = f"✅ PDF сохранен в {output_path}\n+{xp} XP"
             if leveled_up:
                 msg += f"\n🎉 Новый уровень: {self.gamification.get_current_level()}!"
 
-            QMessageBox.information(self, "Успех", msg)
+            await asyncWrap(QMessageBox.information, self, "Успех", msg)
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка экспорта: {str(e)}")
+            await asyncWrap(QMessageBox.critical, self, "Ошибка", f"Ошибка экспорта: {str(e)}")
 
-    def export_to_docx(self):
+    @asyncSlot()
+    async def export_to_docx(self):
         """Экспорт текущего квеста в DOCX"""
         quest_id = self.quest_wizard.current_quest_id
 
         if not quest_id:
-            QMessageBox.warning(self, "Предупреждение",
-                              "Сначала создайте или выберите квест")
+            await asyncWrap(QMessageBox.warning, self, "Предупреждение",
+                            "Сначала создайте или выберите квест")
             return
 
-        quest = self.db.get_quest(quest_id)
+        quest = await self.adb.get_quest(quest_id)
 
         try:
             output_path = self.template_engine.export_to_docx(quest)
 
             # Геймификация
-            xp, leveled_up = self.gamification.add_xp("export_docx")
-            self.gamification.update_stats("docx_exported")
+            xp, leveled_up = await self.adb.run(lambda db: self.gamification.reward("export_docx", "docx_exported"))
             self.gamification_panel.update_display()
 
             msg = f"✅ DOCX сохранен в {output_path}\n+{xp} XP"
             if leveled_up:
                 msg += f"\n🎉 Новый уровень: {self.gamification.get_current_level()}!"
 
-            QMessageBox.information(self, "Успех", msg)
+            await asyncWrap(QMessageBox.information, self, "Успех", msg)
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка экспорта: {str(e)}")
+            await asyncWrap(QMessageBox.critical, self, "Ошибка", f"Ошибка экспорта: {str(e)}")
+
+    def show_diagnostics(self):
+        """Окно метрик и профилей операций"""
+        DiagnosticsDialog(parent=self).exec()
 
     def show_about(self):
         """Показать окно "О программе" """
@@ -313,7 +627,34 @@ class MainWindow(QMainWindow):
         """
         QMessageBox.about(self, "О программе", about_text)
 
+    def backup_now(self):
+        """Внеочередная резервная копия (делается в фоне)"""
+        if self.backup_manager is None:
+            return
+        self.statusBar().showMessage("💾 Создаётся резервная копия...")
+        self.backup_manager.trigger()
+
+    def on_backup_finished(self, result: BackupResult):
+        """Сообщить о результате резервного копирования"""
+        if result.ok:
+            self.statusBar().showMessage(f"💾 Резервная копия сохранена: {result.path}", 5000)
+        else:
+            self.statusBar().showMessage(f"❌ Резервная копия не удалась: {result.error}", 10000)
+
     def closeEvent(self, event):
         """Обработка закрытия окна"""
-        self.db.close()
+        self.quest_wizard.flush_autosave()
+        if self.map_tab.is_built:
+            self.map_tab.widget().save_if_modified()
+            self.map_tab.widget().stop_background_work()
+        self.change_poll_timer.stop()
+        self.deadline_timer.stop()
+        if self._unsubscribe_changes is not None:
+            self._unsubscribe_changes()
+        # дожидается уже отправленных записей (автосохранения, карта)
+        self.adb.close()
+        if self.retention_job is not None:
+            self.retention_job.stop()
+        if self.backup_manager is not None:
+            self.backup_manager.stop()
         event.accept()
\ No newline at end of file
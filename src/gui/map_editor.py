@@ -1,11 +1,71 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QGraphicsView, QGraphicsScene, QGraphicsEllipseItem,
-                             QGraphicsTextItem, QFileDialog, QMessageBox, QLabel,
+                             QGraphicsTextItem, QGraphicsPathItem, QGraphicsItem, QFileDialog, QMessageBox, QLabel,
                              QButtonGroup, QRadioButton, QInputDialog, QColorDialog)
 from PyQt6.QtCore import Qt, QPointF, QRectF
-from PyQt6.QtGui import QPen, QBrush, QColor, QFont, QPainter, QPixmap, QImage
-from typing import Optional, List, Dict
+from PyQt6.QtGui import QPen, QBrush, QColor, QFont, QPainter, QPainterPath, QPolygonF
+from qasync import asyncSlot, asyncWrap
+from array import array
+from typing import Optional, List, Dict, Tuple
+import asyncio
 import os
+import random
+
+from core.geometry import simplify_polyline, distance_to_polyline
+from core.map_format import MapData, encode_map, decode_map
+from core.spatial_index import GridIndex
+from core.tile_pyramid import TilePyramid
+from gui.tiled_background import TiledBackgroundItem, PyramidBuildThread, TerrainBuildThread
+from gui.map_export import MapExportThread
+from gui.polygons import polygon_from_flat
+
+
+class StrokeLayer(QGraphicsItem):
+    """Один элемент сцены, рисующий все штрихи кисти
+
+    Штрих хранится как плоский массив координат x0, y0, x1, y1, ...
+    При отрисовке через пространственный индекс берутся только штрихи из
+    exposedRect; QPolygonF строятся лениво и кэшируются. Десятки тысяч
+    штрихов не превращаются в десятки тысяч QGraphicsItem.
+    """
+
+    def __init__(self, strokes: Dict[int, array], index: GridIndex, pen: QPen):
+        super().__init__()
+        self.strokes = strokes
+        self.index = index
+        self.pen = pen
+        self._polygons: Dict[int, QPolygonF] = {}
+        self._rect = QRectF()
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+    def boundingRect(self) -> QRectF:
+        return self._rect
+
+    def stroke_added(self, bounds: Tuple[float, float, float, float]):
+        rect = QRectF(QPointF(bounds[0], bounds[1]), QPointF(bounds[2], bounds[3]))
+        if not self._rect.contains(rect):
+            self.prepareGeometryChange()
+            self._rect = self._rect.united(rect)
+        self.update(rect)
+
+    def stroke_removed(self, obj_id: int, bounds: Tuple[float, float, float, float]):
+        self._polygons.pop(obj_id, None)
+        self.update(QRectF(QPointF(bounds[0], bounds[1]), QPointF(bounds[2], bounds[3])))
+
+    def paint(self, painter, option, widget=None):
+        exposed = option.exposedRect
+        ids = self.index.query_rect((exposed.left(), exposed.top(),
+                                     exposed.right(), exposed.bottom()))
+        painter.setPen(self.pen)
+        polygons = self._polygons
+        for obj_id in sorted(ids):
+            flat = self.strokes.get(obj_id)
+            if flat is None:
+                continue
+            polygon = polygons.get(obj_id)
+            if polygon is None:
+                polygon = polygons[obj_id] = polygon_from_flat(flat)
+            painter.drawPolyline(polygon)
 
 
 class MapEditor(QWidget):
@@ -19,16 +79,58 @@ class MapEditor(QWidget):
         "Подземелье": QColor(139, 69, 19), # Коричневый
     }
 
-    def __init__(self, gamification, parent=None):
+    PATH_COLOR = QColor(139, 69, 19)
+    PATH_WIDTH = 3
+    # Допуск упрощения штриха (Рамер–Дуглас–Пекер), в пикселях сцены
+    STROKE_TOLERANCE = 1.0
+    MARKER_RADIUS = 15
+    ERASER_RADIUS = 5
+    ZOOM_STEP = 1.25
+    MIN_ZOOM = 1 / 64
+    MAX_ZOOM = 8.0
+    EXPORT_DPI = 300
+    TERRAIN_SIZE = 4096
+
+    # Ключи QGraphicsItem.data()
+    DATA_OBJECT_ID = 1
+    DATA_MARKER_TYPE = 2
+
+    def __init__(self, gamification, db=None, parent=None):
         super().__init__(parent)
         self.gamification = gamification
+        # AsyncDatabase (или None - редактор без привязки к квестам)
+        self.db = db
         self.current_quest_id: Optional[int] = None
+        self.background_path: Optional[str] = None
+        self._background_item: Optional[TiledBackgroundItem] = None
+        self._build_thread: Optional[PyramidBuildThread] = None
+        self._pan_origin = None
+        self._export_thread: Optional[MapExportThread] = None
+        self._terrain_thread: Optional[TerrainBuildThread] = None
+        # Карта квеста читается из БД только когда вкладка реально показана
+        self._load_pending = False
+        # Несохраненные правки; номер правки отличает сохраненное от
+        # дорисованного, пока запись шла в потоке БД
+        self._modified = False
+        self._revision = 0
         self.current_tool = "path"
         self.current_marker_type = "Город"
         self.drawing = False
-        self.last_point: Optional[QPointF] = None
-        self.markers: List[QGraphicsEllipseItem] = []
-        self.labels: List[QGraphicsTextItem] = []
+
+        # Объекты карты по id + пространственный индекс их габаритов
+        self.markers: Dict[int, QGraphicsEllipseItem] = {}
+        self.labels: Dict[int, QGraphicsTextItem] = {}
+        # Штрихи: id -> плоский массив координат, рисуются слоем StrokeLayer
+        self.strokes: Dict[int, array] = {}
+        self.index = GridIndex(cell_size=64)
+        self._next_object_id = 1
+
+        # Текущий штрих: точки и один QGraphicsPathItem на весь штрих
+        self._stroke_points: List[Tuple[float, float]] = []
+        self._stroke_path: Optional[QPainterPath] = None
+        self._stroke_item: Optional[QGraphicsPathItem] = None
+        self._stroke_pen = QPen(self.PATH_COLOR, self.PATH_WIDTH, Qt.PenStyle.SolidLine,
+                                Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin)
 
         self.init_ui()
 
@@ -64,11 +166,22 @@ class MapEditor(QWidget):
 
         tools_layout.addStretch()
 
+        self.background_status = QLabel()
+        tools_layout.addWidget(self.background_status)
+
         # Кнопки для файлов
         load_bg_btn = QPushButton("📂 Загрузить фон")
         load_bg_btn.clicked.connect(self.load_background)
         tools_layout.addWidget(load_bg_btn)
 
+        terrain_btn = QPushButton("🏔️ Сгенерировать местность")
+        terrain_btn.clicked.connect(self.generate_terrain)
+        tools_layout.addWidget(terrain_btn)
+
+        save_quest_btn = QPushButton("📌 Сохранить в квест")
+        save_quest_btn.clicked.connect(self.save_to_quest)
+        tools_layout.addWidget(save_quest_btn)
+
         save_btn = QPushButton("💾 Сохранить PNG")
         save_btn.clicked.connect(self.save_map)
         tools_layout.addWidget(save_btn)
@@ -102,6 +215,8 @@ class MapEditor(QWidget):
 
         # Фон пергамента
         self.scene.setBackgroundBrush(QBrush(QColor(244, 228, 188)))
+        self._reset_objects()
+        self._modified = False
 
         self.view = QGraphicsView(self.scene)
         self.view.setRenderHint(QPainter.RenderHint.Antialiasing)
@@ -109,6 +224,8 @@ class MapEditor(QWidget):
         self.view.mousePressEvent = self.on_mouse_press
         self.view.mouseMoveEvent = self.on_mouse_move
         self.view.mouseReleaseEvent = self.on_mouse_release
+        self.view.wheelEvent = self.on_wheel
+        self.view.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
 
         layout.addWidget(self.view)
 
@@ -124,11 +241,16 @@ class MapEditor(QWidget):
 
     def on_mouse_press(self, event):
         """Обработка нажатия мыши"""
+        if event.button() == Qt.MouseButton.MiddleButton:
+            # Средняя кнопка - панорамирование большой карты
+            self._pan_origin = event.position()
+            return
+
         scene_pos = self.view.mapToScene(event.pos())
 
         if self.current_tool == "path":
             self.drawing = True
-            self.last_point = scene_pos
+            self.begin_stroke(scene_pos)
 
         elif self.current_tool == "marker":
             self.add_marker(scene_pos)
@@ -146,34 +268,126 @@ class MapEditor(QWidget):
 
     def on_mouse_move(self, event):
         """Обработка движения мыши"""
-        if self.drawing and self.current_tool == "path":
-            scene_pos = self.view.mapToScene(event.pos())
+        if self._pan_origin is not None:
+            delta = event.position() - self._pan_origin
+            self._pan_origin = event.position()
+            h_bar = self.view.horizontalScrollBar()
+            v_bar = self.view.verticalScrollBar()
+            h_bar.setValue(h_bar.value() - int(delta.x()))
+            v_bar.setValue(v_bar.value() - int(delta.y()))
+            return
 
-            if self.last_point:
-                # Рисуем линию
-                pen = QPen(QColor(139, 69, 19), 3, Qt.PenStyle.SolidLine)
-                self.scene.addLine(self.last_point.x(), self.last_point.y(),
-                                 scene_pos.x(), scene_pos.y(), pen)
-                self.last_point = scene_pos
+        if self.drawing and self.current_tool == "path":
+            self.extend_stroke(self.view.mapToScene(event.pos()))
 
         QGraphicsView.mouseMoveEvent(self.view, event)
 
     def on_mouse_release(self, event):
         """Обработка отпускания мыши"""
+        if event.button() == Qt.MouseButton.MiddleButton:
+            self._pan_origin = None
+            return
+
+        if self.drawing:
+            self.finish_stroke()
         self.drawing = False
-        self.last_point = None
         QGraphicsView.mouseReleaseEvent(self.view, event)
 
-    def add_marker(self, pos: QPointF):
+    def on_wheel(self, event):
+        """Зум колесом мыши относительно курсора"""
+        steps = event.angleDelta().y() / 120
+        if not steps:
+            return
+
+        factor = self.ZOOM_STEP ** steps
+        zoom = self.view.transform().m11() * factor
+        if self.MIN_ZOOM <= zoom <= self.MAX_ZOOM:
+            self.view.scale(factor, factor)
+
+    def begin_stroke(self, pos: QPointF):
+        """Начало штриха кистью"""
+        self._stroke_points = [(pos.x(), pos.y())]
+        self._stroke_path = QPainterPath(pos)
+
+        self._stroke_item = QGraphicsPathItem(self._stroke_path)
+        self._stroke_item.setPen(self._stroke_pen)
+        self.scene.addItem(self._stroke_item)
+
+    def extend_stroke(self, pos: QPointF):
+        """Продолжение штриха: точка добавляется в тот же path item"""
+        if self._stroke_item is None:
+            return
+
+        self._stroke_points.append((pos.x(), pos.y()))
+        self._stroke_path.lineTo(pos)
+        self._stroke_item.setPath(self._stroke_path)
+
+    def finish_stroke(self) -> Optional[int]:
+        """Завершение штриха: упрощение точек и перенос в слой штрихов"""
+        item = self._stroke_item
+        points = self._stroke_points
+        self._stroke_item = None
+        self._stroke_path = None
+        self._stroke_points = []
+
+        if item is None:
+            return None
+
+        if len(points) < 2:
+            # Клик без движения ничего не рисует
+            self.scene.removeItem(item)
+            return None
+
+        self.scene.removeItem(item)
+        flat = array("f")
+        for x, y in simplify_polyline(points, self.STROKE_TOLERANCE):
+            flat.append(x)
+            flat.append(y)
+        return self.add_stroke(flat)
+
+    def add_stroke(self, flat: array) -> int:
+        """Добавление готового штриха (плоский массив float32 x0, y0, x1, y1, ...)"""
+        return self.add_strokes([flat])[0]
+
+    def add_strokes(self, flats: List[array]) -> List[int]:
+        """Пакетное добавление штрихов (загрузка карты): слой обновляется один раз"""
+        half = self.PATH_WIDTH / 2
+        strokes, index = self.strokes, self.index
+        left = top = float("inf")
+        right = bottom = float("-inf")
+        ids = []
+
+        for flat in flats:
+            xs, ys = flat[0::2], flat[1::2]
+            x1, y1, x2, y2 = min(xs) - half, min(ys) - half, max(xs) + half, max(ys) + half
+            obj_id = self._next_object_id
+            self._next_object_id += 1
+            strokes[obj_id] = flat
+            index.insert(obj_id, (x1, y1, x2, y2))
+            ids.append(obj_id)
+
+            left, top = min(left, x1), min(top, y1)
+            right, bottom = max(right, x2), max(bottom, y2)
+
+        if ids:
+            self._stroke_layer.stroke_added((left, top, right, bottom))
+            self._mark_modified()
+        return ids
+
+    def add_marker(self, pos: QPointF, marker_type: Optional[str] = None):
         """Добавление маркера локации"""
-        color = self.MARKER_COLORS.get(self.current_marker_type, QColor(0, 0, 255))
+        marker_type = marker_type or self.current_marker_type
+        color = self.MARKER_COLORS.get(marker_type, QColor(0, 0, 255))
 
-        marker = QGraphicsEllipseItem(pos.x() - 15, pos.y() - 15, 30, 30)
+        r = self.MARKER_RADIUS
+        marker = QGraphicsEllipseItem(pos.x() - r, pos.y() - r, 2 * r, 2 * r)
         marker.setBrush(QBrush(color))
         marker.setPen(QPen(Qt.GlobalColor.black, 2))
+        marker.setData(self.DATA_MARKER_TYPE, marker_type)
+        marker.setZValue(1)  # маркеры и метки поверх слоя штрихов
 
         self.scene.addItem(marker)
-        self.markers.append(marker)
+        return self._register(marker, self.markers)
 
     def add_label(self, pos: QPointF, text: str):
         """Добавление текстовой метки"""
@@ -181,22 +395,92 @@ class MapEditor(QWidget):
         label.setFont(QFont("Serif", 12, QFont.Weight.Bold))
         label.setDefaultTextColor(QColor(80, 40, 20))
         label.setPos(pos)
+        label.setZValue(1)
 
         self.scene.addItem(label)
-        self.labels.append(label)
+        return self._register(label, self.labels)
+
+    def _register(self, item, store: Dict, bounds: Optional[Tuple[float, float, float, float]] = None) -> int:
+        """Выдача id объекту и добавление в хранилище и индекс"""
+        obj_id = self._next_object_id
+        self._next_object_id += 1
+
+        item.setData(self.DATA_OBJECT_ID, obj_id)
+        store[obj_id] = item
+        self._mark_modified()
+
+        if bounds is None:
+            rect = item.sceneBoundingRect()
+            bounds = (rect.left(), rect.top(), rect.right(), rect.bottom())
+        self.index.insert(obj_id, bounds)
+        return obj_id
+
+    def _hits(self, obj_id: int, x: float, y: float, radius: float) -> bool:
+        """Точная проверка попадания (габарит из индекса слишком грубый)"""
+        if obj_id in self.strokes:
+            flat = self.strokes[obj_id]
+            points = list(zip(flat[0::2], flat[1::2]))
+            return distance_to_polyline(points, x, y) <= radius + self.PATH_WIDTH / 2
+        if obj_id in self.markers:
+            x1, y1, x2, y2 = self.index.bounds(obj_id)
+            cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+            return (cx - x) ** 2 + (cy - y) ** 2 <= (self.MARKER_RADIUS + radius) ** 2
+        return True  # у текстовой метки габарит и есть область попадания
+
+    def object_at(self, pos: QPointF, radius: float = 0.0) -> Optional[int]:
+        """id самого верхнего объекта в точке (выбор / ластик)"""
+        x, y = pos.x(), pos.y()
+        # Маркеры и метки лежат над штрихами, внутри слоя больший id = выше
+        candidates = sorted(self.index.query_point(x, y, radius),
+                            key=lambda i: (i not in self.strokes, i), reverse=True)
+        for obj_id in candidates:
+            if self._hits(obj_id, x, y, radius):
+                return obj_id
+        return None
+
+    def remove_object(self, obj_id: int) -> bool:
+        """Удаление объекта по id за O(1)"""
+        if obj_id in self.strokes:
+            del self.strokes[obj_id]
+            self._stroke_layer.stroke_removed(obj_id, self.index.bounds(obj_id))
+        else:
+            item = self.markers.pop(obj_id, None) or self.labels.pop(obj_id, None)
+            if item is None:
+                return False
+            self.scene.removeItem(item)
 
-    def erase_at_point(self, pos: QPointF):
-        """Стирание объекта в точке"""
-        items = self.scene.items(QRectF(pos.x() - 5, pos.y() - 5, 10, 10))
+        self.index.remove(obj_id)
+        self._mark_modified()
+        return True
 
-        if items:
-            item = items[0]
-            self.scene.removeItem(item)
+    def markers_in_region(self, rect: QRectF) -> List[int]:
+        """id всех маркеров, пересекающих прямоугольник"""
+        ids = self.index.query_rect((rect.left(), rect.top(), rect.right(), rect.bottom()))
+        return [obj_id for obj_id in ids if obj_id in self.markers]
 
-            if item in self.markers:
-                self.markers.remove(item)
-            elif item in self.labels:
-                self.labels.remove(item)
+    def nearest_marker(self, pos: QPointF, max_distance: float = float("inf")) -> Optional[int]:
+        """id ближайшего к точке маркера"""
+        return self.index.nearest(pos.x(), pos.y(), max_distance,
+                                  predicate=self.markers.__contains__)
+
+    def erase_at_point(self, pos: QPointF):
+        """Стирание объекта в точке"""
+        obj_id = self.object_at(pos, self.ERASER_RADIUS)
+        if obj_id is not None:
+            self.remove_object(obj_id)
+
+    def _reset_objects(self):
+        """Сброс хранилищ объектов (сцена очищается отдельно)"""
+        self.markers.clear()
+        self.labels.clear()
+        self.strokes.clear()
+        self.index.clear()
+        self._background_item = None
+        self._mark_modified()
+
+        # scene.clear() удаляет и слой штрихов, создаем новый
+        self._stroke_layer = StrokeLayer(self.strokes, self.index, self._stroke_pen)
+        self.scene.addItem(self._stroke_layer)
 
     def load_background(self):
         """Загрузка фонового изображения"""
@@ -206,48 +490,123 @@ class MapEditor(QWidget):
         )
 
         if file_path:
-            pixmap = QPixmap(file_path)
-            pixmap = pixmap.scaled(800, 600, Qt.AspectRatioMode.KeepAspectRatio,
-                                  Qt.TransformationMode.SmoothTransformation)
-
             # Очищаем предыдущий фон
             self.scene.clear()
-            self.markers.clear()
-            self.labels.clear()
-
-            # Добавляем новый фон
-            self.scene.addPixmap(pixmap)
+            self._reset_objects()
+
+            self._set_background(file_path)
+
+    def generate_terrain(self):
+        """Процедурная местность по seed: фон, реки и предложенные маркеры"""
+        if self._terrain_thread is not None and self._terrain_thread.isRunning():
+            return
+
+        seed, ok = QInputDialog.getInt(self, "Генерация местности", "Seed:",
+                                       random.randrange(1_000_000), 0, 2 ** 31 - 1)
+        if not ok:
+            return
+
+        self.background_status.setText("⏳ Генерация местности...")
+        self._terrain_thread = TerrainBuildThread(seed, self.TERRAIN_SIZE, parent=self)
+        self._terrain_thread.generated.connect(self._on_terrain_generated)
+        self._terrain_thread.failed.connect(self._on_background_failed)
+        self._terrain_thread.start()
+
+    def _on_terrain_generated(self, file_path: str, sites):
+        self.scene.clear()
+        self._reset_objects()
+        self._set_background(file_path)
+        for x, y, marker_type in sites:
+            if marker_type in self.MARKER_COLORS:
+                self.add_marker(QPointF(x, y), marker_type)
+
+    def _set_background(self, file_path: str):
+        """Фон из пирамиды тайлов; при первом открытии она нарезается в фоне"""
+        self.background_path = file_path
+        self._mark_modified()
+
+        pyramid = TilePyramid.cached(file_path)
+        if pyramid is not None:
+            self._show_background(pyramid)
+            return
+
+        self.background_status.setText("⏳ Подготовка фона...")
+        self._build_thread = PyramidBuildThread(file_path, parent=self)
+        self._build_thread.progress.connect(
+            lambda done, total: self.background_status.setText(f"⏳ Подготовка фона: {done}/{total}"))
+        self._build_thread.built.connect(self._show_background)
+        self._build_thread.failed.connect(self._on_background_failed)
+        self._build_thread.start()
+
+    def _show_background(self, pyramid: TilePyramid):
+        """Показ готовой пирамиды тайлов"""
+        self.background_status.clear()
+        if self.background_path is None or pyramid.source != os.path.abspath(self.background_path):
+            return  # пока резали тайлы, пользователь сменил фон
+
+        if self._background_item is not None:
+            self.scene.removeItem(self._background_item)
+        self._background_item = TiledBackgroundItem(pyramid)
+        self.scene.addItem(self._background_item)
+
+        rect = self._background_item.boundingRect()
+        self.scene.setSceneRect(rect)
+        self.view.fitInView(rect, Qt.AspectRatioMode.KeepAspectRatio)
+
+    def _on_background_failed(self, message: str):
+        self.background_status.clear()
+        QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить фон: {message}")
 
     def save_map(self):
-        """Сохранение карты как PNG"""
+        """Экспорт карты в PNG с выбранным разрешением (в фоновом потоке)"""
+        if self._export_thread is not None and self._export_thread.isRunning():
+            QMessageBox.information(self, "Экспорт", "Экспорт карты уже выполняется")
+            return
+
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Сохранить карту",
             f"map_quest_{self.current_quest_id or 'new'}.png",
-            "PNG Image (*.png);;JPEG Image (*.jpg)"
+            "PNG Image (*.png)"
         )
-
-        if file_path:
-            # Создаем изображение
-            image = QImage(800, 600, QImage.Format.Format_ARGB32)
-            image.fill(Qt.GlobalColor.white)
-
-            painter = QPainter(image)
-            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-            self.scene.render(painter)
-            painter.end()
-
-            if image.save(file_path):
-                # Геймификация
-                xp, leveled_up = self.gamification.add_xp("save_map")
-                self.gamification.update_stats("maps_saved")
-
-                msg = f"✅ Карта сохранена в {file_path}\n+{xp} XP"
-                if leveled_up:
-                    msg += f"\n🎉 Новый уровень: {self.gamification.get_current_level()}!"
-
-                QMessageBox.information(self, "Успех", msg)
-            else:
-                QMessageBox.critical(self, "Ошибка", "Не удалось сохранить карту")
+        if not file_path:
+            return
+
+        dpi, ok = QInputDialog.getInt(self, "Экспорт карты", "Разрешение (DPI):",
+                                      self.EXPORT_DPI, 24, 1200)
+        if not ok:
+            return
+
+        pyramid = TilePyramid.cached(self.background_path) if self.background_path else None
+        self._export_thread = MapExportThread(
+            self.to_map_data(), file_path, dpi, self._stroke_pen, self.MARKER_COLORS,
+            self.MARKER_RADIUS, self.scene.backgroundBrush().color(), pyramid, parent=self)
+        self._export_thread.progress.connect(
+            lambda done, total: self.background_status.setText(f"⏳ Экспорт: {done}/{total}"))
+        self._export_thread.exported.connect(self._on_map_exported)
+        self._export_thread.failed.connect(self._on_export_failed)
+        self._export_thread.start()
+
+    def _on_map_exported(self, file_path: str):
+        self.background_status.clear()
+        asyncio.ensure_future(self._report_export(file_path))
+
+    async def _report_export(self, file_path: str):
+        # Геймификация: профиль пишется в потоке БД
+        if self.db is None:
+            xp, leveled_up = self.gamification.reward("save_map", "maps_saved")
+        else:
+            xp, leveled_up = await self.db.run(lambda db: self.gamification.reward("save_map", "maps_saved"))
+
+        msg = f"✅ Карта сохранена в {file_path}\n+{xp} XP"
+        if leveled_up:
+            msg += f"\n🎉 Новый уровень: {self.gamification.get_current_level()}!"
+
+        # Модальное окно - из цикла Qt, а не вложенным циклом внутри корутины
+        await asyncWrap(QMessageBox.information, self, "Успех", msg)
+
+    def _on_export_failed(self, message: str):
+        self.background_status.clear()
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить карту: {message}")
 
     def clear_canvas(self):
         """Очистка холста"""
@@ -260,9 +619,125 @@ class MapEditor(QWidget):
         if reply == QMessageBox.StandardButton.Yes:
             self.scene.clear()
             self.scene.setBackgroundBrush(QBrush(QColor(244, 228, 188)))
-            self.markers.clear()
-            self.labels.clear()
-
-    def set_quest_id(self, quest_id: int):
-        """Привязка карты к квесту"""
-        self.current_quest_id = quest_id
\ No newline at end of file
+            self._reset_objects()
+            self.background_path = None
+
+    def set_quest_id(self, quest_id: Optional[int], keep_current: bool = False):
+        """Привязка карты к квесту (None - отвязка, холст очищается)
+
+        keep_current=True оставляет нарисованное на холсте, если он ни к
+        какому квесту не был привязан (карта, начатая до создания квеста,
+        переходит к новому квесту); карта другого квеста не копируется.
+        """
+        if quest_id == self.current_quest_id:
+            return
+
+        self.save_if_modified()
+
+        was_unbound = self.current_quest_id is None
+        self.current_quest_id = quest_id
+        if quest_id is None:
+            # читать из БД нечего: пустая карта сразу, даже на скрытой вкладке
+            self._load_pending = False
+            self.show_map_blob(None)
+            return
+        if keep_current and was_unbound:
+            self._mark_modified()
+            return
+
+        self._load_pending = True
+        if self.isVisible():
+            self._load_pending_map()
+
+    def showEvent(self, event):
+        """Ленивая загрузка карты при первом показе вкладки"""
+        super().showEvent(event)
+        if self._load_pending:
+            self._load_pending_map()
+
+    def _load_pending_map(self):
+        """Загрузка сохраненной карты текущего квеста (чтение в потоке БД)"""
+        self._load_pending = False
+        if self.db is None or self.current_quest_id is None:
+            self.show_map_blob(None)
+            return
+        asyncio.ensure_future(self._load_map(self.current_quest_id))
+
+    async def _load_map(self, quest_id: int):
+        blob = await self.db.get_quest_map(quest_id)
+        # пока читали, могли выбрать другой квест
+        if quest_id == self.current_quest_id:
+            self.show_map_blob(blob)
+
+    def show_map_blob(self, blob: Optional[bytes]):
+        """Показ карты в формате БД (None - пустая карта)"""
+        self.load_map_data(decode_map(blob) if blob else MapData())
+
+    def load_map_data(self, data: MapData):
+        """Замена содержимого холста данными карты"""
+        self.scene.clear()
+        self._reset_objects()
+        self.background_path = None
+        self.scene.setSceneRect(0, 0, data.width, data.height)
+
+        if data.background and os.path.exists(data.background):
+            self._set_background(data.background)
+
+        self.add_strokes(data.strokes)
+        for x, y, marker_type in data.markers:
+            self.add_marker(QPointF(x, y), marker_type)
+        for x, y, text in data.labels:
+            self.add_label(QPointF(x, y), text)
+
+        self._modified = False
+
+    def to_map_data(self) -> MapData:
+        """Снимок содержимого холста в MapData"""
+        rect = self.scene.sceneRect()
+        data = MapData(int(rect.width()), int(rect.height()), self.background_path)
+        data.strokes = list(self.strokes.values())
+
+        for obj_id, item in self.markers.items():
+            x1, y1, x2, y2 = self.index.bounds(obj_id)
+            data.markers.append(((x1 + x2) / 2, (y1 + y2) / 2, item.data(self.DATA_MARKER_TYPE)))
+        for item in self.labels.values():
+            pos = item.pos()
+            data.labels.append((pos.x(), pos.y(), item.toPlainText()))
+        return data
+
+    def _mark_modified(self):
+        self._modified = True
+        self._revision += 1
+
+    def save_if_modified(self):
+        """Тихое сохранение несохраненных правок карты текущего квеста"""
+        if self._modified and self.db is not None and self.current_quest_id is not None:
+            # Запись уходит в поток БД сразу; закрытие БД дождётся её, ошибка попадёт в лог
+            self.db.save_quest_map(self.current_quest_id, encode_map(self.to_map_data()))
+            self._modified = False
+
+    def stop_background_work(self):
+        """Остановка фоновых потоков перед закрытием (недописанный экспорт удаляется)"""
+        for thread in (self._export_thread, self._build_thread, self._terrain_thread):
+            if thread is not None and thread.isRunning():
+                thread.requestInterruption()
+                thread.wait()
+
+    @asyncSlot()
+    async def save_to_quest(self):
+        """Сохранение редактируемой карты в БД квеста"""
+        if self.db is None or self.current_quest_id is None:
+            await asyncWrap(QMessageBox.warning, self, "Предупреждение",
+                            "Сначала создайте или выберите квест")
+            return
+
+        quest_id, revision = self.current_quest_id, self._revision
+        try:
+            await self.db.save_quest_map(quest_id, encode_map(self.to_map_data()))
+        except Exception as e:
+            # правки остаются несохраненными: их запишет следующее сохранение
+            await asyncWrap(QMessageBox.critical, self, "Ошибка", f"Не удалось сохранить карту в квест: {e}")
+            return
+        # пока шла запись, карту могли дорисовать или сменить квест
+        if quest_id == self.current_quest_id and revision == self._revision:
+            self._modified = False
@@ -0,0 +1,150 @@
+from PyQt6.QtCore import Qt, QRectF, QThread, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter, QPen, QColor, QFont, QBrush
+from typing import Dict, Optional
+import os
+
+from core.map_format import MapData
+from core.png_writer import PngWriter
+from core.spatial_index import GridIndex
+from core.tile_pyramid import TilePyramid
+from gui.polygons import polygon_from_flat
+
+# Экранные пиксели сцены считаются точками 96 DPI
+SCENE_DPI = 96
+# Потолок пикселей в одной полосе рендера (~16 МБ для RGBA)
+BAND_PIXELS = 4 * 1024 * 1024
+
+
+class MapExportThread(QThread):
+    """Экспорт карты в PNG любого размера в фоновом потоке
+
+    Сцена Qt не потокобезопасна, поэтому поток рисует снимок MapData сам:
+    выходное изображение режется на горизонтальные полосы, каждая
+    рендерится в небольшой QImage и сразу дописывается в PngWriter. Пиковая
+    память ограничена одной полосой и строкой тайлов фона и не зависит от
+    размера результата.
+    """
+
+    progress = pyqtSignal(int, int)
+    exported = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, data: MapData, path: str, dpi: int, pen: QPen,
+                 marker_colors: Dict[str, QColor], marker_radius: float,
+                 background: QColor, pyramid: Optional[TilePyramid] = None, parent=None):
+        super().__init__(parent)
+        self.data = data
+        self.path = path
+        self.dpi = dpi
+        self.scale = dpi / SCENE_DPI
+        self.pen = QPen(pen)
+        self.marker_colors = dict(marker_colors)
+        self.marker_radius = marker_radius
+        self.background = QColor(background)
+        self.pyramid = pyramid
+        self.width = max(1, round(data.width * self.scale))
+        self.height = max(1, round(data.height * self.scale))
+        self._tiles: Dict[tuple, QImage] = {}
+
+    def run(self):
+        # пишется рядом с целью и переименовывается в конце: прерванный или
+        # упавший экспорт не оставляет полфайла и не портит прежний файл
+        tmp_path = self.path + ".part"
+        writer = None
+        try:
+            index = GridIndex()
+            for i, flat in enumerate(self.data.strokes):
+                if len(flat) >= 2:
+                    xs, ys = flat[0::2], flat[1::2]
+                    index.insert(i, (min(xs), min(ys), max(xs), max(ys)))
+
+            band_height = max(1, min(self.height, BAND_PIXELS // self.width))
+            bands = -(-self.height // band_height)
+            writer = PngWriter(tmp_path, self.width, self.height, alpha=True, dpi=self.dpi)
+
+            for band in range(bands):
+                if self.isInterruptionRequested():
+                    self._discard(writer, tmp_path)
+                    return
+                top = band * band_height
+                image = self.render_band(index, top, min(band_height, self.height - top))
+                writer.write_rows(image.constBits().asarray(image.sizeInBytes()), image.bytesPerLine())
+                self.progress.emit(band + 1, bands)
+
+            writer.close()
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self._discard(writer, tmp_path)
+            self.failed.emit(str(e))
+        else:
+            self.exported.emit(self.path)
+
+    @staticmethod
+    def _discard(writer: Optional[PngWriter], tmp_path: str):
+        """Закрыть и удалить недописанный файл"""
+        if writer is not None:
+            writer.abort()
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def render_band(self, index: GridIndex, top: int, height: int) -> QImage:
+        """Полоса выходного изображения [top, top + height) в RGBA"""
+        image = QImage(self.width, height, QImage.Format.Format_RGBA8888)
+        image.fill(self.background)
+
+        scale = self.scale
+        # та же полоса в координатах сцены, с запасом на толщину пера и маркеры
+        margin = self.marker_radius + self.pen.widthF()
+        y1, y2 = top / scale, (top + height) / scale
+        x2 = self.width / scale
+
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.translate(0, -top)
+        painter.scale(scale, scale)
+
+        if self.pyramid is not None:
+            self._draw_background(painter, y1, y2, x2)
+
+        painter.setPen(self.pen)
+        for i in sorted(index.query_rect((-margin, y1 - margin, x2 + margin, y2 + margin))):
+            painter.drawPolyline(polygon_from_flat(self.data.strokes[i]))
+
+        r = self.marker_radius
+        painter.setPen(QPen(Qt.GlobalColor.black, 2))
+        for x, y, marker_type in self.data.markers:
+            if y1 - margin <= y <= y2 + margin:
+                painter.setBrush(QBrush(self.marker_colors.get(marker_type, QColor(0, 0, 255))))
+                painter.drawEllipse(QRectF(x - r, y - r, 2 * r, 2 * r))
+
+        # как у QGraphicsTextItem: шрифт меток и отступ документа 4 px
+        painter.setFont(QFont("Serif", 12, QFont.Weight.Bold))
+        painter.setPen(QColor(80, 40, 20))
+        line_height = painter.fontMetrics().height()
+        for x, y, text in self.data.labels:
+            if y1 - line_height - 8 <= y <= y2:
+                painter.drawText(QRectF(x + 4, y + 4, x2, line_height * (text.count("\n") + 1)),
+                                 Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop, text)
+
+        painter.end()
+        return image
+
+    def _draw_background(self, painter: QPainter, y1: float, y2: float, x2: float):
+        """Тайлы фона для полосы; в памяти только тайлы текущей полосы"""
+        pyramid = self.pyramid
+        level = pyramid.level_for_scale(self.scale)
+        used = {}
+        for col, row, (x, y, w, h) in pyramid.tiles_in_rect(level, 0, y1, x2, y2):
+            key = (level, col, row)
+            tile = self._tiles.get(key)
+            if tile is None:
+                tile = QImage(pyramid.tile_path(level, col, row))
+            used[key] = tile
+            if not tile.isNull():
+                painter.drawImage(QRectF(x, y, w, h), tile)
+        # соседние полосы обычно делят строку тайлов, остальное отпускаем
+        self._tiles = used
+
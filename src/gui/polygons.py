@@ -0,0 +1,16 @@
+from PyQt6.QtGui import QPolygonF
+from array import array
+
+
+def polygon_from_flat(flat: array) -> QPolygonF:
+    """QPolygonF из плоского массива координат одним копированием памяти"""
+    if flat.typecode != "d":
+        flat = array("d", flat)  # QPointF хранит два double
+    polygon = QPolygonF()
+    polygon.resize(len(flat) // 2)
+    if len(flat):
+        raw = memoryview(flat).cast("B")
+        ptr = polygon.data()
+        ptr.setsize(len(raw))
+        memoryview(ptr)[:] = raw
+    return polygon
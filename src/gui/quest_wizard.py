@@ -1,9 +1,40 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QLineEdit, QComboBox, QSpinBox, QTextEdit,
-                             QDateTimeEdit, QPushButton, QMessageBox, QFormLayout)
-from PyQt6.QtCore import Qt, QDateTime, pyqtSignal
-from PyQt6.QtGui import QShortcut, QKeySequence
+                             QDateTimeEdit, QPushButton, QMessageBox, QFormLayout,
+                             QCompleter)
+from PyQt6.QtCore import Qt, QDateTime, QTimer, QStringListModel, pyqtSignal
+from PyQt6.QtGui import QShortcut, QKeySequence, QTextCursor
+from qasync import asyncSlot, asyncWrap
 from typing import Optional, Dict, Any
+import asyncio
+
+from core.database import MAX_TITLE_LENGTH, MIN_DESCRIPTION_WORDS
+from core.text_stats import TextReport, WordCounter, analyze_text
+from core.title_index import TitleIndex
+
+INVALID_STYLE = "border: 2px solid red;"
+
+
+def readability_label(score: float) -> str:
+    """Словесная оценка читаемости по шкале Флеша"""
+    if score >= 80:
+        return "легко"
+    if score >= 50:
+        return "средне"
+    if score >= 25:
+        return "сложно"
+    return "очень сложно"
+
+
+def format_text_report(report: TextReport, max_phrases: int = 2) -> str:
+    """Сводка анализа описания одной строкой"""
+    parts = [f"Читаемость: {report.readability:.0f} ({readability_label(report.readability)})"]
+    if report.repeated:
+        phrases = ", ".join(f"«{phrase}» ×{times}" for phrase, times in report.repeated[:max_phrases])
+        parts.append(f"Повторы: {phrases}")
+    if report.forbidden:
+        parts.append("Запрещённые слова: " + ", ".join(report.forbidden))
+    return " · ".join(parts)
 
 
 class QuestWizard(QWidget):
@@ -11,14 +42,41 @@ class QuestWizard(QWidget):
 
     quest_created = pyqtSignal(int)  # Сигнал с ID созданного квеста
     quest_updated = pyqtSignal(int)  # Сигнал с ID обновленного квеста
+    form_cleared = pyqtSignal()  # Форма очищена: дальше вводится новый квест
+
+    # Автосохранение и анализ текста - после паузы в наборе, мс
+    AUTOSAVE_DELAY_MS = 500
+    ANALYSIS_DELAY_MS = 700
+    # Подсказок названий в выпадающем списке
+    TITLE_SUGGESTIONS = 10
 
     def __init__(self, db, gamification, parent=None):
         super().__init__(parent)
+        # AsyncDatabase: запросы идут в потоке БД, окно их не ждёт
         self.db = db
         self.gamification = gamification
         self.current_quest_id: Optional[int] = None
+        # Квест, выбранный последним: ответ на более ранний выбор не показываем
+        self._requested_quest_id: Optional[int] = None
+        self._saving = False
         self.auto_save_enabled = True
 
+        # Число слов описания обновляется по правкам, без разбора всего текста
+        self.word_count = WordCounter()
+        self._description_valid: Optional[bool] = None
+        # Номер запуска анализа: результат устаревшего запуска не показываем
+        self._analysis_generation = 0
+        # Названия всех квестов (TitleIndex): подсказки и проверка дубликатов
+        # без запроса к БД; главное окно передаёт индекс, когда он построен
+        self.title_index: Optional[TitleIndex] = None
+
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setSingleShot(True)
+        self.autosave_timer.timeout.connect(self.auto_save)
+        self.analysis_timer = QTimer(self)
+        self.analysis_timer.setSingleShot(True)
+        self.analysis_timer.timeout.connect(self.start_analysis)
+
         self.init_ui()
         self.setup_shortcuts()
 
@@ -31,11 +89,25 @@ class QuestWizard(QWidget):
 
         # Название квеста
         self.title_input = QLineEdit()
-        self.title_input.setMaxLength(50)
+        self.title_input.setMaxLength(MAX_TITLE_LENGTH)
         self.title_input.setPlaceholderText("Введите название квеста...")
         self.title_input.textChanged.connect(self.on_field_changed)
+        self.title_input.textChanged.connect(self.check_title)
+        # Подсказки берутся из индекса по введённому префиксу
+        self.title_suggestions = QStringListModel(self)
+        self.title_completer = QCompleter(self.title_suggestions, self)
+        self.title_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.title_completer.setMaxVisibleItems(self.TITLE_SUGGESTIONS)
+        self.title_input.setCompleter(self.title_completer)
+        self.title_input.textEdited.connect(self.suggest_titles)
         form_layout.addRow("Название:", self.title_input)
 
+        # Предупреждение о занятом названии (видно сразу, до сохранения)
+        self.title_warning = QLabel()
+        self.title_warning.setStyleSheet("color: red;")
+        self.title_warning.hide()
+        form_layout.addRow("", self.title_warning)
+
         # Сложность
         self.difficulty_combo = QComboBox()
         self.difficulty_combo.addItems(["Легкий", "Средний", "Сложный", "Эпический"])
@@ -56,15 +128,21 @@ class QuestWizard(QWidget):
         # Описание
         desc_label = QLabel("Описание:")
         self.description_edit = QTextEdit()
-        self.description_edit.setPlaceholderText("Подробное описание квеста (минимум 50 слов)...")
+        self.description_edit.setPlaceholderText(f"Подробное описание квеста (минимум {MIN_DESCRIPTION_WORDS} слов)...")
         self.description_edit.setMinimumHeight(150)
-        self.description_edit.textChanged.connect(self.on_description_changed)
+        self.description_edit.document().contentsChange.connect(self.on_description_changed)
 
         # Счетчик слов
-        self.word_counter = QLabel("Слов: 0 / 50")
+        self.word_counter = QLabel()
+        self.show_word_count()
+
+        # Читаемость, повторы, запрещённые слова (считаются в фоне)
+        self.analysis_label = QLabel()
+        self.analysis_label.setWordWrap(True)
 
         form_layout.addRow(desc_label, self.description_edit)
         form_layout.addRow("", self.word_counter)
+        form_layout.addRow("", self.analysis_label)
 
         # Дедлайн
         self.deadline_edit = QDateTimeEdit()
@@ -111,23 +189,86 @@ class QuestWizard(QWidget):
         create_shortcut = QShortcut(QKeySequence("Ctrl+Return"), self)
         create_shortcut.activated.connect(self.create_or_update_quest)
 
-    def on_description_changed(self):
-        """Обработка изменения описания"""
-        text = self.description_edit.toPlainText()
-        words = len(text.split())
-
-        self.word_counter.setText(f"Слов: {words} / 50")
+    def set_title_index(self, index: Optional[TitleIndex]):
+        """Индекс названий построен (или перестроен) главным окном"""
+        self.title_index = index
+        self.check_title()
 
-        if words < 50:
-            self.word_counter.setStyleSheet("color: red;")
+    def suggest_titles(self, text: str):
+        """Подсказки к набираемому названию"""
+        if self.title_index is None or not text.strip():
+            self.title_suggestions.setStringList([])
+            return
+        self.title_suggestions.setStringList(self.title_index.complete(text, self.TITLE_SUGGESTIONS))
+
+    def duplicate_title_id(self, title: str) -> Optional[int]:
+        """ID другого квеста с таким же названием (None, если название свободно или индекса ещё нет)"""
+        if self.title_index is None or not title:
+            return None
+        quest_id = self.title_index.find(title)
+        return None if quest_id == self.current_quest_id else quest_id
+
+    def check_title(self):
+        """Предупреждение, если название уже занято другим квестом"""
+        duplicate = self.duplicate_title_id(self.title_input.text().strip()) is not None
+        if duplicate:
+            self.title_warning.setText("⚠️ Квест с таким названием уже существует")
+        self.title_warning.setVisible(duplicate)
+        self.mark_invalid(self.title_input, duplicate)
+
+    def on_description_changed(self, position: int, removed: int, added: int):
+        """Правка описания: слова пересчитываются только в изменённом месте"""
+        counter = self.word_count
+        document = self.description_edit.document()
+        end = document.characterCount() - 1
+        # setPlainText и clear сообщают о замене всего документа вместе с
+        # завершающим разделителем абзаца - тогда текст читается целиком
+        if position + removed > len(counter.text) or position + added > end:
+            counter.reset(self.description_edit.toPlainText())
         else:
-            self.word_counter.setStyleSheet("color: green;")
-
+            cursor = QTextCursor(document)
+            cursor.setPosition(position)
+            cursor.setPosition(position + added, QTextCursor.MoveMode.KeepAnchor)
+            counter.apply(position, removed, cursor.selectedText())
+            if len(counter.text) != end:
+                counter.reset(self.description_edit.toPlainText())
+
+        self.show_word_count()
+        self.analysis_timer.start(self.ANALYSIS_DELAY_MS)
         self.on_field_changed()
 
+    def show_word_count(self):
+        """Счётчик слов; стиль меняется только при смене состояния"""
+        words = self.word_count.words
+        self.word_counter.setText(f"Слов: {words} / {MIN_DESCRIPTION_WORDS}")
+        valid = words >= MIN_DESCRIPTION_WORDS
+        if valid != self._description_valid:
+            self._description_valid = valid
+            self.word_counter.setStyleSheet("color: green;" if valid else "color: red;")
+
+    def start_analysis(self):
+        """Анализ описания в фоновом потоке (после паузы в наборе)"""
+        self._analysis_generation += 1
+        text = self.description_edit.toPlainText()
+        if not text.strip():
+            self.analysis_label.clear()
+            return
+        asyncio.ensure_future(self._analyze(text, self._analysis_generation))
+
+    async def _analyze(self, text: str, generation: int):
+        report = await asyncio.get_running_loop().run_in_executor(None, analyze_text, text)
+        if generation == self._analysis_generation:
+            self.analysis_label.setText(format_text_report(report))
+
     def on_field_changed(self):
-        """Обработка изменения полей (автосохранение)"""
+        """Обработка изменения полей (автосохранение после паузы в наборе)"""
         if self.auto_save_enabled and self.current_quest_id is not None:
+            self.autosave_timer.start(self.AUTOSAVE_DELAY_MS)
+
+    def flush_autosave(self):
+        """Немедленно выполнить отложенное автосохранение"""
+        if self.autosave_timer.isActive():
+            self.autosave_timer.stop()
             self.auto_save()
 
     def auto_save(self):
@@ -141,78 +282,107 @@ class QuestWizard(QWidget):
         description = self.description_edit.toPlainText().strip()
         deadline = self.deadline_edit.dateTime().toString("yyyy-MM-dd HH:mm:ss")
 
+        # Не ждём: поток БД выполняет сохранения по одному в порядке вызова
         self.db.update_quest(self.current_quest_id, title, difficulty,
-                           reward, description, deadline)
+                             reward, description, deadline)
 
     def validate_fields(self, show_errors: bool = True) -> bool:
         """Валидация полей формы"""
         errors = []
 
         # Проверка названия
-        if not self.title_input.text().strip():
+        title = self.title_input.text().strip()
+        title_valid = bool(title)
+        if not title_valid:
             errors.append("Название квеста не может быть пустым")
-            self.title_input.setStyleSheet("border: 2px solid red;")
-        else:
-            self.title_input.setStyleSheet("")
+        elif self.duplicate_title_id(title) is not None:
+            # UNIQUE в БД не дал бы сохранить квест
+            title_valid = False
+            errors.append(f"Квест с названием «{title}» уже существует")
+        self.mark_invalid(self.title_input, not title_valid)
 
         # Проверка описания
-        words = len(self.description_edit.toPlainText().split())
-        if words < 50:
-            errors.append(f"Описание должно содержать минимум 50 слов (сейчас: {words})")
-            self.description_edit.setStyleSheet("border: 2px solid red;")
-        else:
-            self.description_edit.setStyleSheet("")
+        words = self.word_count.words
+        if words < MIN_DESCRIPTION_WORDS:
+            errors.append(f"Описание должно содержать минимум {MIN_DESCRIPTION_WORDS} слов (сейчас: {words})")
+        self.mark_invalid(self.description_edit, words < MIN_DESCRIPTION_WORDS)
 
         if errors and show_errors:
             QMessageBox.warning(self, "Ошибка валидации", "\n".join(errors))
 
         return len(errors) == 0
 
-    def create_or_update_quest(self):
+    @staticmethod
+    def mark_invalid(widget: QWidget, invalid: bool):
+        """Красная рамка у поля; смена стиля перестраивает виджет, поэтому только при изменении"""
+        style = INVALID_STYLE if invalid else ""
+        if widget.styleSheet() != style:
+            widget.setStyleSheet(style)
+
+    @asyncSlot()
+    async def create_or_update_quest(self):
         """Создание или обновление квеста"""
-        if not self.validate_fields():
+        # Повторное нажатие, пока идёт сохранение, создало бы квест дважды
+        if self._saving:
             return
-
-        title = self.title_input.text().strip()
-        difficulty = self.difficulty_combo.currentText()
-        reward = self.reward_spin.value()
-        description = self.description_edit.toPlainText().strip()
-        deadline = self.deadline_edit.dateTime().toString("yyyy-MM-dd HH:mm:ss")
-
-        if self.current_quest_id is None:
-            # Создание нового квеста
-            quest_id = self.db.create_quest(title, difficulty, reward, description, deadline)
-
-            if quest_id:
-                self.current_quest_id = quest_id
-
-                # Геймификация
-                xp, leveled_up = self.gamification.add_xp("create_quest")
-                self.gamification.update_stats("quests_created")
-
-                msg = f"✅ Квест '{title}' успешно создан!\n+{xp} XP"
-                if leveled_up:
-                    msg += f"\n🎉 Новый уровень: {self.gamification.get_current_level()}!"
-
-                QMessageBox.information(self, "Успех", msg)
-                self.quest_created.emit(quest_id)
-                self.clear_form()
+        self._saving = True
+        self.create_button.setEnabled(False)
+        try:
+            # Модальные окна (и окно ошибок валидации) - из цикла Qt: вложенный
+            # цикл внутри корутины не дал бы выполняться другим задачам asyncio
+            if not await asyncWrap(self.validate_fields):
+                return
+
+            title = self.title_input.text().strip()
+            difficulty = self.difficulty_combo.currentText()
+            reward = self.reward_spin.value()
+            description = self.description_edit.toPlainText().strip()
+            deadline = self.deadline_edit.dateTime().toString("yyyy-MM-dd HH:mm:ss")
+
+            if self.current_quest_id is None:
+                # Создание нового квеста
+                quest_id = await self.db.create_quest(title, difficulty, reward, description, deadline)
+
+                if quest_id:
+                    self.current_quest_id = quest_id
+
+                    # Геймификация
+                    xp, leveled_up = await self.db.run(
+                        lambda db: self.gamification.reward("create_quest", "quests_created"))
+
+                    msg = f"✅ Квест '{title}' успешно создан!\n+{xp} XP"
+                    if leveled_up:
+                        msg += f"\n🎉 Новый уровень: {self.gamification.get_current_level()}!"
+
+                    await asyncWrap(QMessageBox.information, self, "Успех", msg)
+                    self.quest_created.emit(quest_id)
+                    self.clear_form()
+                else:
+                    # Название могли занять, пока индекс не получил изменение
+                    await asyncWrap(QMessageBox.critical, self, "Ошибка",
+                                    f"Не удалось создать квест: название «{title}» уже занято")
             else:
-                QMessageBox.critical(self, "Ошибка", "Не удалось создать квест")
-        else:
-            # Обновление существующего квеста
-            if self.db.update_quest(self.current_quest_id, title, difficulty,
-                                   reward, description, deadline):
-                QMessageBox.information(self, "Успех", f"✅ Квест '{title}' обновлен!")
-                self.quest_updated.emit(self.current_quest_id)
-            else:
-                QMessageBox.critical(self, "Ошибка", "Не удалось обновить квест")
-
-    def load_quest(self, quest_id: int):
+                # Обновление существующего квеста (отложенное автосохранение уже не нужно)
+                self.autosave_timer.stop()
+                quest_id = self.current_quest_id
+                if await self.db.update_quest(quest_id, title, difficulty,
+                                              reward, description, deadline):
+                    await asyncWrap(QMessageBox.information, self, "Успех", f"✅ Квест '{title}' обновлен!")
+                    self.quest_updated.emit(quest_id)
+                else:
+                    await asyncWrap(QMessageBox.critical, self, "Ошибка", "Не удалось обновить квест")
+        finally:
+            self._saving = False
+            self.create_button.setEnabled(True)
+
+    @asyncSlot(int)
+    async def load_quest(self, quest_id: int):
         """Загрузка квеста для редактирования"""
-        quest = self.db.get_quest(quest_id)
+        self.flush_autosave()
+        self._requested_quest_id = quest_id
+        quest = await self.db.get_quest(quest_id)
 
-        if quest:
+        if quest and quest_id == self._requested_quest_id:
             self.auto_save_enabled = False
 
             self.current_quest_id = quest_id
@@ -230,9 +400,11 @@ class QuestWizard(QWidget):
 
     def clear_form(self):
         """Очистка формы"""
+        self.flush_autosave()
         self.auto_save_enabled = False
 
         self.current_quest_id = None
+        self._requested_quest_id = None
         self.title_input.clear()
         self.difficulty_combo.setCurrentIndex(0)
         self.reward_spin.setValue(100)
@@ -244,4 +416,5 @@ class QuestWizard(QWidget):
         self.title_input.setStyleSheet("")
         self.description_edit.setStyleSheet("")
 
-        self.auto_save_enabled = True
\ No newline at end of file
+        self.auto_save_enabled = True
+        self.form_cleared.emit()
\ No newline at end of file
@@ -0,0 +1,103 @@
+from PyQt6.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+from PyQt6.QtCore import QRectF, QThread, pyqtSignal
+from PyQt6.QtGui import QPixmap, QPixmapCache
+import os
+
+from core.terrain import generate_terrain, save_terrain
+from core.tile_pyramid import TilePyramid
+
+# Общий бюджет декодированных тайлов (КБ): ~256 тайлов 256×256 RGBA
+TILE_CACHE_KB = 64 * 1024
+
+
+class TiledBackgroundItem(QGraphicsItem):
+    """Фон карты из пирамиды тайлов
+
+    Сцена работает в пикселях исходного изображения (уровень 0). При
+    отрисовке выбирается уровень пирамиды под текущий масштаб и
+    декодируются только тайлы из exposedRect. Декодированные тайлы живут в
+    QPixmapCache с фиксированным лимитом, поэтому память не растет при
+    панорамировании и зуме по всей карте.
+    """
+
+    def __init__(self, pyramid: TilePyramid):
+        super().__init__()
+        self.pyramid = pyramid
+        self._rect = QRectF(0, 0, pyramid.width, pyramid.height)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+        self.setZValue(-1)
+
+        if QPixmapCache.cacheLimit() < TILE_CACHE_KB:
+            QPixmapCache.setCacheLimit(TILE_CACHE_KB)
+
+    def boundingRect(self) -> QRectF:
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.pyramid.level_for_scale(scale)
+        exposed = option.exposedRect.intersected(self._rect)
+
+        for col, row, (x, y, w, h) in self.pyramid.tiles_in_rect(
+                level, exposed.left(), exposed.top(), exposed.right(), exposed.bottom()):
+            pixmap = self._tile(level, col, row)
+            if pixmap is not None:
+                painter.drawPixmap(QRectF(x, y, w, h), pixmap, QRectF(pixmap.rect()))
+
+    def _tile(self, level: int, col: int, row: int):
+        """Тайл из кэша или с диска"""
+        key = f"{self.pyramid.root}/{level}/{col}_{row}"
+        pixmap = QPixmapCache.find(key)
+        if pixmap is None:
+            pixmap = QPixmap(self.pyramid.tile_path(level, col, row))
+            if pixmap.isNull():
+                return None
+            QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+
+class PyramidBuildThread(QThread):
+    """Нарезка пирамиды тайлов в фоне (один раз на изображение)"""
+
+    progress = pyqtSignal(int, int)
+    built = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, source_path: str, cache_dir: str = "tiles", parent=None):
+        super().__init__(parent)
+        self.source_path = source_path
+        self.cache_dir = cache_dir
+
+    def run(self):
+        try:
+            pyramid = TilePyramid.build(self.source_path, self.cache_dir,
+                                        progress=self.progress.emit)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.built.emit(pyramid)
+
+
+class TerrainBuildThread(QThread):
+    """Генерация местности по seed, сохранение в PNG и нарезка в пирамиду"""
+
+    generated = pyqtSignal(str, object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, seed: int, size: int = 4096, output_dir: str = "maps", parent=None):
+        super().__init__(parent)
+        self.seed = seed
+        self.size = size
+        self.output_dir = output_dir
+
+    def run(self):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"terrain_{self.seed}_{self.size}.png")
+            terrain = generate_terrain(self.size, self.size, self.seed)
+            save_terrain(terrain, path)
+            TilePyramid.build(path)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.generated.emit(path, terrain.sites)
@@ -1,17 +1,23 @@
+import asyncio
 import sys
 from PyQt6.QtWidgets import QApplication
+from qasync import QEventLoop
 from gui.main_window import MainWindow
 
 
 def main():
     app = QApplication(sys.argv)
+    # Цикл asyncio поверх цикла Qt: окно ждёт запросы к БД через await
+    loop = QEventLoop(app)
+    asyncio.set_event_loop(loop)
 
     # Создание и отображение главного окна
     window = MainWindow()
     window.show()
 
-    sys.exit(app.exec())
+    with loop:
+        sys.exit(loop.run_forever())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
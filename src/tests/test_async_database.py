@@ -0,0 +1,76 @@
+import sys
+import os
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.async_database import AsyncDatabase
+from core.database import Database
+
+DEADLINE = "2030-12-31 12:00:00"
+
+
+def test_calls_run_on_database_thread(tmp_path):
+    async def scenario():
+        adb = AsyncDatabase(str(tmp_path / "async.db"))
+        quest_id = await adb.create_quest("Асинхронный", "Легкий", 10, "", DEADLINE)
+        assert (await adb.get_quest(quest_id))["title"] == "Асинхронный"
+        assert [q.id for q in await adb.get_quest_summaries()] == [quest_id]
+        threads = await adb.run(lambda db: {threading.current_thread().name})
+        assert threads.pop().startswith("quest-db")
+        # ошибки доходят до того, кто ждёт
+        with pytest.raises(sqlite3.OperationalError):
+            await adb.run(lambda db: db.conn.execute("SELECT * FROM nowhere"))
+        adb.close()
+
+    asyncio.run(scenario())
+
+
+def test_loop_is_not_blocked(tmp_path):
+    async def scenario():
+        adb = AsyncDatabase(str(tmp_path / "slow.db"))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.ensure_future(ticker())
+        # медленный запрос (диск, большая выборка) не останавливает цикл
+        await adb.run(lambda db: time.sleep(0.3))
+        task.cancel()
+        adb.close()
+        return ticks
+
+    assert asyncio.run(scenario()) >= 10
+
+
+def test_writes_keep_order_and_close_waits(tmp_path):
+    path = str(tmp_path / "order.db")
+    changes = []
+
+    async def scenario():
+        adb = AsyncDatabase(path)
+        adb.subscribe(changes.extend)
+        quest_id = await adb.create_quest("Черновик", "Легкий", 10, "", DEADLINE)
+        # автосохранения не ждут друг друга, но применяются по порядку
+        for i in range(20):
+            adb.update_quest(quest_id, "Черновик", "Легкий", 10, f"правка {i}", DEADLINE)
+        adb.close()
+        with pytest.raises(RuntimeError):
+            adb.get_quest(quest_id)
+        return quest_id
+
+    quest_id = asyncio.run(scenario())
+    db = Database(path)
+    assert db.get_quest(quest_id)["description"] == "правка 19"
+    db.close()
+    assert [change.op for change in changes] == ["insert"] + ["update"] * 20
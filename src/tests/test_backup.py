@@ -0,0 +1,135 @@
+import sys
+import os
+import sqlite3
+import threading
+import time
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.backup import BackupManager, copy_database, verify_backup
+from core.database import Database
+from core.quest_generator import QuestGenerator
+
+DEADLINE = "2030-01-01 12:00:00"
+
+
+def make_db(path, count=2000):
+    db = Database(path)
+    db.create_quests(QuestGenerator(7).generate(count))
+    return db
+
+
+def test_backup_is_verified_copy(tmp_path):
+    db = make_db(str(tmp_path / "quests.db"))
+    manager = BackupManager(db.db_path, backup_dir=str(tmp_path / "backups"))
+
+    result = manager.backup_now()
+    assert result.ok and result.pages > 0
+    assert manager.list_backups() == [result.path]
+    assert verify_backup(result.path, full=True) is None
+
+    # копия - самостоятельный файл с теми же квестами
+    copy = Database(result.path)
+    assert copy.get_quest_summaries() == db.get_quest_summaries()
+    copy.close()
+    db.close()
+
+
+def test_rotation_keeps_newest(tmp_path):
+    db = make_db(str(tmp_path / "quests.db"), 10)
+    backup_dir = tmp_path / "backups"
+    backup_dir.mkdir()
+    # старые копии с более ранними отметками времени
+    for day in range(1, 6):
+        (backup_dir / f"quests-2020010{day}-000000.db").write_bytes(b"")
+
+    manager = BackupManager(db.db_path, backup_dir=str(backup_dir), keep=3)
+    result = manager.backup_now()
+    backups = manager.list_backups()
+    assert backups[0] == result.path
+    assert [os.path.basename(p) for p in backups[1:]] == [
+        "quests-20200105-000000.db", "quests-20200104-000000.db"]
+    db.close()
+
+
+def test_verify_detects_corruption(tmp_path):
+    db = make_db(str(tmp_path / "quests.db"))
+    target = str(tmp_path / "copy.db")
+    copy_database(db.db_path, target)
+    db.close()
+
+    # портим страницы в середине файла
+    with open(target, "r+b") as f:
+        f.seek(os.path.getsize(target) // 2)
+        f.write(b"\xff" * 8192)
+    assert verify_backup(target) is not None
+    assert verify_backup(str(tmp_path / "missing.db")) is not None
+
+    with open(target, "wb") as f:
+        f.write(b"not a database at all")
+    assert verify_backup(target) is not None
+
+
+def test_autosaves_not_blocked_by_backup(tmp_path):
+    db = make_db(str(tmp_path / "quests.db"), 20000)
+    manager = BackupManager(db.db_path, backup_dir=str(tmp_path / "backups"), pages=16, sleep=0.001)
+
+    original = db.get_quest(1)["title"]
+    done = threading.Event()
+    results = []
+
+    def run_backup():
+        results.append(manager.backup_now())
+        done.set()
+
+    thread = threading.Thread(target=run_backup)
+    thread.start()
+    # автосохранения мастера, пока копия снимается
+    latencies = []
+    i = 0
+    while not done.is_set() or i < 20:
+        start = time.perf_counter()
+        db.update_quest(1, f"Автосохранение {i}", "Легкий", i, "Черновик", DEADLINE)
+        latencies.append((time.perf_counter() - start) * 1000)
+        i += 1
+        time.sleep(0.002)
+    thread.join()
+
+    result = results[0]
+    assert result.ok, result.error
+    latencies.sort()
+    # медиана - единицы миллисекунд; запас на медленную машину для хвоста
+    assert latencies[len(latencies) // 2] < 10
+    assert latencies[-1] < 200
+
+    # копия - согласованный снимок на какой-то момент автосохранений
+    conn = sqlite3.connect(result.path)
+    title = conn.execute("SELECT title FROM quests WHERE id = 1").fetchone()[0]
+    conn.close()
+    assert title == original or title.startswith("Автосохранение ")
+    db.close()
+
+
+def test_scheduler_runs_and_stops(tmp_path):
+    db = make_db(str(tmp_path / "quests.db"), 10)
+    results = []
+    manager = BackupManager(db.db_path, backup_dir=str(tmp_path / "backups"), interval_s=3600,
+                            on_result=results.append)
+    manager.start()
+    # первая копия сразу: свежих копий ещё нет
+    for _ in range(200):
+        if results:
+            break
+        time.sleep(0.01)
+    assert len(results) == 1 and results[0].ok
+    assert not manager.due()
+
+    manager.trigger()
+    for _ in range(200):
+        if len(results) == 2:
+            break
+        time.sleep(0.01)
+    manager.stop()
+    assert len(results) == 2
+    db.close()
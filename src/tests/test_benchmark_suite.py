@@ -0,0 +1,46 @@
+import sys
+import os
+import json
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.suite import CASES, compare, measure, run_case
+
+
+def test_compare_flags_only_real_slowdowns():
+    """Регрессия - медиана выросла сверх допуска и сверх шума"""
+    baseline = {"a": {"median": 10.0}, "b": {"median": 10.0}, "c": {"median": 0.001}, "d": {"skipped": "x"}}
+    results = {"a": {"median": 12.0}, "b": {"median": 13.0}, "c": {"median": 0.005},
+               "d": {"median": 1.0}, "new": {"median": 5.0}}
+    assert compare(results, baseline, tolerance=0.25) == [("b", 10.0, 13.0)]
+
+
+def test_measure_and_isolated_case():
+    """Статистика на вызов и случай БД на временной базе"""
+    calls = []
+    stats = measure(lambda: calls.append(1), number=3, repeat=4, warmup=2)
+    assert len(calls) == 2 + 3 * 4
+    assert stats["min"] <= stats["median"] <= stats["p95"]
+
+    stats = run_case(CASES["db.get_quest"], repeat=1)
+    assert stats["median"] > 0 and stats["number"] == CASES["db.get_quest"].number
+
+
+def test_stress_report(tmp_path):
+    """Нагрузочный прогон на маленьком каталоге пишет отчет со всеми разделами"""
+    from benchmarks import stress
+
+    output = tmp_path / "stress.json"
+    stress.main(["--quests", "300", "--versions", "2", "--calls", "20", "--exports", "0",
+                 "--label", "test", "--output", str(output)])
+    report = json.loads(output.read_text(encoding="utf-8"))
+    results = report["results"]
+    assert report["label"] == "test"
+    assert results["fill"]["quests"] == 300 and results["fill"]["versions"] == 600
+    assert results["list.get_all_quests"]["rows"] == 300
+    assert results["list.get_quest_summaries"]["rows"] == 300
+    for name in ("page.middle", "search.title_missing", "filter.difficulty_top_reward",
+                 "quest.get", "quest.update", "versions.latest_of_quest"):
+        assert results[name]["p95_ms"] >= 0
+    assert results["db.file_mb"] > 0
@@ -1,6 +1,7 @@
 import time
 import sys
 import os
+import tempfile
 
 # Добавляем корневую директорию в путь
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -14,7 +15,9 @@ def test_100_quests_in_5_seconds():
     print("🔥 Начинаем БОСС-ФАЙТ! 🔥")
     print("=" * 50)
 
-    db = Database()
+    # временная БД: тест не должен писать в настоящую adventures.db
+    tmp = tempfile.TemporaryDirectory()
+    db = Database(os.path.join(tmp.name, "boss_fight.db"))
 
     try:
         start = time.time()
@@ -43,6 +46,7 @@ def test_100_quests_in_5_seconds():
 
     finally:
         db.close()
+        tmp.cleanup()
 
 
 def test_batch_performance():
@@ -50,7 +54,8 @@ def test_batch_performance():
     print("\n🎯 Дополнительный тест производительности")
     print("=" * 50)
 
-    db = Database()
+    tmp = tempfile.TemporaryDirectory()
+    db = Database(os.path.join(tmp.name, "batch.db"))
 
     try:
         # Тест 1: 10 квестов
@@ -87,6 +92,7 @@ def test_batch_performance():
 
     finally:
         db.close()
+        tmp.cleanup()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+import sys
+import os
+import json
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from core.catalog_io import export_catalog, import_catalog, iter_records
+from core.database import Database
+from core.quest_generator import QuestGenerator
+
+
+def make_catalog(path, count=120):
+    db = Database(path)
+    db.create_quests(QuestGenerator(9).generate(count))
+    for quest_id in (1, 5, 5):
+        quest = db.get_quest(quest_id)
+        db.update_quest(quest_id, quest["title"], quest["difficulty"], quest["reward"] + 1,
+                        quest["description"], quest["deadline"])
+    db.delete_quest(7)
+    return db
+
+
+def dump(db):
+    quests = db.conn.execute("SELECT id, title, difficulty, reward, description, deadline FROM quests ORDER BY id")
+    versions = db.conn.execute("SELECT quest_id, title, reward FROM quest_versions ORDER BY quest_id, id")
+    return [tuple(r) for r in quests], [tuple(r) for r in versions]
+
+
+@pytest.mark.parametrize("name", ["catalog.ndjson", "catalog.csv"])
+def test_round_trip_with_versions(tmp_path, name):
+    source = make_catalog(str(tmp_path / "source.db"))
+    path = str(tmp_path / name)
+    assert export_catalog(source, path, versions=True) == 119 + 3
+
+    target = Database(str(tmp_path / "target.db"))
+    result = import_catalog(target, path, chunk_size=25)
+    assert (result.records, result.quests, result.versions, result.resumed_from) == (122, 119, 3, 0)
+    assert dump(target) == dump(source)
+
+    # повторный импорт ничего не дублирует
+    again = import_catalog(target, path)
+    assert (again.quests, again.versions) == (0, 0)
+    assert dump(target) == dump(source)
+
+
+def test_export_order_and_no_versions(tmp_path):
+    db = make_catalog(str(tmp_path / "source.db"), count=10)
+    records = list(iter_records(db, versions=True))
+    assert [(r["kind"], r.get("id") or r["quest_id"]) for r in records[:4]] == [
+        ("quest", 1), ("version", 1), ("quest", 2), ("quest", 3)]
+    path = str(tmp_path / "quests.ndjson")
+    assert export_catalog(db, path) == 9
+    with open(path, encoding="utf-8") as fh:
+        assert all(json.loads(line)["kind"] == "quest" for line in fh)
+
+
+def test_resume_after_interruption(tmp_path):
+    source = make_catalog(str(tmp_path / "source.db"), count=100)
+    path = str(tmp_path / "catalog.csv")
+    export_catalog(source, path, versions=True)
+    target = Database(str(tmp_path / "target.db"))
+
+    def crash(records):
+        if records >= 40:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        import_catalog(target, path, chunk_size=20, progress=crash)
+    partial = target.conn.execute("SELECT COUNT(*) FROM quests").fetchone()[0]
+    assert 0 < partial < 99
+    # индексы и триггеры восстановлены даже после прерывания
+    names = {r[0] for r in target.conn.execute("SELECT name FROM sqlite_master")}
+    assert {"idx_quests_summary", "quests_log_insert"} <= names
+
+    result = import_catalog(target, path, chunk_size=20)
+    assert result.resumed_from >= 40
+    assert dump(target) == dump(source)
+
+
+def test_changed_file_is_not_resumed(tmp_path):
+    source = make_catalog(str(tmp_path / "source.db"), count=30)
+    path = str(tmp_path / "catalog.ndjson")
+    export_catalog(source, path)
+    target = Database(str(tmp_path / "target.db"))
+
+    def crash(records):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        import_catalog(target, path, chunk_size=10, progress=crash)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write("\n")
+    with pytest.raises(ValueError):
+        import_catalog(target, path)
+    assert import_catalog(target, path, resume=False).quests == 29 - 10  # первый блок уже загружен
+
+
+def test_hand_written_csv(tmp_path):
+    path = tmp_path / "manual.csv"
+    path.write_text("title,reward,difficulty\nРучной квест,150,Легкий\n\"Квест, с запятой\",,\n", encoding="utf-8")
+    db = Database(str(tmp_path / "target.db"))
+    changes = []
+    db.subscribe(changes.extend)
+    result = import_catalog(db, str(path))
+    assert result.quests == 2
+    quests = {q["title"]: q for q in db.get_all_quests()}
+    assert quests["Ручной квест"]["reward"] == 150
+    assert quests["Квест, с запятой"]["reward"] is None
+    assert quests["Квест, с запятой"]["created_at"]
+    # подписчики узнают о массовой загрузке одним событием reset
+    assert [c.op for c in changes] == ["reset"]
@@ -0,0 +1,85 @@
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.catalog_io import main as catalog_main
+from core.database import CatalogStats, Database
+from core.quest_generator import QuestGenerator
+
+TODAY = "2030-06-15"
+
+
+def recount(db):
+    """Итоги полным проходом по quests - с ними сверяется статистика"""
+    rows = db.conn.execute("SELECT difficulty, reward, deadline FROM quests").fetchall()
+    by_difficulty, rewards = {}, {}
+    for difficulty, reward, _ in rows:
+        by_difficulty[difficulty] = by_difficulty.get(difficulty, 0) + 1
+        rewards[difficulty] = rewards.get(difficulty, 0) + (reward or 0)
+    overdue = sum(1 for *_, deadline in rows if deadline and deadline[:10] < TODAY)
+    return CatalogStats(len(rows), sum(rewards.values()), by_difficulty, rewards, overdue)
+
+
+def test_triggers_follow_every_write():
+    db = Database(":memory:")
+    assert db.get_catalog_stats(TODAY) == CatalogStats(0, 0, {}, {}, 0)
+
+    first = db.create_quest("Просрочен", "Легкий", 10, "", "2030-06-14 23:59:00")
+    second = db.create_quest("Сегодня", "Сложный", 50, "", "2030-06-15 08:00:00")
+    db.create_quest("Без всего", None, None, "", None)
+    db.create_quests(QuestGenerator(3).generate(500))
+    assert db.get_catalog_stats(TODAY) == recount(db)
+
+    # автосохранение текста не трогает статистику, смена полей - трогает
+    db.update_quest(first, "Просрочен!", "Легкий", 10, "Новый текст", "2030-06-14 23:59:00")
+    db.update_quest(second, "Сегодня", "Легкий", 70, "", "2030-01-01 00:00:00")
+    db.delete_quest(first)
+    db.conn.execute("DELETE FROM quests WHERE id IN (SELECT id FROM quests LIMIT 100 OFFSET 50)")
+    db.conn.commit()
+
+    stats = db.get_catalog_stats(TODAY)
+    assert stats == recount(db)
+    assert stats.by_difficulty[None] == 1
+    assert db.verify_catalog_stats() == []
+    db.close()
+
+
+def test_verify_and_rebuild(tmp_path):
+    db = Database(str(tmp_path / "stats.db"))
+    db.create_quests(QuestGenerator(5).generate(300))
+
+    db.conn.execute("UPDATE quest_stats SET quests = quests + 1")
+    db.conn.execute("DELETE FROM quest_deadline_days WHERE day = (SELECT MIN(day) FROM quest_deadline_days)")
+    db.conn.commit()
+    problems = db.verify_catalog_stats()
+    assert problems and any(p.startswith("quest_deadline_days") for p in problems)
+    assert catalog_main(["stats", "--db", db.db_path, "--verify"]) == 1
+
+    db.rebuild_catalog_stats()
+    assert db.verify_catalog_stats() == []
+    assert db.get_catalog_stats(TODAY) == recount(db)
+    assert catalog_main(["stats", "--db", db.db_path, "--verify"]) == 0
+    db.close()
+
+
+def test_bulk_load_and_interrupted_load(tmp_path):
+    path = str(tmp_path / "bulk.db")
+    db = Database(path)
+    with db.bulk_load():
+        db.create_quests(QuestGenerator(9).generate(400))
+    assert db.verify_catalog_stats() == []
+    assert db.get_catalog_stats(TODAY).quests == 400
+
+    # загрузка оборвалась посреди: триггеров нет, статистика устарела
+    for op in ("insert", "update", "delete"):
+        db.conn.execute(f"DROP TRIGGER quests_stats_{op}")
+    db.create_quests(QuestGenerator(10).generate(50))
+    db.close()
+
+    # при следующем открытии она пересчитывается
+    db = Database(path)
+    assert db.verify_catalog_stats() == []
+    assert db.get_catalog_stats(TODAY) == recount(db)
+    db.close()
@@ -0,0 +1,81 @@
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import core.database as database
+from core.database import Database, QuestChange
+from core.quest_generator import QuestGenerator
+
+DEADLINE = "2030-01-01 12:00:00"
+
+
+def test_in_process_events():
+    db = Database(":memory:")
+    received = []
+    unsubscribe = db.subscribe(received.append)
+
+    quest_id = db.create_quest("Лента", "Легкий", 10, "Описание", DEADLINE)
+    db.update_quest(quest_id, "Лента 2", "Легкий", 20, "Описание", DEADLINE)
+    assert db.create_quest("Лента 2", "Легкий", 10, "Дубликат", DEADLINE) is None
+    db.delete_quest(quest_id)
+
+    # одно событие на коммит, в порядке записи
+    assert [[(c.quest_id, c.op) for c in batch] for batch in received] == [
+        [(quest_id, "insert")], [(quest_id, "update")], [(quest_id, "delete")]]
+    assert all(isinstance(c, QuestChange) for batch in received for c in batch)
+
+    unsubscribe()
+    db.create_quest("После отписки", "Легкий", 1, "", DEADLINE)
+    assert len(received) == 3
+    db.close()
+
+
+def test_bulk_insert_and_other_connection(tmp_path):
+    path = str(tmp_path / "feed.db")
+    db = Database(path)
+    received = []
+    db.subscribe(received.extend)
+
+    assert db.create_quests(QuestGenerator(1).generate(25), chunk_size=10) == 25
+    assert sorted(c.quest_id for c in received) == list(range(1, 26))
+
+    # другой процесс пишет в тот же файл: изменения приходят через poll_changes
+    other = Database(path)
+    other.update_quest(3, "Чужая правка", "Легкий", 1, "", DEADLINE)
+    other.delete_quest(4)
+    other.close()
+    received.clear()
+    assert db.poll_changes() == 2
+    assert [(c.quest_id, c.op) for c in received] == [(3, "update"), (4, "delete")]
+    assert db.poll_changes() == 0
+
+    seq = received[0].seq
+    assert [c.quest_id for c in db.changes_since(seq - 1)] == [3, 4]
+    assert db.last_change_seq() == received[-1].seq
+    db.close()
+
+
+def test_failing_subscriber_does_not_break_writes():
+    db = Database(":memory:")
+    received = []
+
+    def broken(changes):
+        raise RuntimeError("сломанный подписчик")
+
+    db.subscribe(broken)
+    db.subscribe(received.append)
+    assert db.create_quest("Устойчивость", "Легкий", 1, "", DEADLINE) == 1
+    assert len(received) == 1
+    db.close()
+
+
+def test_change_log_is_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "CHANGE_LOG_KEEP", 5)
+    path = str(tmp_path / "prune.db")
+    db = Database(path)
+    db.create_quests(QuestGenerator(2).generate(20))
+    assert len(db.changes_since(0)) == 5
+    assert db.changes_since(0)[-1].seq == 20  # seq не откатывается после чистки
+    db.close()
@@ -0,0 +1,109 @@
+import sys
+import os
+import sqlite3
+from datetime import datetime
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.deadlines import DeadlineScheduler, normalize_deadline, parse_deadline, wall_clock_ts
+
+START = wall_clock_ts(datetime(2030, 1, 1))
+
+
+def ts(day, hour=12):
+    return wall_clock_ts(datetime(2030, 1, day, hour))
+
+
+def deadline(day, hour=12):
+    return f"2030-01-{day:02d} {hour:02d}:00:00"
+
+
+def test_parse_and_normalize():
+    assert normalize_deadline("15.06.2030 12:30") == "2030-06-15 12:30:00"
+    assert normalize_deadline("2030-06-15T12:30") == "2030-06-15 12:30:00"
+    assert normalize_deadline("2030/06/15") == "2030-06-15 00:00:00"
+    assert normalize_deadline("когда-нибудь") == "когда-нибудь"
+    assert normalize_deadline(None) is None
+    assert parse_deadline("2030-06-15 12:30:00") == datetime(2030, 6, 15, 12, 30)
+    # шкала deadline_ts - местное время, прочитанное как UTC
+    assert wall_clock_ts(datetime(1970, 1, 2)) == 86400
+
+
+def test_deadline_column_and_index():
+    db = Database(":memory:")
+    quest_id = db.create_quest("Точный срок", "Легкий", 1, "", "05.01.2030 12:00")
+    assert db.get_quest(quest_id)["deadline"] == deadline(5)
+    assert db.get_quest(quest_id)["deadline_ts"] == ts(5)
+    db.update_quest(quest_id, "Точный срок", "Легкий", 1, "", "2030-01-07T12:00")
+    assert db.get_deadline_ts([quest_id, 999]) == [(quest_id, ts(7))]
+
+    plan = db.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT deadline_ts, id FROM quests WHERE deadline_ts >= 1 AND "
+        "(deadline_ts > 1 OR id > 1) ORDER BY deadline_ts, id LIMIT 5").fetchall()
+    assert "idx_quests_deadline" in plan[0][3] and "TEMP B-TREE" not in str([tuple(r) for r in plan])
+    db.close()
+
+
+def test_migration_of_old_database(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE quests (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT UNIQUE NOT NULL,
+        difficulty TEXT, reward INTEGER, description TEXT, deadline TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)
+    """)
+    conn.executemany("INSERT INTO quests (title, deadline) VALUES (?, ?)", [
+        ("ISO", deadline(3)), ("Точки", "02.01.2030 12:00"), ("Без срока", None), ("Текст", "скоро")])
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    rows = db.conn.execute("SELECT title, deadline, deadline_ts FROM quests ORDER BY id").fetchall()
+    assert [tuple(r) for r in rows] == [
+        ("ISO", deadline(3), ts(3)), ("Точки", deadline(2), ts(2)),
+        ("Без срока", None, None), ("Текст", "скоро", None)]
+    assert db.next_deadlines(START) == [(ts(2), 2), (ts(3), 1)]
+    db.close()
+
+
+def test_scheduler_fires_in_order_with_refills():
+    db = Database(":memory:")
+    ids = {day: db.create_quest(f"Квест {day}", "Легкий", 1, "", deadline(day)) for day in range(2, 12)}
+    scheduler = DeadlineScheduler(db, k=3, start_ts=START)
+    assert len(scheduler) == 3 and scheduler.next_due() == ts(2)
+
+    assert scheduler.due(ts(1)) == []
+    fired = scheduler.due(ts(6))
+    assert [event.quest_id for event in fired] == [ids[day] for day in range(2, 7)]
+    assert fired[0].title == "Квест 2" and fired[0].deadline_ts == ts(2)
+    # уже сработавшие не повторяются
+    assert scheduler.due(ts(6)) == []
+    assert [event.quest_id for event in scheduler.due(ts(30))] == [ids[day] for day in range(7, 12)]
+    assert scheduler.next_due() is None
+    db.close()
+
+
+def test_scheduler_follows_change_feed():
+    db = Database(":memory:")
+    ids = {day: db.create_quest(f"Квест {day}", "Легкий", 1, "", deadline(day)) for day in range(10, 20)}
+    scheduler = DeadlineScheduler(db, k=3, start_ts=START)
+    db.subscribe(scheduler.apply_changes)
+
+    early = db.create_quest("Срочный", "Легкий", 1, "", deadline(5))   # раньше всех в куче
+    late = db.create_quest("Поздний", "Легкий", 1, "", deadline(28))   # за горизонтом
+    db.update_quest(ids[10], "Квест 10", "Легкий", 1, "", deadline(25))  # уехал за горизонт
+    db.update_quest(ids[15], "Квест 15", "Легкий", 1, "", deadline(6))   # приехал в окно
+    db.delete_quest(ids[11])
+    db.update_quest(ids[12], "Квест 12", "Легкий", 1, "Правка текста", deadline(12))
+
+    order = [event.quest_id for event in scheduler.due(ts(30))]
+    expected = [early, ids[15], ids[12]] + [ids[day] for day in (13, 14, 16, 17, 18, 19)] + [ids[10], late]
+    assert order == expected
+
+    # bulk_load присылает reset: планировщик перечитывает окно
+    with db.bulk_load():
+        db.create_quests([("Из импорта", "Легкий", 1, "", "2030-02-01 12:00")])
+    assert scheduler.next_due() == wall_clock_ts(datetime(2030, 2, 1, 12))
+    db.close()
@@ -0,0 +1,40 @@
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.geometry import simplify_polyline
+
+
+def test_straight_line_collapses_to_endpoints():
+    """Точки на прямой выбрасываются, концы остаются"""
+    points = [(float(x), 2.0 * x) for x in range(1000)]
+    assert simplify_polyline(points, 0.5) == [points[0], points[-1]]
+
+
+def test_corners_survive_simplification():
+    """Углы ломаной сохраняются, шум в пределах допуска убирается"""
+    points = [(x, 0.1 * (x % 2)) for x in range(0, 50)] + [(49, y) for y in range(1, 50)]
+    simplified = simplify_polyline(points, 1.0)
+    assert simplified[0] == points[0] and simplified[-1] == points[-1]
+    assert len(simplified) == 3
+    assert simplified[1][0] == 49
+
+
+def test_tolerance_bound_is_respected():
+    """Каждая исходная точка не дальше допуска от упрощенной линии"""
+    import math
+    points = [(x * 0.5, 20 * math.sin(x * 0.05)) for x in range(2000)]
+    tolerance = 0.75
+    simplified = simplify_polyline(points, tolerance)
+    assert len(simplified) < len(points) // 10
+
+    def dist(p, a, b):
+        (px, py), (ax, ay), (bx, by) = p, a, b
+        dx, dy = bx - ax, by - ay
+        t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+        return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+    for p in points:
+        assert min(dist(p, a, b) for a, b in zip(simplified, simplified[1:])) <= tolerance + 1e-9
@@ -0,0 +1,28 @@
+import sys
+import os
+import subprocess
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HEAVY = ["weasyprint", "docx", "qrcode", "jinja2", "numpy", "gui.map_editor"]
+
+
+def loaded_after(statement):
+    """Какие тяжёлые модули загружены после statement (в чистом процессе)"""
+    code = f"import sys; {statement}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True,
+                            env=dict(os.environ, QT_QPA_PLATFORM="offscreen"), check=True).stdout
+    return output.split()
+
+
+def test_startup_imports_stay_light():
+    # тяжёлые библиотеки экспорта и редактора карт не нужны до первого использования
+    assert loaded_after("import core.template_engine") == []
+    assert loaded_after("import gui.main_window") == []
+
+
+def test_optional_dependencies_resolve_on_access():
+    loaded = loaded_after("import core.template_engine as te; te.Environment")
+    assert loaded == ["jinja2"]
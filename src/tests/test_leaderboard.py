@@ -0,0 +1,96 @@
+import time
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.gamification import GamificationEngine
+
+
+def test_profile_state_is_persisted():
+    """XP, статистика и достижения профиля переживают перезапуск движка"""
+    db = Database(":memory:")
+    try:
+        engine = GamificationEngine(db, profile="alice")
+        for _ in range(10):
+            engine.add_xp("create_quest")
+            engine.update_stats("quests_created")
+
+        reloaded = GamificationEngine(db, profile="alice")
+        assert reloaded.total_xp == engine.total_xp == 120  # 10 * 10 + 20 за достижение
+        assert reloaded.stats["quests_created"] == 10
+        assert [a["id"] for a in reloaded.get_unlocked_achievements()] == ["quest_maker_10"]
+
+        # второй профиль не видит чужой прогресс
+        assert GamificationEngine(db, profile="bob").total_xp == 0
+    finally:
+        db.close()
+
+
+def test_ranks_and_leaderboard():
+    """Рейтинг по XP и по отдельной статистике"""
+    db = Database(":memory:")
+    try:
+        ids = [db.get_or_create_profile(f"hero{i}") for i in range(4)]
+        db.add_profile_xp(ids[1], 300)
+        db.add_profile_xp(ids[2], 300)
+        db.add_profile_xp(ids[3], 50)
+        db.increment_profile_stat(ids[3], "maps_saved", 5)
+
+        assert [p["id"] for p in db.get_leaderboard(3)] == [ids[1], ids[2], ids[3]]
+        assert db.get_profile_rank(ids[1]) == db.get_profile_rank(ids[2]) == 1
+        assert db.get_profile_rank(ids[3]) == 3
+        assert db.get_profile_rank(ids[0]) == 4
+        assert db.get_profile_stat_rank(ids[3], "maps_saved") == 1
+        assert db.get_profile_stat_rank(ids[0], "maps_saved") == 2
+        assert db.get_profile_rank(999) is None
+    finally:
+        db.close()
+
+
+def test_rank_cache_sees_other_connections(tmp_path):
+    """Кэш рангов сбрасывается, когда другой процесс меняет XP"""
+    path = str(tmp_path / "guild.db")
+    db, other = Database(path), Database(path)
+    try:
+        me = db.get_or_create_profile("me")
+        db.add_profile_xp(me, 10)
+        assert db.get_profile_rank(me) == 1
+
+        rival = other.get_or_create_profile("rival")
+        other.add_profile_xp(rival, 20)
+        assert db.get_profile_rank(me) == 2
+        assert other.get_or_create_profile("me") == me
+
+        # записи квестов и свои изменения XP кэш не сбрасывают
+        cached = db._rank_cache["xp"]
+        other.create_quest("Чужой квест", "Легкий", 10, "Описание", "2030-01-01 12:00:00")
+        db.add_profile_xp(me, 15)
+        assert db.get_profile_rank(me) == 1
+        assert db._rank_cache["xp"] is cached
+    finally:
+        other.close()
+        db.close()
+
+
+def test_rank_lookup_at_100k_profiles():
+    """Поиск ранга при 100k профилей занимает меньше миллисекунды"""
+    db = Database(":memory:")
+    try:
+        db.conn.executemany(
+            "INSERT INTO profiles (name, total_xp) VALUES (?, ?)",
+            ((f"p{i}", (i * 7919) % 100_000) for i in range(100_000)),
+        )
+        db.conn.commit()
+
+        db.get_profile_rank(1)  # прогрев кэша
+        start = time.perf_counter()
+        for profile_id in range(1, 100_001, 100):
+            db.get_profile_rank(profile_id)
+        per_lookup = (time.perf_counter() - start) / 1000
+
+        assert per_lookup < 0.001, f"{per_lookup * 1000:.3f} мс на поиск ранга"
+    finally:
+        db.close()
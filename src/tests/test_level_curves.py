@@ -0,0 +1,49 @@
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.gamification import GamificationEngine
+from core.level_curves import LevelCurve
+
+
+def test_default_curve_matches_100_xp_per_level():
+    """Линейная кривая по умолчанию совпадает со старой формулой"""
+    engine = GamificationEngine()
+    for xp in (0, 1, 99, 100, 250, 10_000):
+        engine.total_xp = xp
+        assert engine.get_current_level() == 1 + xp // 100
+        assert engine.get_progress_to_next_level() == (xp % 100, 100, xp % 100)
+
+
+def test_table_curve_and_tail():
+    """Табличная кривая и продолжение за пределами таблицы"""
+    curve = LevelCurve.from_thresholds([0, 50, 150, 400])
+    assert [curve.level_for(xp) for xp in (0, 49, 50, 149, 150, 399, 400)] == [1, 1, 2, 2, 3, 3, 4]
+    # после таблицы каждый уровень стоит как последний шаг (250 XP)
+    assert curve.level_for(650) == 5
+    assert curve.progress(500) == (100, 250, 40)
+
+
+def test_exponential_curve_handles_huge_xp():
+    """Экспоненциальная кривая и очень большие значения XP"""
+    curve = LevelCurve.exponential(base=100, growth=1.5, max_level=50)
+    assert curve.level_for(99) == 1
+    assert curve.level_for(100) == 2
+    assert curve.level_for(250) == 3
+
+    huge = 10 ** 40
+    level = curve.level_for(huge)
+    assert curve.level_start(level) <= huge < curve.level_start(level + 1)
+    xp_into, required, percent = curve.progress(huge)
+    assert 0 <= xp_into < required and 0 <= percent < 100
+
+
+def test_curve_swap_at_runtime():
+    """Смена кривой (новый сезон) сразу меняет уровень"""
+    engine = GamificationEngine()
+    engine.total_xp = 300
+    assert engine.get_current_level() == 4
+    engine.set_level_curve(LevelCurve.from_thresholds([0, 1000]))
+    assert engine.get_current_level() == 1
@@ -0,0 +1,55 @@
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.map_format import MapData, encode_map, decode_map
+
+
+def sample_map() -> MapData:
+    data = MapData(1024, 768, background="maps/region.png")
+    data.add_stroke([(0.5, 1.5), (10.25, 20.75), (30.0, 40.0)])
+    data.add_stroke([(100.0, 100.0), (200.0, 50.0)])
+    data.markers = [(15.0, 25.0, "Город"), (300.5, 400.5, "Логово"), (1.0, 2.0, "Город")]
+    data.labels = [(50.0, 60.0, "Тёмный лес"), (0.0, 0.0, "")]
+    return data
+
+
+def test_roundtrip():
+    """Кодирование и декодирование карты без потерь"""
+    data = sample_map()
+    decoded = decode_map(encode_map(data))
+    assert decoded == data
+    assert decoded.strokes[0].tolist() == [0.5, 1.5, 10.25, 20.75, 30.0, 40.0]
+
+    empty = decode_map(encode_map(MapData()))
+    assert empty == MapData() and empty.background is None
+
+
+def test_rejects_foreign_blob():
+    """Чужие данные не принимаются за карту"""
+    try:
+        decode_map(b"PNG\x00" + bytes(20))
+    except ValueError:
+        pass
+    else:
+        assert False, "ожидался ValueError"
+
+
+def test_map_stored_with_quest():
+    """Карта хранится в БД по quest_id и удаляется вместе с квестом"""
+    db = Database(":memory:")
+    try:
+        quest_id = db.create_quest("Квест с картой", "Легкий", 100, "описание", "2025-12-31 23:59:59")
+        assert db.get_quest_map(quest_id) is None
+
+        db.save_quest_map(quest_id, encode_map(sample_map()))
+        db.save_quest_map(quest_id, encode_map(MapData(640, 480)))
+        assert decode_map(db.get_quest_map(quest_id)).width == 640
+
+        db.delete_quest(quest_id)
+        assert db.get_quest_map(quest_id) is None
+    finally:
+        db.close()
@@ -0,0 +1,102 @@
+import sys
+import os
+import json
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from core.database import Database
+from core.metrics import METRICS, Histogram, MetricsRegistry, timed
+
+
+@pytest.fixture
+def metrics():
+    """Глобальный реестр включен на время теста и затем возвращен в исходное состояние"""
+    enabled, profiling = METRICS.enabled, METRICS.profiling
+    METRICS.reset()
+    METRICS.enabled = True
+    yield METRICS
+    METRICS.enabled, METRICS.profiling = enabled, profiling
+    METRICS.reset()
+
+
+def test_histogram_summary():
+    """Квантили - с точностью до ширины корзины, count/min/max - точно"""
+    hist = Histogram()
+    for i in range(1, 1001):
+        hist.observe(i / 100)  # 0.01 .. 10 мс
+    summary = hist.summary()
+    assert summary["count"] == 1000
+    assert summary["min_ms"] == 0.01
+    assert summary["max_ms"] == 10
+    assert summary["mean_ms"] == pytest.approx(5.005)
+    assert summary["p50_ms"] == pytest.approx(5, rel=0.2)
+    assert summary["p95_ms"] == pytest.approx(9.5, rel=0.2)
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"] <= summary["max_ms"]
+    assert Histogram().summary()["p95_ms"] == 0
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+
+    @timed("work", registry)
+    def work(x):
+        return x * 2
+
+    assert work(21) == 42
+    registry.inc("counter")
+    assert registry.snapshot()["histograms"] == {}
+    assert registry.snapshot()["counters"] == {}
+
+
+def test_timed_database_calls(metrics):
+    db = Database(":memory:")
+    quest_id = db.create_quest("Метрики", "Легкий", 10, "Описание", "2030-01-01 12:00:00")
+    for _ in range(5):
+        db.get_quest(quest_id)
+    with pytest.raises(TypeError):
+        db.get_quest()
+    db.close()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["histograms"]["db.create_quest"]["count"] == 1
+    assert snapshot["histograms"]["db.get_quest"]["count"] == 6
+    assert snapshot["counters"]["db.get_quest.errors"] == 1
+
+
+def test_gamification_counters(metrics):
+    from core.gamification import GamificationEngine
+
+    engine = GamificationEngine(Database(":memory:"), profile="metrics")
+    engine.add_xp("create_quest")
+    snapshot = metrics.snapshot()
+    assert snapshot["histograms"]["gamification.add_xp"]["count"] == 1
+    assert snapshot["counters"]["gamification.xp_gained"] > 0
+
+
+def test_profiling_and_json_dump(metrics, tmp_path):
+    metrics.profiling = True
+
+    @timed("outer")
+    def outer():
+        return inner() + 1
+
+    @timed("inner")
+    def inner():
+        return sum(range(1000))
+
+    for _ in range(3):
+        outer()
+    # профилируется только внешний вызов, вложенный попадает в его профиль
+    assert "inner" in metrics.profile_text("outer")
+    assert metrics.profile_text("inner") == ""
+    assert metrics.snapshot()["histograms"]["inner"]["count"] == 3
+
+    path = tmp_path / "metrics.json"
+    text = metrics.dump_json(str(path))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data == json.loads(text)
+    assert data["profiled"] == ["outer"]
+    assert data["histograms"]["outer"]["count"] == 3
@@ -0,0 +1,40 @@
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from core.png_writer import PngWriter
+
+
+def test_streamed_bands_roundtrip(tmp_path):
+    """Полосы с выравниванием строк складываются в корректный PNG с DPI"""
+    Image = pytest.importorskip("PIL.Image")
+    path = str(tmp_path / "out.png")
+    width, height, stride = 5, 7, 24  # 5 * 4 = 20 байт + 4 байта выравнивания
+
+    with PngWriter(path, width, height, alpha=True, dpi=300) as writer:
+        for top, rows in ((0, 3), (3, 4)):
+            band = bytearray()
+            for y in range(top, top + rows):
+                for x in range(width):
+                    band += bytes((x * 40, y * 30, 7, 255))
+                band += b"\xff" * (stride - width * 4)
+            writer.write_rows(band, stride)
+
+    image = Image.open(path)
+    assert image.size == (width, height)
+    assert image.info["dpi"] == pytest.approx((300, 300), abs=0.01)
+    assert image.getpixel((4, 6)) == (160, 180, 7, 255)
+
+
+def test_row_count_checked(tmp_path):
+    """Лишние или недостающие строки - ошибка"""
+    writer = PngWriter(str(tmp_path / "bad.png"), 2, 2, alpha=False)
+    with pytest.raises(ValueError):
+        writer.write_rows(bytes(6 * 3))
+    writer.write_rows(bytes(6))
+    with pytest.raises(ValueError):
+        writer.close()
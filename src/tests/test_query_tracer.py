@@ -0,0 +1,81 @@
+import sys
+import os
+import logging
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlite3
+
+import pytest
+
+from core.database import Database
+from core.query_tracer import normalize_sql
+from core.quest_generator import QuestGenerator
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT *  FROM quests\n\tWHERE id = 5;") == "SELECT * FROM quests WHERE id = ?"
+    assert normalize_sql("SELECT * FROM t WHERE name = 'O''Neil' AND x > -1.5e3") == \
+        "SELECT * FROM t WHERE name = ? AND x > ?"
+    assert normalize_sql("DELETE FROM t WHERE id IN (1, 2, 3) -- чистка") == "DELETE FROM t WHERE id IN (?)"
+    # цифры внутри имен не трогаем
+    assert normalize_sql("SELECT col2 FROM t2") == "SELECT col2 FROM t2"
+
+
+def test_statement_stats():
+    db = Database(":memory:")
+    db.create_quests(QuestGenerator(1).generate(300))
+    tracer = db.trace_queries(threshold_ms=10_000)
+
+    for quest_id in range(1, 11):
+        db.get_quest(quest_id)
+    assert len(db.get_all_quests()) == 300
+    quest = db.get_quest(1)
+    db.update_quest(1, quest["title"], quest["difficulty"], 1, quest["description"], quest["deadline"])
+
+    stats = {row["sql"]: row for row in tracer.report()}
+    by_id = stats["SELECT * FROM quests WHERE id = ?"]
+    assert by_id["count"] == 11
+    assert by_id["rows"] == 11
+    assert by_id["p95_ms"] <= by_id["max_ms"]
+    scan = stats["SELECT * FROM quests ORDER BY created_at DESC"]
+    assert scan["count"] == 1 and scan["rows"] == 300
+    assert scan["steps"] > 0  # progress handler: полный скан - тысячи шагов VM
+    assert stats["COMMIT"]["count"] >= 1
+    assert "BEGIN" in stats  # неявный BEGIN виден только через trace callback
+    assert not tracer.slow
+    assert "ORDER BY created_at" in tracer.format_report()
+
+    assert db.stop_tracing() is tracer
+    assert isinstance(db.conn, sqlite3.Connection)
+    db.get_quest(1)
+    assert tracer.stats["SELECT * FROM quests WHERE id = ?"].count == 11  # после остановки не пишет
+    db.close()
+
+
+def test_slow_query_logged_with_plan(caplog):
+    db = Database(":memory:")
+    db.create_quests(QuestGenerator(2).generate(200))
+    tracer = db.trace_queries(threshold_ms=0)
+
+    with caplog.at_level(logging.WARNING, logger="core.query_tracer"):
+        db.get_all_quests()
+
+    slow = [q for q in tracer.slow if q.sql.startswith("SELECT * FROM quests ORDER BY")]
+    assert slow and slow[0].rows == 200
+    assert "SCAN quests" in slow[0].plan
+    assert "slow query" in caplog.text and "SCAN quests" in caplog.text
+    db.close()
+
+
+def test_errors_counted_and_transactions_work():
+    db = Database(":memory:")
+    tracer = db.trace_queries()
+    with pytest.raises(sqlite3.OperationalError):
+        db.conn.execute("SELECT * FROM missing_table")
+    assert tracer.stats["SELECT * FROM missing_table"].errors == 1
+
+    assert db.create_quests(QuestGenerator(3).generate(50), chunk_size=20) == 50
+    assert len(db.get_all_quests()) == 50
+    db.close()
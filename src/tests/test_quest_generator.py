@@ -0,0 +1,54 @@
+import sys
+import os
+from datetime import datetime
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database, MAX_TITLE_LENGTH, MIN_DESCRIPTION_WORDS
+from core.quest_generator import QuestGenerator, DIFFICULTIES, min_description_words
+
+START = datetime(2030, 1, 1)
+
+
+def test_deterministic_for_seed():
+    """Один seed и дата старта - один и тот же поток квестов"""
+    a = list(QuestGenerator(42, START).generate(500))
+    b = list(QuestGenerator(42, START).generate(500))
+    c = list(QuestGenerator(43, START).generate(500))
+    assert a == b
+    assert a != c
+    # поток не зависит от того, как его режут на пачки
+    batched = [q for batch in QuestGenerator(42, START).batches(500, size=77) for q in batch]
+    assert batched == a
+
+
+def test_quests_pass_wizard_validation():
+    """Названия уникальны, непусты и не длиннее 50 символов, описание не короче 50 слов, награда по сложности"""
+    assert min_description_words() >= MIN_DESCRIPTION_WORDS
+    limits = {name: (rewards, days) for name, _, rewards, days in DIFFICULTIES}
+
+    quests = list(QuestGenerator(1, START).generate(20000))
+    assert len({q.title for q in quests}) == len(quests)
+    # поле названия в мастере обрезает длинные молча - вместе с номером " #N"
+    assert max(len(q.title) for q in quests) <= MAX_TITLE_LENGTH
+    for q in quests[:5000]:
+        assert q.title.strip()
+        assert len(q.description.split()) >= MIN_DESCRIPTION_WORDS
+        (low, high), (first, last) = limits[q.difficulty]
+        assert low <= q.reward <= high
+        assert f"{q.reward} золотых" in q.description
+        days = (datetime.strptime(q.deadline, "%Y-%m-%d %H:%M:%S") - START).days
+        assert first <= days <= last
+
+
+def test_bulk_insert():
+    """Пакетная вставка потоком, повторные названия пропускаются"""
+    db = Database(":memory:")
+    try:
+        assert db.create_quests(QuestGenerator(5, START).generate(2500), chunk_size=1000) == 2500
+        assert db.create_quests(QuestGenerator(5, START).generate(10)) == 0
+        quest = db.get_all_quests()[0]
+        assert len(quest["description"].split()) >= MIN_DESCRIPTION_WORDS
+    finally:
+        db.close()
@@ -0,0 +1,59 @@
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database, QuestSummary
+from core.quest_generator import QuestGenerator
+
+
+def make_db(count=100):
+    db = Database(":memory:")
+    db.create_quests(QuestGenerator(5).generate(count))
+    return db
+
+
+def test_summaries_match_full_quests():
+    db = make_db()
+    summaries = db.get_quest_summaries()
+    assert len(summaries) == 100
+    assert all(type(s) is QuestSummary for s in summaries)
+    # одна секунда created_at у всех: порядок от новых к старым по id
+    assert [s.id for s in summaries] == list(range(100, 0, -1))
+    full = {q["id"]: q for q in db.get_all_quests()}
+    for s in summaries:
+        assert (s.title, s.difficulty, s.reward) == (full[s.id]["title"], full[s.id]["difficulty"],
+                                                     full[s.id]["reward"])
+    assert db.get_quest_summary(7).title == full[7]["title"]
+    assert db.get_quest_summary(10_000) is None
+    db.close()
+
+
+def test_pagination():
+    db = make_db()
+    everything = db.get_quest_summaries()
+    assert db.get_quest_summaries(10) == everything[:10]
+    assert db.get_quest_summaries(10, 95) == everything[95:]
+    assert db.get_quest_summaries(offset=50) == everything[50:]
+
+
+def test_list_query_uses_covering_index():
+    db = make_db(10)
+    plan = db.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id, title, difficulty, reward FROM quests "
+        "ORDER BY created_at DESC, id DESC LIMIT -1 OFFSET 0"
+    ).fetchall()
+    details = " ".join(row[3] for row in plan)
+    assert "COVERING INDEX idx_quests_summary" in details
+    assert "TEMP B-TREE" not in details  # без сортировки
+
+
+def test_summaries_while_tracing():
+    db = make_db(10)
+    tracer = db.trace_queries()
+    assert len(db.get_quest_summaries()) == 10
+    assert isinstance(db.get_quest_summary(1), QuestSummary)
+    assert any(row["rows"] == 10 for row in tracer.report())
+    # обычные запросы по-прежнему получают sqlite3.Row
+    assert db.get_quest(1)["id"] == 1
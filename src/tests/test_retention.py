@@ -0,0 +1,150 @@
+import sys
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.retention import DAY, RetentionJob, RetentionPolicy
+
+NOW = datetime(2030, 6, 15, 12, 0, 0)
+DEADLINE = "2030-12-31 12:00:00"
+
+
+def add_versions(db, quest_id, ages, description="v"):
+    """Версии квеста с заданным возрастом в секундах (порядок id = порядок времени)"""
+    rows = [(quest_id, f"{description} {age}", (NOW - timedelta(seconds=age)).strftime("%Y-%m-%d %H:%M:%S"))
+            for age in sorted(ages, reverse=True)]
+    db.conn.executemany(
+        "INSERT INTO quest_versions (quest_id, title, description, created_at) VALUES (?, 'v', ?, ?)", rows)
+    db.conn.commit()
+
+
+def kept(db, quest_id):
+    rows = db.conn.execute("SELECT description FROM quest_versions WHERE quest_id = ? ORDER BY id",
+                           (quest_id,)).fetchall()
+    return [int(row[0].split()[-1]) for row in rows]
+
+
+def test_policy_thins_history(tmp_path):
+    db = Database(str(tmp_path / "versions.db"))
+    quest = db.create_quest("История", "Легкий", 1, "", DEADLINE)
+    hour = 3600
+    ages = [
+        60, 120,                                     # свежие: все
+        2 * DAY + 10, 2 * DAY + 20, 2 * DAY + 30,    # один час в почасовом окне -> одна
+        3 * DAY + 5 * hour,                          # отдельный час -> остаётся
+        10 * DAY + 100, 10 * DAY + 2 * hour,         # один день в подневном окне -> одна
+        40 * DAY,                                    # старше подневного окна -> удаляется
+    ]
+    add_versions(db, quest, ages)
+    orphan = 999
+    add_versions(db, orphan, [60])
+
+    policy = RetentionPolicy(keep_last=1, keep_all_s=DAY, hourly_s=5 * DAY, daily_s=30 * DAY)
+    job = RetentionJob(db.db_path, policy, pause=0)
+    assert job.count(NOW) == 5
+    result = job.run_once(NOW)
+    assert result.deleted == 5 and result.batches == 1
+
+    assert kept(db, quest) == [10 * DAY + 100, 3 * DAY + 5 * hour, 2 * DAY + 10, 120, 60]
+    assert kept(db, orphan) == []
+
+    # keep_last бережёт новейшие, как бы стары они ни были
+    old = db.create_quest("Старый", "Легкий", 1, "", DEADLINE)
+    add_versions(db, old, [100 * DAY, 101 * DAY, 102 * DAY])
+    RetentionJob(db.db_path, policy._replace(keep_last=2), pause=0).run_once(NOW)
+    assert kept(db, old) == [101 * DAY, 100 * DAY]
+
+    # без предела возраста остаётся по версии на день
+    forever = db.create_quest("Навсегда", "Легкий", 1, "", DEADLINE)
+    add_versions(db, forever, [400 * DAY, 400 * DAY + 60, 500 * DAY])
+    RetentionJob(db.db_path, policy._replace(daily_s=None), pause=0).run_once(NOW)
+    assert kept(db, forever) == [500 * DAY, 400 * DAY]
+    db.close()
+
+
+def test_batches_and_incremental_vacuum(tmp_path):
+    path = str(tmp_path / "bloated.db")
+    db = Database(path)
+    assert db.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    for i in range(5):
+        quest = db.create_quest(f"Квест {i}", "Легкий", 1, "", DEADLINE)
+        add_versions(db, quest, [10 * DAY + n for n in range(400)], description="x" * 2000)
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    before = os.path.getsize(path)
+
+    job = RetentionJob(path, RetentionPolicy(keep_last=1, keep_all_s=0, hourly_s=0, daily_s=0),
+                       batch_quests=2, vacuum_pages=64, pause=0)
+    result = job.run_once(NOW)
+    assert result.batches == 3 and result.deleted == 5 * 399
+    assert result.pages_freed > 0
+    assert os.path.getsize(path) < before / 4
+    # приложение продолжает работать со своим соединением
+    assert db.update_quest(1, "Квест 0", "Легкий", 2, "после", DEADLINE)
+    db.close()
+
+
+def test_old_database_needs_conversion(tmp_path):
+    path = str(tmp_path / "old.db")
+    sqlite3.connect(path).execute("CREATE TABLE legacy (x)").connection.close()
+    db = Database(path)
+    quest = db.create_quest("Старый файл", "Легкий", 1, "", DEADLINE)
+    add_versions(db, quest, [10 * DAY + n for n in range(50)], description="x" * 2000)
+    db.close()
+
+    job = RetentionJob(path, RetentionPolicy(keep_last=1, keep_all_s=0, hourly_s=0, daily_s=0), pause=0)
+    result = job.run_once(NOW)
+    # страницы освободились, но файл не ужимается без incremental vacuum
+    assert result.deleted == 49 and result.pages_freed == 0
+    assert job.enable_incremental_vacuum()
+    assert not job.enable_incremental_vacuum()
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
+
+
+class LimitedJob(RetentionJob):
+    """Соединение с пределом переменных старых сборок SQLite"""
+
+    def _connect(self):
+        conn = super()._connect()
+        conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        return conn
+
+
+def test_delete_is_sliced_under_variable_limit(tmp_path):
+    db = Database(str(tmp_path / "long.db"))
+    quest = db.create_quest("Долгая история", "Легкий", 1, "", DEADLINE)
+    add_versions(db, quest, [10 * DAY + n for n in range(3000)])
+    policy = RetentionPolicy(keep_last=5, keep_all_s=0, hourly_s=0, daily_s=0)
+
+    # одним DELETE на всю пачку квестов это не влезает в 999 переменных
+    result = LimitedJob(db.db_path, policy, delete_rows=999, pause=0).run_once(NOW)
+    assert result.deleted == 2995 and result.batches == 1
+    assert len(kept(db, quest)) == 5
+    db.close()
+
+
+def test_schedule_survives_failed_run(tmp_path):
+    runs = []
+
+    class FlakyJob(RetentionJob):
+        def run_once(self, now=None):
+            runs.append(now)
+            if len(runs) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            return super().run_once(now)
+
+    db = Database(str(tmp_path / "flaky.db"))
+    job = FlakyJob(db.db_path, pause=0)
+    job.start(interval_s=0.01, first_delay_s=0)
+    deadline = time.monotonic() + 5
+    while len(runs) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    job.stop()
+    assert len(runs) >= 3 and job.last_result is not None
+    db.close()
@@ -0,0 +1,110 @@
+import json
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.catalog_io import import_catalog
+from core.database import Database
+from core.quest_generator import QuestGenerator
+from core.similarity import SimilarityIndex, jaccard, signatures
+
+DEADLINE = "2030-01-01 12:00:00"
+
+
+def test_signatures_estimate_jaccard():
+    quests = list(QuestGenerator(2).generate(60))
+    texts = [quest.description for quest in quests]
+    rows = signatures(texts + ["", "Один"])
+    assert rows.shape == (62, 128) and rows.dtype == np.uint16
+    for i in range(0, 60, 2):
+        estimate = (rows[i] == rows[i + 1]).mean()
+        assert abs(estimate - jaccard(texts[i], texts[i + 1])) < 0.15
+    # тот же текст в другом регистре и с другой пунктуацией - та же сигнатура
+    assert (signatures([texts[0].upper().replace(".", "!")])[0] == rows[0]).all()
+    assert jaccard("", texts[0]) == 0.0
+
+
+def test_index_follows_writes():
+    db = Database(":memory:")
+    with db.bulk_load():
+        db.create_quests(QuestGenerator(3).generate(300))
+    index = SimilarityIndex(db)
+    assert index.pending() == 300
+    db.subscribe(index.apply_changes)
+    assert index.refresh() == 300 and index.pending() == 0
+
+    original = db.get_quest(10)
+    copy = db.create_quest("Почти копия", "Легкий", 10, original["description"] + " Спешите!", DEADLINE)
+    assert index.pending() == 0  # переиндексирован подписчиком сразу после записи
+    matches = index.find_similar(copy, 0.8)
+    assert 10 in [match.quest_id for match in matches]
+    assert [match.quest_id for match in index.find_similar(10, 0.8, exact=True)][:1] == [copy]
+
+    # описание переписано - копия больше не похожа
+    db.update_quest(copy, "Почти копия", "Легкий", 10, "Совсем другая история про утерянный ключ", DEADLINE)
+    assert copy not in [match.quest_id for match in index.find_similar(10, 0.8)]
+    assert index.find_similar_text("Совсем другая история про утерянный ключ", 0.9)[0].quest_id == copy
+
+    db.delete_quest(copy)
+    assert index.find_similar_text("Совсем другая история про утерянный ключ", 0.5) == []
+    assert index.find_similar_text("") == []
+    db.close()
+
+
+def test_changes_from_another_connection(tmp_path):
+    path = str(tmp_path / "adventures.db")
+    db = Database(path)
+    first = db.create_quest("Первый", "Легкий", 10, "Гоблины украли мельничный жернов у старого мельника", DEADLINE)
+    second = db.create_quest("Второй", "Легкий", 10, "Дракон спит на горе и видит сны о золоте", DEADLINE)
+    index = SimilarityIndex(db)
+    index.refresh()
+    assert index.find_similar(first, 0.5) == []
+
+    # другой процесс переписал описание: триггер помечает квест, refresh его переиндексирует
+    other = Database(path)
+    other.update_quest(second, "Второй", "Легкий", 10, "Гоблины украли мельничный жернов у старого мельника!", DEADLINE)
+    other.close()
+    assert index.pending() == 1
+    assert index.refresh() == 1
+    assert [match.quest_id for match in index.find_similar(first, 0.9)] == [second]
+    db.close()
+
+
+def test_import_below_indexed_ids(tmp_path):
+    db = Database(str(tmp_path / "adventures.db"))
+    with db.bulk_load():
+        db.create_quests(QuestGenerator(4).generate(20))
+    index = SimilarityIndex(db)
+    index.refresh()
+    for quest_id in range(2, 11):
+        db.delete_quest(quest_id)
+    assert index.refresh() == 9 and index.pending() == 0
+
+    source = db.get_quest(1)
+    catalog = tmp_path / "catalog.ndjson"
+
+    def import_copy(quest_id, title):
+        # импорт сохраняет id из файла - ниже самого большого проиндексированного
+        catalog.write_text(json.dumps({
+            "kind": "quest", "id": quest_id, "title": title, "difficulty": "Легкий", "reward": 10,
+            "description": source["description"], "deadline": DEADLINE, "created_at": source["created_at"],
+        }, ensure_ascii=False) + "\n", encoding="utf-8")
+        import_catalog(db, str(catalog), resume=False)
+
+    import_copy(5, "Импортированный")
+    assert index.pending() == 1
+    assert index.refresh() == 1 and index.pending() == 0
+    assert 5 in [match.quest_id for match in index.find_similar(1, 0.9)]
+
+    # подписчик видит "reset" от импорта и сам проверяет всю таблицу
+    db.subscribe(index.apply_changes)
+    import_copy(7, "Еще один")
+    assert index.pending() == 0
+    assert 7 in [match.quest_id for match in index.find_similar(1, 0.9)]
+    db.close()
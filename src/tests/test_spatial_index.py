@@ -0,0 +1,46 @@
+import math
+import random
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.spatial_index import GridIndex
+
+
+def test_query_and_remove():
+    """Поиск по прямоугольнику и удаление по id"""
+    index = GridIndex(cell_size=10)
+    index.insert(1, (0, 0, 5, 5))
+    index.insert(2, (100, 100, 130, 130))
+    index.insert(3, (-40, -40, 200, 200))  # объект на много ячеек
+
+    assert sorted(index.query_rect((1, 1, 2, 2))) == [1, 3]
+    assert sorted(index.query_point(120, 120)) == [2, 3]
+    assert index.remove(3) and not index.remove(3)
+    assert index.query_point(50, 50, radius=5) == []
+    assert len(index) == 2
+
+
+def test_nearest_matches_brute_force():
+    """Ближайший объект совпадает с полным перебором"""
+    rng = random.Random(7)
+    index = GridIndex(cell_size=32)
+    centres = {}
+    for obj_id in range(2000):
+        x, y = rng.uniform(-500, 3000), rng.uniform(-500, 3000)
+        centres[obj_id] = (x, y)
+        index.insert(obj_id, (x - 15, y - 15, x + 15, y + 15))
+
+    even = lambda obj_id: obj_id % 2 == 0
+    for _ in range(200):
+        qx, qy = rng.uniform(-1000, 3500), rng.uniform(-1000, 3500)
+        expected = min(centres, key=lambda i: math.hypot(centres[i][0] - qx, centres[i][1] - qy))
+        assert index.nearest(qx, qy) == expected
+
+        expected_even = min((i for i in centres if even(i)),
+                            key=lambda i: math.hypot(centres[i][0] - qx, centres[i][1] - qy))
+        assert index.nearest(qx, qy, predicate=even) == expected_even
+
+    assert index.nearest(-5000, -5000, max_distance=10) is None
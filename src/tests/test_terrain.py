@@ -0,0 +1,36 @@
+import sys
+import os
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core.terrain import generate_terrain, value_noise, SEA_LEVEL
+
+
+def test_same_seed_same_map():
+    """Один seed - одна и та же карта, другой seed - другая"""
+    a = generate_terrain(512, 384, seed=7)
+    b = generate_terrain(512, 384, seed=7)
+    c = generate_terrain(512, 384, seed=8)
+
+    assert a.image.shape == (384, 512, 4) and a.image.dtype == np.uint8
+    assert np.array_equal(a.image, b.image)
+    assert a.sites == b.sites and [r.tolist() for r in a.rivers] == [r.tolist() for r in b.rivers]
+    assert not np.array_equal(a.image, c.image)
+
+
+def test_noise_range_and_sites_on_land():
+    """Высоты в 0..1, маркеры лежат на суше внутри карты"""
+    heights = value_noise(300, 200, seed=1)
+    assert heights.shape == (200, 300) and heights.dtype == np.float32
+    assert heights.min() == 0.0 and heights.max() == pytest.approx(1.0)
+
+    terrain = generate_terrain(1024, 1024, seed=3)
+    assert terrain.sites
+    for x, y, marker_type in terrain.sites:
+        assert 0 <= x < 1024 and 0 <= y < 1024
+        assert terrain.heights[int(y), int(x)] >= SEA_LEVEL
@@ -0,0 +1,46 @@
+import sys
+import os
+import random
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from core.text_stats import WordCounter, analyze_text, count_syllables
+
+
+def test_word_counter_matches_split_after_random_edits():
+    rng = random.Random(3)
+    alphabet = "ab вг  \n\t  "
+    counter = WordCounter("начало текста")
+    for _ in range(3000):
+        text = counter.text
+        position = rng.randint(0, len(text))
+        removed = rng.randint(0, min(5, len(text) - position))
+        inserted = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6)))
+        counter.apply(position, removed, inserted)
+        assert counter.text == text[:position] + inserted + text[position + removed:]
+        assert counter.words == len(counter.text.split())
+
+
+def test_word_counter_edits_inside_words():
+    counter = WordCounter("один два три")
+    assert counter.apply(4, 1, "") == 2           # "одиндва три"
+    assert counter.apply(4, 0, " ") == 3          # снова "один два три"
+    assert counter.apply(0, len(counter.text), "") == 0
+    with pytest.raises(ValueError):
+        counter.apply(1, 1, "x")
+
+
+def test_analyze_text():
+    simple = "Мы шли. Был дом. Там кот. " * 3
+    hard = ("Многочисленные исследовательские экспедиции, организованные гильдией, "
+            "систематически обнаруживали непредсказуемые архитектурные особенности подземелий")
+    report = analyze_text(simple + " lorem ipsum", min_repeats=3)
+    assert report.words == 20 and report.sentences == 10
+    assert ("мы шли был", 3) in report.repeated
+    assert report.forbidden == ["ipsum", "lorem"]
+    assert analyze_text(simple).readability > analyze_text(hard).readability
+    assert analyze_text("").readability == 0 and analyze_text("").repeated == []
+    assert count_syllables("подземелье") == 4 and count_syllables("брр") == 1
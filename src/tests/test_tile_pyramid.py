@@ -0,0 +1,109 @@
+import sys
+import os
+import warnings
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+Image = pytest.importorskip("PIL.Image")
+
+from core import tile_pyramid
+from core.tile_pyramid import TilePyramid
+
+
+def make_image(path, width=1000, height=600):
+    Image.new("RGB", (width, height), (120, 200, 40)).save(path)
+    return str(path)
+
+
+def test_build_levels_and_tiles(tmp_path):
+    """Пирамида уменьшается вдвое до одного тайла, тайлы лежат на диске"""
+    source = make_image(tmp_path / "map.png")
+    calls = []
+    pyramid = TilePyramid.build(source, str(tmp_path / "tiles"), tile_size=256,
+                                progress=lambda done, total: calls.append((done, total)))
+
+    assert (pyramid.width, pyramid.height) == (1000, 600)
+    assert pyramid.levels == [(1000, 600), (500, 300), (250, 150)]
+    assert calls == [(1, 3), (2, 3), (3, 3)]
+    assert os.path.exists(pyramid.tile_path(0, 3, 2))
+    assert os.path.exists(pyramid.tile_path(2, 0, 0))
+    assert not os.path.exists(pyramid.tile_path(2, 1, 0))
+
+
+def test_tiles_in_rect_and_level_for_scale(tmp_path):
+    """Выбор уровня по масштабу и только пересекающиеся тайлы"""
+    source = make_image(tmp_path / "map.png")
+    pyramid = TilePyramid.build(source, str(tmp_path / "tiles"), tile_size=256)
+
+    assert pyramid.level_for_scale(2.0) == 0
+    assert pyramid.level_for_scale(1.0) == 0
+    assert pyramid.level_for_scale(0.5) == 1
+    assert pyramid.level_for_scale(0.01) == pyramid.max_level
+
+    tiles = list(pyramid.tiles_in_rect(0, 300, 10, 520, 20))
+    assert [(col, row) for col, row, _ in tiles] == [(1, 0), (2, 0)]
+    assert tiles[0][2] == (256, 0, 256, 256)
+
+    # на грубом уровне один тайл покрывает всю карту в координатах уровня 0
+    (col, row, rect), = pyramid.tiles_in_rect(2, 0, 0, 999, 599)
+    assert (col, row) == (0, 0)
+    assert rect == pytest.approx((0, 0, 1000, 600))
+
+
+def test_cached_until_source_changes(tmp_path):
+    """Готовая пирамида переиспользуется, измененный исходник - нет"""
+    source = make_image(tmp_path / "map.png")
+    cache_dir = str(tmp_path / "tiles")
+    assert TilePyramid.cached(source, cache_dir) is None
+
+    built = TilePyramid.build(source, cache_dir)
+    assert TilePyramid.cached(source, cache_dir).root == built.root
+
+    make_image(tmp_path / "map.png", 300, 300)
+    os.utime(source, ns=(0, 0))
+    assert TilePyramid.cached(source, cache_dir) is None
+
+
+def test_source_limit_is_not_global(tmp_path, monkeypatch):
+    """Карта больше предела Pillow строится, сам предел Pillow не меняется"""
+    source = make_image(tmp_path / "map.png")
+
+    # между пределом и двумя пределами Pillow только предупреждает
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 400_000)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert TilePyramid.build(source, str(tmp_path / "warned")).width == 1000
+
+    # выше двух пределов Image.open отказывает
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100_000)
+    with pytest.raises(Image.DecompressionBombError):
+        Image.open(source)
+    assert TilePyramid.build(source, str(tmp_path / "tiles")).width == 1000
+    assert Image.MAX_IMAGE_PIXELS == 100_000
+
+    # свой предел проверяется по заявленному размеру, до декодирования
+    monkeypatch.setattr(tile_pyramid, "MAX_SOURCE_PIXELS", 500_000)
+    with pytest.raises(ValueError):
+        TilePyramid.build(make_image(tmp_path / "other.png", 1000, 501), str(tmp_path / "tiles"))
+    with pytest.raises(Image.UnidentifiedImageError):
+        TilePyramid.build(__file__, str(tmp_path / "tiles"))
+
+
+def test_unguarded_open_on_pinned_pillow(tmp_path):
+    """_open_unguarded опирается на Image.OPEN: проверено на pillow 12 из requirements.txt.
+
+    При обновлении Pillow тест падает - сверить Image.OPEN и конструктор
+    классов форматов, затем поднять версию здесь.
+    """
+    assert PIL.__version__.split(".")[0] == "12"
+    for name in ("map.png", "map.jpg", "map.tif", "map.bmp"):
+        path = make_image(tmp_path / name)
+        image = tile_pyramid._open_unguarded(path)
+        image.load()
+        reference = Image.open(path)
+        assert (image.format, image.size, image.mode) == (reference.format, reference.size, reference.mode)
+        assert image.tobytes() == reference.tobytes()
@@ -0,0 +1,101 @@
+import sys
+import os
+import random
+import threading
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import Database
+from core.title_index import TitleIndex
+
+
+def reference_complete(titles, prefix, limit=10):
+    key = prefix.casefold()
+    matches = sorted((title.casefold(), title, quest_id) for quest_id, title in titles.items()
+                     if title.casefold().startswith(key))
+    return [title for _, title, _ in matches[:limit]]
+
+
+def test_complete_and_find():
+    index = TitleIndex([(1, "Тень дракона"), (2, "Тайна озера"), (3, "тень Луны"), (4, "Башня")])
+    assert index.complete("тЕн") == ["Тень дракона", "тень Луны"]
+    assert index.complete("т", limit=2) == ["Тайна озера", "Тень дракона"]
+    assert index.complete("Замок") == []
+    assert index.find("Башня") == 4
+    assert index.find("башня") is None      # как UNIQUE в БД: регистр важен
+    assert "Тайна озера" in index and len(index) == 4
+
+
+def test_updates_match_reference_across_compactions():
+    rng = random.Random(7)
+    words = ["Тень", "тайна", "Башня", "башни", "Озеро", "Ё", "ёж", "Z"]
+    titles = {quest_id: f"{rng.choice(words)} {quest_id}" for quest_id in range(1, 300)}
+    index = TitleIndex(titles.items(), compact_after=40)
+    for step in range(600):
+        quest_id = rng.randint(1, 400)
+        if rng.random() < 0.3:
+            titles.pop(quest_id, None)
+            index.update({quest_id: None})
+        else:
+            titles[quest_id] = f"{rng.choice(words)} {rng.choice(words)} {step}"
+            index.update({quest_id: titles[quest_id]})
+        if step % 50 == 0:
+            assert len(index) == len(titles)
+            for prefix in ["", "т", "Ба", "ё", "z", "Озеро Т"]:
+                assert index.complete(prefix) == reference_complete(titles, prefix)
+            for quest_id, title in rng.sample(sorted(titles.items()), 20):
+                assert index.find(title) == quest_id
+
+
+def test_compaction_in_another_thread_keeps_later_updates():
+    rng = random.Random(11)
+    words = ["Тень", "тайна", "Башня", "Озеро", "ёж"]
+    titles = {quest_id: f"{rng.choice(words)} {quest_id}" for quest_id in range(1, 500)}
+    index = TitleIndex(titles.items(), compact_after=50)
+    for step in range(400):
+        quest_id = rng.randint(1, 600)
+        titles[quest_id] = None if rng.random() < 0.3 else f"{rng.choice(words)} {rng.choice(words)} {step}"
+        index.update({quest_id: titles[quest_id]}, compact=False)
+        if index.needs_compaction():
+            build = index.start_compaction()
+            assert not index.needs_compaction()     # одно слияние за раз
+            result = []
+            worker = threading.Thread(target=lambda: result.append(build()))
+            worker.start()
+            # пока идёт слияние, индекс меняется и отвечает
+            for _ in range(10):
+                quest_id = rng.randint(1, 600)
+                titles[quest_id] = f"{rng.choice(words)} во время {step}.{quest_id}"
+                index.update({quest_id: titles[quest_id]}, compact=False)
+                assert index.find(titles[quest_id]) == quest_id
+            worker.join()
+            index.finish_compaction(result[0])
+    live = {quest_id: title for quest_id, title in titles.items() if title is not None}
+    assert len(index) == len(live)
+    for prefix in ["", "т", "Ба", "ё", "Озеро Т"]:
+        assert index.complete(prefix) == reference_complete(live, prefix)
+    for quest_id, title in live.items():
+        assert index.find(title) == quest_id
+
+
+def test_follows_change_feed():
+    db = Database(":memory:")
+    first = db.create_quest("Тень дракона", "Легкий", 1, "", "2030-01-01 12:00:00")
+    second = db.create_quest("Тайна озера", "Легкий", 1, "", "2030-01-01 12:00:00")
+    index = TitleIndex.from_database(db)
+    db.subscribe(lambda changes: index.apply_changes(changes, db))
+
+    db.update_quest(first, "Тень Луны", "Легкий", 1, "", "2030-01-01 12:00:00")
+    db.delete_quest(second)
+    third = db.create_quest("Тайна башни", "Легкий", 1, "", "2030-01-01 12:00:00")
+    assert index.find("Тень дракона") is None
+    assert index.find("Тень Луны") == first
+    assert index.complete("Тай") == ["Тайна башни"]
+
+    # bulk_load присылает reset: индекс перестраивается из БД
+    with db.bulk_load():
+        db.create_quests([("Тайна замка", "Легкий", 1, "", "2030-01-01 12:00:00")])
+    assert index.complete("Тай") == ["Тайна башни", "Тайна замка"]
+    assert index.find("Тайна башни") == third
+    db.close()